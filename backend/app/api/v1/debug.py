@@ -0,0 +1,17 @@
+"""
+Диагностические endpoints XIO
+"""
+
+from typing import Any, Dict
+from fastapi import APIRouter, Query
+from app.ws.broker import event_broker
+
+router = APIRouter()
+
+@router.get("/debug/latency")
+async def delivery_latency(limit: int = Query(default=10, ge=1, le=100)) -> Dict[str, Any]:
+    """Самые медленные комнаты и подключения по задержке от emit до записи в сокет"""
+    return {
+        "queue_depth": event_broker.get_health()["queue_depth"],
+        **event_broker.connection_manager.get_latency_report(limit)
+    }
@@ -2,11 +2,13 @@
 Health check endpoints для XIO
 """
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, HTTPException, Response, status
 from typing import Dict, Any
 import logging
 
 from app.config.settings import get_settings
+from app.observability.health import health_monitor
+from app.observability.prometheus import render_metrics
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -23,34 +25,32 @@ async def health_check() -> Dict[str, Any]:
 
 
 @router.get("/ready", status_code=status.HTTP_200_OK)
-async def readiness_check() -> Dict[str, Any]:
-    """Проверка готовности сервиса к обработке запросов"""
-    settings = get_settings()
+async def readiness_check(response: Response) -> Dict[str, Any]:
+    """
+    Проверка готовности сервиса к обработке запросов.
     
-    # TODO: Добавить проверки подключений к БД, Redis, ChromaDB
-    checks = {
-        "database": "unknown",  # await check_database_connection()
-        "redis": "unknown",     # await check_redis_connection()
-        "chroma": "unknown",    # await check_chroma_connection()
-    }
-    
-    all_ready = all(check == "healthy" for check in checks.values())
+    Отвечает из кеша фоновых проверок, поэтому частый опрос
+    оркестратором не создает нагрузки на зависимости.
+    """
+    readiness = health_monitor.readiness()
+    if readiness["status"] != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
     
     return {
-        "status": "ready" if all_ready else "not_ready",
         "service": "XIO Backend",
         "version": "0.1.0",
-        "checks": checks
+        **readiness
     }
 
 
 @router.get("/metrics", status_code=status.HTTP_200_OK)
-async def metrics() -> Dict[str, Any]:
-    """Базовые метрики сервиса"""
-    # TODO: Интеграция с Prometheus
-    return {
-        "active_meetings": 0,
-        "total_runs": 0,
-        "active_runs": 0,
-        "tool_calls_total": 0
-    } 
\ No newline at end of file
+async def metrics() -> Response:
+    """Метрики сервиса в формате Prometheus"""
+    if not get_settings().ENABLE_METRICS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Метрики отключены (ENABLE_METRICS=false)"
+        )
+    
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
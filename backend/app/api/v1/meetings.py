@@ -7,14 +7,13 @@ from typing import Dict, Any, List
 import logging
 
 from app.ws.broker import connection_manager, event_broker
-from app.orchestrator.manager import XIOOrchestrator
+from app.orchestrator.admission import AdmissionTimeoutError
+from app.orchestrator.manager import orchestrator
+from app.services.run_log import run_log
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Глобальный экземпляр оркестратора (в продакшн должен быть через DI)
-orchestrator = XIOOrchestrator()
-
 
 @router.post("/meetings", status_code=status.HTTP_201_CREATED)
 async def create_meeting(meeting_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -46,7 +45,7 @@ async def start_meeting(meeting_id: str, start_data: Dict[str, Any] = None) -> D
         agenda = start_data.get("agenda")
         
         # Запускаем оркестратор
-        run_id = await orchestrator.start_run(meeting_id, topic, agenda)
+        run_id = await orchestrator.start_run(meeting_id, topic, agenda, start_data.get("team_id"))
         
         # Отправляем событие о запуске
         await event_broker.emit_event({
@@ -64,6 +63,10 @@ async def start_meeting(meeting_id: str, start_data: Dict[str, Any] = None) -> D
             "status": "started"
         }
         
+    except AdmissionTimeoutError as e:
+        # Все слоты консилиумов заняты - клиент может повторить позже
+        logger.warning(f"Встреча {meeting_id} не запущена: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Ошибка запуска встречи {meeting_id}: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -116,9 +119,9 @@ async def control_meeting(meeting_id: str, control_data: Dict[str, Any]) -> Dict
         if action == "pause":
             result = await orchestrator.pause_run()
         elif action == "resume":
-            result = await orchestrator.resume_run()
+            result = await orchestrator.resume_run(meeting_id)
         elif action == "stop":
-            result = await orchestrator.stop_run()
+            result = await orchestrator.stop_run(meeting_id)
         elif action == "request_alt":
             result = await orchestrator.request_alternatives()
         elif action == "request_risk":
@@ -129,7 +132,8 @@ async def control_meeting(meeting_id: str, control_data: Dict[str, Any]) -> Dict
             await event_broker.emit_event({
                 "type": "run_status",
                 "meeting_id": meeting_id,
-                "run_id": orchestrator._current_run_id,
+                # После паузы run уже не принадлежит процессу - берем его из журнала
+                "run_id": orchestrator._current_run_id or await run_log.store.run_for_meeting(meeting_id),
                 "status": action,
                 "action": action
             })
@@ -142,6 +146,9 @@ async def control_meeting(meeting_id: str, control_data: Dict[str, Any]) -> Dict
             "status": "executed" if result else "failed"
         }
         
+    except AdmissionTimeoutError as e:
+        logger.warning(f"Действие {action} для встречи {meeting_id} отклонено: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except Exception as e:
         logger.error(f"Ошибка выполнения действия {action} для встречи {meeting_id}: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -175,8 +182,14 @@ async def get_meeting_status(meeting_id: str) -> Dict[str, Any]:
     orchestrator_status = orchestrator.get_status()
     room_info = connection_manager.get_room_info(meeting_id)
     
+    # Состояние run и очередь берутся из общего хранилища, а не из памяти реплики
+    run_state = await run_log.load_for_meeting(meeting_id)
+    speaking_order = await run_log.get_speaking_order(meeting_id)
+    
     return {
         "meeting_id": meeting_id,
+        "run": run_state.model_dump(mode="json") if run_state else None,
+        "speaking_order": speaking_order.model_dump(mode="json") if speaking_order else None,
         "orchestrator": orchestrator_status,
         "websocket": room_info,
         "timestamp": "now"
@@ -12,7 +12,9 @@ from app.models.participants import (
     ParticipantUpdate,
     SpeakingOrder
 )
+from app.models.runs import RunEventType
 from app.services.participants import participant_service
+from app.services.run_log import SpeakingOrderConflict, run_log
 
 router = APIRouter()
 
@@ -65,12 +67,17 @@ async def update_participant_status(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Участник {agent_id} не найден"
         )
+    await run_log.record_for_meeting(participant.meeting_id, RunEventType.PARTICIPANT_STATUS, {
+        "agent_id": agent_id,
+        "status": participant.status.value
+    })
     return participant
 
 @router.get("/meetings/{meeting_id}/speaking-order", response_model=SpeakingOrder)
 async def get_speaking_order(meeting_id: str) -> SpeakingOrder:
     """Получает текущий порядок выступления"""
-    order = participant_service.get_speaking_order(meeting_id)
+    # Общая очередь из хранилища run видна с любой реплики
+    order = await run_log.get_speaking_order(meeting_id) or participant_service.get_speaking_order(meeting_id)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -87,15 +94,30 @@ async def create_speaking_order(meeting_id: str) -> SpeakingOrder:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Нет участников для встречи {meeting_id}"
         )
-    return participant_service.create_speaking_order(meeting_id, participants)
+    order = await _update_speaking_order(
+        meeting_id, lambda current: participant_service.build_speaking_order(meeting_id, participants)
+    )
+    return participant_service.apply_speaking_order(order)
 
 @router.post("/meetings/{meeting_id}/next-speaker", response_model=SpeakingOrder)
 async def next_speaker(meeting_id: str) -> SpeakingOrder:
     """Переключает на следующего спикера"""
-    order = participant_service.next_speaker(meeting_id)
+    def advance(current: Optional[SpeakingOrder]) -> Optional[SpeakingOrder]:
+        current = current or participant_service.get_speaking_order(meeting_id)
+        if not current or not current.order:
+            return None
+        return participant_service.advance_speaking_order(current)
+
+    order = await _update_speaking_order(meeting_id, advance)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Не удалось переключить спикера для встречи {meeting_id}"
         )
-    return order 
\ No newline at end of file
+    return participant_service.apply_speaking_order(order)
+
+async def _update_speaking_order(meeting_id: str, change) -> Optional[SpeakingOrder]:
+    try:
+        return await run_log.update_speaking_order(meeting_id, change)
+    except SpeakingOrderConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
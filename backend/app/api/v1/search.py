@@ -0,0 +1,37 @@
+"""
+API endpoints для поиска по сообщениям
+"""
+
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Query
+from app.models.messages import MessageRole, MessageType
+from app.models.search import MessageSearchPage
+from app.services.search import message_search
+
+router = APIRouter()
+
+@router.get("/search/messages", response_model=MessageSearchPage)
+async def search_messages(
+    q: str = Query(..., min_length=1, description="Поисковый запрос"),
+    meeting_id: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    role: Optional[MessageRole] = None,
+    message_type: Optional[MessageType] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: int = Query(default=1, ge=1),
+    size: int = Query(default=20, ge=1, le=100)
+) -> MessageSearchPage:
+    """Полнотекстовый поиск по сообщениям с ранжированием BM25"""
+    return await message_search.search(
+        q,
+        meeting_id=meeting_id,
+        agent_id=agent_id,
+        role=role,
+        message_type=message_type,
+        date_from=date_from,
+        date_to=date_to,
+        limit=size,
+        offset=(page - 1) * size
+    )
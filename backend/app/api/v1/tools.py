@@ -2,10 +2,12 @@
 Tools API endpoints для XIO
 """
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
 from typing import Dict, Any, List
 import logging
 
+from app.tools.registry_service import tool_registry
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
@@ -13,55 +15,34 @@ router = APIRouter()
 @router.get("/tools/available", status_code=status.HTTP_200_OK)
 async def get_available_tools() -> List[Dict[str, Any]]:
     """Получить список доступных инструментов"""
-    # TODO: Получение из реестра
-    
     return [
         {
-            "definition_id": "notion.decision_log",
-            "name": "Create Decision Log",
-            "description": "Создает страницу с журналом решений в Notion",
-            "visibility": "ce"
-        },
-        {
-            "definition_id": "notion.action_item",
-            "name": "Create Action Item",
-            "description": "Создает задачу в Notion",
-            "visibility": "ce"
-        },
-        {
-            "definition_id": "slack.send_message",
-            "name": "Send Slack Message",
-            "description": "Отправляет сообщение в Slack",
-            "visibility": "ce"
+            "definition_id": definition.definition_id,
+            "name": definition.name,
+            "description": definition.description,
+            "visibility": definition.visibility
         }
+        for definition in tool_registry.list_definitions()
     ]
 
 
 @router.get("/tool-definitions", status_code=status.HTTP_200_OK)
-async def list_tool_definitions() -> List[Dict[str, Any]]:
+async def list_tool_definitions(response: Response) -> List[Dict[str, Any]]:
     """Получить список определений инструментов"""
-    # TODO: Получение из БД
+    # Один снимок на весь ответ - согласованное состояние при перезагрузке
+    snapshot = tool_registry.snapshot
+    response.headers["X-Tool-Registry-Generation"] = str(snapshot.generation)
     
     return [
         {
-            "definition_id": "notion.decision_log",
-            "name": "Create Decision Log",
-            "json_schema": {
-                "type": "object",
-                "properties": {
-                    "meeting_id": {"type": "string"},
-                    "title": {"type": "string"},
-                    "alternatives": {"type": "array"},
-                    "rationale": {"type": "string"}
-                },
-                "required": ["meeting_id", "title"]
-            },
-            "runtime_constraints": {
-                "timeout": 30,
-                "cpu_limit": "0.1",
-                "memory_limit": "128m"
-            }
+            "definition_id": definition.definition_id,
+            "name": definition.name,
+            "json_schema": definition.json_schema,
+            "runtime_constraints": definition.runtime_constraints,
+            "generation": snapshot.definition_generations.get(definition_id),
+            "registry_generation": snapshot.generation
         }
+        for definition_id, definition in snapshot.definitions.items()
     ]
 
 
@@ -3,7 +3,7 @@
 """
 
 from functools import lru_cache
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -38,6 +38,20 @@ class Settings(BaseSettings):
     # ChromaDB
     CHROMA_HOST: str = Field(default="localhost", env="CHROMA_HOST")
     CHROMA_PORT: int = Field(default=8001, env="CHROMA_PORT")
+    CHROMA_COLLECTION: str = Field(default="meeting_history", env="CHROMA_COLLECTION")
+    VECTOR_BACKEND: str = Field(default="memory", env="VECTOR_BACKEND")  # memory | chroma
+    RETRIEVAL_TOP_K: int = Field(default=8, env="RETRIEVAL_TOP_K")
+    RETRIEVAL_CHUNK_WORDS: int = Field(default=200, env="RETRIEVAL_CHUNK_WORDS")
+    RETRIEVAL_CHUNK_OVERLAP: int = Field(default=40, env="RETRIEVAL_CHUNK_OVERLAP")
+    INDEXING_ENABLED: bool = Field(default=True, env="INDEXING_ENABLED")
+    INDEXING_DEBOUNCE_MS: float = Field(default=200.0, env="INDEXING_DEBOUNCE_MS")
+    INDEXING_MAX_DELAY_MS: float = Field(default=2000.0, env="INDEXING_MAX_DELAY_MS")
+    INDEXING_BATCH_SIZE: int = Field(default=64, env="INDEXING_BATCH_SIZE")
+    INDEXING_MAX_PENDING: int = Field(default=5000, env="INDEXING_MAX_PENDING")
+    SEARCH_BACKEND: str = Field(default="memory", env="SEARCH_BACKEND")  # memory | sqlite
+    SEARCH_INDEX_PATH: str = Field(default="data/search.sqlite3", env="SEARCH_INDEX_PATH")
+    SEARCH_FLUSH_INTERVAL_MS: float = Field(default=100.0, env="SEARCH_FLUSH_INTERVAL_MS")
+    SEARCH_BATCH_SIZE: int = Field(default=500, env="SEARCH_BATCH_SIZE")
     
     # Celery
     CELERY_BROKER_URL: str = Field(
@@ -55,9 +69,42 @@ class Settings(BaseSettings):
     MAX_TOKENS: int = Field(default=4000, env="MAX_TOKENS")
     TEMPERATURE: float = Field(default=0.7, env="TEMPERATURE")
     
+    # Общий клиент моделей
+    LLM_PROVIDER: str = Field(default="openai", env="LLM_PROVIDER")  # openai | mock
+    OPENAI_API_URL: str = Field(default="https://api.openai.com", env="OPENAI_API_URL")
+    LLM_REQUEST_TIMEOUT: float = Field(default=60.0, env="LLM_REQUEST_TIMEOUT")
+    LLM_MAX_CONCURRENCY: int = Field(default=16, env="LLM_MAX_CONCURRENCY")
+    LLM_DEFAULT_MODEL_CONCURRENCY: int = Field(default=8, env="LLM_DEFAULT_MODEL_CONCURRENCY")
+    LLM_MODEL_CONCURRENCY: Dict[str, int] = Field(default={}, env="LLM_MODEL_CONCURRENCY")
+    LLM_MODEL_PRICING: Dict[str, Dict[str, float]] = Field(
+        default={
+            "gpt-4": {"prompt": 0.03, "completion": 0.06},
+            "gpt-4o": {"prompt": 0.0025, "completion": 0.01},
+            "gpt-4o-mini": {"prompt": 0.00015, "completion": 0.0006}
+        },
+        env="LLM_MODEL_PRICING"
+    )
+    LLM_MOCK_LATENCY: float = Field(default=0.0, env="LLM_MOCK_LATENCY")
+    
+    # Кеш промптов и эмбеддинги
+    LLM_PROMPT_CACHE_ENABLED: bool = Field(default=True, env="LLM_PROMPT_CACHE_ENABLED")
+    LLM_PROMPT_CACHE_TTL: float = Field(default=86400.0, env="LLM_PROMPT_CACHE_TTL")
+    LLM_PROMPT_CACHE_MAX_ENTRIES: int = Field(default=5000, env="LLM_PROMPT_CACHE_MAX_ENTRIES")
+    # 1.0 - только exact; semantic требует EMBEDDING_PROVIDER с семантическими векторами (не hashing)
+    LLM_PROMPT_CACHE_SIMILARITY: float = Field(default=1.0, env="LLM_PROMPT_CACHE_SIMILARITY")
+    LLM_PROMPT_CACHE_DISABLED_AGENTS: List[str] = Field(default=[], env="LLM_PROMPT_CACHE_DISABLED_AGENTS")
+    EMBEDDING_PROVIDER: str = Field(default="hashing", env="EMBEDDING_PROVIDER")  # hashing | openai
+    EMBEDDING_MODEL: str = Field(default="text-embedding-3-small", env="EMBEDDING_MODEL")
+    EMBEDDING_DIM: int = Field(default=256, env="EMBEDDING_DIM")
+    EMBEDDING_BATCH_SIZE: int = Field(default=64, env="EMBEDDING_BATCH_SIZE")
+    EMBEDDING_BATCH_WINDOW_MS: float = Field(default=10.0, env="EMBEDDING_BATCH_WINDOW_MS")
+    EMBEDDING_CACHE_SIZE: int = Field(default=20000, env="EMBEDDING_CACHE_SIZE")
+    
     # Notion интеграция
     NOTION_API_KEY: Optional[str] = Field(default=None, env="NOTION_API_KEY")
     NOTION_DATABASE_ID: Optional[str] = Field(default=None, env="NOTION_DATABASE_ID")
+    NOTION_EXPORT_CONCURRENCY: int = Field(default=3, env="NOTION_EXPORT_CONCURRENCY")
+    NOTION_EXPORT_LEDGER_DIR: Optional[str] = Field(default=None, env="NOTION_EXPORT_LEDGER_DIR")
     
     # Slack интеграция
     SLACK_BOT_TOKEN: Optional[str] = Field(default=None, env="SLACK_BOT_TOKEN")
@@ -66,6 +113,33 @@ class Settings(BaseSettings):
     # Telegram интеграция
     TELEGRAM_BOT_TOKEN: Optional[str] = Field(default=None, env="TELEGRAM_BOT_TOKEN")
     
+    # Очередь исходящих уведомлений
+    NOTIFICATION_QUEUE_PATH: str = Field(default="data/notifications.sqlite3", env="NOTIFICATION_QUEUE_PATH")
+    NOTIFICATION_CHANNELS: List[str] = Field(default=[], env="NOTIFICATION_CHANNELS")
+    NOTIFICATION_DIGEST_WINDOW: float = Field(default=30.0, env="NOTIFICATION_DIGEST_WINDOW")
+    NOTIFICATION_DIGEST_MAX_ITEMS: int = Field(default=50, env="NOTIFICATION_DIGEST_MAX_ITEMS")
+    NOTIFICATION_RATE_LIMITS: Dict[str, float] = Field(
+        default={"slack": 1.0, "telegram": 1.0},
+        env="NOTIFICATION_RATE_LIMITS"
+    )
+    NOTIFICATION_MAX_ATTEMPTS: int = Field(default=5, env="NOTIFICATION_MAX_ATTEMPTS")
+    NOTIFICATION_RETRY_BASE: float = Field(default=5.0, env="NOTIFICATION_RETRY_BASE")
+    NOTIFICATION_POLL_INTERVAL: float = Field(default=1.0, env="NOTIFICATION_POLL_INTERVAL")
+    
+    # HTTP-слой интеграций
+    NOTION_API_URL: str = Field(default="https://api.notion.com", env="NOTION_API_URL")
+    SLACK_API_URL: str = Field(default="https://slack.com", env="SLACK_API_URL")
+    TELEGRAM_API_URL: str = Field(default="https://api.telegram.org", env="TELEGRAM_API_URL")
+    INTEGRATION_HTTP_TIMEOUT: float = Field(default=10.0, env="INTEGRATION_HTTP_TIMEOUT")
+    INTEGRATION_HTTP_MAX_CONNECTIONS: int = Field(default=20, env="INTEGRATION_HTTP_MAX_CONNECTIONS")
+    INTEGRATION_HTTP_MAX_KEEPALIVE: int = Field(default=10, env="INTEGRATION_HTTP_MAX_KEEPALIVE")
+    INTEGRATION_HTTP_KEEPALIVE_EXPIRY: float = Field(default=30.0, env="INTEGRATION_HTTP_KEEPALIVE_EXPIRY")
+    INTEGRATION_HTTP_RETRIES: int = Field(default=3, env="INTEGRATION_HTTP_RETRIES")
+    INTEGRATION_HTTP_BACKOFF_BASE: float = Field(default=0.2, env="INTEGRATION_HTTP_BACKOFF_BASE")
+    INTEGRATION_HTTP_BACKOFF_MAX: float = Field(default=5.0, env="INTEGRATION_HTTP_BACKOFF_MAX")
+    CIRCUIT_BREAKER_FAILURES: int = Field(default=5, env="CIRCUIT_BREAKER_FAILURES")
+    CIRCUIT_BREAKER_RESET_SECONDS: float = Field(default=30.0, env="CIRCUIT_BREAKER_RESET_SECONDS")
+    
     # Безопасность
     SECRET_KEY: str = Field(
         default="your-secret-key-change-in-production",
@@ -76,7 +150,22 @@ class Settings(BaseSettings):
     
     # Лимиты
     MAX_CONCURRENT_RUNS: int = Field(default=10, env="MAX_CONCURRENT_RUNS")
+    RUN_ADMISSION_TIMEOUT: float = Field(default=30.0, env="RUN_ADMISSION_TIMEOUT")  # секунды, 0 - ждать без ограничения
     RUN_TIMEOUT_MINUTES: int = Field(default=60, env="RUN_TIMEOUT_MINUTES")
+    RUN_STATE_BACKEND: str = Field(default="memory", env="RUN_STATE_BACKEND")  # memory | sqlite | redis
+    RUN_STATE_PATH: str = Field(default="data/run_state.sqlite3", env="RUN_STATE_PATH")
+    RUN_STATE_REDIS_URL: Optional[str] = Field(default=None, env="RUN_STATE_REDIS_URL")  # по умолчанию REDIS_URL
+    RUN_SNAPSHOT_INTERVAL: int = Field(default=100, env="RUN_SNAPSHOT_INTERVAL")
+    # Аренда исполняемого run репликой: продлевается каждые RUN_LEASE_TTL / 3 секунд
+    RUN_LEASE_TTL: float = Field(default=30.0, env="RUN_LEASE_TTL")
+    RUN_OWNER_ID: Optional[str] = Field(default=None, env="RUN_OWNER_ID")  # по умолчанию имя хоста
+    # Бюджеты токенов и стоимости (0 - без ограничения); бюджет команды считается в пределах процесса
+    RUN_TOKEN_BUDGET: int = Field(default=0, env="RUN_TOKEN_BUDGET")
+    RUN_COST_BUDGET_USD: float = Field(default=0.0, env="RUN_COST_BUDGET_USD")
+    TEAM_TOKEN_BUDGET: int = Field(default=0, env="TEAM_TOKEN_BUDGET")
+    TEAM_COST_BUDGET_USD: float = Field(default=0.0, env="TEAM_COST_BUDGET_USD")
+    BUDGET_SOFT_RATIO: float = Field(default=0.8, env="BUDGET_SOFT_RATIO")
+    BUDGET_FALLBACK_MODEL: str = Field(default="gpt-4o-mini", env="BUDGET_FALLBACK_MODEL")
     MAX_MESSAGE_SIZE: int = Field(default=10000, env="MAX_MESSAGE_SIZE")
     
     # Мониторинг
@@ -85,12 +174,62 @@ class Settings(BaseSettings):
         default=None,
         env="OTEL_EXPORTER_OTLP_ENDPOINT"
     )
+    OTEL_SERVICE_NAME: str = Field(default="xio-backend", env="OTEL_SERVICE_NAME")
+    OTEL_TRACES_SAMPLE_RATIO: float = Field(default=0.1, env="OTEL_TRACES_SAMPLE_RATIO")
+    
+    # Фоновые проверки зависимостей для /ready
+    HEALTH_PROBE_INTERVAL: float = Field(default=5.0, env="HEALTH_PROBE_INTERVAL")
+    HEALTH_PROBE_TIMEOUT: float = Field(default=2.0, env="HEALTH_PROBE_TIMEOUT")
+    HEALTH_STALE_AFTER: float = Field(default=30.0, env="HEALTH_STALE_AFTER")
+    
+    # Контекстное окно агентов
+    CONTEXT_DEFAULT_BUDGET: int = Field(default=6000, env="CONTEXT_DEFAULT_BUDGET")
+    CONTEXT_AGENT_BUDGETS: Dict[str, int] = Field(default={}, env="CONTEXT_AGENT_BUDGETS")
+    CONTEXT_RECENT_SHARE: float = Field(default=0.6, env="CONTEXT_RECENT_SHARE")
+    CONTEXT_KEEP_RECENT: int = Field(default=6, env="CONTEXT_KEEP_RECENT")
+    CONTEXT_SUMMARY_CHUNK: int = Field(default=20, env="CONTEXT_SUMMARY_CHUNK")
+    CONTEXT_MAX_SUMMARY_BLOCKS: int = Field(default=8, env="CONTEXT_MAX_SUMMARY_BLOCKS")
+    CONTEXT_SUMMARY_MODEL: Optional[str] = Field(default=None, env="CONTEXT_SUMMARY_MODEL")
+    CONTEXT_SUMMARY_MAX_TOKENS: int = Field(default=400, env="CONTEXT_SUMMARY_MAX_TOKENS")
+    
+    # Потоковые ответы агентов
+    STREAM_DELTA_FLUSH_MS: int = Field(default=50, env="STREAM_DELTA_FLUSH_MS")
+    # Очередь событий каждого подписчика брокера (уведомления, журнал run)
+    BROKER_SUBSCRIBER_QUEUE: int = Field(default=1000, env="BROKER_SUBSCRIBER_QUEUE")
+    
+    # Реестр инструментов
+    TOOL_DEFINITIONS_DIR: Optional[str] = Field(default=None, env="TOOL_DEFINITIONS_DIR")
+    TOOL_REGISTRY_WATCH_INTERVAL: float = Field(default=2.0, env="TOOL_REGISTRY_WATCH_INTERVAL")
+    
+    # Диспетчер вызовов инструментов
+    TOOL_BULKHEAD_CONCURRENCY: int = Field(default=4, env="TOOL_BULKHEAD_CONCURRENCY")
+    TOOL_BULKHEAD_QUEUE: int = Field(default=100, env="TOOL_BULKHEAD_QUEUE")
+    TOOL_INTEGRATION_RATE_LIMITS: Dict[str, Dict[str, float]] = Field(
+        default={
+            "notion": {"requests_per_second": 3, "burst": 3},
+            "slack": {"requests_per_second": 1, "burst": 5},
+            "telegram": {"requests_per_second": 30, "burst": 30}
+        },
+        env="TOOL_INTEGRATION_RATE_LIMITS"
+    )
+    
+    # Кеш результатов инструментов
+    TOOL_CACHE_TTL: float = Field(default=3600.0, env="TOOL_CACHE_TTL")
+    TOOL_CACHE_MAX_ENTRIES: int = Field(default=10000, env="TOOL_CACHE_MAX_ENTRIES")
+    TOOL_CACHE_REDIS_URL: Optional[str] = Field(default=None, env="TOOL_CACHE_REDIS_URL")
     
     # Docker sandbox настройки
     DOCKER_HOST: str = Field(default="unix:///var/run/docker.sock", env="DOCKER_HOST")
     SANDBOX_CPU_LIMIT: str = Field(default="0.5", env="SANDBOX_CPU_LIMIT")
     SANDBOX_MEMORY_LIMIT: str = Field(default="512m", env="SANDBOX_MEMORY_LIMIT")
     SANDBOX_TIMEOUT: int = Field(default=30, env="SANDBOX_TIMEOUT")
+    SANDBOX_BACKEND: str = Field(default="docker", env="SANDBOX_BACKEND")  # docker | local (тесты и разработка)
+    SANDBOX_IMAGE: str = Field(default="xio/tool-sandbox:latest", env="SANDBOX_IMAGE")
+    SANDBOX_NETWORK: str = Field(default="none", env="SANDBOX_NETWORK")
+    SANDBOX_POOL_MIN_IDLE: int = Field(default=1, env="SANDBOX_POOL_MIN_IDLE")
+    SANDBOX_POOL_MAX_SIZE: int = Field(default=4, env="SANDBOX_POOL_MAX_SIZE")
+    SANDBOX_IDLE_TTL: float = Field(default=300.0, env="SANDBOX_IDLE_TTL")
+    SANDBOX_MAX_CALLS_PER_WORKER: int = Field(default=100, env="SANDBOX_MAX_CALLS_PER_WORKER")
     
     class Config:
         env_file = ".env"
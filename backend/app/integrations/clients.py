@@ -0,0 +1,100 @@
+"""
+Общие клиенты интеграций Notion/Slack/Telegram
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from app.config.settings import get_settings
+from app.integrations.http import CircuitBreaker, IntegrationError, IntegrationHTTPClient
+from app.integrations.notion.client import NOTION_VERSION, NotionClient
+from app.integrations.slack.client import SlackClient
+from app.integrations.telegram.client import TelegramClient
+
+logger = logging.getLogger(__name__)
+
+
+class IntegrationClients:
+    """
+    Реестр долгоживущих клиентов интеграций.
+
+    Клиенты создаются один раз и переиспользуют keep-alive соединения;
+    circuit breakers общие для всех клиентов и ведутся по хостам.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._http: Dict[str, IntegrationHTTPClient] = {}
+        self._notion: Optional[NotionClient] = None
+        self._slack: Optional[SlackClient] = None
+        self._telegram: Optional[TelegramClient] = None
+
+    def _http_client(self, name: str, base_url: str, headers: Dict[str, str]) -> IntegrationHTTPClient:
+        client = self._http.get(name)
+        if client is None:
+            client = IntegrationHTTPClient(name, base_url, headers, breakers=self._breakers)
+            self._http[name] = client
+        return client
+
+    @property
+    def notion(self) -> NotionClient:
+        if self._notion is None:
+            if not self.settings.NOTION_API_KEY:
+                raise IntegrationError("notion: NOTION_API_KEY не настроен")
+            self._notion = NotionClient(self._http_client(
+                "notion",
+                self.settings.NOTION_API_URL,
+                {
+                    "Authorization": f"Bearer {self.settings.NOTION_API_KEY}",
+                    "Notion-Version": NOTION_VERSION
+                }
+            ))
+        return self._notion
+
+    @property
+    def slack(self) -> SlackClient:
+        if self._slack is None:
+            headers = {}
+            if self.settings.SLACK_BOT_TOKEN:
+                headers["Authorization"] = f"Bearer {self.settings.SLACK_BOT_TOKEN}"
+            self._slack = SlackClient(
+                self._http_client("slack", self.settings.SLACK_API_URL, headers),
+                webhook_url=self.settings.SLACK_WEBHOOK_URL
+            )
+        return self._slack
+
+    @property
+    def telegram(self) -> TelegramClient:
+        if self._telegram is None:
+            if not self.settings.TELEGRAM_BOT_TOKEN:
+                raise IntegrationError("telegram: TELEGRAM_BOT_TOKEN не настроен")
+            self._telegram = TelegramClient(
+                self._http_client("telegram", self.settings.TELEGRAM_API_URL, {}),
+                bot_token=self.settings.TELEGRAM_BOT_TOKEN
+            )
+        return self._telegram
+
+    async def start(self):
+        """Создать клиенты для настроенных интеграций"""
+        if self.settings.NOTION_API_KEY:
+            self.notion
+        if self.settings.SLACK_BOT_TOKEN or self.settings.SLACK_WEBHOOK_URL:
+            self.slack
+        if self.settings.TELEGRAM_BOT_TOKEN:
+            self.telegram
+        logger.info(f"Клиенты интеграций созданы: {list(self._http)}")
+
+    async def close(self):
+        """Закрыть пулы соединений"""
+        for client in self._http.values():
+            await client.close()
+        self._http.clear()
+        self._notion = self._slack = self._telegram = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: client.get_stats() for name, client in self._http.items()}
+
+
+# Глобальный экземпляр клиентов интеграций
+integration_clients = IntegrationClients()
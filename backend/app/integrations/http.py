@@ -0,0 +1,269 @@
+"""
+Общий HTTP-слой интеграций: пул соединений, ретраи, circuit breaker
+"""
+
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config.settings import get_settings
+from app.observability.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 доступен только при установленном пакете h2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Повтор этих методов не создает дубликатов на стороне сервиса
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Ошибки установки соединения: запрос гарантированно не дошел до сервиса
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class IntegrationError(RuntimeError):
+    """Ошибка обращения к внешней интеграции"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, payload: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.payload = payload
+
+
+class CircuitOpenError(IntegrationError):
+    """Circuit breaker хоста разомкнут, запрос не отправлялся"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для одного хоста.
+
+    closed -> open после failure_threshold подряд неудач;
+    open -> half_open через reset_timeout (пропускается один пробный запрос);
+    half_open -> closed при успехе, -> open при неудаче.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host: str, failure_threshold: int, reset_timeout: float):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос сейчас"""
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit breaker {self.host} замкнут")
+        self.state = self.CLOSED
+
+    def release_probe(self):
+        """Вернуть слот пробного запроса, если проба оборвалась без результата"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit breaker {self.host} разомкнут после {self._failures} ошибок")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"host": self.host, "state": self.state, "failures": self._failures}
+
+
+class IntegrationHTTPClient:
+    """Пуловый HTTP-клиент одной интеграции с ретраями и circuit breaker по хостам"""
+
+    def __init__(self,
+                 name: str,
+                 base_url: str = "",
+                 headers: Optional[Dict[str, str]] = None,
+                 breakers: Optional[Dict[str, CircuitBreaker]] = None):
+        self.settings = get_settings()
+        self.name = name
+        self.base_url = base_url
+        self.headers = headers or {}
+        self._breakers = breakers if breakers is not None else {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """httpx-клиент с keep-alive пулом (создается лениво)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(self.settings.INTEGRATION_HTTP_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=self.settings.INTEGRATION_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=self.settings.INTEGRATION_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=self.settings.INTEGRATION_HTTP_KEEPALIVE_EXPIRY
+                )
+            )
+        return self._client
+
+    def breaker_for(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                host,
+                failure_threshold=self.settings.CIRCUIT_BREAKER_FAILURES,
+                reset_timeout=self.settings.CIRCUIT_BREAKER_RESET_SECONDS
+            )
+            self._breakers[host] = breaker
+        return breaker
+
+    async def request(self,
+                      method: str,
+                      url: str,
+                      idempotent: Optional[bool] = None,
+                      **kwargs: Any) -> httpx.Response:
+        """
+        Выполнить запрос с ретраями.
+
+        Идемпотентные запросы (GET/PUT/DELETE или idempotent=True) повторяются
+        при сетевых ошибках, таймаутах и ответах 429/5xx. Остальные (создание
+        страницы, отправка сообщения) - только если запрос не дошел до сервиса:
+        ошибка соединения или 429. Между попытками - экспоненциальная задержка
+        с полным джиттером (или Retry-After).
+
+        URL и текст исключений в ошибки и логи не попадают: в них бывают
+        токены (путь Telegram Bot API, Slack webhook).
+        """
+        host = urlsplit(str(self.client.base_url.join(url))).netloc
+        target = f"{method} {host}"
+        breaker = self.breaker_for(host)
+        max_retries = self.settings.INTEGRATION_HTTP_RETRIES
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(max_retries + 1):
+            if not breaker.allow():
+                metrics_registry.counter(
+                    "integration_http_rejected_total", integration=self.name, host=host
+                ).inc()
+                raise CircuitOpenError(f"{self.name}: circuit breaker для {host} разомкнут")
+
+            started_at = time.perf_counter()
+            retry_after: Optional[float] = None
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                self._observe(host, "error", started_at)
+                breaker.record_failure()
+                error = type(e).__name__
+                if attempt >= max_retries or not (idempotent or isinstance(e, CONNECT_ERRORS)):
+                    raise IntegrationError(f"{self.name}: {target} не выполнен: {error}") from None
+                logger.warning(f"{self.name}: {target}: сетевая ошибка {error}, попытка {attempt + 1}/{max_retries}")
+            except BaseException:
+                # Отмена или неожиданная ошибка: проба half_open не должна остаться занятой
+                breaker.release_probe()
+                raise
+            else:
+                self._observe(host, str(response.status_code), started_at)
+
+                if response.status_code not in RETRYABLE_STATUSES:
+                    breaker.record_success()
+                    if response.is_error:
+                        raise IntegrationError(
+                            f"{self.name}: {target} вернул {response.status_code}",
+                            status_code=response.status_code,
+                            payload=_safe_json(response)
+                        )
+                    return response
+
+                # 429 - сигнал лимита, а не отказа хоста
+                if response.status_code == 429:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+
+                # 5xx на неидемпотентный запрос: сервис мог успеть его выполнить
+                if attempt >= max_retries or not (idempotent or response.status_code == 429):
+                    raise IntegrationError(
+                        f"{self.name}: {target} вернул {response.status_code}",
+                        status_code=response.status_code,
+                        payload=_safe_json(response)
+                    )
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+
+            await asyncio.sleep(retry_after if retry_after is not None else self._backoff(attempt))
+
+        raise IntegrationError(f"{self.name}: исчерпаны попытки для {target}")
+
+    def _backoff(self, attempt: int) -> float:
+        """Экспоненциальная задержка с полным джиттером"""
+        cap = min(
+            self.settings.INTEGRATION_HTTP_BACKOFF_MAX,
+            self.settings.INTEGRATION_HTTP_BACKOFF_BASE * (2 ** attempt)
+        )
+        return random.uniform(0, cap)
+
+    def _observe(self, host: str, status: str, started_at: float):
+        metrics_registry.histogram(
+            "integration_http_request_seconds",
+            integration=self.name,
+            host=host,
+            status=status
+        ).observe(time.perf_counter() - started_at)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "integration": self.name,
+            "http2": HTTP2_AVAILABLE,
+            "breakers": [breaker.get_stats() for breaker in self._breakers.values()]
+        }
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+def _safe_json(response: httpx.Response) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
@@ -0,0 +1,337 @@
+"""
+Очередь исходящих уведомлений в Slack/Telegram с дайджестами
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config.settings import get_settings
+from app.integrations.clients import integration_clients
+from app.observability.metrics import metrics_registry
+from app.tools.limits import TokenBucket
+from app.ws.broker import event_broker
+
+logger = logging.getLogger(__name__)
+
+# Канал - "<вид>:<адресат>", например "slack:#xio-meetings", "slack:webhook", "telegram:-100123"
+Sender = Callable[[str, str], Awaitable[Any]]
+
+# Статусы run_status, после которых отправляется итог встречи
+COMPLETION_STATUSES = {"completed", "stop", "stopped", "failed"}
+
+PENDING = "pending"
+SENT = "sent"
+DEAD = "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    text TEXT NOT NULL,
+    dedupe_key TEXT UNIQUE,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    not_before REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_pending ON notifications (status, channel, not_before);
+"""
+
+
+class NotificationStore:
+    """
+    Хранилище очереди уведомлений в SQLite.
+
+    Уведомление остается pending до подтвержденной отправки,
+    поэтому после рестарта очередь дорабатывается.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def open(self):
+        if self._conn is not None:
+            return
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        await self.open()
+        async with self._lock:
+            return await asyncio.to_thread(self._transaction, fn)
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._conn:
+            return fn(self._conn)
+
+    async def enqueue(self, channel: str, text: str, dedupe_key: Optional[str] = None) -> bool:
+        """Добавить уведомление; False если такое уже есть (по dedupe_key)"""
+        now = time.time()
+
+        def insert(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO notifications "
+                "(channel, text, dedupe_key, status, created_at, not_before) VALUES (?, ?, ?, ?, ?, ?)",
+                (channel, text, dedupe_key, PENDING, now, now)
+            )
+            return cursor.rowcount > 0
+
+        return await self._run(insert)
+
+    async def due_channels(self, now: float, window: float) -> List[str]:
+        """Каналы, у которых самое старое ожидающее уведомление старше окна дайджеста"""
+        def select(conn: sqlite3.Connection) -> List[str]:
+            rows = conn.execute(
+                "SELECT channel FROM notifications WHERE status = ? AND not_before <= ? "
+                "GROUP BY channel HAVING MIN(created_at) <= ?",
+                (PENDING, now, now - window)
+            ).fetchall()
+            return [row["channel"] for row in rows]
+
+        return await self._run(select)
+
+    async def pending(self, channel: str, now: float, limit: int) -> List[Dict[str, Any]]:
+        def select(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            rows = conn.execute(
+                "SELECT id, text, attempts FROM notifications "
+                "WHERE status = ? AND channel = ? AND not_before <= ? ORDER BY id LIMIT ?",
+                (PENDING, channel, now, limit)
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+        return await self._run(select)
+
+    async def mark_sent(self, ids: List[int]):
+        def update(conn: sqlite3.Connection):
+            conn.executemany(
+                "UPDATE notifications SET status = ?, attempts = attempts + 1 WHERE id = ?",
+                [(SENT, item_id) for item_id in ids]
+            )
+
+        await self._run(update)
+
+    async def mark_retry(self, retries: Dict[int, float], error: str):
+        """Отложить уведомления: id -> время следующей попытки"""
+        def update(conn: sqlite3.Connection):
+            conn.executemany(
+                "UPDATE notifications SET attempts = attempts + 1, last_error = ?, not_before = ? WHERE id = ?",
+                [(error, not_before, item_id) for item_id, not_before in retries.items()]
+            )
+
+        await self._run(update)
+
+    async def mark_dead(self, ids: List[int], error: str):
+        def update(conn: sqlite3.Connection):
+            conn.executemany(
+                "UPDATE notifications SET status = ?, attempts = attempts + 1, last_error = ? WHERE id = ?",
+                [(DEAD, error, item_id) for item_id in ids]
+            )
+
+        await self._run(update)
+
+    async def dead_letters(self, channel: Optional[str] = None) -> List[Dict[str, Any]]:
+        def select(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            query = "SELECT id, channel, text, attempts, last_error FROM notifications WHERE status = ?"
+            params: List[Any] = [DEAD]
+            if channel:
+                query += " AND channel = ?"
+                params.append(channel)
+            return [dict(row) for row in conn.execute(query + " ORDER BY id", params).fetchall()]
+
+        return await self._run(select)
+
+    async def requeue_dead(self, channel: Optional[str] = None) -> int:
+        """Вернуть dead-letter уведомления в очередь"""
+        now = time.time()
+
+        def update(conn: sqlite3.Connection) -> int:
+            query = "UPDATE notifications SET status = ?, attempts = 0, created_at = ?, not_before = ? WHERE status = ?"
+            params: List[Any] = [PENDING, now, now, DEAD]
+            if channel:
+                query += " AND channel = ?"
+                params.append(channel)
+            return conn.execute(query, params).rowcount
+
+        return await self._run(update)
+
+    async def counts(self) -> Dict[str, int]:
+        def select(conn: sqlite3.Connection) -> Dict[str, int]:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM notifications GROUP BY status").fetchall()
+            return {row["status"]: row["n"] for row in rows}
+
+        return await self._run(select)
+
+    async def ping(self) -> Dict[str, Any]:
+        """Проверка доступности базы очереди"""
+        await self._run(lambda conn: conn.execute("SELECT 1").fetchone())
+        return {"backend": "sqlite"}
+
+
+class NotificationQueue:
+    """
+    Исходящие уведомления с дайджестами и лимитом частоты на канал.
+
+    Уведомления одного канала, накопившиеся за окно дайджеста, уходят одним
+    сообщением. Неудачная отправка повторяется с экспоненциальной задержкой,
+    после NOTIFICATION_MAX_ATTEMPTS попыток уведомления уходят в dead-letter.
+    """
+
+    def __init__(self,
+                 store: Optional[NotificationStore] = None,
+                 senders: Optional[Dict[str, Sender]] = None):
+        self.settings = get_settings()
+        self.store = store or NotificationStore(self.settings.NOTIFICATION_QUEUE_PATH)
+        self.senders = senders if senders is not None else {
+            "slack": _send_slack,
+            "telegram": _send_telegram
+        }
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def enqueue(self, channel: str, text: str, dedupe_key: Optional[str] = None) -> bool:
+        """Поставить уведомление в очередь канала"""
+        kind = channel.split(":", 1)[0]
+        if kind not in self.senders:
+            raise ValueError(f"Неизвестный канал уведомлений: {channel}")
+
+        added = await self.store.enqueue(channel, text, dedupe_key)
+        if added:
+            metrics_registry.counter("notifications_enqueued_total", kind=kind).inc()
+        return added
+
+    async def handle_run_status(self, event: Dict[str, Any]):
+        """Подписчик run_status: итог завершенной встречи во все каналы"""
+        if event.get("status") not in COMPLETION_STATUSES:
+            return
+
+        meeting_id = event.get("meeting_id")
+        text = event.get("summary") or f"Встреча {meeting_id} завершена (run {event.get('run_id')})"
+        for channel in self.settings.NOTIFICATION_CHANNELS:
+            # run_id + канал: повторное событие не дублирует уведомление
+            await self.enqueue(channel, text, dedupe_key=f"run_status:{event.get('run_id')}:{channel}")
+
+    def _bucket(self, channel: str) -> TokenBucket:
+        bucket = self._buckets.get(channel)
+        if bucket is None:
+            kind = channel.split(":", 1)[0]
+            rate = self.settings.NOTIFICATION_RATE_LIMITS.get(kind, 1.0)
+            bucket = TokenBucket(rate, capacity=1)
+            self._buckets[channel] = bucket
+        return bucket
+
+    async def flush_due(self, now: Optional[float] = None) -> int:
+        """Отправить дайджесты всех готовых каналов; возвращает число отправленных сообщений"""
+        now = now if now is not None else time.time()
+        channels = await self.store.due_channels(now, self.settings.NOTIFICATION_DIGEST_WINDOW)
+        results = await asyncio.gather(*(self._deliver(channel, now) for channel in channels))
+        return sum(results)
+
+    async def _deliver(self, channel: str, now: float) -> int:
+        # Канал исчерпал лимит: уведомления копятся в следующий дайджест
+        if not self._bucket(channel).try_acquire():
+            metrics_registry.counter("notifications_throttled_total", channel=channel).inc()
+            return 0
+
+        items = await self.store.pending(channel, now, self.settings.NOTIFICATION_DIGEST_MAX_ITEMS)
+        if not items:
+            return 0
+
+        ids = [item["id"] for item in items]
+        kind, target = channel.split(":", 1)
+        try:
+            await self.senders[kind](target, render_digest([item["text"] for item in items]))
+        except Exception as e:
+            # Попытки и задержка считаются по каждому уведомлению: старое не тянет
+            # в dead-letter свежие, попавшие с ним в один дайджест
+            dead, retries = [], {}
+            for item in items:
+                attempts = item["attempts"] + 1
+                if attempts >= self.settings.NOTIFICATION_MAX_ATTEMPTS:
+                    dead.append(item["id"])
+                else:
+                    retries[item["id"]] = now + self.settings.NOTIFICATION_RETRY_BASE * (2 ** (attempts - 1))
+            if dead:
+                logger.error(f"Уведомления {channel} в dead-letter после {self.settings.NOTIFICATION_MAX_ATTEMPTS} попыток: {e}")
+                await self.store.mark_dead(dead, str(e))
+                metrics_registry.counter("notifications_dead_total", kind=kind).inc(len(dead))
+            if retries:
+                delay = min(retries.values()) - now
+                logger.warning(f"Отправка в {channel} не удалась ({e}), повтор через {delay:.1f}с")
+                await self.store.mark_retry(retries, str(e))
+            return 0
+
+        await self.store.mark_sent(ids)
+        metrics_registry.counter("notifications_sent_total", kind=kind).inc()
+        metrics_registry.histogram(
+            "notification_digest_size", buckets=(1, 2, 5, 10, 20, 50), kind=kind
+        ).observe(len(ids))
+        return 1
+
+    async def _dispatch_loop(self):
+        while True:
+            try:
+                await self.flush_due()
+            except Exception as e:
+                logger.error(f"Ошибка цикла отправки уведомлений: {e}")
+            await asyncio.sleep(self.settings.NOTIFICATION_POLL_INTERVAL)
+
+    async def start(self):
+        """Открыть очередь, подписаться на run_status и запустить отправку"""
+        await self.store.open()
+        event_broker.subscribe("run_status", self.handle_run_status)
+        if self._task is None:
+            self._task = asyncio.create_task(self._dispatch_loop())
+        logger.info(f"Очередь уведомлений запущена: {await self.store.counts()}")
+
+    async def stop(self):
+        event_broker.unsubscribe("run_status", self.handle_run_status)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.store.close()
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return {"queue": await self.store.counts(), "channels": len(self._buckets)}
+
+
+def render_digest(texts: List[str]) -> str:
+    """Одно сообщение из нескольких уведомлений канала"""
+    if len(texts) == 1:
+        return texts[0]
+    lines = [f"Сводка XIO: {len(texts)} уведомлений"]
+    lines.extend(f"• {text}" for text in texts)
+    return "\n".join(lines)
+
+
+async def _send_slack(target: str, text: str):
+    if target == "webhook":
+        await integration_clients.slack.send_webhook(text)
+    else:
+        await integration_clients.slack.post_message(target, text)
+
+
+async def _send_telegram(target: str, text: str):
+    await integration_clients.telegram.send_message(target, text)
+
+
+# Глобальный экземпляр очереди уведомлений
+notification_queue = NotificationQueue()
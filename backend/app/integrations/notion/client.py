@@ -0,0 +1,84 @@
+"""
+Клиент Notion API
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.integrations.http import IntegrationHTTPClient
+from app.models.artifacts import NotionResponse
+from app.tools.limits import TokenBucket, integration_rate_limits
+
+logger = logging.getLogger(__name__)
+
+NOTION_VERSION = "2022-06-28"
+
+
+class NotionClient:
+    """
+    Создание и обновление страниц Notion через общий HTTP-пул.
+
+    Каждый запрос берет токен из общего bucket интеграции notion
+    (тот же, что у диспетчера инструментов), если не передан свой.
+    """
+
+    def __init__(self, http: IntegrationHTTPClient, rate_limit: Optional[TokenBucket] = None):
+        self.http = http
+        self.rate_limit = rate_limit if rate_limit is not None else integration_rate_limits.bucket("notion")
+
+    async def _request(self, method: str, path: str, **kwargs):
+        if self.rate_limit:
+            await self.rate_limit.acquire()
+        return await self.http.request(method, path, **kwargs)
+
+    async def create_page(self,
+                          database_id: str,
+                          properties: Dict[str, Any],
+                          children: Optional[List[Dict[str, Any]]] = None) -> NotionResponse:
+        """Создать страницу в базе данных Notion"""
+        payload: Dict[str, Any] = {
+            "parent": {"database_id": database_id},
+            "properties": properties
+        }
+        if children:
+            payload["children"] = children
+
+        response = await self._request("POST", "/v1/pages", json=payload)
+        data = response.json()
+        return NotionResponse(page_id=data["id"], url=data.get("url", ""), status="created")
+
+    async def update_page(self, page_id: str, properties: Dict[str, Any]) -> NotionResponse:
+        """Обновить свойства существующей страницы"""
+        # Повтор PATCH с теми же свойствами дает тот же результат
+        response = await self._request(
+            "PATCH", f"/v1/pages/{page_id}", idempotent=True, json={"properties": properties}
+        )
+        data = response.json()
+        return NotionResponse(page_id=data.get("id", page_id), url=data.get("url", ""), status="updated")
+
+    async def replace_children(self, page_id: str, children: List[Dict[str, Any]]):
+        """
+        Заменить содержимое страницы: добавить новые блоки, затем удалить прежние.
+
+        Сбой между шагами оставляет на странице старое и новое содержимое,
+        но не пустую страницу; повторная замена удаляет все, кроме добавленного.
+        """
+        block_ids: List[str] = []
+        cursor: Optional[str] = None
+        while True:
+            params: Dict[str, Any] = {"page_size": 100}
+            if cursor:
+                params["start_cursor"] = cursor
+            response = await self._request("GET", f"/v1/blocks/{page_id}/children", params=params)
+            data = response.json()
+            block_ids.extend(block["id"] for block in data.get("results", []))
+            if not data.get("has_more"):
+                break
+            cursor = data.get("next_cursor")
+
+        if children:
+            # Добавление блоков не идемпотентно: повтор после таймаута задублирует содержимое
+            await self._request("PATCH", f"/v1/blocks/{page_id}/children", json={"children": children})
+
+        for block_id in block_ids:
+            await self._request("DELETE", f"/v1/blocks/{block_id}")
@@ -0,0 +1,159 @@
+"""
+Пакетный экспорт decision logs и задач встречи в Notion
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config.settings import get_settings
+from app.integrations.notion import mappers
+from app.integrations.notion.client import NotionClient
+from app.models.artifacts import NotionExportReport
+from app.models.validators import ValidatedActionItem, ValidatedDecisionLog
+from app.ws.broker import event_broker
+
+logger = logging.getLogger(__name__)
+
+
+class ExportLedger:
+    """
+    Журнал экспортированных артефактов: ключ -> external_ref, url, хеш содержимого.
+
+    Запись делается сразу после успешного создания/обновления страницы,
+    поэтому повторный экспорт после сбоя продолжает с места остановки.
+    При заданном каталоге журнал хранится в JSON-файле на встречу.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory) if directory else None
+        self._entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _path(self, meeting_id: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / f"{meeting_id}.json"
+
+    async def load(self, meeting_id: str) -> Dict[str, Dict[str, Any]]:
+        """Записи журнала встречи"""
+        if meeting_id not in self._entries:
+            entries: Dict[str, Dict[str, Any]] = {}
+            path = self._path(meeting_id)
+            if path is not None and path.exists():
+                entries = json.loads(await asyncio.to_thread(path.read_text, encoding="utf-8"))
+            self._entries[meeting_id] = entries
+        return self._entries[meeting_id]
+
+    async def record(self, meeting_id: str, key: str, entry: Dict[str, Any]):
+        """Зафиксировать экспортированный артефакт"""
+        entries = await self.load(meeting_id)
+        entries[key] = entry
+
+        path = self._path(meeting_id)
+        if path is None:
+            return
+
+        lock = self._locks.setdefault(meeting_id, asyncio.Lock())
+        async with lock:
+            await asyncio.to_thread(self._write, path, dict(entries))
+
+    @staticmethod
+    def _write(path: Path, entries: Dict[str, Dict[str, Any]]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+class NotionExportPipeline:
+    """
+    Экспорт артефактов встречи в Notion с ограниченным параллелизмом.
+
+    Неизменившиеся артефакты пропускаются, изменившиеся обновляются
+    (свойства и содержимое страницы), новые создаются. Частоту запросов
+    ограничивает общий bucket интеграции notion в NotionClient.
+    """
+
+    def __init__(self,
+                 client: NotionClient,
+                 ledger: Optional[ExportLedger] = None,
+                 database_id: Optional[str] = None):
+        self.settings = get_settings()
+        self.client = client
+        self.ledger = ledger or ExportLedger(self.settings.NOTION_EXPORT_LEDGER_DIR)
+        self.database_id = database_id or self.settings.NOTION_DATABASE_ID
+
+    async def export_meeting(self,
+                             meeting_id: str,
+                             decisions: List[ValidatedDecisionLog],
+                             action_items: List[ValidatedActionItem]) -> NotionExportReport:
+        """Экспортировать артефакты встречи (идемпотентно)"""
+        if not self.database_id:
+            raise ValueError("NOTION_DATABASE_ID не настроен")
+
+        report = NotionExportReport(meeting_id=meeting_id)
+        ledger_entries = await self.ledger.load(meeting_id)
+        semaphore = asyncio.Semaphore(self.settings.NOTION_EXPORT_CONCURRENCY)
+
+        artifacts = [*decisions, *action_items]
+
+        async def export_one(artifact):
+            key = mappers.artifact_key(artifact)
+            digest = mappers.content_hash(artifact)
+            previous = ledger_entries.get(key)
+
+            if previous and previous.get("content_hash") == digest:
+                report.skipped.append(key)
+                return
+
+            async with semaphore:
+                try:
+                    if previous:
+                        response = await self.client.update_page(
+                            previous["page_id"], mappers.to_properties(artifact)
+                        )
+                        # content_hash покрывает и тело страницы: запись в журнал - только
+                        # после замены содержимого, иначе повторный экспорт ее пропустит
+                        await self.client.replace_children(response.page_id, mappers.to_children(artifact))
+                    else:
+                        response = await self.client.create_page(
+                            self.database_id,
+                            mappers.to_properties(artifact),
+                            mappers.to_children(artifact)
+                        )
+                except Exception as e:
+                    logger.error(f"Экспорт {key} в Notion не удался: {e}")
+                    report.failed[key] = str(e)
+                    return
+
+            await self.ledger.record(meeting_id, key, {
+                "page_id": response.page_id,
+                "external_ref": f"notion:{response.page_id}",
+                "url": response.url,
+                "content_hash": digest,
+                "exported_at": datetime.now().isoformat()
+            })
+            (report.updated if response.status == "updated" else report.created).append(key)
+
+            await event_broker.emit_event({
+                "type": "artifact_created",
+                "meeting_id": meeting_id,
+                "artifact_type": mappers.artifact_kind(artifact),
+                "external_ref": f"notion:{response.page_id}",
+                "url": response.url,
+                "summary": mappers.summary(artifact),
+                "status": response.status
+            })
+
+        await asyncio.gather(*(export_one(artifact) for artifact in artifacts))
+
+        logger.info(
+            f"Экспорт встречи {meeting_id} в Notion: создано {len(report.created)}, "
+            f"обновлено {len(report.updated)}, пропущено {len(report.skipped)}, ошибок {len(report.failed)}"
+        )
+        return report
@@ -0,0 +1,91 @@
+"""
+Преобразование артефактов консилиума в свойства страниц Notion
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Union
+
+from app.models.validators import ValidatedActionItem, ValidatedDecisionLog
+
+Artifact = Union[ValidatedDecisionLog, ValidatedActionItem]
+
+
+def _title(text: str) -> Dict[str, Any]:
+    return {"title": [{"text": {"content": text[:2000]}}]}
+
+
+def _rich_text(text: str) -> Dict[str, Any]:
+    return {"rich_text": [{"text": {"content": text[:2000]}}]}
+
+
+def _select(value: str) -> Dict[str, Any]:
+    return {"select": {"name": value}}
+
+
+def _paragraph(text: str) -> Dict[str, Any]:
+    return {
+        "object": "block",
+        "type": "paragraph",
+        "paragraph": {"rich_text": [{"type": "text", "text": {"content": text[:2000]}}]}
+    }
+
+
+def artifact_kind(artifact: Artifact) -> str:
+    return "decision_log" if isinstance(artifact, ValidatedDecisionLog) else "action_item"
+
+
+def artifact_key(artifact: Artifact) -> str:
+    """Стабильный ключ артефакта внутри встречи (title используется как ID, как в валидаторах)"""
+    return f"{artifact_kind(artifact)}:{artifact.meeting_id}:{artifact.title}"
+
+
+def content_hash(artifact: Artifact) -> str:
+    """Хеш содержимого для определения изменений (без автоматической даты решения)"""
+    payload = artifact.model_dump(mode="json", exclude={"date"})
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def to_properties(artifact: Artifact) -> Dict[str, Any]:
+    """Свойства страницы Notion"""
+    properties: Dict[str, Any] = {
+        "Name": _title(artifact.title),
+        "Meeting": _rich_text(artifact.meeting_id),
+        "Type": _select(artifact_kind(artifact))
+    }
+
+    if isinstance(artifact, ValidatedActionItem):
+        properties["Assignee"] = _rich_text(artifact.assignee)
+        properties["Priority"] = _select(artifact.priority.value)
+        properties["Status"] = _select(artifact.status.value)
+        if artifact.due_date:
+            properties["Due"] = {"date": {"start": artifact.due_date.date().isoformat()}}
+        if artifact.tags:
+            properties["Tags"] = {"multi_select": [{"name": tag} for tag in artifact.tags]}
+    else:
+        properties["Decision"] = _rich_text(artifact.decision)
+
+    return properties
+
+
+def to_children(artifact: Artifact) -> List[Dict[str, Any]]:
+    """Блоки содержимого страницы"""
+    if isinstance(artifact, ValidatedActionItem):
+        blocks = [_paragraph(artifact.description)]
+        blocks.extend(_paragraph(f"✓ {criterion}") for criterion in artifact.acceptance_criteria or [])
+        return blocks
+
+    blocks = [_paragraph(f"Решение: {artifact.decision}"), _paragraph(f"Обоснование: {artifact.rationale}")]
+    for alternative in artifact.alternatives:
+        blocks.append(_paragraph(f"Альтернатива: {alternative.option}"))
+    for risk in artifact.risks or []:
+        blocks.append(_paragraph(f"Риск ({risk.impact.value}/{risk.probability.value}): {risk.risk}"))
+    return blocks
+
+
+def summary(artifact: Artifact) -> str:
+    """Краткое описание для события artifact_created"""
+    if isinstance(artifact, ValidatedActionItem):
+        return f"Задача назначена: {artifact.assignee}"
+    return artifact.decision
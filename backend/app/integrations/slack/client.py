@@ -0,0 +1,44 @@
+"""
+Клиент Slack API
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.integrations.http import IntegrationError, IntegrationHTTPClient
+
+logger = logging.getLogger(__name__)
+
+
+class SlackClient:
+    """Отправка сообщений в Slack (Web API или incoming webhook)"""
+
+    def __init__(self, http: IntegrationHTTPClient, webhook_url: Optional[str] = None):
+        self.http = http
+        self.webhook_url = webhook_url
+
+    async def post_message(self,
+                           channel: str,
+                           text: str,
+                           blocks: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Отправить сообщение через chat.postMessage"""
+        payload: Dict[str, Any] = {"channel": channel, "text": text}
+        if blocks:
+            payload["blocks"] = blocks
+
+        response = await self.http.request("POST", "/api/chat.postMessage", json=payload)
+        data = response.json()
+        # Slack сообщает об ошибках в теле ответа со статусом 200
+        if not data.get("ok", False):
+            raise IntegrationError(f"slack: chat.postMessage: {data.get('error')}", payload=data)
+        return data
+
+    async def send_webhook(self, text: str, blocks: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Отправить сообщение в incoming webhook"""
+        if not self.webhook_url:
+            raise IntegrationError("slack: SLACK_WEBHOOK_URL не настроен")
+
+        payload: Dict[str, Any] = {"text": text}
+        if blocks:
+            payload["blocks"] = blocks
+        await self.http.request("POST", self.webhook_url, json=payload)
@@ -0,0 +1,30 @@
+"""
+Клиент Telegram Bot API
+"""
+
+import logging
+from typing import Any, Dict
+
+from app.integrations.http import IntegrationError, IntegrationHTTPClient
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramClient:
+    """Отправка сообщений ботом Telegram"""
+
+    def __init__(self, http: IntegrationHTTPClient, bot_token: str):
+        self.http = http
+        self.bot_token = bot_token
+
+    async def send_message(self, chat_id: str, text: str, parse_mode: str = "Markdown") -> Dict[str, Any]:
+        """Отправить сообщение в чат"""
+        response = await self.http.request(
+            "POST",
+            f"/bot{self.bot_token}/sendMessage",
+            json={"chat_id": chat_id, "text": text, "parse_mode": parse_mode}
+        )
+        data = response.json()
+        if not data.get("ok", False):
+            raise IntegrationError(f"telegram: sendMessage: {data.get('description')}", payload=data)
+        return data["result"]
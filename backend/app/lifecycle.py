@@ -7,7 +7,19 @@ from typing import Optional
 
 from app.config.settings import get_settings
 from app.ws.broker import event_broker
-from app.orchestrator.manager import XIOOrchestrator
+from app.orchestrator.manager import XIOOrchestrator, orchestrator
+from app.tools.registry_service import tool_registry
+from app.tools.sandbox.pool import sandbox_executor
+from app.integrations.clients import integration_clients
+from app.integrations.notifications import notification_queue
+from app.llm.client import model_client
+from app.services.rag_service import rag_service
+from app.services.indexing import indexing_pipeline
+from app.services.search import message_search
+from app.services.run_log import run_log
+from app.tools.result_cache import tool_result_cache
+from app.observability.tracing import shutdown_tracing
+from app.observability.health import health_monitor
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +31,6 @@ class LifecycleManager:
         self.settings = get_settings()
         self._db_engine: Optional[object] = None
         self._redis_client: Optional[object] = None
-        self._chroma_client: Optional[object] = None
         self._orchestrator: Optional[XIOOrchestrator] = None
     
     async def initialize_databases(self):
@@ -34,12 +45,13 @@ class LifecycleManager:
         # import redis.asyncio as redis
         # self._redis_client = redis.from_url(self.settings.REDIS_URL)
         
-        # TODO: Инициализация ChromaDB
-        # import chromadb
-        # self._chroma_client = chromadb.HttpClient(
-        #     host=self.settings.CHROMA_HOST,
-        #     port=self.settings.CHROMA_PORT
-        # )
+        # Векторный индекс истории встреч (Chroma или in-process)
+        try:
+            count = await rag_service.index.count()
+            logger.info(f"Векторный индекс {rag_service.index.name}: {count} фрагментов")
+        except Exception as e:
+            # Без индекса поиск по истории недоступен, остальное работает
+            logger.error(f"Не удалось подключить векторный индекс: {e}")
         
         logger.info("Подключения к базам данных успешно инициализированы")
     
@@ -47,19 +59,109 @@ class LifecycleManager:
         """Инициализация реестра инструментов"""
         logger.info("Загрузка реестра инструментов...")
         
-        # TODO: Загрузка ToolDefinition из registry/tools/definitions/
-        # from app.tools.registry_service import ToolRegistryService
-        # registry = ToolRegistryService()
-        # await registry.load_definitions()
+        await tool_registry.load_definitions()
+        
+        # Горячая перезагрузка определений без рестарта API
+        await tool_registry.start_watching()
         
         logger.info("Реестр инструментов загружен")
     
+    async def initialize_sandbox(self):
+        """Прогрев пула воркеров песочницы"""
+        logger.info("Прогрев песочницы инструментов...")
+        
+        try:
+            await sandbox_executor.start()
+            logger.info("Песочница инструментов прогрета")
+        except Exception as e:
+            # Без прогрева воркеры стартуют при первом вызове
+            logger.error(f"Не удалось прогреть песочницу: {e}")
+    
+    async def initialize_integrations(self):
+        """Инициализация пулов соединений интеграций"""
+        logger.info("Инициализация клиентов интеграций...")
+        
+        await integration_clients.start()
+        
+        logger.info("Клиенты интеграций инициализированы")
+    
+    async def initialize_notifications(self):
+        """Запуск очереди исходящих уведомлений"""
+        logger.info("Запуск очереди уведомлений...")
+        
+        await notification_queue.start()
+        
+        logger.info("Очередь уведомлений запущена")
+    
+    async def initialize_indexing(self):
+        """Запуск фоновой индексации сообщений для поиска по истории"""
+        if not self.settings.INDEXING_ENABLED:
+            logger.info("Фоновая индексация сообщений отключена")
+            return
+        
+        await indexing_pipeline.start()
+    
+    async def initialize_search(self):
+        """Запуск полнотекстового индекса сообщений"""
+        await message_search.start()
+    
+    async def initialize_health_checks(self):
+        """Регистрация фоновых проверок зависимостей для /ready"""
+        logger.info("Запуск проверок зависимостей...")
+        
+        health_monitor.register("broker", self._probe_broker)
+        health_monitor.register("storage", self._probe_storage)
+        # Без векторного индекса и песочницы сервис работает в урезанном режиме
+        health_monitor.register("vector_index", self._probe_vector_index, critical=False)
+        health_monitor.register("sandbox", self._probe_sandbox, critical=False)
+        if self.settings.TOOL_CACHE_REDIS_URL:
+            # Без Redis кеш инструментов работает локально
+            health_monitor.register("tool_cache", self._probe_tool_cache, critical=False)
+        if self.settings.RUN_STATE_BACKEND != "memory":
+            # Без общего хранилища run (SQLite или Redis) реплика не может вести и показывать run
+            health_monitor.register("run_state", self._probe_run_state)
+        
+        await health_monitor.start()
+        
+        logger.info("Проверки зависимостей запущены")
+    
+    async def _probe_broker(self):
+        state = event_broker.get_health()
+        if not state["running"]:
+            raise RuntimeError("Цикл обработки событий остановлен")
+        return state
+    
+    async def _probe_storage(self):
+        # SELECT 1 к поисковому индексу и базе очереди уведомлений: проба идет
+        # каждые несколько секунд, поэтому без COUNT(*) по всем документам
+        return {
+            "search": await message_search.ping(),
+            "notifications": await notification_queue.store.ping()
+        }
+    
+    async def _probe_vector_index(self):
+        return {"backend": rag_service.index.name, "documents": await rag_service.index.count()}
+    
+    async def _probe_sandbox(self):
+        return await sandbox_executor.ping(timeout=health_monitor.timeout)
+    
+    async def _probe_run_state(self):
+        return await run_log.store.ping()
+    
+    async def _probe_tool_cache(self):
+        return await tool_result_cache.ping()
+    
     async def initialize_orchestrator(self):
         """Инициализация оркестратора AutoGen"""
         logger.info("Инициализация оркестратора AutoGen...")
         
-        # Создаем и инициализируем оркестратор
-        self._orchestrator = XIOOrchestrator()
+        # Журнал run пишет вызовы инструментов и решения из брокера
+        # и продлевает аренду своих run
+        run_log.attach(event_broker)
+        await run_log.start()
+        
+        # Инициализируем общий оркестратор (восстанавливает незавершенные run)
+        self._orchestrator = orchestrator
         await self._orchestrator.initialize()
         
         logger.info("Оркестратор AutoGen инициализирован")
@@ -77,9 +179,23 @@ class LifecycleManager:
         """Закрытие подключений"""
         logger.info("Закрытие подключений...")
         
+        await health_monitor.stop()
+        
         # Останавливаем брокер событий
         await event_broker.stop_processing()
         
+        await tool_registry.stop_watching()
+        await sandbox_executor.stop()
+        await notification_queue.stop()
+        await integration_clients.close()
+        await model_client.close()
+        await indexing_pipeline.stop()
+        await message_search.stop()
+        await rag_service.close()
+        await run_log.close()
+        
+        shutdown_tracing()
+        
         if self._redis_client:
             await self._redis_client.close()
         
@@ -101,8 +217,14 @@ async def startup_event():
     try:
         await lifecycle_manager.initialize_databases()
         await lifecycle_manager.initialize_tool_registry()
+        await lifecycle_manager.initialize_sandbox()
+        await lifecycle_manager.initialize_integrations()
         await lifecycle_manager.initialize_orchestrator()
         await lifecycle_manager.initialize_websocket_broker()
+        await lifecycle_manager.initialize_notifications()
+        await lifecycle_manager.initialize_indexing()
+        await lifecycle_manager.initialize_search()
+        await lifecycle_manager.initialize_health_checks()
         
         logger.info("XIO Backend успешно запущен")
     except Exception as e:
@@ -0,0 +1,348 @@
+"""
+Общий клиент языковых моделей для всех агентов и run
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config.settings import get_settings
+from app.llm.prompt_cache import PromptCache
+from app.llm.providers import DeltaHandler, ModelProvider, create_provider
+from app.models.llm import ModelPriority, ModelRequest, ModelResponse, ModelUsage
+from app.observability.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(request: ModelRequest) -> str:
+    """Ключ объединения идентичных запросов (без run/agent/priority)"""
+    canonical = json.dumps(
+        [request.model, request.messages, request.temperature, request.max_tokens],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PriorityLimiter:
+    """
+    Семафор с полосами приоритета.
+
+    Освободившийся слот получает самый приоритетный ожидающий,
+    внутри полосы - в порядке очереди.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self._available = limit
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: int = ModelPriority.AGENT):
+        if self._available > 0 and not self._waiters:
+            self._available -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Слот уже передан, но задача отменена - возвращаем его
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._available += 1
+
+    @property
+    def in_use(self) -> int:
+        return self.limit - self._available
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"limit": self.limit, "in_use": self.in_use, "queued": self.queued}
+
+
+class ModelClient:
+    """
+    Пуловый клиент моделей.
+
+    - один провайдер (и пул соединений) на процесс;
+    - глобальный лимит и лимит на модель с полосами приоритета
+      (ходы модератора обгоняют фоновую суммаризацию);
+    - повторяющиеся промпты отдаются из кеша (exact/semantic);
+    - идентичные запросы в полете объединяются в один вызов;
+    - учет токенов и стоимости по run.
+    """
+
+    def __init__(self, provider: Optional[ModelProvider] = None, cache: Optional[PromptCache] = None):
+        self.settings = get_settings()
+        self._provider = provider
+        self.cache = cache or PromptCache()
+        self._global = PriorityLimiter("global", self.settings.LLM_MAX_CONCURRENCY)
+        self._per_model: Dict[str, PriorityLimiter] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self._orphaned: Set[asyncio.Future] = set()
+        self._usage: Dict[str, ModelUsage] = {}
+
+    @property
+    def provider(self) -> ModelProvider:
+        if self._provider is None:
+            self._provider = create_provider()
+        return self._provider
+
+    def _model_limiter(self, model: str) -> PriorityLimiter:
+        limiter = self._per_model.get(model)
+        if limiter is None:
+            limit = self.settings.LLM_MODEL_CONCURRENCY.get(model, self.settings.LLM_DEFAULT_MODEL_CONCURRENCY)
+            limiter = PriorityLimiter(model, limit)
+            self._per_model[model] = limiter
+        return limiter
+
+    def cost_of(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Стоимость по прайсу LLM_MODEL_PRICING (USD за 1K токенов)"""
+        pricing = self.settings.LLM_MODEL_PRICING.get(model)
+        if not pricing:
+            return 0.0
+        return (
+            prompt_tokens * pricing.get("prompt", 0.0)
+            + completion_tokens * pricing.get("completion", 0.0)
+        ) / 1000.0
+
+    async def complete(self, request: ModelRequest) -> ModelResponse:
+        """Выполнить запрос к модели с учетом кеша, лимитов, приоритета и объединения"""
+        cached = await self._from_cache(request)
+        if cached is not None:
+            return cached
+
+        key = request_key(request)
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            response = await self._await_shared(in_flight)
+            if in_flight in self._orphaned:
+                # Инициатор отменен: токены вызова учитывает первый дождавшийся
+                self._orphaned.discard(in_flight)
+                await self._to_cache(request, response)
+            else:
+                response = response.model_copy(update={"coalesced": True})
+            self._account(request, response)
+            return response
+
+        # Вызов идет отдельной задачей: отмена инициатора не отменяет его для объединенных ожидающих
+        task = asyncio.ensure_future(self._call(request))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._call_done(key, done))
+
+        response = await self._await_shared(task, leader=True)
+        await self._to_cache(request, response)
+        self._account(request, response)
+        return response
+
+    async def _await_shared(self, task: asyncio.Future, leader: bool = False) -> ModelResponse:
+        """Дождаться общего вызова; последний отмененный ожидающий отменяет и сам вызов"""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if task.done():
+                if self._waiters[task] == 1:
+                    self._orphaned.discard(task)
+                raise
+            if self._waiters[task] == 1:
+                task.cancel()
+            elif leader:
+                self._orphaned.add(task)
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _call_done(self, key: str, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            self._orphaned.discard(task)
+        if not task.cancelled():
+            # Исключение доставлено ожидающим; помечаем его полученным
+            task.exception()
+
+    async def stream(self, request: ModelRequest, on_delta: DeltaHandler) -> ModelResponse:
+        """
+        Потоковый запрос: части ответа передаются в on_delta по мере генерации.
+
+        Не объединяется с другими запросами. ttft_ms считается от постановки
+        в очередь, т.е. включает ожидание слота - так его видит пользователь.
+        """
+        cached = await self._from_cache(request)
+        if cached is not None:
+            await on_delta(cached.content)
+            return cached
+
+        response = await self._call(request, on_delta)
+        await self._to_cache(request, response)
+        self._account(request, response)
+        return response
+
+    async def _from_cache(self, request: ModelRequest) -> Optional[ModelResponse]:
+        if not self.cache.enabled_for(request):
+            return None
+
+        response, tier = await self.cache.lookup(request)
+        if response is None:
+            if request.run_id:
+                self._run_usage(request.run_id).cache_misses += 1
+            return None
+
+        response = response.model_copy(update={"cache": tier, "cost_usd": 0.0, "latency_ms": 0.0, "ttft_ms": 0.0})
+        self._account(request, response)
+        return response
+
+    async def _to_cache(self, request: ModelRequest, response: ModelResponse):
+        if self.cache.enabled_for(request):
+            await self.cache.store(request, response)
+
+    async def _call(self, request: ModelRequest, on_delta: Optional[DeltaHandler] = None) -> ModelResponse:
+        lane = request.priority.name.lower()
+        model_limiter = self._model_limiter(request.model)
+        queued_at = time.perf_counter()
+        first_token_at: Optional[float] = None
+
+        async def forward(delta: str):
+            nonlocal first_token_at
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                metrics_registry.histogram(
+                    "llm_time_to_first_token_seconds", model=request.model, lane=lane
+                ).observe(first_token_at - queued_at)
+            await on_delta(delta)
+
+        await model_limiter.acquire(request.priority)
+        try:
+            await self._global.acquire(request.priority)
+            try:
+                metrics_registry.histogram(
+                    "llm_queue_wait_seconds", model=request.model, lane=lane
+                ).observe(time.perf_counter() - queued_at)
+
+                started_at = time.perf_counter()
+                try:
+                    if on_delta is None:
+                        response = await self.provider.complete(request)
+                    else:
+                        response = await self.provider.stream(request, forward)
+                except Exception:
+                    metrics_registry.counter("llm_requests_total", model=request.model, outcome="error").inc()
+                    raise
+                latency = time.perf_counter() - started_at
+            finally:
+                self._global.release()
+        finally:
+            model_limiter.release()
+
+        metrics_registry.histogram("llm_request_seconds", model=request.model, lane=lane).observe(latency)
+        metrics_registry.counter("llm_requests_total", model=request.model, outcome="ok").inc()
+
+        return response.model_copy(update={
+            "latency_ms": latency * 1000,
+            "ttft_ms": (first_token_at - queued_at) * 1000 if first_token_at is not None else None,
+            "cost_usd": self.cost_of(request.model, response.prompt_tokens, response.completion_tokens)
+        })
+
+    def _account(self, request: ModelRequest, response: ModelResponse):
+        if not request.run_id:
+            return
+
+        usage = self._run_usage(request.run_id)
+        usage.requests += 1
+
+        # Ответ из кеша не тратил токены
+        if response.cache:
+            usage.cache_hits[response.cache] = usage.cache_hits.get(response.cache, 0) + 1
+            usage.tokens_saved += response.total_tokens
+            return
+
+        # Объединенный запрос не тратил токены: их учел исходный вызов
+        if response.coalesced:
+            usage.coalesced += 1
+            return
+
+        usage.prompt_tokens += response.prompt_tokens
+        usage.completion_tokens += response.completion_tokens
+        usage.cost_usd += response.cost_usd
+        usage.by_model[response.model] = usage.by_model.get(response.model, 0) + response.total_tokens
+
+        metrics_registry.counter("llm_tokens_total", model=response.model, kind="prompt").inc(response.prompt_tokens)
+        metrics_registry.counter("llm_tokens_total", model=response.model, kind="completion").inc(response.completion_tokens)
+
+    def _run_usage(self, run_id: str) -> ModelUsage:
+        usage = self._usage.get(run_id)
+        if usage is None:
+            usage = ModelUsage(run_id=run_id)
+            self._usage[run_id] = usage
+        return usage
+
+    def get_run_usage(self, run_id: str) -> ModelUsage:
+        """Токены и стоимость run"""
+        return self._usage.get(run_id) or ModelUsage(run_id=run_id)
+
+    def pop_run_usage(self, run_id: str) -> ModelUsage:
+        """Забрать учет завершенного run"""
+        return self._usage.pop(run_id, None) or ModelUsage(run_id=run_id)
+
+    def restore_run_usage(self, usage: ModelUsage):
+        """Вернуть учет run после паузы (складывается с уже накопленным)"""
+        current = self._usage.get(usage.run_id)
+        if current is None:
+            self._usage[usage.run_id] = usage.model_copy(deep=True)
+            return
+        current.requests += usage.requests
+        current.coalesced += usage.coalesced
+        current.prompt_tokens += usage.prompt_tokens
+        current.completion_tokens += usage.completion_tokens
+        current.cost_usd += usage.cost_usd
+        current.cache_misses += usage.cache_misses
+        current.tokens_saved += usage.tokens_saved
+        for model, tokens in usage.by_model.items():
+            current.by_model[model] = current.by_model.get(model, 0) + tokens
+        for tier, hits in usage.cache_hits.items():
+            current.cache_hits[tier] = current.cache_hits.get(tier, 0) + hits
+
+    async def close(self):
+        if self._provider is not None:
+            await self._provider.close()
+        await self.cache.embedder.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self._provider.name if self._provider else None,
+            "global": self._global.get_stats(),
+            "models": {model: limiter.get_stats() for model, limiter in self._per_model.items()},
+            "in_flight": len(self._in_flight),
+            "runs": len(self._usage),
+            "prompt_cache": self.cache.get_stats()
+        }
+
+
+# Глобальный экземпляр клиента моделей
+model_client = ModelClient()
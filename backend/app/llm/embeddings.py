@@ -0,0 +1,232 @@
+"""
+Эмбеддинги текста: локальный hashing-эмбеддер и OpenAI-совместимый API
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.integrations.http import IntegrationHTTPClient
+from app.observability.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm == 0:
+        return vector
+    return [value / norm for value in vector]
+
+
+def cosine(a: List[float], b: List[float]) -> float:
+    """Косинусная близость нормированных векторов"""
+    return sum(x * y for x, y in zip(a, b))
+
+
+class Embedder(ABC):
+    """Преобразование текстов в нормированные векторы"""
+
+    name: str = "embedder"
+    dim: int = 0
+    # Близость векторов отражает смысл текста (а не общие слова) -
+    # только такие эмбеддеры допустимы для семантического кеша промптов
+    semantic: bool = True
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Векторы для пачки текстов (в том же порядке)"""
+
+    async def close(self):
+        pass
+
+
+class HashingEmbedder(Embedder):
+    """
+    Детерминированный локальный эмбеддер (feature hashing слов и биграмм).
+
+    Не требует сети и дает стабильные векторы между процессами;
+    используется в тестах, бенчмарках и как запасной вариант.
+    """
+
+    name = "hashing"
+    semantic = False
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD_RE.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[index] += sign
+        return normalize(vector)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(text) for text in texts]
+
+
+class OpenAIEmbedder(Embedder):
+    """OpenAI-совместимый /v1/embeddings на общем пуле соединений"""
+
+    name = "openai"
+
+    def __init__(self, http: Optional[IntegrationHTTPClient] = None, model: Optional[str] = None):
+        self.settings = get_settings()
+        self.model = model or self.settings.EMBEDDING_MODEL
+        self.dim = self.settings.EMBEDDING_DIM
+        self.http = http or IntegrationHTTPClient(
+            "openai_embeddings",
+            self.settings.OPENAI_API_URL,
+            {"Authorization": f"Bearer {self.settings.OPENAI_API_KEY}"}
+        )
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        response = await self.http.request(
+            "POST",
+            "/v1/embeddings",
+            idempotent=True,
+            json={"model": self.model, "input": texts, "dimensions": self.dim}
+        )
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return [normalize(item["embedding"]) for item in data]
+
+    async def close(self):
+        await self.http.close()
+
+
+class CachedEmbedder(Embedder):
+    """
+    Обертка над эмбеддером: LRU-кеш по хешу содержимого и микробатчинг.
+
+    Промахи кеша от конкурентных вызовов копятся EMBEDDING_BATCH_WINDOW_MS
+    и уходят в базовый эмбеддер пачками до EMBEDDING_BATCH_SIZE текстов;
+    одинаковые тексты в окне считаются один раз.
+    """
+
+    def __init__(self, inner: Embedder, cache_size: Optional[int] = None):
+        self.settings = get_settings()
+        self.inner = inner
+        self.name = inner.name
+        self.dim = inner.dim
+        self.semantic = inner.semantic
+        self.cache_size = cache_size if cache_size is not None else self.settings.EMBEDDING_CACHE_SIZE
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._waiting: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    @staticmethod
+    def content_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        pending: List[Tuple[int, asyncio.Future]] = []
+
+        for i, text in enumerate(texts):
+            key = self.content_key(text)
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                results[i] = vector
+                self.hits += 1
+                continue
+            self.misses += 1
+            waiting = self._waiting.get(key)
+            if waiting is None:
+                waiting = (text, loop.create_future())
+                self._waiting[key] = waiting
+            pending.append((i, waiting[1]))
+
+        metrics_registry.counter("embedding_cache_hits_total").inc(len(texts) - len(pending))
+        metrics_registry.counter("embedding_cache_misses_total").inc(len(pending))
+
+        if pending:
+            if len(self._waiting) >= self.settings.EMBEDDING_BATCH_SIZE:
+                self._schedule_flush(0)
+            else:
+                self._schedule_flush(self.settings.EMBEDDING_BATCH_WINDOW_MS / 1000)
+            for i, future in pending:
+                results[i] = await future
+
+        return results
+
+    def _schedule_flush(self, delay: float):
+        if self._flush_handle is not None:
+            if delay > 0:
+                return
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self):
+        self._flush_handle = None
+        waiting, self._waiting = self._waiting, {}
+        items = list(waiting.items())
+        batch_size = self.settings.EMBEDDING_BATCH_SIZE
+
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            self.batches += 1
+            metrics_registry.histogram(
+                "embedding_batch_size", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+            ).observe(len(batch))
+            try:
+                vectors = await self.inner.embed([text for _, (text, _) in batch])
+            except Exception as e:
+                logger.error(f"Ошибка вычисления эмбеддингов ({len(batch)} текстов): {e}")
+                for _, (_, future) in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (key, (_, future)), vector in zip(batch, vectors):
+                self._remember(key, vector)
+                if not future.done():
+                    future.set_result(vector)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches
+        }
+
+    async def close(self):
+        await self.inner.close()
+
+
+def create_embedder() -> Embedder:
+    """Эмбеддер по настройке EMBEDDING_PROVIDER"""
+    settings = get_settings()
+    if settings.EMBEDDING_PROVIDER == "hashing":
+        return HashingEmbedder(settings.EMBEDDING_DIM)
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return OpenAIEmbedder()
+    raise ValueError(f"Неизвестный EMBEDDING_PROVIDER: {settings.EMBEDDING_PROVIDER}")
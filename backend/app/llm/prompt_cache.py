@@ -0,0 +1,220 @@
+"""
+Кеш ответов моделей на повторяющиеся промпты
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.llm.embeddings import Embedder, cosine, create_embedder
+from app.models.llm import ModelRequest, ModelResponse
+from app.observability.metrics import metrics_registry
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy опционален
+    np = None
+
+logger = logging.getLogger(__name__)
+
+EXACT = "exact"
+SEMANTIC = "semantic"
+
+
+def partition_of(request: ModelRequest) -> str:
+    """Раздел кеша: ответы разных моделей, версий команды и ролей не смешиваются"""
+    return f"{request.model}|{request.team_version or '-'}|{request.agent_role or '-'}"
+
+
+def is_single_turn(request: ModelRequest) -> bool:
+    """Промпт из одного вопроса (плюс системные сообщения) без истории переписки"""
+    return sum(1 for message in request.messages if message.get("role") != "system") == 1
+
+
+def semantic_bucket(request: ModelRequest) -> str:
+    """
+    Корзина семантического уровня: раздел + все сообщения, кроме последнего.
+
+    Близость сравнивается только для последнего вопроса, контекст перед ним
+    должен совпадать точно.
+    """
+    canonical = json.dumps(
+        [partition_of(request), request.messages[:-1], request.temperature, request.max_tokens],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def exact_key(request: ModelRequest) -> str:
+    canonical = json.dumps(
+        [partition_of(request), request.messages, request.temperature, request.max_tokens],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """
+    Двухуровневый кеш промптов.
+
+    1. exact - совпадение хеша (раздел + сообщения + параметры генерации);
+    2. semantic - только для однооборотных промптов: ближайший вопрос
+       с тем же контекстом по косинусной близости эмбеддингов не ниже
+       LLM_PROMPT_CACHE_SIMILARITY. Выключен по умолчанию (1.0) и требует
+       семантического эмбеддера: у hashing близки любые тексты с общими
+       словами, и ответ на один вопрос отдавался бы на другой.
+
+    Общий LRU с TTL; вытесненная запись удаляется из обоих уровней.
+    """
+
+    def __init__(self, embedder: Optional[Embedder] = None):
+        self.settings = get_settings()
+        self._embedder = embedder
+        # key -> запись; порядок - от давно использованных к недавним
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # корзина semantic_bucket -> {key: вектор последнего сообщения}
+        self._vectors: Dict[str, Dict[str, List[float]]] = {}
+        # векторы последних промахов, чтобы store не считал эмбеддинг повторно
+        self._recent_vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+
+        self._semantic_warned = False
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = create_embedder()
+        return self._embedder
+
+    def semantic_for(self, request: ModelRequest) -> bool:
+        """Искать ли ответ по близости (а не только точным совпадением)"""
+        if self.settings.LLM_PROMPT_CACHE_SIMILARITY >= 1.0 or not is_single_turn(request):
+            return False
+        if not self.embedder.semantic:
+            if not self._semantic_warned:
+                self._semantic_warned = True
+                logger.warning(
+                    f"Semantic-кеш промптов выключен: эмбеддер {self.embedder.name} не семантический"
+                )
+            return False
+        return True
+
+    def enabled_for(self, request: ModelRequest) -> bool:
+        """Кеш включен, запрос разрешает кеширование и агент не отказался от него"""
+        return (
+            self.settings.LLM_PROMPT_CACHE_ENABLED
+            and request.cacheable
+            and request.agent_id not in self.settings.LLM_PROMPT_CACHE_DISABLED_AGENTS
+        )
+
+    async def lookup(self, request: ModelRequest) -> Tuple[Optional[ModelResponse], Optional[str]]:
+        """Найти ответ: (ответ, уровень) или (None, None)"""
+        now = time.monotonic()
+        key = exact_key(request)
+
+        entry = self._get_live(key, now)
+        if entry is not None:
+            return self._hit(entry, EXACT)
+
+        vectors = self._vectors.get(semantic_bucket(request))
+        if vectors and self.semantic_for(request):
+            vector = await self._vector(key, request)
+            best_key = self._nearest(vector, vectors, self.settings.LLM_PROMPT_CACHE_SIMILARITY)
+            if best_key is not None:
+                entry = self._get_live(best_key, now)
+                if entry is not None:
+                    return self._hit(entry, SEMANTIC)
+
+        metrics_registry.counter("llm_prompt_cache_total", outcome="miss").inc()
+        return None, None
+
+    async def store(self, request: ModelRequest, response: ModelResponse):
+        """Сохранить ответ модели"""
+        key = exact_key(request)
+        bucket = semantic_bucket(request)
+
+        vector = None
+        if self.semantic_for(request):
+            vector = await self._vector(key, request)
+            self._recent_vectors.pop(key, None)
+
+        self._entries[key] = {
+            "response": response,
+            "bucket": bucket,
+            "expires_at": time.monotonic() + self.settings.LLM_PROMPT_CACHE_TTL
+        }
+        self._entries.move_to_end(key)
+        if vector is not None:
+            self._vectors.setdefault(bucket, {})[key] = vector
+
+        while len(self._entries) > self.settings.LLM_PROMPT_CACHE_MAX_ENTRIES:
+            oldest_key = next(iter(self._entries))
+            self._evict(oldest_key)
+            metrics_registry.counter("llm_prompt_cache_evictions_total").inc()
+
+    async def _vector(self, key: str, request: ModelRequest) -> List[float]:
+        vector = self._recent_vectors.get(key)
+        if vector is None:
+            vector = (await self.embedder.embed([request.messages[-1].get("content", "")]))[0]
+            self._recent_vectors[key] = vector
+            if len(self._recent_vectors) > 1024:
+                self._recent_vectors.popitem(last=False)
+        return vector
+
+    @staticmethod
+    def _nearest(vector: List[float], vectors: Dict[str, List[float]], threshold: float) -> Optional[str]:
+        keys = list(vectors)
+        if np is not None:
+            # Векторы нормированы: косинус - скалярное произведение, одна операция на корзину
+            scores = np.asarray([vectors[key] for key in keys], dtype=np.float32) @ np.asarray(vector, dtype=np.float32)
+            best = int(np.argmax(scores))
+            return keys[best] if scores[best] >= threshold else None
+        best_key, best_score = None, threshold
+        for candidate_key in keys:
+            score = cosine(vector, vectors[candidate_key])
+            if score >= best_score:
+                best_key, best_score = candidate_key, score
+        return best_key
+
+    def _get_live(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] <= now:
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _hit(self, entry: Dict[str, Any], tier: str) -> Tuple[ModelResponse, str]:
+        metrics_registry.counter("llm_prompt_cache_total", outcome=tier).inc()
+        return entry["response"], tier
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        vectors = self._vectors.get(entry["bucket"])
+        if vectors is not None:
+            vectors.pop(key, None)
+            if not vectors:
+                del self._vectors[entry["bucket"]]
+
+    def clear(self):
+        self._entries.clear()
+        self._vectors.clear()
+        self._recent_vectors.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "semantic_buckets": len(self._vectors),
+            "max_entries": self.settings.LLM_PROMPT_CACHE_MAX_ENTRIES
+        }
@@ -0,0 +1,208 @@
+"""
+Провайдеры языковых моделей: OpenAI-совместимый API и локальная mock-модель
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.config.settings import get_settings
+from app.integrations.http import IntegrationError, IntegrationHTTPClient
+from app.models.llm import ModelRequest, ModelResponse
+
+logger = logging.getLogger(__name__)
+
+DeltaHandler = Callable[[str], Awaitable[None]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов (~4 символа на токен)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """Оценка токенов запроса с учетом служебных токенов на сообщение"""
+    return sum(estimate_tokens(message.get("content", "")) + 4 for message in messages)
+
+
+class ModelProvider(ABC):
+    """Транспорт до модели"""
+
+    name: str = "provider"
+
+    @abstractmethod
+    async def complete(self, request: ModelRequest) -> ModelResponse:
+        """Выполнить запрос к модели"""
+
+    async def stream(self, request: ModelRequest, on_delta: DeltaHandler) -> ModelResponse:
+        """Выполнить запрос, передавая части ответа по мере генерации"""
+        response = await self.complete(request)
+        await on_delta(response.content)
+        return response
+
+    async def close(self):
+        pass
+
+
+class OpenAIProvider(ModelProvider):
+    """
+    OpenAI-совместимый chat completions API.
+
+    Соединения берутся из общего пула IntegrationHTTPClient, поэтому
+    все агенты всех run переиспользуют одни keep-alive соединения.
+    """
+
+    name = "openai"
+
+    def __init__(self, http: Optional[IntegrationHTTPClient] = None):
+        self.settings = get_settings()
+        self.http = http or IntegrationHTTPClient(
+            "openai",
+            self.settings.OPENAI_API_URL,
+            {"Authorization": f"Bearer {self.settings.OPENAI_API_KEY}"}
+        )
+
+    async def complete(self, request: ModelRequest) -> ModelResponse:
+        payload = {
+            "model": request.model,
+            "messages": request.messages,
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens or self.settings.MAX_TOKENS
+        }
+        response = await self.http.request(
+            "POST",
+            "/v1/chat/completions",
+            idempotent=True,
+            json=payload,
+            timeout=self.settings.LLM_REQUEST_TIMEOUT
+        )
+        data = response.json()
+        try:
+            content = data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError) as e:
+            raise IntegrationError(f"openai: неожиданный ответ: {e}", payload=data) from e
+
+        usage = data.get("usage") or {}
+        return ModelResponse(
+            model=data.get("model", request.model),
+            content=content,
+            prompt_tokens=usage.get("prompt_tokens", estimate_prompt_tokens(request.messages)),
+            completion_tokens=usage.get("completion_tokens", estimate_tokens(content))
+        )
+
+    async def stream(self, request: ModelRequest, on_delta: DeltaHandler) -> ModelResponse:
+        """Потоковый ответ (SSE); usage приходит последним чанком"""
+        payload = {
+            "model": request.model,
+            "messages": request.messages,
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens or self.settings.MAX_TOKENS,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        parts: List[str] = []
+        usage: Dict[str, int] = {}
+        model = request.model
+
+        async with self.http.client.stream(
+            "POST",
+            "/v1/chat/completions",
+            json=payload,
+            timeout=self.settings.LLM_REQUEST_TIMEOUT
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                raise IntegrationError(
+                    f"openai: stream вернул {response.status_code}",
+                    status_code=response.status_code,
+                    payload=response.text
+                )
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                model = chunk.get("model", model)
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        parts.append(delta)
+                        await on_delta(delta)
+
+        content = "".join(parts)
+        return ModelResponse(
+            model=model,
+            content=content,
+            prompt_tokens=usage.get("prompt_tokens", estimate_prompt_tokens(request.messages)),
+            completion_tokens=usage.get("completion_tokens", estimate_tokens(content))
+        )
+
+    async def close(self):
+        await self.http.close()
+
+
+class MockModelProvider(ModelProvider):
+    """
+    Детерминированная локальная модель для тестов и бенчмарков.
+
+    Ответ зависит только от модели и сообщений, токены считаются оценкой.
+    latency - имитация времени ответа в секундах, token_delay - пауза
+    между частями потокового ответа.
+    """
+
+    name = "mock"
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def reply_for(self, request: ModelRequest) -> str:
+        canonical = json.dumps([request.model, request.messages], sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:8]
+        last = request.messages[-1].get("content", "") if request.messages else ""
+        speaker = request.agent_id or "assistant"
+        return f"{speaker}: по теме «{last[:80]}» предлагаю вариант {digest}"
+
+    async def complete(self, request: ModelRequest) -> ModelResponse:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        content = self.reply_for(request)
+        completion_tokens = estimate_tokens(content)
+        if request.max_tokens:
+            completion_tokens = min(completion_tokens, request.max_tokens)
+
+        return ModelResponse(
+            model=request.model,
+            content=content,
+            prompt_tokens=estimate_prompt_tokens(request.messages),
+            completion_tokens=completion_tokens
+        )
+
+    async def stream(self, request: ModelRequest, on_delta: DeltaHandler) -> ModelResponse:
+        response = await self.complete(request)
+        # Части по словам с пробелом впереди, как у реальных токенизаторов
+        words = response.content.split(" ")
+        for index, word in enumerate(words):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            await on_delta(word if index == 0 else f" {word}")
+        return response
+
+
+def create_provider() -> ModelProvider:
+    """Провайдер по настройке LLM_PROVIDER"""
+    settings = get_settings()
+    if settings.LLM_PROVIDER == "mock":
+        return MockModelProvider(latency=settings.LLM_MOCK_LATENCY)
+    if settings.LLM_PROVIDER == "openai":
+        return OpenAIProvider()
+    raise ValueError(f"Неизвестный LLM_PROVIDER: {settings.LLM_PROVIDER}")
@@ -9,7 +9,10 @@ from contextlib import asynccontextmanager
 
 from app.config.settings import get_settings
 from app.lifecycle import startup_event, shutdown_event
-from app.api.v1 import meetings, teams, tools, messages, participants, artifacts, health
+from app.observability.metrics import metrics_registry
+from app.observability.prometheus import HTTPMetricsMiddleware
+from app.observability.tracing import configure_tracing, instrument_app
+from app.api.v1 import meetings, teams, tools, messages, participants, artifacts, health, search, debug
 
 
 @asynccontextmanager
@@ -42,6 +45,15 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Метрики: при ENABLE_METRICS=false горячие пути пишут в заглушку
+    metrics_registry.enabled = settings.ENABLE_METRICS
+    if settings.ENABLE_METRICS:
+        app.add_middleware(HTTPMetricsMiddleware)
+    
+    # Трассировка: OTLP при заданном OTEL_EXPORTER_OTLP_ENDPOINT
+    configure_tracing()
+    instrument_app(app)
+    
     # API routes
     app.include_router(health.router, prefix="/api/v1", tags=["health"])
     app.include_router(meetings.router, prefix="/api/v1", tags=["meetings"])
@@ -50,6 +62,8 @@ def create_app() -> FastAPI:
     app.include_router(messages.router, prefix="/api/v1", tags=["messages"])
     app.include_router(participants.router, prefix="/api/v1", tags=["participants"])
     app.include_router(artifacts.router, prefix="/api/v1", tags=["artifacts"])
+    app.include_router(search.router, prefix="/api/v1", tags=["search"])
+    app.include_router(debug.router, prefix="/api/v1", tags=["debug"])
     
     return app
 
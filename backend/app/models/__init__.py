@@ -10,7 +10,8 @@ from .artifacts import (
     Risk,
     DecisionLog,
     ActionItem,
-    NotionResponse
+    NotionResponse,
+    NotionExportReport
 )
 
 from .validators import (
@@ -38,6 +39,43 @@ from .participants import (
     SpeakingOrder
 )
 
+from .tools import (
+    ToolScope,
+    ToolDefinition,
+    ToolInstance,
+    ToolCallStatus,
+    ToolCallRequest,
+    ToolCallResult
+)
+
+from .llm import (
+    BudgetLevel,
+    BudgetSpend,
+    ModelPriority,
+    ModelRequest,
+    ModelResponse,
+    ModelUsage,
+    RunBudget
+)
+
+from .retrieval import (
+    RetrievalDocument,
+    RetrievalHit
+)
+
+from .search import (
+    MessageSearchHit,
+    MessageSearchPage
+)
+
+from .runs import (
+    RunStatus,
+    RunEventType,
+    RunEvent,
+    RunCheckpoint,
+    RunState
+)
+
 __all__ = [
     # Base models
     "ImpactLevel",
@@ -48,6 +86,7 @@ __all__ = [
     "DecisionLog",
     "ActionItem",
     "NotionResponse",
+    "NotionExportReport",
     # Validated models
     "ValidatedDecisionLog",
     "ValidatedActionItem",
@@ -66,5 +105,32 @@ __all__ = [
     "ToolBadge",
     "Participant",
     "ParticipantUpdate",
-    "SpeakingOrder"
+    "SpeakingOrder",
+    # Tool models
+    "ToolScope",
+    "ToolDefinition",
+    "ToolInstance",
+    "ToolCallStatus",
+    "ToolCallRequest",
+    "ToolCallResult",
+    # LLM models
+    "BudgetLevel",
+    "BudgetSpend",
+    "ModelPriority",
+    "ModelRequest",
+    "ModelResponse",
+    "ModelUsage",
+    "RunBudget",
+    # Retrieval models
+    "RetrievalDocument",
+    "RetrievalHit",
+    # Search models
+    "MessageSearchHit",
+    "MessageSearchPage",
+    # Run state models
+    "RunStatus",
+    "RunEventType",
+    "RunEvent",
+    "RunCheckpoint",
+    "RunState"
 ] 
\ No newline at end of file
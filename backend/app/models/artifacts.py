@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 class ImpactLevel(str, Enum):
@@ -115,4 +115,16 @@ class NotionResponse(BaseModel):
     """Ответ от Notion API при создании страницы/задачи"""
     page_id: str = Field(..., description="ID созданной страницы/задачи в Notion")
     url: str = Field(..., description="URL страницы/задачи в Notion")
-    status: str = Field(..., description="Статус операции", pattern="^(created|updated)$") 
\ No newline at end of file
+    status: str = Field(..., description="Статус операции", pattern="^(created|updated)$")
+
+class NotionExportReport(BaseModel):
+    """Итог пакетного экспорта артефактов встречи в Notion"""
+    meeting_id: str = Field(..., description="Идентификатор встречи")
+    created: List[str] = Field(default_factory=list, description="Ключи созданных артефактов")
+    updated: List[str] = Field(default_factory=list, description="Ключи обновленных артефактов")
+    skipped: List[str] = Field(default_factory=list, description="Ключи неизменившихся артефактов")
+    failed: Dict[str, str] = Field(default_factory=dict, description="Ключ артефакта -> ошибка")
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed
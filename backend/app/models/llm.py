@@ -0,0 +1,104 @@
+"""
+Модели для обращений к языковым моделям
+"""
+
+from enum import Enum, IntEnum
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, computed_field
+
+class ModelPriority(IntEnum):
+    """Полоса приоритета запроса (меньше - важнее)"""
+    MODERATOR = 0
+    AGENT = 1
+    BACKGROUND = 2
+
+class ModelRequest(BaseModel):
+    """Запрос к модели от агента"""
+    model: str = Field(..., description="Имя модели")
+    messages: List[Dict[str, str]] = Field(..., description="Сообщения в формате role/content")
+    max_tokens: Optional[int] = Field(None, description="Лимит токенов ответа")
+    temperature: float = Field(default=0.7, description="Температура")
+    run_id: Optional[str] = Field(None, description="ID run для учета токенов")
+    agent_id: Optional[str] = Field(None, description="ID агента")
+    priority: ModelPriority = Field(default=ModelPriority.AGENT, description="Полоса приоритета")
+    team_version: Optional[str] = Field(None, description="Версия команды (раздел кеша промптов)")
+    agent_role: Optional[str] = Field(None, description="Роль агента (раздел кеша промптов)")
+    cacheable: bool = Field(default=True, description="Разрешено ли брать ответ из кеша промптов")
+
+class ModelResponse(BaseModel):
+    """Ответ модели"""
+    model: str = Field(..., description="Имя модели")
+    content: str = Field(..., description="Текст ответа")
+    prompt_tokens: int = Field(default=0, description="Токены запроса")
+    completion_tokens: int = Field(default=0, description="Токены ответа")
+    cost_usd: float = Field(default=0.0, description="Стоимость запроса")
+    coalesced: bool = Field(default=False, description="Ответ получен из идентичного запроса в полете")
+    latency_ms: float = Field(default=0.0, description="Время ответа модели")
+    ttft_ms: Optional[float] = Field(None, description="Время до первого токена (потоковый ответ)")
+    cache: Optional[str] = Field(None, description="Уровень кеша промптов при попадании (exact|semantic)")
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+class ModelUsage(BaseModel):
+    """Учет токенов и стоимости run"""
+    run_id: str = Field(..., description="ID run")
+    requests: int = Field(default=0, description="Запросов к модели")
+    coalesced: int = Field(default=0, description="Запросов, объединенных с идентичными")
+    prompt_tokens: int = Field(default=0, description="Токены запросов")
+    completion_tokens: int = Field(default=0, description="Токены ответов")
+    cost_usd: float = Field(default=0.0, description="Стоимость")
+    by_model: Dict[str, int] = Field(default_factory=dict, description="Токены по моделям")
+    cache_hits: Dict[str, int] = Field(default_factory=dict, description="Попадания в кеш промптов по уровням")
+    cache_misses: int = Field(default=0, description="Промахи кеша промптов")
+    tokens_saved: int = Field(default=0, description="Токены, сэкономленные кешем")
+
+    @computed_field
+    @property
+    def cache_hit_ratio(self) -> float:
+        hits = sum(self.cache_hits.values())
+        total = hits + self.cache_misses
+        return hits / total if total else 0.0
+
+class BudgetLevel(str, Enum):
+    """Состояние бюджета"""
+    OK = "ok"
+    SOFT = "soft"  # мягкий порог: дешевая модель и суммаризация
+    EXCEEDED = "exceeded"  # жесткий порог: run останавливается
+
+class BudgetSpend(BaseModel):
+    """Расход бюджета run или команды"""
+    scope: str = Field(..., description="run | team")
+    key: str = Field(..., description="ID run или команды")
+    tokens: int = Field(default=0, description="Потрачено токенов")
+    cost_usd: float = Field(default=0.0, description="Потрачено USD")
+    token_limit: Optional[int] = Field(None, description="Лимит токенов (None - без ограничения)")
+    cost_limit_usd: Optional[float] = Field(None, description="Лимит стоимости (None - без ограничения)")
+    level: BudgetLevel = Field(default=BudgetLevel.OK, description="Состояние бюджета")
+
+    @computed_field
+    @property
+    def ratio(self) -> float:
+        """Доля израсходованного лимита (по самому близкому к исчерпанию)"""
+        ratios = [0.0]
+        if self.token_limit:
+            ratios.append(self.tokens / self.token_limit)
+        if self.cost_limit_usd:
+            ratios.append(self.cost_usd / self.cost_limit_usd)
+        return max(ratios)
+
+class RunBudget(BaseModel):
+    """Бюджет run с учетом бюджета его команды"""
+    run: BudgetSpend = Field(..., description="Расход run")
+    team: Optional[BudgetSpend] = Field(None, description="Расход команды run")
+
+    @computed_field
+    @property
+    def level(self) -> BudgetLevel:
+        levels = [self.run.level] + ([self.team.level] if self.team else [])
+        for level in (BudgetLevel.EXCEEDED, BudgetLevel.SOFT):
+            if level in levels:
+                return level
+        return BudgetLevel.OK
+
@@ -0,0 +1,28 @@
+"""
+Модели для поиска по прошлым встречам (RAG)
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field
+
+class RetrievalDocument(BaseModel):
+    """Фрагмент истории встречи для векторного индекса"""
+    id: str = Field(..., description="Идемпотентный ID фрагмента")
+    text: str = Field(..., description="Текст фрагмента")
+    kind: str = Field(..., description="Тип источника (message|decision|task)")
+    meeting_id: str = Field(..., description="Идентификатор встречи")
+    team_id: Optional[str] = Field(None, description="Идентификатор команды")
+    created_at: datetime = Field(default_factory=datetime.now, description="Время создания источника")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Дополнительные метаданные")
+
+class RetrievalHit(BaseModel):
+    """Результат поиска"""
+    id: str = Field(..., description="ID фрагмента")
+    score: float = Field(..., description="Косинусная близость к запросу")
+    text: str = Field(..., description="Текст фрагмента")
+    kind: str = Field(..., description="Тип источника")
+    meeting_id: str = Field(..., description="Идентификатор встречи")
+    team_id: Optional[str] = Field(None, description="Идентификатор команды")
+    created_at: Optional[datetime] = Field(None, description="Время создания источника")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Дополнительные метаданные")
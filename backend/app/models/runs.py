@@ -0,0 +1,124 @@
+"""
+Модели состояния run консилиума (журнал событий и снимки)
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from .llm import ModelUsage
+from .participants import SpeakingOrder
+
+class RunStatus(str, Enum):
+    """Статус run"""
+    RUNNING = "running"
+    PAUSED = "paused"
+    STOPPED = "stopped"
+    COMPLETED = "completed"
+
+class RunEventType(str, Enum):
+    """Типы событий журнала run"""
+    RUN_STARTED = "run_started"
+    RUN_PAUSED = "run_paused"
+    RUN_RESUMED = "run_resumed"
+    RUN_STOPPED = "run_stopped"
+    RUN_COMPLETED = "run_completed"
+    SPEAKER_CHANGED = "speaker_changed"
+    PARTICIPANT_STATUS = "participant_status"
+    MESSAGE = "message"
+    TOOL_CALL = "tool_call"
+    DECISION = "decision"
+
+class RunEvent(BaseModel):
+    """Запись append-only журнала run"""
+    run_id: str = Field(..., description="Идентификатор run")
+    seq: int = Field(..., description="Порядковый номер события в run (с 1)")
+    type: RunEventType = Field(..., description="Тип события")
+    ts: datetime = Field(default_factory=datetime.now, description="Время события")
+    data: Dict[str, Any] = Field(default_factory=dict, description="Данные события")
+
+class RunCheckpoint(BaseModel):
+    """Контрольная точка приостановленного run: все, что нужно для продолжения на любом воркере"""
+    team_state: Dict[str, Any] = Field(default_factory=dict, description="Состояние команды AutoGen (save_state)")
+    agent_states: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="agent_id -> состояние агента")
+    conversation_cursor: Optional[str] = Field(None, description="Последнее сообщение, на котором остановился run")
+    usage: Optional[ModelUsage] = Field(None, description="Учет токенов run на момент паузы")
+    paused_at: datetime = Field(default_factory=datetime.now, description="Время паузы")
+
+class RunState(BaseModel):
+    """
+    Компактное состояние run, восстанавливаемое из журнала.
+
+    Хранит только то, что нужно для продолжения run: очередь выступлений,
+    статусы участников и курсор переписки, но не сами сообщения.
+    """
+    run_id: str = Field(..., description="Идентификатор run")
+    meeting_id: str = Field(..., description="Идентификатор встречи")
+    topic: Optional[str] = Field(None, description="Тема консилиума")
+    team_id: Optional[str] = Field(None, description="Команда (общий бюджет токенов)")
+    status: RunStatus = Field(default=RunStatus.RUNNING, description="Статус run")
+    speaking_order: Optional[SpeakingOrder] = Field(None, description="Очередь выступлений")
+    participant_statuses: Dict[str, str] = Field(default_factory=dict, description="agent_id -> статус")
+    message_count: int = Field(default=0, description="Число сообщений run")
+    last_message_id: Optional[str] = Field(None, description="Курсор переписки: последнее сообщение")
+    tool_calls: int = Field(default=0, description="Число вызовов инструментов")
+    decisions: List[str] = Field(default_factory=list, description="Зафиксированные решения")
+    checkpoint: Optional[RunCheckpoint] = Field(None, description="Контрольная точка, пока run на паузе")
+    last_seq: int = Field(default=0, description="Последнее примененное событие журнала")
+    started_at: Optional[datetime] = Field(None, description="Время старта")
+    updated_at: Optional[datetime] = Field(None, description="Время последнего события")
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (RunStatus.RUNNING, RunStatus.PAUSED)
+
+    def apply(self, event: RunEvent) -> "RunState":
+        """Применить событие журнала (повторно примененные события игнорируются)"""
+        if event.seq <= self.last_seq:
+            return self
+
+        data = event.data
+        if event.type == RunEventType.RUN_STARTED:
+            self.status = RunStatus.RUNNING
+            self.topic = data.get("topic", self.topic)
+            self.team_id = data.get("team_id", self.team_id)
+            self.started_at = event.ts
+        elif event.type == RunEventType.RUN_PAUSED:
+            self.status = RunStatus.PAUSED
+            if "checkpoint" in data:
+                self.checkpoint = RunCheckpoint.model_validate(data["checkpoint"])
+        elif event.type == RunEventType.RUN_RESUMED:
+            self.status = RunStatus.RUNNING
+            self.checkpoint = None
+        elif event.type == RunEventType.RUN_STOPPED:
+            self.status = RunStatus.STOPPED
+        elif event.type == RunEventType.RUN_COMPLETED:
+            self.status = RunStatus.COMPLETED
+        elif event.type == RunEventType.SPEAKER_CHANGED:
+            # Полная очередь пишется при создании, далее - только смена спикера
+            previous = self.speaking_order.current_speaker if self.speaking_order else None
+            if self.speaking_order is None or "order" in data:
+                self.speaking_order = SpeakingOrder(meeting_id=self.meeting_id, **data)
+            else:
+                self.speaking_order = self.speaking_order.model_copy(update=data)
+            # Статусы спикеров следуют из очереди так же, как в ParticipantService
+            if previous:
+                self.participant_statuses[previous] = "waiting"
+            if self.speaking_order.current_speaker:
+                self.participant_statuses[self.speaking_order.current_speaker] = "speaking"
+            if self.speaking_order.next_speaker:
+                self.participant_statuses[self.speaking_order.next_speaker] = "next"
+        elif event.type == RunEventType.PARTICIPANT_STATUS:
+            self.participant_statuses[data["agent_id"]] = data["status"]
+        elif event.type == RunEventType.MESSAGE:
+            self.message_count += 1
+            self.last_message_id = data.get("message_id")
+        elif event.type == RunEventType.TOOL_CALL:
+            self.tool_calls += 1
+        elif event.type == RunEventType.DECISION:
+            self.decisions.append(data.get("summary") or data.get("artifact_id") or "")
+
+        self.last_seq = event.seq
+        self.updated_at = event.ts
+        return self
@@ -0,0 +1,18 @@
+"""
+Модели полнотекстового поиска по сообщениям
+"""
+
+from typing import List
+from pydantic import BaseModel, Field
+from .messages import Message
+
+class MessageSearchHit(BaseModel):
+    """Найденное сообщение"""
+    message: Message = Field(..., description="Сообщение")
+    score: float = Field(..., description="Релевантность BM25")
+
+class MessageSearchPage(BaseModel):
+    """Страница результатов поиска"""
+    query: str = Field(..., description="Поисковый запрос")
+    total: int = Field(..., description="Число совпадений с учетом фильтров")
+    hits: List[MessageSearchHit] = Field(default_factory=list, description="Результаты по убыванию релевантности")
@@ -0,0 +1,97 @@
+"""
+Модели для инструментов консилиума
+"""
+
+from enum import Enum
+from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field
+
+class ToolScope(str, Enum):
+    """Уровень привязки экземпляра инструмента"""
+    AGENT = "agent"
+    TEAM = "team"
+    GLOBAL = "global"
+
+class ToolDefinition(BaseModel):
+    """Системное определение инструмента (сигнатура + JSON Schema)"""
+    definition_id: str = Field(..., description="Уникальный идентификатор определения")
+    name: str = Field(..., description="Отображаемое имя инструмента")
+    description: Optional[str] = Field(None, description="Описание инструмента")
+    json_schema: Dict[str, Any] = Field(default_factory=dict, description="JSON Schema входных аргументов")
+    returns: Dict[str, Any] = Field(default_factory=dict, description="JSON Schema результата")
+    runtime_constraints: Dict[str, Any] = Field(default_factory=dict, description="Ограничения исполнения")
+    network_policy: Dict[str, Any] = Field(default_factory=dict, description="Сетевая политика")
+    visibility: str = Field(default="ce", description="Видимость (ce|ee)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "definition_id": "notion.decision_log",
+                "name": "Create Decision Log",
+                "description": "Создает страницу с журналом решений в Notion",
+                "json_schema": {
+                    "type": "object",
+                    "properties": {"meeting_id": {"type": "string"}},
+                    "required": ["meeting_id"]
+                },
+                "runtime_constraints": {"timeout": 30},
+                "visibility": "ce"
+            }
+        }
+
+class ToolInstance(BaseModel):
+    """Экземпляр инструмента пользователя (параметры/секреты/права)"""
+    instance_id: str = Field(..., description="Уникальный идентификатор экземпляра")
+    definition_id: str = Field(..., description="Идентификатор определения инструмента")
+    owner_id: str = Field(..., description="Владелец экземпляра")
+    name: Optional[str] = Field(None, description="Отображаемое имя экземпляра")
+    scope: ToolScope = Field(default=ToolScope.GLOBAL, description="Уровень привязки")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="Параметры экземпляра")
+    secrets_ref: Optional[str] = Field(None, description="Ссылка на секреты (Vault/KMS)")
+    permissions: List[str] = Field(default_factory=list, description="Разрешения")
+    rate_limits: Dict[str, Any] = Field(default_factory=dict, description="Лимиты частоты вызовов")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "instance_id": "notion_default",
+                "definition_id": "notion.decision_log",
+                "owner_id": "user_123",
+                "name": "Default Notion Integration",
+                "scope": "global",
+                "parameters": {"database_id": "db_123"},
+                "secrets_ref": "vault:notion/default",
+                "permissions": ["write"],
+                "rate_limits": {"requests_per_second": 3, "burst": 3}
+            }
+        }
+
+class ToolCallStatus(str, Enum):
+    """Статус вызова инструмента"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    REJECTED = "rejected"
+
+class ToolCallRequest(BaseModel):
+    """Запрос агента на вызов инструмента"""
+    call_id: str = Field(..., description="Идентификатор вызова")
+    definition_id: str = Field(..., description="Идентификатор определения инструмента")
+    instance_id: str = Field(..., description="Идентификатор экземпляра инструмента")
+    meeting_id: str = Field(..., description="Идентификатор встречи")
+    run_id: Optional[str] = Field(None, description="Идентификатор запуска")
+    agent_id: Optional[str] = Field(None, description="Агент, вызвавший инструмент")
+    thread_id: Optional[str] = Field(None, description="ID треда вызова в UI")
+    args: Dict[str, Any] = Field(default_factory=dict, description="Аргументы вызова")
+
+class ToolCallResult(BaseModel):
+    """Результат вызова инструмента"""
+    call_id: str = Field(..., description="Идентификатор вызова")
+    definition_id: str = Field(..., description="Идентификатор определения инструмента")
+    status: ToolCallStatus = Field(..., description="Итоговый статус")
+    result: Any = Field(None, description="Результат инструмента")
+    error: Optional[str] = Field(None, description="Описание ошибки")
+    duration_ms: float = Field(default=0.0, description="Длительность исполнения, мс")
+    wait_ms: float = Field(default=0.0, description="Ожидание лимитов и пула, мс")
+    cache: Optional[str] = Field(None, description="Кеш результата: hit|miss|coalesced")
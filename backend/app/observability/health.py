@@ -0,0 +1,162 @@
+"""
+Фоновые проверки зависимостей XIO для /ready
+
+Проверки выполняются по расписанию с таймаутом, результаты кешируются:
+/ready читает только кеш и не нагружает зависимости на каждый опрос.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config.settings import get_settings
+from app.observability.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# Проверка возвращает детали состояния или бросает исключение
+ProbeFn = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+PROBE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+@dataclass
+class ProbeResult:
+    """Результат последней проверки зависимости"""
+    name: str
+    status: str  # healthy | unhealthy | unknown
+    latency: float = 0.0
+    checked_at: Optional[float] = None
+    error: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self, now: float, stale_after: float) -> Dict[str, Any]:
+        status = self.status
+        if self.checked_at is not None and now - self.checked_at > stale_after:
+            status = "stale"
+        return {
+            "status": status,
+            "latency_ms": round(self.latency * 1000, 3),
+            "age_seconds": None if self.checked_at is None else round(now - self.checked_at, 3),
+            "error": self.error,
+            "details": self.details
+        }
+
+
+@dataclass
+class _Probe:
+    name: str
+    fn: ProbeFn
+    critical: bool
+    result: ProbeResult
+
+
+class HealthMonitor:
+    """Планировщик проверок зависимостей с кешем результатов"""
+
+    def __init__(self,
+                 interval: Optional[float] = None,
+                 timeout: Optional[float] = None,
+                 stale_after: Optional[float] = None):
+        settings = get_settings()
+        self.interval = interval if interval is not None else settings.HEALTH_PROBE_INTERVAL
+        self.timeout = timeout if timeout is not None else settings.HEALTH_PROBE_TIMEOUT
+        self.stale_after = stale_after if stale_after is not None else settings.HEALTH_STALE_AFTER
+        self._probes: Dict[str, _Probe] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, fn: ProbeFn, critical: bool = True):
+        """
+        Зарегистрировать проверку.
+
+        Некритичная зависимость не снимает сервис с трафика,
+        а только помечает его как degraded.
+        """
+        self._probes[name] = _Probe(name, fn, critical, ProbeResult(name=name, status="unknown"))
+
+    def unregister(self, name: str):
+        self._probes.pop(name, None)
+
+    async def run_probe(self, name: str) -> ProbeResult:
+        """Выполнить одну проверку с таймаутом и обновить кеш"""
+        probe = self._probes[name]
+        started = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(probe.fn(), timeout=self.timeout)
+            result = ProbeResult(name=name, status="healthy", details=details or {})
+        except asyncio.TimeoutError:
+            result = ProbeResult(name=name, status="unhealthy", error=f"Таймаут {self.timeout}s")
+        except Exception as e:
+            result = ProbeResult(name=name, status="unhealthy", error=f"{type(e).__name__}: {e}")
+
+        result.latency = time.perf_counter() - started
+        result.checked_at = time.monotonic()
+
+        if result.status != probe.result.status and probe.result.status != "unknown":
+            logger.warning(f"Зависимость {name}: {probe.result.status} -> {result.status} {result.error or ''}")
+        probe.result = result
+
+        metrics_registry.histogram("health_probe_seconds", buckets=PROBE_BUCKETS, probe=name).observe(result.latency)
+        metrics_registry.gauge("health_probe_up", probe=name).set(1 if result.status == "healthy" else 0)
+        return result
+
+    async def probe_all(self) -> List[ProbeResult]:
+        """Выполнить все проверки параллельно"""
+        return list(await asyncio.gather(*(self.run_probe(name) for name in list(self._probes))))
+
+    async def start(self):
+        """Первый прогон проверок и запуск фонового цикла"""
+        if self._task and not self._task.done():
+            return
+        await self.probe_all()
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"Проверки зависимостей запущены: {list(self._probes)}, interval={self.interval}s")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"Ошибка цикла проверок зависимостей: {e}")
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Готовность из кеша (без обращения к зависимостям).
+
+        Сервис готов, если все критичные проверки healthy и не устарели.
+        """
+        now = time.monotonic()
+        checks = {}
+        ready = True
+        degraded = []
+        for probe in self._probes.values():
+            check = probe.result.to_dict(now, self.stale_after)
+            check["critical"] = probe.critical
+            checks[probe.name] = check
+            if check["status"] != "healthy":
+                if probe.critical:
+                    ready = False
+                else:
+                    degraded.append(probe.name)
+
+        return {
+            "status": "ready" if ready else "not_ready",
+            "degraded": degraded,
+            "checks": checks
+        }
+
+
+# Глобальный экземпляр монитора
+health_monitor = HealthMonitor()
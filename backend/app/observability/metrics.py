@@ -0,0 +1,214 @@
+"""
+Внутренние метрики XIO (счетчики, gauge и гистограммы латентности)
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Tuple
+
+# Границы бакетов в секундах: от 1 мс до 30 с
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Монотонный счетчик"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Gauge:
+    """Текущее значение (глубина очереди, число подключений)"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class Histogram:
+    """Гистограмма с фиксированными бакетами"""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # Последний элемент - бакет +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе бакета"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for idx, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[idx] if idx < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max
+        }
+
+
+class _NullMetric:
+    """Заглушка для выключенных метрик (ENABLE_METRICS=false)"""
+
+    __slots__ = ()
+    value = 0.0
+    count = 0
+
+    def inc(self, amount: float = 1.0):
+        pass
+
+    def dec(self, amount: float = 1.0):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+    def quantile(self, q: float) -> float:
+        return 0.0
+
+
+NULL_METRIC = _NullMetric()
+
+
+class MetricsRegistry:
+    """Реестр метрик с метками"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelsKey, Counter]] = {}
+        self._gauges: Dict[str, Dict[LabelsKey, Gauge]] = {}
+        self._histograms: Dict[str, Dict[LabelsKey, Histogram]] = {}
+        self._lock = threading.Lock()
+        self.enabled = True
+
+    def counter(self, name: str, **labels: Any) -> Counter:
+        """Получить (или создать) счетчик"""
+        if not self.enabled:
+            return NULL_METRIC
+        key = self._labels_key(labels)
+        series = self._counters.get(name)
+        if series is not None:
+            metric = series.get(key)
+            if metric is not None:
+                return metric
+
+        with self._lock:
+            return self._counters.setdefault(name, {}).setdefault(key, Counter())
+
+    def gauge(self, name: str, **labels: Any) -> Gauge:
+        """Получить (или создать) gauge"""
+        if not self.enabled:
+            return NULL_METRIC
+        key = self._labels_key(labels)
+        series = self._gauges.get(name)
+        if series is not None:
+            metric = series.get(key)
+            if metric is not None:
+                return metric
+
+        with self._lock:
+            return self._gauges.setdefault(name, {}).setdefault(key, Gauge())
+
+    def histogram(self, name: str, buckets: Optional[Tuple[float, ...]] = None, **labels: Any) -> Histogram:
+        """Получить (или создать) гистограмму"""
+        if not self.enabled:
+            return NULL_METRIC
+        key = self._labels_key(labels)
+        series = self._histograms.get(name)
+        if series is not None:
+            metric = series.get(key)
+            if metric is not None:
+                return metric
+
+        with self._lock:
+            return self._histograms.setdefault(name, {}).setdefault(
+                key, Histogram(buckets or DEFAULT_BUCKETS)
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Снимок всех метрик в виде словаря"""
+        return {
+            "counters": {
+                name: [{"labels": dict(key), "value": metric.value} for key, metric in series.items()]
+                for name, series in self._counters.items()
+            },
+            "gauges": {
+                name: [{"labels": dict(key), "value": metric.value} for key, metric in series.items()]
+                for name, series in self._gauges.items()
+            },
+            "histograms": {
+                name: [{"labels": dict(key), **metric.snapshot()} for key, metric in series.items()]
+                for name, series in self._histograms.items()
+            }
+        }
+
+    def reset(self):
+        """Сбросить все метрики (для тестов)"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def series(self) -> Tuple[Dict[str, Dict[LabelsKey, Counter]],
+                              Dict[str, Dict[LabelsKey, Gauge]],
+                              Dict[str, Dict[LabelsKey, Histogram]]]:
+        """Копии серий (counters, gauges, histograms) для экспорта"""
+        with self._lock:
+            return (
+                {name: dict(series) for name, series in self._counters.items()},
+                {name: dict(series) for name, series in self._gauges.items()},
+                {name: dict(series) for name, series in self._histograms.items()}
+            )
+
+    @staticmethod
+    def _labels_key(labels: Dict[str, Any]) -> LabelsKey:
+        if not labels:
+            return ()
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+# Глобальный экземпляр реестра метрик
+metrics_registry = MetricsRegistry()
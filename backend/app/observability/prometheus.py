@@ -0,0 +1,120 @@
+"""
+Экспорт метрик XIO в формате Prometheus и HTTP-метрики по маршрутам
+"""
+
+import time
+from typing import Iterator, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from prometheus_client.process_collector import ProcessCollector
+
+from app.observability.metrics import MetricsRegistry, metrics_registry
+
+NAMESPACE = "xio"
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RegistryCollector:
+    """
+    Коллектор prometheus_client поверх MetricsRegistry.
+
+    Горячие пути пишут в собственные метрики без блокировок и форматирования,
+    экспозиция строится только при scrape.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    def collect(self) -> Iterator:
+        counters, gauges, histograms = self.registry.series()
+
+        for name, series in counters.items():
+            label_names = _label_names(series)
+            family = CounterMetricFamily(f"{NAMESPACE}_{name}", name, labels=label_names)
+            for key, metric in series.items():
+                family.add_metric(_label_values(key, label_names), metric.value)
+            yield family
+
+        for name, series in gauges.items():
+            label_names = _label_names(series)
+            family = GaugeMetricFamily(f"{NAMESPACE}_{name}", name, labels=label_names)
+            for key, metric in series.items():
+                family.add_metric(_label_values(key, label_names), metric.value)
+            yield family
+
+        for name, series in histograms.items():
+            label_names = _label_names(series)
+            family = HistogramMetricFamily(f"{NAMESPACE}_{name}", name, labels=label_names)
+            for key, metric in series.items():
+                cumulative, buckets = 0, []
+                for bound, count in zip(metric.buckets, metric.counts):
+                    cumulative += count
+                    buckets.append((_format_bound(bound), cumulative))
+                buckets.append(("+Inf", metric.count))
+                family.add_metric(_label_values(key, label_names), buckets, metric.sum)
+            yield family
+
+
+def _label_names(series) -> Tuple[str, ...]:
+    names = set()
+    for key in series:
+        names.update(label for label, _ in key)
+    return tuple(sorted(names))
+
+
+def _label_values(key, label_names) -> Tuple[str, ...]:
+    values = dict(key)
+    return tuple(values.get(name, "") for name in label_names)
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+_registry = CollectorRegistry(auto_describe=False)
+_registry.register(RegistryCollector(metrics_registry))
+_registry.register(ProcessCollector(namespace=NAMESPACE, registry=None))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Тело и Content-Type ответа /metrics"""
+    return generate_latest(_registry), CONTENT_TYPE_LATEST
+
+
+class HTTPMetricsMiddleware:
+    """
+    ASGI middleware: латентность и число запросов по шаблону маршрута.
+
+    Метка route - шаблон пути (/api/v1/meetings/{meeting_id}), а не сам путь,
+    чтобы число серий не росло с числом встреч.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            labels = {"method": scope["method"], "route": path}
+            metrics_registry.histogram("http_request_duration_seconds", buckets=HTTP_BUCKETS, **labels).observe(
+                time.perf_counter() - started
+            )
+            metrics_registry.counter("http_requests_total", status=status_code, **labels).inc()
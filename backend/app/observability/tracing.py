@@ -0,0 +1,115 @@
+"""
+Трассировка OpenTelemetry: настройка провайдера и перенос контекста через очереди
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+from opentelemetry.propagate import extract, inject
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+TRACER_NAME = "xio"
+
+_provider: Optional[TracerProvider] = None
+
+
+def get_tracer() -> trace.Tracer:
+    """Трейсер XIO (no-op, пока трассировка не настроена)"""
+    if _provider is not None:
+        return _provider.get_tracer(TRACER_NAME)
+    return trace.get_tracer(TRACER_NAME)
+
+
+def configure_tracing(exporter: Optional[SpanExporter] = None,
+                      sample_ratio: Optional[float] = None) -> Optional[TracerProvider]:
+    """
+    Настроить провайдер трассировки.
+
+    Без явного exporter спаны уходят в OTLP (OTEL_EXPORTER_OTLP_ENDPOINT);
+    если endpoint не задан - трассировка остается выключенной.
+    Семплирование по trace_id с учетом решения родителя, поэтому
+    входящий traceparent с флагом sampled всегда трассируется.
+    """
+    global _provider
+    settings = get_settings()
+
+    if exporter is None:
+        if not settings.OTEL_EXPORTER_OTLP_ENDPOINT:
+            logger.info("OTEL_EXPORTER_OTLP_ENDPOINT не задан, трассировка отключена")
+            return None
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("opentelemetry-exporter-otlp не установлен, трассировка отключена")
+            return None
+        processor = BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.OTEL_EXPORTER_OTLP_ENDPOINT))
+    else:
+        processor = SimpleSpanProcessor(exporter)
+
+    ratio = settings.OTEL_TRACES_SAMPLE_RATIO if sample_ratio is None else sample_ratio
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(ratio))
+    )
+    provider.add_span_processor(processor)
+    _provider = provider
+    logger.info(f"Трассировка включена: sample_ratio={ratio}")
+    return provider
+
+
+def instrument_app(app) -> bool:
+    """Спаны HTTP-запросов FastAPI"""
+    if _provider is None:
+        return False
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=_provider, excluded_urls="/api/v1/metrics")
+    return True
+
+
+def shutdown_tracing():
+    """Дослать буферизованные спаны и отключить трассировку"""
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+def inject_context() -> Dict[str, str]:
+    """Текущий контекст трассировки в виде carrier (traceparent) для очереди или воркера"""
+    carrier: Dict[str, str] = {}
+    if trace.get_current_span().get_span_context().is_valid:
+        inject(carrier)
+    return carrier
+
+
+def extract_context(carrier: Optional[Dict[str, str]]) -> otel_context.Context:
+    """Контекст из carrier (пустой carrier - текущий контекст)"""
+    if not carrier:
+        return otel_context.get_current()
+    return extract(carrier)
+
+
+def record_span(name: str,
+                start_ns: int,
+                end_ns: int,
+                parent: Optional[otel_context.Context] = None,
+                attributes: Optional[Dict[str, Any]] = None):
+    """Спан для уже прошедшего интервала (ожидание в очереди, работа в воркере)"""
+    span = get_tracer().start_span(name, context=parent, start_time=start_ns, attributes=attributes)
+    span.end(end_time=end_ns)
+
+
+def perf_to_ns(perf_timestamp: float) -> int:
+    """Отметку time.perf_counter() в wall-clock наносекунды"""
+    return time.time_ns() - int((time.perf_counter() - perf_timestamp) * 1e9)
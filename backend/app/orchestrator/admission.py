@@ -0,0 +1,83 @@
+"""
+Допуск run к исполнению: ограничение числа одновременных консилиумов
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.config.settings import get_settings
+from app.observability.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_BUCKETS = (0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0)
+
+
+class AdmissionTimeoutError(RuntimeError):
+    """Свободный слот для run не освободился за отведенное время"""
+
+
+class RunAdmission:
+    """
+    Слоты MAX_CONCURRENT_RUNS; run ждет свободный слот в порядке очереди.
+
+    Ожидание ограничено RUN_ADMISSION_TIMEOUT: при перегрузке запуск
+    отклоняется понятной ошибкой, а не висит бесконечно.
+    """
+
+    def __init__(self, max_runs: Optional[int] = None, timeout: Optional[float] = None):
+        settings = get_settings()
+        self.max_runs = max_runs or settings.MAX_CONCURRENT_RUNS
+        self.timeout = timeout if timeout is not None else settings.RUN_ADMISSION_TIMEOUT
+        self._semaphore = asyncio.Semaphore(self.max_runs)
+        self._active: Dict[str, float] = {}
+        self._waiting = 0
+
+    async def acquire(self, run_id: str) -> float:
+        """Занять слот для run, вернуть время ожидания в секундах"""
+        if run_id in self._active:
+            return 0.0
+
+        started = time.perf_counter()
+        self._waiting += 1
+        metrics_registry.gauge("runs_waiting").set(self._waiting)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout or None)
+        except asyncio.TimeoutError:
+            metrics_registry.counter("run_admission_timeouts_total").inc()
+            raise AdmissionTimeoutError(
+                f"Нет свободного слота для run {run_id} за {self.timeout:g}с "
+                f"(занято {len(self._active)} из {self.max_runs})"
+            )
+        finally:
+            self._waiting -= 1
+            metrics_registry.gauge("runs_waiting").set(self._waiting)
+
+        waited = time.perf_counter() - started
+        self._active[run_id] = time.time()
+        metrics_registry.histogram("run_admission_wait_seconds", buckets=ADMISSION_BUCKETS).observe(waited)
+        metrics_registry.gauge("runs_active").set(len(self._active))
+        if waited > 1.0:
+            logger.info(f"Run {run_id} ждал слот {waited:.1f}с")
+        return waited
+
+    def release(self, run_id: str) -> bool:
+        """Освободить слот run (повторный вызов безопасен)"""
+        if self._active.pop(run_id, None) is None:
+            return False
+        self._semaphore.release()
+        metrics_registry.gauge("runs_active").set(len(self._active))
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_runs": self.max_runs,
+            "active": len(self._active),
+            "waiting": self._waiting
+        }
+
+
+# Глобальный экземпляр допуска run
+run_admission = RunAdmission()
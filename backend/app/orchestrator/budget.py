@@ -0,0 +1,131 @@
+"""
+Бюджеты токенов и стоимости run и команды
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.models.llm import BudgetLevel, BudgetSpend, ModelUsage, RunBudget
+from app.observability.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetTracker:
+    """
+    Учет расхода run и команды относительно бюджетов.
+
+    Расход run обновляется из учета model_client после каждого хода.
+    Расход команды - сумма ее run в этом процессе: живые run считаются
+    по последнему обновлению, завершенные складываются в итог команды.
+
+    Учет ведется в памяти процесса: при нескольких репликах бюджет команды
+    действует на каждую реплику отдельно, а итог команды сбрасывается
+    при перезапуске. Бюджет run переживает паузу через контрольную точку.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._run_teams: Dict[str, Optional[str]] = {}
+        self._run_spend: Dict[str, Tuple[int, float]] = {}
+        self._team_closed: Dict[str, Tuple[int, float]] = {}
+        self._levels: Dict[str, BudgetLevel] = {}
+
+    def start(self, run_id: str, team_id: Optional[str] = None):
+        """Начать учет run (повторный вызов безопасен)"""
+        self._run_teams[run_id] = team_id
+        self._run_spend.setdefault(run_id, (0, 0.0))
+
+    def update(self, run_id: str, usage: ModelUsage) -> RunBudget:
+        """Обновить расход run из учета model_client (run вне учета не ограничивается)"""
+        if run_id not in self._run_teams:
+            return self.get(run_id)
+        self._run_spend[run_id] = (usage.prompt_tokens + usage.completion_tokens, usage.cost_usd)
+
+        budget = self.get(run_id)
+        previous = self._levels.get(run_id, BudgetLevel.OK)
+        if budget.level != previous:
+            self._levels[run_id] = budget.level
+            metrics_registry.counter("run_budget_transitions_total", level=budget.level.value).inc()
+            logger.warning(
+                f"Бюджет run {run_id}: {previous.value} -> {budget.level.value} "
+                f"(run {budget.run.ratio:.0%}, команда {budget.team.ratio if budget.team else 0.0:.0%})"
+            )
+        return budget
+
+    def get(self, run_id: str) -> RunBudget:
+        """Текущий расход run и его команды"""
+        return self._budget(run_id, self._run_spend.get(run_id, (0, 0.0)))
+
+    def snapshot(self, run_id: str, usage: ModelUsage) -> RunBudget:
+        """Расход run с учетом свежего usage без записи в учет (для чтения статуса)"""
+        if run_id not in self._run_teams:
+            return self.get(run_id)
+        return self._budget(run_id, (usage.prompt_tokens + usage.completion_tokens, usage.cost_usd))
+
+    def _budget(self, run_id: str, run_spend: Tuple[int, float]) -> RunBudget:
+        tokens, cost = run_spend
+        run = self._spend(
+            "run", run_id, tokens, cost, self.settings.RUN_TOKEN_BUDGET, self.settings.RUN_COST_BUDGET_USD
+        )
+
+        team_id = self._run_teams.get(run_id)
+        team = None
+        if team_id:
+            tokens, cost = self._team_spend(team_id, run_id, run_spend)
+            team = self._spend(
+                "team", team_id, tokens, cost, self.settings.TEAM_TOKEN_BUDGET, self.settings.TEAM_COST_BUDGET_USD
+            )
+        return RunBudget(run=run, team=team)
+
+    def fallback_model(self, model: str) -> str:
+        """Модель для run за мягким порогом"""
+        return self.settings.BUDGET_FALLBACK_MODEL or model
+
+    def finish(self, run_id: str):
+        """Завершить учет run: его расход остается в итоге команды"""
+        team_id = self._run_teams.get(run_id)
+        tokens, cost = self._run_spend.get(run_id, (0, 0.0))
+        if team_id:
+            closed_tokens, closed_cost = self._team_closed.get(team_id, (0, 0.0))
+            self._team_closed[team_id] = (closed_tokens + tokens, closed_cost + cost)
+        self.release(run_id)
+
+    def release(self, run_id: str):
+        """Снять run с учета без переноса в итог команды (run на паузе унесет расход в контрольной точке)"""
+        self._run_teams.pop(run_id, None)
+        self._run_spend.pop(run_id, None)
+        self._levels.pop(run_id, None)
+
+    def _team_spend(self, team_id: str, current_run: str, current_spend: Tuple[int, float]) -> Tuple[int, float]:
+        tokens, cost = self._team_closed.get(team_id, (0, 0.0))
+        for run_id, run_team in self._run_teams.items():
+            if run_team == team_id:
+                if run_id == current_run:
+                    run_tokens, run_cost = current_spend
+                else:
+                    run_tokens, run_cost = self._run_spend.get(run_id, (0, 0.0))
+                tokens += run_tokens
+                cost += run_cost
+        return tokens, cost
+
+    def _spend(self, scope: str, key: str, tokens: int, cost: float,
+               token_limit: int, cost_limit: float) -> BudgetSpend:
+        spend = BudgetSpend(
+            scope=scope,
+            key=key,
+            tokens=tokens,
+            cost_usd=cost,
+            token_limit=token_limit or None,
+            cost_limit_usd=cost_limit or None
+        )
+        if spend.ratio >= 1.0:
+            spend.level = BudgetLevel.EXCEEDED
+        elif spend.ratio >= self.settings.BUDGET_SOFT_RATIO:
+            spend.level = BudgetLevel.SOFT
+        return spend
+
+
+# Глобальный экземпляр учета бюджетов
+budget_tracker = BudgetTracker()
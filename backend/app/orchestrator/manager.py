@@ -4,7 +4,9 @@
 
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+import time
+import uuid
+from typing import Dict, List, Optional, Any, Set
 from datetime import datetime
 
 # TODO: Раскомментировать когда будут установлены зависимости
@@ -15,10 +17,31 @@ from datetime import datetime
 # from autogen_core import Image, FunctionCall, TextMessage
 
 from app.config.settings import get_settings
+from app.llm.client import model_client
+from app.models.llm import BudgetLevel, ModelRequest, RunBudget
+from app.models.messages import Message, MessageRole
+from app.models.runs import RunCheckpoint, RunEventType, RunState, RunStatus
+from app.observability.metrics import metrics_registry
+from app.observability.tracing import get_tracer
+from app.orchestrator.admission import AdmissionTimeoutError, run_admission
+from app.orchestrator.budget import budget_tracker
+from app.services.context import context_window
+from app.services.messages import message_service
+from app.services.participants import participant_service
+from app.services.run_log import run_log
+from app.ws.broker import event_broker
 
 logger = logging.getLogger(__name__)
 
 
+class RunPausedError(RuntimeError):
+    """Ход агента прерван паузой run"""
+
+
+class BudgetExceededError(RuntimeError):
+    """Бюджет run или команды исчерпан, новые ходы не запускаются"""
+
+
 class XIOOrchestrator:
     """
     Оркестратор для управления консилиумом экспертов XIO
@@ -30,7 +53,16 @@ class XIOOrchestrator:
         self._agents: Dict[str, Any] = {}  # AssistantAgent
         self._team: Optional[Any] = None  # RoundRobinGroupChat
         self._is_running = False
+        # Run запускается или возобновляется: оркестратор занят еще до первого await
+        self._starting = False
         self._current_run_id: Optional[str] = None
+        # Фоновая задача хода консилиума текущего run
+        self._run_task: Optional[asyncio.Task] = None
+        # Незавершенные ходы агентов (задача -> run): пауза их отменяет
+        self._turns: Dict[asyncio.Task, Optional[str]] = {}
+        self._interrupted: Set[asyncio.Task] = set()
+        # Остановленные run, чьи ходы еще доигрываются: учет токенов забирается после них
+        self._draining: Set[str] = set()
         
     async def initialize(self):
         """Инициализация оркестратора"""
@@ -40,17 +72,60 @@ class XIOOrchestrator:
         # await self._create_agents()
         # await self._create_team()
         
+        # Незавершенные run переживают рестарт: снимок + хвост журнала
+        for state in await run_log.recover_active():
+            await self._restore_run(state)
+        
         logger.info("XIO оркестратор инициализирован")
     
+    async def _restore_run(self, state: RunState):
+        """Продолжить run, восстановленный из журнала"""
+        if self._is_running or self._starting:
+            logger.warning(f"Run {state.run_id} восстановлен, но оркестратор уже ведет {self._current_run_id}")
+            await run_log.drop(state.run_id)
+            return
+        self._starting = True
+        try:
+            await run_admission.acquire(state.run_id)
+        except AdmissionTimeoutError as e:
+            # Старт приложения не срывается: run остается в хранилище для другого воркера
+            logger.error(f"Run {state.run_id} не продолжен: {e}")
+            await run_log.drop(state.run_id)
+            return
+        finally:
+            self._starting = False
+        await self._adopt_run(state)
+        logger.info(f"Продолжен run {state.run_id} ({state.status.value}, сообщений: {state.message_count})")
+    
+    async def _adopt_run(self, state: RunState, checkpoint: Optional[RunCheckpoint] = None):
+        """Принять run в этот процесс: очередь выступлений, учет токенов, состояние агентов и ход консилиума"""
+        self._current_run_id = state.run_id
+        self._is_running = True
+        budget_tracker.start(state.run_id, state.team_id)
+        # Общая очередь в хранилище свежее журнала, если ее меняли другие реплики
+        order = await run_log.get_speaking_order(state.meeting_id) or state.speaking_order
+        if order is not None:
+            participant_service.restore_speaking_order(order, state.participant_statuses)
+        if checkpoint is not None and checkpoint.usage is not None:
+            model_client.restore_run_usage(checkpoint.usage)
+            budget_tracker.update(state.run_id, model_client.get_run_usage(state.run_id))
+        if checkpoint is not None and (checkpoint.team_state or checkpoint.agent_states):
+            self._agents = await self._create_agents()
+            self._team = await self._create_team()
+            for agent_id, agent_state in checkpoint.agent_states.items():
+                agent = self._agents.get(agent_id)
+                if agent is not None:
+                    await agent.load_state(agent_state)
+            if self._team is not None and checkpoint.team_state:
+                await self._team.load_state(checkpoint.team_state)
+        self._start_flow(state.run_id, state.meeting_id, state.topic)
+    
     async def _create_agents(self) -> Dict[str, Any]:
         """Создание агентов с ролями"""
         
         # Пока заглушка, т.к. нужен OpenAI API ключ
-        # В реальной интеграции здесь будет:
-        # model_client = OpenAIChatCompletionClient(
-        #     model="gpt-4",
-        #     api_key=self.settings.OPENAI_API_KEY
-        # )
+        # Все агенты используют общий model_client (app/llm/client.py):
+        # один пул соединений, лимиты параллелизма и учет токенов по run
         
         agents = {}
         
@@ -81,23 +156,72 @@ class XIOOrchestrator:
         logger.info("Команда создана с round-robin политикой")
         return team
     
-    async def start_run(self, meeting_id: str, topic: str, agenda: str = None) -> str:
+    async def start_run(self, meeting_id: str, topic: str, agenda: str = None, team_id: Optional[str] = None) -> str:
         """Запустить новый run консилиума"""
         
-        if self._is_running:
+        if self._is_running or self._starting:
             raise ValueError("Оркестратор уже запущен")
         
         run_id = f"run_{meeting_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        self._current_run_id = run_id
-        self._is_running = True
-        
-        logger.info(f"Запуск консилиума: run_id={run_id}, meeting_id={meeting_id}")
-        
-        # Пока что заглушка - создаем тестовые события
-        await self._simulate_basic_flow(meeting_id, topic)
+        self._starting = True
+        try:
+            with get_tracer().start_as_current_span(
+                "orchestrator.start_run", attributes={"xio.meeting_id": meeting_id, "xio.run_id": run_id}
+            ) as span:
+                # Ждем свободный слот среди MAX_CONCURRENT_RUNS консилиумов
+                waited = await run_admission.acquire(run_id)
+                span.set_attribute("xio.admission_wait_ms", round(waited * 1000, 2))
+                try:
+                    await run_log.start_run(run_id, meeting_id, topic, team_id)
+                except BaseException:
+                    run_admission.release(run_id)
+                    raise
+                self._current_run_id = run_id
+                self._is_running = True
+                budget_tracker.start(run_id, team_id)
+                
+                logger.info(f"Запуск консилиума: run_id={run_id}, meeting_id={meeting_id}")
+                self._start_flow(run_id, meeting_id, topic)
+        finally:
+            self._starting = False
         
         return run_id
     
+    def _start_flow(self, run_id: str, meeting_id: str, topic: Optional[str]):
+        """Консилиум идет фоновой задачей, слот освобождается при любом ее исходе"""
+        self._run_task = asyncio.create_task(self._run_flow(run_id, meeting_id, topic or ""))
+    
+    async def _run_flow(self, run_id: str, meeting_id: str, topic: str):
+        """Ход консилиума; завершившийся или упавший run закрывается и отдает слот"""
+        try:
+            # Пока что заглушка - создаем тестовые события
+            await self._simulate_basic_flow(meeting_id, topic)
+        except asyncio.CancelledError:
+            # Отмена - это стоп или пауза: run закрывают они
+            raise
+        except Exception as e:
+            logger.error(f"Консилиум {run_id} завершился с ошибкой: {e}")
+            await self._close_run(run_id, meeting_id, RunEventType.RUN_STOPPED, reason="error")
+        else:
+            await self._close_run(run_id, meeting_id, RunEventType.RUN_COMPLETED)
+        finally:
+            run_admission.release(run_id)
+            if self._run_task is asyncio.current_task():
+                self._run_task = None
+    
+    async def _close_run(self, run_id: str, meeting_id: str, event_type: RunEventType, reason: Optional[str] = None):
+        """Закрыть run, чей ход консилиума закончился сам"""
+        if not self._is_running or self._current_run_id != run_id:
+            return
+        await self._finish_run(event_type, reason)
+        await event_broker.emit_event({
+            "type": "run_status",
+            "meeting_id": meeting_id,
+            "run_id": run_id,
+            "status": "completed" if event_type == RunEventType.RUN_COMPLETED else "stopped",
+            "reason": reason
+        })
+    
     async def _simulate_basic_flow(self, meeting_id: str, topic: str):
         """Симуляция базового потока консилиума (заглушка)"""
         
@@ -135,37 +259,291 @@ class XIOOrchestrator:
             logger.info(f"Сообщение от {message['agent_id']}: {message['content'][:50]}...")
             await asyncio.sleep(2)  # Имитация времени обдумывания
         
-        # НЕ завершаем run здесь - он должен оставаться активным для тестирования
-        # self._is_running = False
+        # Run закрывает _run_flow после возврата
         logger.info(f"Консилиум завершен: {self._current_run_id}")
     
+    async def stream_agent_turn(self, meeting_id: str, request: ModelRequest) -> Message:
+        """
+        Ход агента с потоковым ответом.
+
+        Части ответа уходят в брокер как chat_message_delta (брокер склеивает
+        их в кадры), финальный текст - одним agent_message. В MessageService
+        сохраняется только финальное сообщение.
+
+        Ход идет в пределах бюджета run: за мягким порогом - на дешевой
+        модели, при исчерпанном бюджете ход не запускается.
+        """
+        message_id = f"msg_{uuid.uuid4().hex[:8]}"
+        run_id = request.run_id or self._current_run_id
+        if run_id:
+            request = await self._within_budget(meeting_id, run_id, request)
+        with get_tracer().start_as_current_span("agent.turn", attributes={
+            "xio.meeting_id": meeting_id,
+            "xio.run_id": run_id or "",
+            "xio.agent_id": request.agent_id or "",
+            "xio.model": request.model,
+            "xio.message_id": message_id
+        }) as span:
+            turn = asyncio.create_task(self._stream_turn(meeting_id, run_id, message_id, request))
+            self._turns[turn] = run_id
+            try:
+                message = await turn
+            except asyncio.CancelledError:
+                if turn in self._interrupted:
+                    raise RunPausedError(f"Run {run_id} приостановлен, ход {request.agent_id} прерван")
+                raise
+            finally:
+                self._turns.pop(turn, None)
+                self._interrupted.discard(turn)
+                if run_id in self._draining:
+                    self._finish_usage(run_id)
+            if run_id:
+                await self._check_budget(meeting_id, run_id)
+            span.set_attribute("xio.ttft_ms", message.metadata.get("ttft_ms") or 0.0)
+            span.set_attribute("xio.tokens", message.metadata.get("tokens") or 0)
+            return message
+    
+    async def _stream_turn(self, meeting_id: str, run_id: Optional[str], message_id: str,
+                           request: ModelRequest) -> Message:
+        started_at = time.perf_counter()
+        
+        async def on_delta(delta: str):
+            await event_broker.emit_event({
+                "type": "chat_message_delta",
+                "meeting_id": meeting_id,
+                "run_id": run_id,
+                "agent_id": request.agent_id,
+                "message_id": message_id,
+                "delta": delta
+            })
+        
+        try:
+            response = await model_client.stream(request, on_delta)
+        except asyncio.CancelledError:
+            # Клиенты отбрасывают накопленные части незавершенного ответа
+            await event_broker.emit_event({
+                "type": "chat_message_aborted",
+                "meeting_id": meeting_id,
+                "run_id": run_id,
+                "agent_id": request.agent_id,
+                "message_id": message_id,
+                "reason": "Ход прерван"
+            })
+            raise
+        except Exception as e:
+            logger.error(f"Потоковый ответ {request.agent_id} прерван: {e}")
+            await event_broker.emit_event({
+                "type": "chat_message_aborted",
+                "meeting_id": meeting_id,
+                "run_id": run_id,
+                "agent_id": request.agent_id,
+                "message_id": message_id,
+                "reason": str(e)
+            })
+            raise
+        
+        message = message_service.create_message(
+            meeting_id=meeting_id,
+            run_id=run_id,
+            agent_id=request.agent_id,
+            role=MessageRole.ASSISTANT,
+            content=response.content,
+            metadata={
+                "model": response.model,
+                "ttft_ms": response.ttft_ms,
+                "latency_ms": response.latency_ms,
+                "tokens": response.total_tokens
+            },
+            message_id=message_id
+        )
+        if run_id:
+            await run_log.record(run_id, RunEventType.MESSAGE, {"message_id": message_id, "agent_id": request.agent_id})
+        
+        await event_broker.emit_event({
+            "type": "agent_message",
+            "meeting_id": meeting_id,
+            "run_id": run_id,
+            "agent_id": request.agent_id,
+            "message_id": message_id,
+            "role": "assistant",
+            "content": response.content,
+            "timestamp": message.created_at.isoformat(),
+            "ttft_ms": response.ttft_ms
+        })
+        
+        logger.debug(
+            f"Ход {request.agent_id}: ttft={response.ttft_ms}мс, "
+            f"всего {(time.perf_counter() - started_at) * 1000:.0f}мс"
+        )
+        return message
+    
     async def pause_run(self) -> bool:
-        """Приостановить текущий run"""
+        """
+        Приостановить текущий run.
+
+        Незавершенные ходы агентов отменяются, состояние команды и агентов,
+        курсор переписки и учет токенов уходят контрольной точкой в журнал
+        run, а слот допуска освобождается: на паузе run не держит ресурсов
+        процесса и может быть продолжен любым воркером.
+        """
         if not self._is_running:
             return False
-            
-        # TODO: Реальная пауза AutoGen team
-        logger.info(f"Консилиум приостановлен: {self._current_run_id}")
+        
+        run_id = self._current_run_id
+        await self._cancel_run_task()
+        await self._cancel_turns(run_id)
+        state = run_log.get_state(run_id)
+        checkpoint = RunCheckpoint(
+            team_state=await self._team.save_state() if self._team is not None else {},
+            agent_states={agent_id: await agent.save_state() for agent_id, agent in self._agents.items()},
+            conversation_cursor=state.last_message_id if state else None,
+            usage=model_client.pop_run_usage(run_id)
+        )
+        await run_log.record(run_id, RunEventType.RUN_PAUSED, {"checkpoint": checkpoint.model_dump(mode="json")})
+        run_admission.release(run_id)
+        budget_tracker.release(run_id)
+        self._release_run()
+        logger.info(f"Консилиум приостановлен: {run_id}")
         return True
     
-    async def resume_run(self) -> bool:
-        """Возобновить приостановленный run"""
-        if not self._current_run_id:
+    async def resume_run(self, meeting_id: Optional[str] = None) -> bool:
+        """
+        Возобновить приостановленный run встречи с контрольной точки.
+
+        Если run одновременно возобновляет другой воркер, побеждает первый
+        записавший RUN_RESUMED в журнал, остальные получают False.
+        """
+        if self._is_running or self._starting or meeting_id is None:
             return False
+        
+        self._starting = True
+        try:
+            state = await run_log.load_for_meeting(meeting_id)
+            if state is None or state.status != RunStatus.PAUSED:
+                return False
             
-        # TODO: Реальное возобновление AutoGen team  
-        logger.info(f"Консилиум возобновлен: {self._current_run_id}")
+            await run_admission.acquire(state.run_id)
+            resumed = await run_log.resume(state.run_id)
+            if resumed is None:
+                run_admission.release(state.run_id)
+                return False
+            
+            state, checkpoint = resumed
+            await self._adopt_run(state, checkpoint)
+        finally:
+            self._starting = False
+        logger.info(
+            f"Консилиум возобновлен: {state.run_id} "
+            f"(курсор: {checkpoint.conversation_cursor if checkpoint else None})"
+        )
         return True
     
-    async def stop_run(self) -> bool:
-        """Остановить текущий run"""
+    async def stop_run(self, meeting_id: Optional[str] = None, reason: Optional[str] = None) -> bool:
+        """Остановить текущий run (или run встречи, стоящий на паузе)"""
         if not self._is_running:
-            return False
+            if meeting_id is None:
+                return False
+            state = await run_log.load_for_meeting(meeting_id)
+            if state is None or state.status != RunStatus.PAUSED:
+                return False
+            stopped = await run_log.stop_paused(state.run_id)
+            if stopped is None:
+                return False
+            context_window.forget(meeting_id)
+            logger.info(f"Консилиум остановлен на паузе: {state.run_id}")
+            return True
             
-        self._is_running = False
-        logger.info(f"Консилиум остановлен: {self._current_run_id}")
+        await self._cancel_run_task()
+        await self._finish_run(RunEventType.RUN_STOPPED, reason)
+        logger.info(f"Консилиум остановлен: {self._current_run_id}" + (f" ({reason})" if reason else ""))
         return True
     
+    async def _finish_run(self, event_type: RunEventType, reason: Optional[str] = None):
+        """Освободить ресурсы текущего run и записать его итог в журнал"""
+        run_id = self._current_run_id
+        state = run_log.get_state(run_id)
+        self._is_running = False
+        run_admission.release(run_id)
+        budget_tracker.finish(run_id)
+        self._finish_usage(run_id)
+        await run_log.record(run_id, event_type, {"reason": reason} if reason else None)
+        # Резюме и оценки токенов встречи больше не нужны: кеш не растет с числом встреч
+        if state is not None:
+            context_window.forget(state.meeting_id)
+    
+    async def _cancel_run_task(self):
+        """Отменить ход консилиума (если стоп пришел не из него самого) и дождаться отмены"""
+        task, self._run_task = self._run_task, None
+        if task is None or task.done() or task is asyncio.current_task():
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    
+    async def _within_budget(self, meeting_id: str, run_id: str, request: ModelRequest) -> ModelRequest:
+        """Запрос хода с учетом бюджета run и команды"""
+        budget = budget_tracker.get(run_id)
+        if budget.level == BudgetLevel.EXCEEDED:
+            # Бюджет команды мог исчерпать другой run
+            await self._stop_for_budget(meeting_id, run_id, budget)
+            raise BudgetExceededError(f"Бюджет run {run_id} исчерпан, ход {request.agent_id} не запущен")
+        if budget.level == BudgetLevel.SOFT:
+            # Мягкий порог: дешевая модель и сжатие истории в резюме
+            context_window.schedule_summarization(meeting_id, request.agent_id)
+            model = budget_tracker.fallback_model(request.model)
+            if model != request.model:
+                metrics_registry.counter("run_budget_downgrades_total", model=request.model).inc()
+                request = request.model_copy(update={"model": model})
+        return request
+    
+    async def _check_budget(self, meeting_id: str, run_id: str):
+        """Обновить расход run после хода и остановить run при исчерпании бюджета"""
+        budget = budget_tracker.update(run_id, model_client.get_run_usage(run_id))
+        if budget.level == BudgetLevel.EXCEEDED:
+            await self._stop_for_budget(meeting_id, run_id, budget)
+    
+    async def _stop_for_budget(self, meeting_id: str, run_id: str, budget: RunBudget):
+        """Остановить run с исчерпанным бюджетом: ходы в полете доигрываются, новые не запускаются"""
+        if not self._is_running or run_id != self._current_run_id:
+            return
+        await self.stop_run(reason="budget_exceeded")
+        await event_broker.emit_event({
+            "type": "run_status",
+            "meeting_id": meeting_id,
+            "run_id": run_id,
+            "status": "stopped",
+            "reason": "budget_exceeded",
+            "budget": budget.model_dump(mode="json")
+        })
+    
+    async def _cancel_turns(self, run_id: Optional[str]):
+        """Отменить незавершенные ходы run и дождаться их"""
+        turns = [turn for turn, turn_run in self._turns.items() if turn_run == run_id and not turn.done()]
+        for turn in turns:
+            self._interrupted.add(turn)
+            turn.cancel()
+        if turns:
+            await asyncio.gather(*turns, return_exceptions=True)
+            logger.info(f"Прервано ходов run {run_id}: {len(turns)}")
+    
+    def _finish_usage(self, run_id: str):
+        """Забрать учет токенов завершенного run у model_client (после доигравших ходов)"""
+        if run_id in self._turns.values():
+            self._draining.add(run_id)
+            return
+        self._draining.discard(run_id)
+        usage = model_client.pop_run_usage(run_id)
+        if usage.requests:
+            logger.info(
+                f"Расход run {run_id}: {usage.prompt_tokens + usage.completion_tokens} токенов, "
+                f"${usage.cost_usd:.4f}, запросов {usage.requests}"
+            )
+    
+    def _release_run(self):
+        self._is_running = False
+        self._current_run_id = None
+        self._agents = {}
+        self._team = None
+    
     async def request_alternatives(self) -> bool:
         """Запросить больше альтернатив от экспертов"""
         if not self._is_running:
@@ -190,5 +568,23 @@ class XIOOrchestrator:
             "is_running": self._is_running,
             "current_run_id": self._current_run_id,
             "agents_count": len(self._agents),
-            "has_team": self._team is not None
-        } 
\ No newline at end of file
+            "has_team": self._team is not None,
+            "admission": run_admission.get_stats(),
+            "usage": model_client.get_run_usage(self._current_run_id).model_dump() if self._current_run_id else None,
+            "budget": self._budget().model_dump(mode="json") if self._is_running else None,
+            "run_state": self._run_state()
+        }
+    
+    def _budget(self) -> RunBudget:
+        # Расход на текущий момент, включая ходы, завершившиеся после последней проверки (без записи в учет)
+        return budget_tracker.snapshot(self._current_run_id, model_client.get_run_usage(self._current_run_id))
+    
+    def _run_state(self) -> Optional[Dict[str, Any]]:
+        state = run_log.get_state(self._current_run_id) if self._current_run_id else None
+        if state is None:
+            return None
+        return state.model_dump(mode="json", include={"status", "speaking_order", "message_count", "last_message_id", "last_seq"}) 
+
+
+# Глобальный экземпляр оркестратора (общий для API и жизненного цикла)
+orchestrator = XIOOrchestrator()
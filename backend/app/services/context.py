@@ -0,0 +1,280 @@
+"""
+Управление контекстным окном агентов: бюджет токенов и скользящая суммаризация
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.config.settings import get_settings
+from app.llm.client import model_client
+from app.llm.providers import estimate_tokens
+from app.models.llm import ModelPriority, ModelRequest
+from app.models.messages import Message, MessageType
+from app.observability.metrics import metrics_registry
+from app.services.messages import MessageService, message_service
+
+logger = logging.getLogger(__name__)
+
+# (run_id, строки "агент: текст") -> резюме
+Summarizer = Callable[[Optional[str], List[str]], Awaitable[str]]
+
+# Решения и задачи всегда попадают в промпт целиком
+PINNED_TYPES = {MessageType.DECISION, MessageType.TASK}
+
+
+@dataclass
+class SummaryBlock:
+    """Резюме последовательного отрезка истории"""
+    text: str
+    tokens: int
+    message_ids: List[str]
+
+
+@dataclass
+class MeetingContext:
+    """Кешированное состояние контекста встречи"""
+    blocks: List[SummaryBlock] = field(default_factory=list)
+    summarized_ids: Set[str] = field(default_factory=set)
+    run_id: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+    # id сообщения -> оценка токенов (сбрасывается вместе с контекстом)
+    tokens: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class ContextStats:
+    """Токены одного хода агента по частям промпта"""
+    budget: int
+    prompt_tokens: int = 0
+    system_tokens: int = 0
+    pinned_tokens: int = 0
+    summary_tokens: int = 0
+    recent_tokens: int = 0
+    recent_messages: int = 0
+    summary_blocks: int = 0
+    # сообщения вне окна, еще не вошедшие в резюме
+    pending_messages: int = 0
+
+
+class ContextWindowManager:
+    """
+    Сборка промптов агентов в пределах бюджета токенов.
+
+    Промпт = системный промпт + закрепленные решения/задачи + кешированные
+    резюме старых отрезков + последние сообщения. Когда несуммаризированная
+    история перерастает долю бюджета на свежие сообщения, старейший отрезок
+    суммаризируется в фоне низкоприоритетным запросом к модели.
+    """
+
+    def __init__(self,
+                 messages: Optional[MessageService] = None,
+                 summarizer: Optional[Summarizer] = None):
+        self.settings = get_settings()
+        self.messages = messages or message_service
+        self.summarizer = summarizer or self._summarize_with_model
+        self._contexts: Dict[str, MeetingContext] = {}
+
+    def budget_for(self, agent_id: str) -> int:
+        return self.settings.CONTEXT_AGENT_BUDGETS.get(agent_id, self.settings.CONTEXT_DEFAULT_BUDGET)
+
+    def _context(self, meeting_id: str) -> MeetingContext:
+        context = self._contexts.get(meeting_id)
+        if context is None:
+            context = MeetingContext()
+            self._contexts[meeting_id] = context
+        return context
+
+    def _message_tokens(self, context: MeetingContext, message: Message) -> int:
+        tokens = context.tokens.get(message.id)
+        if tokens is None:
+            tokens = estimate_tokens(message.content) + 4
+            context.tokens[message.id] = tokens
+        return tokens
+
+    def _history(self, meeting_id: str) -> Tuple[List[Message], List[Message]]:
+        """(закрепленные, остальные) сообщения встречи в хронологическом порядке"""
+        history = self.messages.get_messages(meeting_id, limit=None)
+        pinned = [message for message in history if message.type in PINNED_TYPES]
+        regular = [message for message in history if message.type not in PINNED_TYPES]
+        return pinned, regular
+
+    def build_prompt(self,
+                     meeting_id: str,
+                     agent_id: str,
+                     system_prompt: str) -> Tuple[List[Dict[str, str]], ContextStats]:
+        """Собрать сообщения промпта агента и статистику токенов хода"""
+        context = self._context(meeting_id)
+        budget = self.budget_for(agent_id)
+        stats = ContextStats(budget=budget)
+        pinned, regular = self._history(meeting_id)
+
+        prompt: List[Dict[str, str]] = [{"role": "system", "content": system_prompt}]
+        stats.system_tokens = estimate_tokens(system_prompt) + 4
+
+        if pinned:
+            pinned_text = "Зафиксированные решения и задачи:\n" + "\n".join(
+                f"- [{message.type.value}] {message.content}" for message in pinned
+            )
+            prompt.append({"role": "system", "content": pinned_text})
+            stats.pinned_tokens = estimate_tokens(pinned_text) + 4
+
+        if context.blocks:
+            summary_text = "Краткое содержание предыдущей части встречи:\n" + "\n".join(
+                block.text for block in context.blocks
+            )
+            prompt.append({"role": "system", "content": summary_text})
+            stats.summary_tokens = estimate_tokens(summary_text) + 4
+            stats.summary_blocks = len(context.blocks)
+
+        # Свежие сообщения - с конца, пока хватает бюджета
+        unsummarized = [message for message in regular if message.id not in context.summarized_ids]
+        remaining = budget - stats.system_tokens - stats.pinned_tokens - stats.summary_tokens
+        recent: List[Message] = []
+        for message in reversed(unsummarized):
+            tokens = self._message_tokens(context, message)
+            if tokens > remaining:
+                break
+            recent.append(message)
+            remaining -= tokens
+            stats.recent_tokens += tokens
+        recent.reverse()
+
+        prompt.extend(
+            {"role": message.role.value, "name": message.agent_id, "content": message.content}
+            for message in recent
+        )
+        stats.recent_messages = len(recent)
+        stats.pending_messages = len(unsummarized) - len(recent)
+        stats.prompt_tokens = stats.system_tokens + stats.pinned_tokens + stats.summary_tokens + stats.recent_tokens
+
+        metrics_registry.histogram(
+            "context_prompt_tokens", buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000), agent=agent_id
+        ).observe(stats.prompt_tokens)
+        metrics_registry.histogram(
+            "context_pending_messages", buckets=(0, 1, 5, 10, 20, 50, 100), agent=agent_id
+        ).observe(stats.pending_messages)
+
+        unsummarized_tokens = sum(self._message_tokens(context, message) for message in unsummarized)
+        if unsummarized_tokens > budget * self.settings.CONTEXT_RECENT_SHARE:
+            self.schedule_summarization(meeting_id, agent_id)
+
+        return prompt, stats
+
+    def build_request(self,
+                      meeting_id: str,
+                      run_id: str,
+                      agent_id: str,
+                      system_prompt: str,
+                      model: Optional[str] = None,
+                      priority: ModelPriority = ModelPriority.AGENT,
+                      **kwargs) -> Tuple[ModelRequest, ContextStats]:
+        """Запрос к модели для хода агента"""
+        messages, stats = self.build_prompt(meeting_id, agent_id, system_prompt)
+        request = ModelRequest(
+            model=model or self.settings.DEFAULT_MODEL,
+            messages=messages,
+            run_id=run_id,
+            agent_id=agent_id,
+            priority=priority,
+            **kwargs
+        )
+        return request, stats
+
+    def schedule_summarization(self, meeting_id: str, agent_id: Optional[str] = None):
+        """Запустить фоновую суммаризацию, если она еще не идет"""
+        context = self._context(meeting_id)
+        if context.task is None or context.task.done():
+            budget = self.budget_for(agent_id) if agent_id else self.settings.CONTEXT_DEFAULT_BUDGET
+            context.task = asyncio.create_task(self._summarize_backlog(meeting_id, budget))
+
+    async def wait_idle(self, meeting_id: str):
+        """Дождаться фоновой суммаризации встречи"""
+        task = self._context(meeting_id).task
+        if task is not None:
+            await task
+
+    async def _summarize_backlog(self, meeting_id: str, budget: int):
+        context = self._context(meeting_id)
+        recent_budget = budget * self.settings.CONTEXT_RECENT_SHARE
+
+        while True:
+            _, regular = self._history(meeting_id)
+            unsummarized = [message for message in regular if message.id not in context.summarized_ids]
+            # Последние сообщения всегда остаются дословно
+            candidates = unsummarized[:max(0, len(unsummarized) - self.settings.CONTEXT_KEEP_RECENT)]
+            unsummarized_tokens = sum(self._message_tokens(context, message) for message in unsummarized)
+            if not candidates or unsummarized_tokens <= recent_budget:
+                break
+
+            chunk = candidates[:self.settings.CONTEXT_SUMMARY_CHUNK]
+            context.run_id = chunk[-1].run_id
+            try:
+                text = await self.summarizer(
+                    context.run_id, [f"{message.agent_id}: {message.content}" for message in chunk]
+                )
+            except Exception as e:
+                logger.error(f"Суммаризация встречи {meeting_id} не удалась: {e}")
+                break
+
+            context.blocks.append(SummaryBlock(
+                text=text,
+                tokens=estimate_tokens(text),
+                message_ids=[message.id for message in chunk]
+            ))
+            context.summarized_ids.update(message.id for message in chunk)
+            metrics_registry.counter("context_summaries_total").inc()
+
+            try:
+                await self._compact_blocks(context)
+            except Exception as e:
+                logger.error(f"Слияние резюме встречи {meeting_id} не удалось: {e}")
+                break
+
+    async def _compact_blocks(self, context: MeetingContext):
+        """Слить два старейших резюме, если блоков больше лимита"""
+        while len(context.blocks) > self.settings.CONTEXT_MAX_SUMMARY_BLOCKS:
+            first, second = context.blocks[0], context.blocks[1]
+            text = await self.summarizer(context.run_id, [first.text, second.text])
+            context.blocks[:2] = [SummaryBlock(
+                text=text,
+                tokens=estimate_tokens(text),
+                message_ids=first.message_ids + second.message_ids
+            )]
+
+    async def _summarize_with_model(self, run_id: Optional[str], lines: List[str]) -> str:
+        response = await model_client.complete(ModelRequest(
+            model=self.settings.CONTEXT_SUMMARY_MODEL or self.settings.DEFAULT_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Сожми фрагмент обсуждения: ключевые аргументы, альтернативы, риски и договоренности."
+                },
+                {"role": "user", "content": "\n".join(lines)}
+            ],
+            max_tokens=self.settings.CONTEXT_SUMMARY_MAX_TOKENS,
+            temperature=0.0,
+            run_id=run_id,
+            agent_id="summarizer",
+            priority=ModelPriority.BACKGROUND
+        ))
+        return response.content
+
+    def forget(self, meeting_id: str):
+        """Сбросить кеш контекста встречи (резюме и оценки токенов)"""
+        context = self._contexts.pop(meeting_id, None)
+        if context is not None and context.task is not None:
+            context.task.cancel()
+
+    def get_stats(self, meeting_id: str) -> Dict[str, int]:
+        context = self._context(meeting_id)
+        return {
+            "summary_blocks": len(context.blocks),
+            "summarized_messages": len(context.summarized_ids),
+            "summary_tokens": sum(block.tokens for block in context.blocks)
+        }
+
+
+# Глобальный экземпляр менеджера контекста
+context_window = ContextWindowManager()
@@ -0,0 +1,181 @@
+"""
+Инкрементальная фоновая индексация новых сообщений в векторный индекс
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from app.config.settings import get_settings
+from app.models.messages import Message, MessageType
+from app.observability.metrics import metrics_registry
+from app.services.messages import MessageService, message_service
+from app.services.rag_service import RetrievalService, rag_service
+
+logger = logging.getLogger(__name__)
+
+# Служебные сообщения (вызовы инструментов, статусы) в поиск не попадают
+INDEXED_TYPES = {MessageType.CHAT, MessageType.DECISION, MessageType.TASK, MessageType.SUMMARY}
+
+LAG_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class IndexingPipeline:
+    """
+    Подписчик MessageService, индексирующий сообщения по мере создания.
+
+    create_message только кладет сообщение в буфер. Фоновый воркер ждет
+    затишья (debounce, но не дольше INDEXING_MAX_DELAY_MS), режет сообщения
+    на фрагменты и индексирует пачками. При переполнении буфера сообщения
+    не теряются: встреча помечается на переиндексацию из хранилища сообщений,
+    что безопасно благодаря идемпотентным ID фрагментов.
+    """
+
+    def __init__(self,
+                 retrieval: Optional[RetrievalService] = None,
+                 messages: Optional[MessageService] = None):
+        self.settings = get_settings()
+        self.retrieval = retrieval or rag_service
+        self.messages = messages or message_service
+        self._pending: "OrderedDict[str, Message]" = OrderedDict()
+        self._backfill: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._busy = False
+        self.indexed = 0
+        self.batches = 0
+        self.overflows = 0
+        self.failures = 0
+        self.max_lag = 0.0
+
+    def submit(self, message: Message):
+        """Слушатель MessageService: O(1), без ожиданий"""
+        if message.type not in INDEXED_TYPES or not message.content.strip():
+            return
+
+        if message.id not in self._pending and len(self._pending) >= self.settings.INDEXING_MAX_PENDING:
+            if message.meeting_id not in self._backfill:
+                logger.warning(f"Буфер индексации переполнен, встреча {message.meeting_id} будет переиндексирована")
+            self._backfill.add(message.meeting_id)
+            self.overflows += 1
+            metrics_registry.counter("indexing_overflow_total").inc()
+        else:
+            self._pending[message.id] = message
+        self._wakeup.set()
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._wakeup = asyncio.Event()
+        if self._pending or self._backfill:
+            self._wakeup.set()
+        self.messages.subscribe(self.submit)
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Запущена фоновая индексация сообщений")
+
+    async def stop(self):
+        self.messages.unsubscribe(self.submit)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # Дослать накопленное, чтобы не терять свежие решения при остановке
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Не удалось доиндексировать сообщения при остановке: {e}")
+
+    async def _run(self):
+        debounce = self.settings.INDEXING_DEBOUNCE_MS / 1000
+        max_delay = self.settings.INDEXING_MAX_DELAY_MS / 1000
+
+        while True:
+            await self._wakeup.wait()
+            first_seen = time.monotonic()
+
+            # Debounce: ждем затишья, но не дольше max_delay и не больше пачки
+            while len(self._pending) < self.settings.INDEXING_BATCH_SIZE:
+                self._wakeup.clear()
+                remaining = max_delay - (time.monotonic() - first_seen)
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(debounce, remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка фоновой индексации: {e}")
+
+    async def flush(self):
+        """Проиндексировать все накопленные сообщения"""
+        self._busy = True
+        try:
+            while self._backfill:
+                meeting_id = self._backfill.pop()
+                history = [
+                    message for message in self.messages.get_messages(meeting_id, limit=None)
+                    if message.type in INDEXED_TYPES
+                ]
+                for message in history:
+                    self._pending.pop(message.id, None)
+                for start in range(0, len(history), self.settings.INDEXING_BATCH_SIZE):
+                    await self._index_batch(history[start:start + self.settings.INDEXING_BATCH_SIZE])
+
+            while self._pending:
+                batch: List[Message] = []
+                while self._pending and len(batch) < self.settings.INDEXING_BATCH_SIZE:
+                    batch.append(self._pending.popitem(last=False)[1])
+                await self._index_batch(batch)
+        finally:
+            self._busy = False
+
+    async def _index_batch(self, batch: List[Message]):
+        try:
+            await self.retrieval.index_messages(batch)
+        except Exception as e:
+            # Повтор через переиндексацию встреч при следующем пробуждении
+            self.failures += 1
+            metrics_registry.counter("indexing_failures_total").inc()
+            logger.error(f"Не удалось проиндексировать {len(batch)} сообщений: {e}")
+            self._backfill.update(message.meeting_id for message in batch)
+            raise
+
+        now = datetime.now()
+        lag = metrics_registry.histogram("indexing_lag_seconds", buckets=LAG_BUCKETS)
+        for message in batch:
+            seconds = max(0.0, (now - message.created_at).total_seconds())
+            lag.observe(seconds)
+            self.max_lag = max(self.max_lag, seconds)
+        self.indexed += len(batch)
+        self.batches += 1
+        metrics_registry.counter("indexing_messages_total").inc(len(batch))
+
+    async def wait_idle(self, poll_interval: float = 0.005):
+        """Дождаться, пока буфер индексации опустеет"""
+        while self._pending or self._backfill or self._busy:
+            await asyncio.sleep(poll_interval)
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "pending": len(self._pending),
+            "backfill_meetings": len(self._backfill),
+            "indexed": self.indexed,
+            "batches": self.batches,
+            "overflows": self.overflows,
+            "failures": self.failures,
+            "max_lag_seconds": self.max_lag
+        }
+
+
+# Глобальный экземпляр конвейера индексации
+indexing_pipeline = IndexingPipeline()
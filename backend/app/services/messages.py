@@ -2,9 +2,10 @@
 Сервис для работы с сообщениями консилиума
 """
 
+import logging
 import uuid
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
 from app.models.messages import (
     Message,
     MessageThread,
@@ -15,6 +16,11 @@ from app.models.messages import (
     ToolCallMessage
 )
 
+logger = logging.getLogger(__name__)
+
+# Синхронный слушатель новых сообщений; не должен блокировать
+MessageListener = Callable[[Message], None]
+
 class MessageService:
     """Сервис для работы с сообщениями"""
     
@@ -22,6 +28,30 @@ class MessageService:
         # TODO: Заменить на реальное хранилище
         self._messages: Dict[str, Message] = {}
         self._threads: Dict[str, MessageThread] = {}
+        self._listeners: List[MessageListener] = []
+    
+    def subscribe(self, listener: MessageListener):
+        """Подписаться на создание сообщений"""
+        self._listeners.append(listener)
+    
+    def unsubscribe(self, listener: MessageListener):
+        """Отписаться от создания сообщений"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _store(self, message: Message, thread_id: Optional[str]):
+        """Сохраняет сообщение и уведомляет слушателей"""
+        self._messages[message.id] = message
+        
+        if thread_id:
+            self._add_to_thread(message, thread_id)
+        
+        for listener in self._listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                # Ошибка слушателя не должна ломать создание сообщения
+                logger.error(f"Ошибка слушателя сообщений: {e}")
         
     def create_message(self,
                       meeting_id: str,
@@ -32,10 +62,11 @@ class MessageService:
                       reply_to: Optional[str] = None,
                       thread_id: Optional[str] = None,
                       message_type: MessageType = MessageType.CHAT,
-                      metadata: Optional[Dict[str, Any]] = None) -> Message:
-        """Создает новое сообщение"""
+                      metadata: Optional[Dict[str, Any]] = None,
+                      message_id: Optional[str] = None) -> Message:
+        """Создает новое сообщение (message_id задается, если он уже выдан потоковым ответом)"""
         
-        message_id = f"msg_{uuid.uuid4().hex[:8]}"
+        message_id = message_id or f"msg_{uuid.uuid4().hex[:8]}"
         
         message = Message(
             id=message_id,
@@ -51,11 +82,7 @@ class MessageService:
             metadata=metadata or {}
         )
         
-        self._messages[message_id] = message
-        
-        if thread_id:
-            self._add_to_thread(message, thread_id)
-            
+        self._store(message, thread_id)
         return message
     
     def create_decision_message(self,
@@ -89,11 +116,7 @@ class MessageService:
             }
         )
         
-        self._messages[message_id] = message
-        
-        if thread_id:
-            self._add_to_thread(message, thread_id)
-            
+        self._store(message, thread_id)
         return message
     
     def create_task_message(self,
@@ -127,11 +150,7 @@ class MessageService:
             }
         )
         
-        self._messages[message_id] = message
-        
-        if thread_id:
-            self._add_to_thread(message, thread_id)
-            
+        self._store(message, thread_id)
         return message
     
     def create_tool_call_message(self,
@@ -163,11 +182,7 @@ class MessageService:
             }
         )
         
-        self._messages[message_id] = message
-        
-        if thread_id:
-            self._add_to_thread(message, thread_id)
-            
+        self._store(message, thread_id)
         return message
     
     def get_message(self, message_id: str) -> Optional[Message]:
@@ -176,10 +191,10 @@ class MessageService:
     
     def get_messages(self,
                     meeting_id: str,
-                    limit: int = 50,
+                    limit: Optional[int] = 50,
                     offset: int = 0,
                     message_type: Optional[MessageType] = None) -> List[Message]:
-        """Получает список сообщений встречи"""
+        """Получает список сообщений встречи (limit=None - все сообщения)"""
         
         messages = [
             msg for msg in self._messages.values()
@@ -190,6 +205,8 @@ class MessageService:
         # Сортируем по времени создания
         messages.sort(key=lambda x: x.created_at)
         
+        if limit is None:
+            return messages[offset:]
         return messages[offset:offset + limit]
     
     def create_thread(self, meeting_id: str, metadata: Optional[Dict[str, Any]] = None) -> MessageThread:
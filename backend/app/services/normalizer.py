@@ -3,6 +3,7 @@
 """
 
 import re
+import time
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
@@ -14,6 +15,7 @@ from app.models import (
     TaskPriority,
     TaskStatus
 )
+from app.observability.metrics import metrics_registry
 
 class ActionItemCandidate(BaseModel):
     """Кандидат в задачи, извлеченный из текста"""
@@ -63,6 +65,7 @@ class ActionItemNormalizer:
 
     def extract_candidates(self, text: str) -> List[ActionItemCandidate]:
         """Извлекает кандидатов в задачи из текста"""
+        started = time.perf_counter()
         candidates = []
         
         # Разбиваем текст на предложения (упрощенно)
@@ -98,6 +101,9 @@ class ActionItemNormalizer:
                     )
                     candidates.append(candidate)
         
+        metrics_registry.histogram("normalizer_extract_seconds").observe(time.perf_counter() - started)
+        metrics_registry.counter("normalizer_chars_total").inc(len(text))
+        metrics_registry.counter("normalizer_candidates_total").inc(len(candidates))
         return candidates
 
     def _detect_priority(self, text: str) -> TaskPriority:
@@ -189,6 +195,7 @@ class ActionItemNormalizer:
             
             tasks.append(task)
         
+        metrics_registry.counter("normalizer_tasks_total").inc(len(tasks))
         return tasks
 
     def _normalize_title(self, text: str) -> str:
@@ -72,6 +72,12 @@ class ParticipantService:
                             meeting_id: str,
                             participants: List[Participant]) -> SpeakingOrder:
         """Создает порядок выступления участников"""
+        return self.apply_speaking_order(self.build_speaking_order(meeting_id, participants))
+    
+    def build_speaking_order(self,
+                             meeting_id: str,
+                             participants: List[Participant]) -> SpeakingOrder:
+        """Строит порядок выступления без изменения состояния сервиса"""
         
         # Сортируем по ролям: модератор -> эксперты -> хронист -> интегратор
         role_order = {
@@ -89,28 +95,12 @@ class ParticipantService:
         
         order = [p.agent_id for p in sorted_participants]
         
-        speaking_order = SpeakingOrder(
+        return SpeakingOrder(
             meeting_id=meeting_id,
             current_speaker=order[0] if order else None,
             next_speaker=order[1] if len(order) > 1 else None,
             order=order
         )
-        
-        self._speaking_orders[meeting_id] = speaking_order
-        
-        # Обновляем статусы участников
-        if order:
-            self.update_participant(
-                order[0],
-                ParticipantUpdate(status=ParticipantStatus.SPEAKING)
-            )
-            if len(order) > 1:
-                self.update_participant(
-                    order[1],
-                    ParticipantUpdate(status=ParticipantStatus.NEXT)
-                )
-        
-        return speaking_order
     
     def get_speaking_order(self, meeting_id: str) -> Optional[SpeakingOrder]:
         """Получает текущий порядок выступления"""
@@ -121,7 +111,10 @@ class ParticipantService:
         speaking_order = self._speaking_orders.get(meeting_id)
         if not speaking_order or not speaking_order.order:
             return None
-            
+        return self.apply_speaking_order(self.advance_speaking_order(speaking_order))
+    
+    def advance_speaking_order(self, speaking_order: SpeakingOrder) -> SpeakingOrder:
+        """Следующий шаг очереди (новый объект, исходная очередь не меняется)"""
         # Находим индекс текущего спикера
         current_idx = speaking_order.order.index(speaking_order.current_speaker)
         
@@ -129,31 +122,46 @@ class ParticipantService:
         next_idx = (current_idx + 1) % len(speaking_order.order)
         after_next_idx = (next_idx + 1) % len(speaking_order.order)
         
+        return speaking_order.model_copy(update={
+            "current_speaker": speaking_order.order[next_idx],
+            "next_speaker": speaking_order.order[after_next_idx],
+            # Если сделали полный круг, увеличиваем номер раунда
+            "round": speaking_order.round + 1 if next_idx == 0 else speaking_order.round
+        })
+    
+    def apply_speaking_order(self, speaking_order: SpeakingOrder) -> SpeakingOrder:
+        """Делает очередь текущей и обновляет статусы спикеров"""
+        previous = self._speaking_orders.get(speaking_order.meeting_id)
+        self._speaking_orders[speaking_order.meeting_id] = speaking_order
+        
         # Обновляем статусы
+        if previous and previous.current_speaker:
+            self.update_participant(
+                previous.current_speaker,
+                ParticipantUpdate(status=ParticipantStatus.WAITING)
+            )
         if speaking_order.current_speaker:
             self.update_participant(
                 speaking_order.current_speaker,
-                ParticipantUpdate(status=ParticipantStatus.WAITING)
+                ParticipantUpdate(status=ParticipantStatus.SPEAKING)
+            )
+        if speaking_order.next_speaker:
+            self.update_participant(
+                speaking_order.next_speaker,
+                ParticipantUpdate(status=ParticipantStatus.NEXT)
             )
-            
-        speaking_order.current_speaker = speaking_order.order[next_idx]
-        speaking_order.next_speaker = speaking_order.order[after_next_idx]
-        
-        # Если сделали полный круг, увеличиваем номер раунда
-        if next_idx == 0:
-            speaking_order.round += 1
-            
-        # Обновляем статусы новых спикеров
-        self.update_participant(
-            speaking_order.current_speaker,
-            ParticipantUpdate(status=ParticipantStatus.SPEAKING)
-        )
-        self.update_participant(
-            speaking_order.next_speaker,
-            ParticipantUpdate(status=ParticipantStatus.NEXT)
-        )
         
         return speaking_order
+    
+    def restore_speaking_order(self,
+                               speaking_order: SpeakingOrder,
+                               statuses: Optional[Dict[str, str]] = None) -> SpeakingOrder:
+        """Восстанавливает очередь и статусы участников из журнала run"""
+        self._speaking_orders[speaking_order.meeting_id] = speaking_order
+        for agent_id, status in (statuses or {}).items():
+            if agent_id in self._participants:
+                self._participants[agent_id].status = ParticipantStatus(status)
+        return speaking_order
 
 # Глобальный экземпляр сервиса
 participant_service = ParticipantService() 
\ No newline at end of file
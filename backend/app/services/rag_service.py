@@ -0,0 +1,211 @@
+"""
+Поиск по истории прошлых встреч: решения, задачи и сообщения (RAG)
+"""
+
+import hashlib
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.config.settings import get_settings
+from app.llm.embeddings import CachedEmbedder, Embedder, create_embedder
+from app.models.artifacts import ActionItem, DecisionLog
+from app.models.messages import Message
+from app.models.retrieval import RetrievalDocument, RetrievalHit
+from app.observability.metrics import metrics_registry
+from app.storage.vector_index import MetadataFilter, VectorIndex, VectorRecord, create_vector_index
+
+logger = logging.getLogger(__name__)
+
+
+def _artifact_id(kind: str, meeting_id: str, title: str) -> str:
+    """Стабильный ID артефакта без собственного идентификатора"""
+    digest = hashlib.sha1(f"{meeting_id}|{title}".encode("utf-8")).hexdigest()[:16]
+    return f"{kind}:{digest}"
+
+
+def chunk_text(text: str, max_words: int, overlap: int = 0) -> List[str]:
+    """Разбить текст на окна по словам с перекрытием"""
+    words = text.split()
+    if len(words) <= max_words:
+        return [text.strip()] if words else []
+    step = max(1, max_words - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + max_words]))
+        if start + max_words >= len(words):
+            break
+    return chunks
+
+
+class RetrievalService:
+    """
+    Индексация и семантический поиск фрагментов прошлых встреч.
+
+    ID фрагментов детерминированы, поэтому повторная индексация
+    того же источника заменяет запись, а не дублирует ее.
+    """
+
+    def __init__(self,
+                 index: Optional[VectorIndex] = None,
+                 embedder: Optional[Embedder] = None):
+        self.settings = get_settings()
+        self._index = index
+        self._embedder = embedder
+        # meeting_id -> team_id, чтобы сообщения наследовали команду встречи
+        self._meeting_teams: Dict[str, str] = {}
+
+    @property
+    def index(self) -> VectorIndex:
+        if self._index is None:
+            self._index = create_vector_index()
+        return self._index
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = CachedEmbedder(create_embedder())
+        return self._embedder
+
+    def register_meeting(self, meeting_id: str, team_id: Optional[str]):
+        """Запомнить команду встречи для фильтрации по team_id"""
+        if team_id:
+            self._meeting_teams[meeting_id] = team_id
+
+    async def index_documents(self, documents: List[RetrievalDocument]) -> int:
+        """Проиндексировать пачку фрагментов, вернуть число записей"""
+        documents = [document for document in documents if document.text.strip()]
+        if not documents:
+            return 0
+
+        started = time.perf_counter()
+        vectors = await self.embedder.embed([document.text for document in documents])
+        records = []
+        for document, vector in zip(documents, vectors):
+            team_id = document.team_id or self._meeting_teams.get(document.meeting_id)
+            metadata = {
+                **document.metadata,
+                "kind": document.kind,
+                "meeting_id": document.meeting_id,
+                "ts": document.created_at.timestamp(),
+            }
+            if team_id:
+                metadata["team_id"] = team_id
+            records.append(VectorRecord(id=document.id, vector=vector, document=document.text, metadata=metadata))
+
+        await self.index.upsert(records)
+        metrics_registry.counter("retrieval_indexed_total", backend=self.index.name).inc(len(records))
+        metrics_registry.histogram("retrieval_index_seconds", backend=self.index.name).observe(
+            time.perf_counter() - started
+        )
+        return len(records)
+
+    def message_documents(self, message: Message, team_id: Optional[str] = None) -> List[RetrievalDocument]:
+        """Фрагменты сообщения с ID вида message:<id>:<номер фрагмента>"""
+        chunks = chunk_text(
+            message.content, self.settings.RETRIEVAL_CHUNK_WORDS, self.settings.RETRIEVAL_CHUNK_OVERLAP
+        )
+        return [
+            RetrievalDocument(
+                id=f"message:{message.id}:{n}",
+                text=chunk,
+                kind=message.type.value,
+                meeting_id=message.meeting_id,
+                team_id=team_id,
+                created_at=message.created_at,
+                metadata={"agent_id": message.agent_id, "run_id": message.run_id, "message_id": message.id}
+            )
+            for n, chunk in enumerate(chunks)
+        ]
+
+    async def index_messages(self, messages: List[Message], team_id: Optional[str] = None) -> int:
+        documents: List[RetrievalDocument] = []
+        for message in messages:
+            documents.extend(self.message_documents(message, team_id))
+        return await self.index_documents(documents)
+
+    async def index_message(self, message: Message, team_id: Optional[str] = None) -> int:
+        return await self.index_messages([message], team_id)
+
+    async def index_decision(self, decision: DecisionLog, team_id: Optional[str] = None) -> int:
+        text = f"{decision.title}. {decision.decision}. Обоснование: {decision.rationale}"
+        return await self.index_documents([RetrievalDocument(
+            id=_artifact_id("decision", decision.meeting_id, decision.title),
+            text=text,
+            kind="decision",
+            meeting_id=decision.meeting_id,
+            team_id=team_id,
+            created_at=decision.date,
+            metadata={"title": decision.title}
+        )])
+
+    async def index_action_item(self, item: ActionItem, team_id: Optional[str] = None) -> int:
+        return await self.index_documents([RetrievalDocument(
+            id=_artifact_id("task", item.meeting_id, item.title),
+            text=f"{item.title}. {item.description}",
+            kind="task",
+            meeting_id=item.meeting_id,
+            team_id=team_id,
+            metadata={"title": item.title, "assignee": item.assignee, "priority": item.priority.value}
+        )])
+
+    async def search(self,
+                     query: str,
+                     k: Optional[int] = None,
+                     meeting_id: Optional[str] = None,
+                     team_id: Optional[str] = None,
+                     date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None,
+                     kinds: Optional[List[str]] = None) -> List[RetrievalHit]:
+        """Top-k фрагментов, ближайших к запросу, с фильтрами по метаданным"""
+        started = time.perf_counter()
+        where = MetadataFilter(
+            ts_from=date_from.timestamp() if date_from else None,
+            ts_to=date_to.timestamp() if date_to else None
+        )
+        if meeting_id:
+            where.equals["meeting_id"] = meeting_id
+        if team_id:
+            where.equals["team_id"] = team_id
+        if kinds:
+            where.one_of["kind"] = list(kinds)
+
+        [vector] = await self.embedder.embed([query])
+        hits = await self.index.query(vector, k or self.settings.RETRIEVAL_TOP_K, where)
+
+        metrics_registry.histogram("retrieval_query_seconds", backend=self.index.name).observe(
+            time.perf_counter() - started
+        )
+        return [self._to_hit(hit.id, hit.score, hit.document, hit.metadata) for hit in hits]
+
+    @staticmethod
+    def _to_hit(record_id: str, score: float, text: str, metadata: Dict) -> RetrievalHit:
+        extra = {key: value for key, value in metadata.items() if key not in ("kind", "meeting_id", "team_id", "ts")}
+        ts = metadata.get("ts")
+        return RetrievalHit(
+            id=record_id,
+            score=score,
+            text=text,
+            kind=metadata.get("kind", ""),
+            meeting_id=metadata.get("meeting_id", ""),
+            team_id=metadata.get("team_id"),
+            created_at=datetime.fromtimestamp(ts) if ts is not None else None,
+            metadata=extra
+        )
+
+    async def get_stats(self) -> Dict[str, object]:
+        stats: Dict[str, object] = {"backend": self.index.name, "documents": await self.index.count()}
+        if isinstance(self.embedder, CachedEmbedder):
+            stats["embeddings"] = self.embedder.get_stats()
+        return stats
+
+    async def close(self):
+        if self._index is not None:
+            await self._index.close()
+        if self._embedder is not None:
+            await self._embedder.close()
+
+
+# Глобальный экземпляр сервиса поиска
+rag_service = RetrievalService()
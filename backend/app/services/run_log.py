@@ -0,0 +1,496 @@
+"""
+Журнал событий run: event sourcing состояния консилиума
+"""
+
+import asyncio
+import logging
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.models.participants import SpeakingOrder
+from app.models.runs import RunCheckpoint, RunEvent, RunEventType, RunState, RunStatus
+from app.observability.metrics import metrics_registry
+from app.storage.run_state import RunStateStore, create_run_state_store
+
+logger = logging.getLogger(__name__)
+
+RECOVERY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Статусы вызова инструмента, после которых вызов попадает в журнал
+_FINAL_TOOL_STATUSES = ("completed", "failed", "rejected")
+
+# Попыток записи очереди выступлений при конфликте версий
+SPEAKING_ORDER_ATTEMPTS = 5
+
+# Попыток дозаписи в журнал, который одновременно дописывает другая реплика
+APPEND_ATTEMPTS = 5
+
+_STATUS_EVENTS = {
+    RunEventType.RUN_STARTED,
+    RunEventType.RUN_PAUSED,
+    RunEventType.RUN_RESUMED,
+    RunEventType.RUN_STOPPED,
+    RunEventType.RUN_COMPLETED,
+}
+
+
+class SpeakingOrderConflict(Exception):
+    """Очередь выступлений одновременно меняют другие реплики"""
+
+
+class RunLog:
+    """
+    Append-only журнал событий run с периодическими снимками.
+
+    Живое состояние исполняемых run держится в памяти и обновляется тем же
+    RunState.apply, что и при восстановлении. Каждые RUN_SNAPSHOT_INTERVAL
+    событий (и при паузе или завершении run) пишется снимок, поэтому
+    восстановление - это загрузка снимка и повтор только хвоста журнала.
+    Приостановленный run в памяти процесса не держится: его продолжает
+    любой воркер через resume().
+
+    Исполняемый run арендован процессом (RUN_LEASE_TTL, продление фоновой
+    задачей): при старте реплика восстанавливает только run без живой
+    аренды, поэтому масштабирование не дублирует run других реплик.
+    """
+
+    def __init__(self, store: Optional[RunStateStore] = None, owner: Optional[str] = None):
+        self.settings = get_settings()
+        self._store = store
+        self.owner = owner or self.settings.RUN_OWNER_ID or socket.gethostname()
+        self._lease_task: Optional[asyncio.Task] = None
+        self._states: Dict[str, RunState] = {}
+        self._meeting_runs: Dict[str, str] = {}
+        self._since_snapshot: Dict[str, int] = {}
+        self._last_recovery: Optional[Dict[str, Any]] = None
+
+    @property
+    def store(self) -> RunStateStore:
+        if self._store is None:
+            self._store = create_run_state_store()
+        return self._store
+
+    def attach(self, broker):
+        """Подписаться на события брокера, которые меняют состояние run"""
+        broker.subscribe("tool_execution", self._on_tool_execution)
+        broker.subscribe("artifact_created", self._on_artifact_created)
+
+    def detach(self, broker):
+        broker.unsubscribe("tool_execution", self._on_tool_execution)
+        broker.unsubscribe("artifact_created", self._on_artifact_created)
+
+    async def start_run(self,
+                        run_id: str,
+                        meeting_id: str,
+                        topic: Optional[str] = None,
+                        team_id: Optional[str] = None) -> RunState:
+        """Открыть журнал нового run"""
+        state = RunState(run_id=run_id, meeting_id=meeting_id, topic=topic, team_id=team_id)
+        await self._claim(run_id)
+        self._track(state)
+        await self.record(
+            run_id, RunEventType.RUN_STARTED, {"meeting_id": meeting_id, "topic": topic, "team_id": team_id}
+        )
+        return state
+
+    async def record(self,
+                     run_id: str,
+                     event_type: RunEventType,
+                     data: Optional[Dict[str, Any]] = None) -> Optional[RunEvent]:
+        """
+        Дописать событие в журнал и применить к живому состоянию.
+
+        seq назначается синхронно, поэтому порядок событий в журнале совпадает
+        с порядком вызовов. Ошибка хранилища не прерывает run, а только логируется.
+        """
+        state = self._states.get(run_id)
+        if state is None:
+            logger.warning(f"Событие {event_type.value} для неизвестного run {run_id} пропущено")
+            return None
+
+        event = RunEvent(run_id=run_id, seq=state.last_seq + 1, type=event_type, data=data or {})
+        state.apply(event)
+        metrics_registry.counter("run_events_total", type=event_type.value).inc()
+
+        since_snapshot = self._since_snapshot.get(run_id, 0) + 1
+        released = state.status != RunStatus.RUNNING
+        snapshot = released or since_snapshot >= self.settings.RUN_SNAPSHOT_INTERVAL
+        index = (state.meeting_id, state.status.value) if event_type in _STATUS_EVENTS else None
+        if released:
+            self._forget(state)
+
+        try:
+            # Событие, статус и снимок - одна запись в хранилище (один round trip для Redis)
+            started = time.perf_counter()
+            await self.store.write([event], index=index, snapshot=state if snapshot else None)
+            if snapshot:
+                metrics_registry.histogram(
+                    "run_snapshot_seconds", buckets=RECOVERY_BUCKETS, backend=self.store.name
+                ).observe(time.perf_counter() - started)
+            if run_id in self._states:
+                self._since_snapshot[run_id] = 0 if snapshot else since_snapshot
+        except ValueError:
+            # seq занят: в журнал писала другая реплика (смена очереди выступлений).
+            # Догоняем журнал и пишем событие следующим seq
+            appended = await self._append_shared(run_id, event_type, data)
+            if appended is None:
+                return None
+            state, event = appended
+            if run_id in self._states and state.status == RunStatus.RUNNING:
+                self._states[run_id] = state
+            elif run_id in self._states:
+                self._forget(state)
+        except Exception as e:
+            metrics_registry.counter("run_log_errors_total", backend=self.store.name).inc()
+            logger.error(f"Не удалось записать событие {event_type.value} run {run_id}: {e}")
+        if run_id not in self._states:
+            await self._release(run_id)
+        return event
+
+    async def record_for_meeting(self,
+                                 meeting_id: str,
+                                 event_type: RunEventType,
+                                 data: Optional[Dict[str, Any]] = None) -> Optional[RunEvent]:
+        """
+        Записать событие в активный run встречи (если он есть).
+
+        Run другой реплики дописывается прямо в общий журнал: иначе смена
+        очереди выступлений на этой реплике не пережила бы восстановление.
+        """
+        run_id = self._meeting_runs.get(meeting_id)
+        if run_id is not None:
+            return await self.record(run_id, event_type, data)
+        run_id = await self.store.run_for_meeting(meeting_id)
+        if run_id is None:
+            return None
+        appended = await self._append_shared(run_id, event_type, data)
+        return appended[1] if appended else None
+
+    async def _append_shared(self,
+                             run_id: str,
+                             event_type: RunEventType,
+                             data: Optional[Dict[str, Any]] = None) -> Optional[Tuple[RunState, RunEvent]]:
+        """
+        Дописать событие в активный run по состоянию из хранилища.
+
+        seq берется из журнала; если его заняла другая реплика, журнал
+        перечитывается и запись повторяется.
+        """
+        for _ in range(APPEND_ATTEMPTS):
+            state, _, _ = await self._rebuild(run_id)
+            if state is None or not state.is_active:
+                return None
+            event = RunEvent(run_id=run_id, seq=state.last_seq + 1, type=event_type, data=data or {})
+            state.apply(event)
+            index = (state.meeting_id, state.status.value) if event_type in _STATUS_EVENTS else None
+            snapshot = state if state.status != RunStatus.RUNNING else None
+            try:
+                await self.store.write([event], index=index, snapshot=snapshot)
+            except ValueError:
+                metrics_registry.counter("run_log_append_conflicts_total", backend=self.store.name).inc()
+                continue
+            metrics_registry.counter("run_events_total", type=event_type.value).inc()
+            return state, event
+        logger.error(f"Событие {event_type.value} run {run_id} не записано: журнал занят другими репликами")
+        return None
+
+    async def snapshot(self, run_id: str):
+        """Сохранить снимок текущего состояния run"""
+        state = self._states.get(run_id)
+        if state is None:
+            return
+        started = time.perf_counter()
+        await self.store.save_snapshot(state)
+        self._since_snapshot[run_id] = 0
+        metrics_registry.histogram(
+            "run_snapshot_seconds", buckets=RECOVERY_BUCKETS, backend=self.store.name
+        ).observe(time.perf_counter() - started)
+
+    async def _rebuild(self, run_id: str) -> Tuple[Optional[RunState], int, int]:
+        """Снимок + хвост журнала: (состояние, seq снимка, число повторенных событий)"""
+        state = await self.store.load_snapshot(run_id)
+        snapshot_seq = state.last_seq if state else 0
+        events = await self.store.read_events(run_id, after_seq=snapshot_seq)
+
+        if state is None:
+            if not events:
+                return None, 0, 0
+            state = RunState(run_id=run_id, meeting_id=events[0].data["meeting_id"])
+        for event in events:
+            state.apply(event)
+        return state, snapshot_seq, len(events)
+
+    async def recover(self, run_id: str) -> Optional[RunState]:
+        """Восстановить состояние run и продолжить его вести в этом процессе"""
+        started = time.perf_counter()
+        state, snapshot_seq, replayed = await self._rebuild(run_id)
+        if state is None:
+            return None
+
+        elapsed = time.perf_counter() - started
+        metrics_registry.histogram(
+            "run_recovery_seconds", buckets=RECOVERY_BUCKETS, backend=self.store.name
+        ).observe(elapsed)
+        metrics_registry.counter("run_recovery_events_total", backend=self.store.name).inc(replayed)
+        self._last_recovery = {
+            "run_id": run_id,
+            "snapshot_seq": snapshot_seq,
+            "replayed_events": replayed,
+            "seconds": round(elapsed, 6)
+        }
+        logger.info(
+            f"Run {run_id} восстановлен: снимок на seq={snapshot_seq}, "
+            f"повторено {replayed} событий за {elapsed * 1000:.1f}мс"
+        )
+
+        if state.status == RunStatus.RUNNING:
+            self._track(state)
+            self._since_snapshot[run_id] = replayed
+        return state
+
+    async def load_for_meeting(self, meeting_id: str) -> Optional[RunState]:
+        """
+        Состояние последнего run встречи для чтения.
+
+        Run, который ведет этот процесс, берется из памяти; run другой
+        реплики собирается из хранилища (снимок + хвост) без захвата.
+        """
+        state = self.active_run(meeting_id)
+        if state is not None:
+            return state
+        run_id = await self.store.run_for_meeting(meeting_id)
+        if run_id is None:
+            return None
+        state, _, _ = await self._rebuild(run_id)
+        return state
+
+    async def get_speaking_order(self, meeting_id: str) -> Optional[SpeakingOrder]:
+        stored = await self.store.load_speaking_order(meeting_id)
+        return stored[0] if stored else None
+
+    async def update_speaking_order(self,
+                                    meeting_id: str,
+                                    change: Callable[[Optional[SpeakingOrder]], Optional[SpeakingOrder]]
+                                    ) -> Optional[SpeakingOrder]:
+        """
+        Изменить общую очередь выступлений с оптимистичной блокировкой.
+
+        change получает текущую очередь из хранилища и возвращает новую
+        (без побочных эффектов: при конфликте версий вызывается повторно).
+        """
+        for _ in range(SPEAKING_ORDER_ATTEMPTS):
+            stored = await self.store.load_speaking_order(meeting_id)
+            current, version = stored if stored else (None, 0)
+            order = change(current)
+            if order is None:
+                return None
+            if await self.store.save_speaking_order(order, version):
+                if current is None or current.order != order.order:
+                    data = order.model_dump(exclude={"meeting_id"})
+                else:
+                    data = order.model_dump(include={"current_speaker", "next_speaker", "round"})
+                await self.record_for_meeting(meeting_id, RunEventType.SPEAKER_CHANGED, data)
+                return order
+            metrics_registry.counter("speaking_order_conflicts_total", backend=self.store.name).inc()
+        raise SpeakingOrderConflict(
+            f"Очередь выступлений встречи {meeting_id} изменена другой репликой {SPEAKING_ORDER_ATTEMPTS} раз подряд"
+        )
+
+    async def recover_active(self) -> List[RunState]:
+        """
+        Восстановить исполнявшиеся run (при старте инстанса); run на паузе остаются в хранилище.
+
+        Run, чью аренду держит живая реплика, пропускается: забираются только
+        run упавших реплик (аренда истекла) и свои после рестарта.
+        """
+        runs = await self.store.list_runs([RunStatus.RUNNING.value])
+        states = []
+        for run in runs:
+            if not await self.store.claim_run(run["run_id"], self.owner, self.settings.RUN_LEASE_TTL):
+                metrics_registry.counter("run_recovery_skipped_total", backend=self.store.name).inc()
+                logger.info(f"Run {run['run_id']} ведет другая реплика, восстановление пропущено")
+                continue
+            state = await self.recover(run["run_id"])
+            if state is not None and state.status == RunStatus.RUNNING:
+                states.append(state)
+            else:
+                await self._release(run["run_id"])
+        return states
+
+    async def resume(self, run_id: str) -> Optional[Tuple[RunState, Optional[RunCheckpoint]]]:
+        """
+        Продолжить приостановленный run в этом процессе.
+
+        Возвращает состояние и контрольную точку паузы. RUN_RESUMED пишется
+        с seq, следующим за паузой: если run одновременно забирает другой
+        воркер, хранилище отклонит повторный seq, и run останется за тем,
+        кто записал первым.
+        """
+        return await self._claim_paused(run_id, RunEventType.RUN_RESUMED)
+
+    async def stop_paused(self, run_id: str) -> Optional[RunState]:
+        """Остановить приостановленный run, который не ведет ни один воркер"""
+        claimed = await self._claim_paused(run_id, RunEventType.RUN_STOPPED)
+        return claimed[0] if claimed else None
+
+    async def _claim_paused(self,
+                            run_id: str,
+                            event_type: RunEventType) -> Optional[Tuple[RunState, Optional[RunCheckpoint]]]:
+        state, _, _ = await self._rebuild(run_id)
+        if state is None or state.status != RunStatus.PAUSED:
+            return None
+
+        checkpoint = state.checkpoint
+        event = RunEvent(run_id=run_id, seq=state.last_seq + 1, type=event_type)
+        state.apply(event)
+        running = state.status == RunStatus.RUNNING
+        try:
+            await self.store.write(
+                [event], index=(state.meeting_id, state.status.value), snapshot=None if running else state
+            )
+        except ValueError:
+            logger.info(f"Run {run_id} уже забран другим воркером")
+            return None
+
+        metrics_registry.counter("run_events_total", type=event_type.value).inc()
+        if running:
+            await self._claim(run_id)
+            self._track(state)
+            self._since_snapshot[run_id] = 1
+        return state, checkpoint
+
+    async def drop(self, run_id: str):
+        """Перестать вести run в этом процессе и снять аренду (в хранилище он остается как есть)"""
+        state = self._states.get(run_id)
+        if state is not None:
+            self._forget(state)
+        await self._release(run_id)
+
+    def get_state(self, run_id: str) -> Optional[RunState]:
+        return self._states.get(run_id)
+
+    def active_run(self, meeting_id: str) -> Optional[RunState]:
+        run_id = self._meeting_runs.get(meeting_id)
+        return self._states.get(run_id) if run_id else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.store.name,
+            "active_runs": len(self._states),
+            "snapshot_interval": self.settings.RUN_SNAPSHOT_INTERVAL,
+            "last_recovery": self._last_recovery
+        }
+
+    async def start(self):
+        """Запустить продление аренды исполняемых run"""
+        if self._lease_task and not self._lease_task.done():
+            return
+        self._lease_task = asyncio.create_task(self._renew_loop())
+
+    async def stop(self):
+        if self._lease_task:
+            self._lease_task.cancel()
+            try:
+                await self._lease_task
+            except asyncio.CancelledError:
+                pass
+            self._lease_task = None
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(self.settings.RUN_LEASE_TTL / 3)
+            try:
+                await self.renew_leases()
+            except Exception as e:
+                logger.error(f"Ошибка продления аренды run: {e}")
+
+    async def renew_leases(self):
+        """
+        Продлить аренду всех run этого процесса.
+
+        Run с перехваченной арендой (процесс не продлевал ее дольше TTL, и run
+        забрала другая реплика) больше не ведется здесь: его журнал пишет новый владелец.
+        """
+        for run_id in list(self._states):
+            if await self.store.claim_run(run_id, self.owner, self.settings.RUN_LEASE_TTL):
+                continue
+            metrics_registry.counter("run_lease_lost_total", backend=self.store.name).inc()
+            logger.error(f"Аренда run {run_id} перехвачена другой репликой, run больше не ведется здесь")
+            state = self._states.get(run_id)
+            if state is not None:
+                self._forget(state)
+
+    async def close(self):
+        """
+        Снимки активных run перед остановкой (рестарт повторит минимум событий).
+
+        Аренда снимается: run остановленного процесса сразу может подхватить
+        другая реплика.
+        """
+        await self.stop()
+        for run_id in list(self._states):
+            try:
+                await self.snapshot(run_id)
+                await self._release(run_id)
+            except Exception as e:
+                logger.error(f"Не удалось сохранить снимок run {run_id}: {e}")
+        await self.store.close()
+
+    async def _claim(self, run_id: str) -> bool:
+        try:
+            return await self.store.claim_run(run_id, self.owner, self.settings.RUN_LEASE_TTL)
+        except Exception as e:
+            metrics_registry.counter("run_log_errors_total", backend=self.store.name).inc()
+            logger.error(f"Не удалось взять аренду run {run_id}: {e}")
+            return False
+
+    async def _release(self, run_id: str):
+        try:
+            await self.store.release_run(run_id, self.owner)
+        except Exception as e:
+            logger.error(f"Не удалось снять аренду run {run_id}: {e}")
+
+    def _track(self, state: RunState):
+        self._states[state.run_id] = state
+        self._meeting_runs[state.meeting_id] = state.run_id
+
+    def _forget(self, state: RunState):
+        self._states.pop(state.run_id, None)
+        self._since_snapshot.pop(state.run_id, None)
+        if self._meeting_runs.get(state.meeting_id) == state.run_id:
+            del self._meeting_runs[state.meeting_id]
+
+    def _run_for(self, event: Dict[str, Any]) -> Optional[str]:
+        run_id = event.get("run_id")
+        if run_id in self._states:
+            return run_id
+        return self._meeting_runs.get(event.get("meeting_id"))
+
+    async def _on_tool_execution(self, event: Dict[str, Any]):
+        if event.get("status") not in _FINAL_TOOL_STATUSES:
+            return
+        run_id = self._run_for(event)
+        if run_id is None:
+            return
+        await self.record(run_id, RunEventType.TOOL_CALL, {
+            "tool_id": event.get("tool_id"),
+            "agent_id": event.get("agent_id"),
+            "status": event.get("status")
+        })
+
+    async def _on_artifact_created(self, event: Dict[str, Any]):
+        if event.get("artifact_type") != "decision_log":
+            return
+        run_id = self._run_for(event)
+        if run_id is None:
+            return
+        await self.record(run_id, RunEventType.DECISION, {
+            "summary": event.get("summary"),
+            "external_ref": event.get("external_ref")
+        })
+
+
+# Глобальный экземпляр журнала run
+run_log = RunLog()
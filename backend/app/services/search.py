@@ -0,0 +1,169 @@
+"""
+Полнотекстовый поиск по сообщениям встреч
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.config.settings import get_settings
+from app.models.messages import Message, MessageRole, MessageType
+from app.models.search import MessageSearchHit, MessageSearchPage
+from app.observability.metrics import metrics_registry
+from app.services.messages import MessageService, message_service
+from app.storage.text_search import SearchDocument, SearchFilter, TextSearchIndex, create_text_search_index
+
+logger = logging.getLogger(__name__)
+
+
+def to_search_document(message: Message) -> SearchDocument:
+    return SearchDocument(
+        id=message.id,
+        text=message.content,
+        meeting_id=message.meeting_id,
+        agent_id=message.agent_id,
+        role=message.role.value,
+        type=message.type.value,
+        ts=message.created_at.timestamp()
+    )
+
+
+class MessageSearchService:
+    """
+    Инкрементально поддерживаемый полнотекстовый индекс сообщений.
+
+    Новые сообщения буферизуются слушателем MessageService и пишутся
+    в индекс пачками в фоне; перед запросом буфер досылается, поэтому
+    поиск видит все уже созданные сообщения.
+    """
+
+    def __init__(self,
+                 index: Optional[TextSearchIndex] = None,
+                 messages: Optional[MessageService] = None):
+        self.settings = get_settings()
+        self._index = index
+        self.messages = messages or message_service
+        self._pending: "OrderedDict[str, Message]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def index(self) -> TextSearchIndex:
+        if self._index is None:
+            self._index = create_text_search_index()
+        return self._index
+
+    def submit(self, message: Message):
+        """Слушатель MessageService"""
+        self._pending[message.id] = message
+        self._wakeup.set()
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self.messages.subscribe(self.submit)
+        self._worker = asyncio.create_task(self._run())
+        logger.info(f"Запущен полнотекстовый индекс сообщений ({self.index.name})")
+
+    async def stop(self):
+        self.messages.unsubscribe(self.submit)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Не удалось дописать полнотекстовый индекс при остановке: {e}")
+        await self.index.close()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Короткая пауза собирает всплеск сообщений в одну транзакцию
+            await asyncio.sleep(self.settings.SEARCH_FLUSH_INTERVAL_MS / 1000)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка обновления полнотекстового индекса: {e}")
+
+    async def flush(self):
+        """Записать буфер в индекс"""
+        async with self._flush_lock:
+            while self._pending:
+                batch: List[Message] = []
+                while self._pending and len(batch) < self.settings.SEARCH_BATCH_SIZE:
+                    batch.append(self._pending.popitem(last=False)[1])
+                try:
+                    await self.index.add([to_search_document(message) for message in batch])
+                except Exception:
+                    # Вернуть пачку в буфер для следующей попытки
+                    for message in reversed(batch):
+                        self._pending[message.id] = message
+                        self._pending.move_to_end(message.id, last=False)
+                    raise
+                metrics_registry.counter("search_indexed_total", backend=self.index.name).inc(len(batch))
+
+    async def reindex(self, meeting_ids: List[str]) -> int:
+        """Переиндексировать встречи из хранилища сообщений"""
+        count = 0
+        for meeting_id in meeting_ids:
+            for message in self.messages.get_messages(meeting_id, limit=None):
+                self._pending[message.id] = message
+                count += 1
+        await self.flush()
+        return count
+
+    async def search(self,
+                     query: str,
+                     meeting_id: Optional[str] = None,
+                     agent_id: Optional[str] = None,
+                     role: Optional[MessageRole] = None,
+                     message_type: Optional[MessageType] = None,
+                     date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None,
+                     limit: int = 20,
+                     offset: int = 0) -> MessageSearchPage:
+        """Поиск сообщений по BM25 с фильтрами"""
+        started = time.perf_counter()
+        await self.flush()
+
+        where = SearchFilter(
+            meeting_id=meeting_id,
+            agent_id=agent_id,
+            role=role.value if role else None,
+            type=message_type.value if message_type else None,
+            ts_from=date_from.timestamp() if date_from else None,
+            ts_to=date_to.timestamp() if date_to else None
+        )
+        total, ranked = await self.index.search(query, where, limit, offset)
+
+        hits = []
+        for message_id, score in ranked:
+            message = self.messages.get_message(message_id)
+            if message is not None:
+                hits.append(MessageSearchHit(message=message, score=score))
+
+        metrics_registry.histogram("search_query_seconds", backend=self.index.name).observe(
+            time.perf_counter() - started
+        )
+        return MessageSearchPage(query=query, total=total, hits=hits)
+
+    async def get_stats(self) -> Dict[str, object]:
+        return {"backend": self.index.name, "documents": await self.index.count(), "pending": len(self._pending)}
+
+    async def ping(self) -> Dict[str, object]:
+        return {**(await self.index.ping()), "pending": len(self._pending)}
+
+
+# Глобальный экземпляр сервиса поиска по сообщениям
+message_search = MessageSearchService()
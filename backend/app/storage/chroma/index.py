@@ -0,0 +1,92 @@
+"""
+Векторный индекс на ChromaDB
+"""
+
+import asyncio
+import logging
+from typing import Any, List, Optional
+
+from app.storage.vector_index import MetadataFilter, VectorHit, VectorIndex, VectorRecord
+
+logger = logging.getLogger(__name__)
+
+
+class ChromaIndex(VectorIndex):
+    """
+    Коллекция ChromaDB с косинусной метрикой.
+
+    Эмбеддинги считаются на стороне приложения (кеш и батчинг),
+    Chroma только хранит векторы и фильтрует по метаданным.
+    Клиент Chroma синхронный, вызовы уходят в пул потоков.
+    """
+
+    name = "chroma"
+
+    def __init__(self, host: str, port: int, collection: str):
+        self.host = host
+        self.port = port
+        self.collection_name = collection
+        self._collection: Optional[Any] = None
+
+    def _get_collection(self):
+        if self._collection is None:
+            import chromadb
+
+            client = chromadb.HttpClient(host=self.host, port=self.port)
+            self._collection = client.get_or_create_collection(
+                self.collection_name,
+                metadata={"hnsw:space": "cosine"}
+            )
+            logger.info(f"Подключена коллекция Chroma {self.collection_name} ({self.host}:{self.port})")
+        return self._collection
+
+    async def upsert(self, records: List[VectorRecord]):
+        if not records:
+            return
+        await asyncio.to_thread(
+            lambda: self._get_collection().upsert(
+                ids=[record.id for record in records],
+                embeddings=[record.vector for record in records],
+                documents=[record.document for record in records],
+                metadatas=[_clean_metadata(record.metadata) for record in records]
+            )
+        )
+
+    async def delete(self, ids: List[str]):
+        if ids:
+            await asyncio.to_thread(lambda: self._get_collection().delete(ids=ids))
+
+    async def query(self,
+                    vector: List[float],
+                    k: int,
+                    where: Optional[MetadataFilter] = None) -> List[VectorHit]:
+        result = await asyncio.to_thread(
+            lambda: self._get_collection().query(
+                query_embeddings=[vector],
+                n_results=k,
+                where=where.to_chroma() if where else None,
+                include=["documents", "metadatas", "distances"]
+            )
+        )
+        return [
+            # cosine distance = 1 - similarity
+            VectorHit(id=record_id, score=1.0 - distance, document=document, metadata=metadata or {})
+            for record_id, document, metadata, distance in zip(
+                result["ids"][0],
+                result["documents"][0],
+                result["metadatas"][0],
+                result["distances"][0]
+            )
+        ]
+
+    async def count(self) -> int:
+        return await asyncio.to_thread(lambda: self._get_collection().count())
+
+
+def _clean_metadata(metadata: dict) -> dict:
+    """Chroma принимает только str/int/float/bool и не принимает None"""
+    return {
+        key: value
+        for key, value in metadata.items()
+        if isinstance(value, (str, int, float, bool))
+    }
@@ -0,0 +1,643 @@
+"""
+Хранилище журнала событий и снимков состояния run
+"""
+
+import asyncio
+import bisect
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.models.participants import SpeakingOrder
+from app.models.runs import RunEvent, RunState, RunStatus
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import ResponseError, WatchError
+except ImportError:  # pragma: no cover - Redis-бэкенд недоступен
+    aioredis = None
+
+    class ResponseError(Exception):
+        pass
+
+    class WatchError(Exception):
+        pass
+
+
+class RunStateStore(ABC):
+    """
+    Журнал run (append-only), его компактные снимки и разделяемая очередь выступлений.
+
+    Восстановление run = последний снимок + события журнала после него.
+    Очередь выступлений версионируется: запись проходит только при
+    совпадении версии (оптимистичная блокировка между репликами API).
+    Исполняемый run арендован одной репликой: чужой run с живой арендой
+    при старте не восстанавливается.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def append(self, events: List[RunEvent]):
+        """Дописать события в журнал (seq уникален в пределах run)"""
+
+    @abstractmethod
+    async def read_events(self, run_id: str, after_seq: int = 0) -> List[RunEvent]:
+        """События run с seq > after_seq в порядке seq"""
+
+    @abstractmethod
+    async def save_snapshot(self, state: RunState):
+        """Сохранить снимок (заменяет предыдущий)"""
+
+    @abstractmethod
+    async def load_snapshot(self, run_id: str) -> Optional[RunState]:
+        """Последний снимок run"""
+
+    @abstractmethod
+    async def index_run(self, run_id: str, meeting_id: str, status: str):
+        """Обновить статус run в индексе (для поиска активных run при старте)"""
+
+    @abstractmethod
+    async def list_runs(self, statuses: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        """Run из индекса: [{"run_id", "meeting_id", "status"}]"""
+
+    @abstractmethod
+    async def run_for_meeting(self, meeting_id: str) -> Optional[str]:
+        """Последний запущенный run встречи"""
+
+    @abstractmethod
+    async def load_speaking_order(self, meeting_id: str) -> Optional[Tuple[SpeakingOrder, int]]:
+        """Очередь выступлений встречи и ее версия"""
+
+    @abstractmethod
+    async def save_speaking_order(self, order: SpeakingOrder, expected_version: int) -> bool:
+        """Записать очередь, если версия не изменилась (0 - очереди еще нет)"""
+
+    @abstractmethod
+    async def claim_run(self, run_id: str, owner: str, ttl: float) -> bool:
+        """Взять или продлить аренду run на ttl секунд (нельзя, пока ее держит другой владелец)"""
+
+    @abstractmethod
+    async def release_run(self, run_id: str, owner: str):
+        """Снять аренду run, если ее держит owner"""
+
+    async def write(self,
+                    events: List[RunEvent],
+                    index: Optional[Tuple[str, str]] = None,
+                    snapshot: Optional[RunState] = None):
+        """
+        События, статус run в индексе (meeting_id, status) и снимок одной записью.
+
+        Бэкенды переопределяют метод, чтобы уложиться в одну транзакцию
+        или один round trip.
+        """
+        if events:
+            await self.append(events)
+        if index is not None:
+            await self.index_run(_write_run_id(events, snapshot), *index)
+        if snapshot is not None:
+            await self.save_snapshot(snapshot)
+
+    async def ping(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    async def close(self):
+        pass
+
+
+def _write_run_id(events: List[RunEvent], snapshot: Optional[RunState]) -> Optional[str]:
+    if events:
+        return events[0].run_id
+    return snapshot.run_id if snapshot is not None else None
+
+
+class MemoryRunStateStore(RunStateStore):
+    """Хранилище в памяти процесса (тесты и локальная разработка)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._events: Dict[str, List[RunEvent]] = {}
+        self._snapshots: Dict[str, str] = {}
+        self._runs: Dict[str, Dict[str, str]] = {}
+        self._meeting_runs: Dict[str, str] = {}
+        self._speaking_orders: Dict[str, Tuple[str, int]] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    async def append(self, events: List[RunEvent]):
+        for event in events:
+            log = self._events.setdefault(event.run_id, [])
+            if log and log[-1].seq >= event.seq:
+                raise ValueError(f"Событие {event.run_id}#{event.seq} уже есть в журнале")
+            log.append(event)
+
+    async def read_events(self, run_id: str, after_seq: int = 0) -> List[RunEvent]:
+        log = self._events.get(run_id, [])
+        # seq строго возрастают, хвост находится бинарным поиском
+        return log[bisect.bisect_right(log, after_seq, key=lambda event: event.seq):]
+
+    async def save_snapshot(self, state: RunState):
+        # Копия через JSON, чтобы снимок не менялся вместе с живым состоянием
+        self._snapshots[state.run_id] = state.model_dump_json()
+
+    async def load_snapshot(self, run_id: str) -> Optional[RunState]:
+        raw = self._snapshots.get(run_id)
+        return RunState.model_validate_json(raw) if raw else None
+
+    async def index_run(self, run_id: str, meeting_id: str, status: str):
+        self._runs[run_id] = {"run_id": run_id, "meeting_id": meeting_id, "status": status}
+        if status == RunStatus.RUNNING.value:
+            self._meeting_runs[meeting_id] = run_id
+
+    async def list_runs(self, statuses: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        return [dict(run) for run in self._runs.values() if statuses is None or run["status"] in statuses]
+
+    async def run_for_meeting(self, meeting_id: str) -> Optional[str]:
+        return self._meeting_runs.get(meeting_id)
+
+    async def load_speaking_order(self, meeting_id: str) -> Optional[Tuple[SpeakingOrder, int]]:
+        stored = self._speaking_orders.get(meeting_id)
+        if stored is None:
+            return None
+        raw, version = stored
+        return SpeakingOrder.model_validate_json(raw), version
+
+    async def save_speaking_order(self, order: SpeakingOrder, expected_version: int) -> bool:
+        version = self._speaking_orders.get(order.meeting_id, (None, 0))[1]
+        if version != expected_version:
+            return False
+        self._speaking_orders[order.meeting_id] = (order.model_dump_json(), version + 1)
+        return True
+
+    async def claim_run(self, run_id: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        current = self._leases.get(run_id)
+        if current is not None and current[0] != owner and current[1] > now:
+            return False
+        self._leases[run_id] = (owner, now + ttl)
+        return True
+
+    async def release_run(self, run_id: str, owner: str):
+        if self._leases.get(run_id, (None, 0.0))[0] == owner:
+            del self._leases[run_id]
+
+
+_RUN_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS run_events (
+    run_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS run_snapshots (
+    run_id TEXT PRIMARY KEY,
+    last_seq INTEGER NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    meeting_id TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_status ON runs (status);
+CREATE INDEX IF NOT EXISTS idx_runs_meeting ON runs (meeting_id);
+CREATE TABLE IF NOT EXISTS speaking_orders (
+    meeting_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_leases (
+    run_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteRunStateStore(RunStateStore):
+    """Персистентное хранилище на SQLite (один файл на инстанс)"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def open(self):
+        if self._conn is not None:
+            return
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_RUN_STATE_SCHEMA)
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        await self.open()
+        async with self._lock:
+            return await asyncio.to_thread(self._transaction, fn)
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._conn:
+            return fn(self._conn)
+
+    async def write(self,
+                    events: List[RunEvent],
+                    index: Optional[Tuple[str, str]] = None,
+                    snapshot: Optional[RunState] = None):
+        rows = [_event_row(event) for event in events]
+        run_id = _write_run_id(events, snapshot)
+        snapshot_row = (snapshot.run_id, snapshot.last_seq, snapshot.model_dump_json()) if snapshot else None
+
+        def apply(conn: sqlite3.Connection):
+            if rows:
+                _insert_events(conn, rows)
+            if index is not None:
+                _upsert_run(conn, run_id, *index)
+            if snapshot_row is not None:
+                _upsert_snapshot(conn, snapshot_row)
+
+        await self._run(apply)
+
+    async def append(self, events: List[RunEvent]):
+        rows = [_event_row(event) for event in events]
+        await self._run(lambda conn: _insert_events(conn, rows))
+
+    async def read_events(self, run_id: str, after_seq: int = 0) -> List[RunEvent]:
+        def select(conn: sqlite3.Connection):
+            return conn.execute(
+                "SELECT seq, type, ts, data FROM run_events WHERE run_id = ? AND seq > ? ORDER BY seq",
+                (run_id, after_seq)
+            ).fetchall()
+
+        return [
+            RunEvent(run_id=run_id, seq=seq, type=type_, ts=datetime.fromisoformat(ts), data=json.loads(data))
+            for seq, type_, ts, data in await self._run(select)
+        ]
+
+    async def save_snapshot(self, state: RunState):
+        row = (state.run_id, state.last_seq, state.model_dump_json())
+        await self._run(lambda conn: _upsert_snapshot(conn, row))
+
+    async def load_snapshot(self, run_id: str) -> Optional[RunState]:
+        def select(conn: sqlite3.Connection):
+            return conn.execute("SELECT state FROM run_snapshots WHERE run_id = ?", (run_id,)).fetchone()
+
+        row = await self._run(select)
+        return RunState.model_validate_json(row[0]) if row else None
+
+    async def index_run(self, run_id: str, meeting_id: str, status: str):
+        await self._run(lambda conn: _upsert_run(conn, run_id, meeting_id, status))
+
+    async def list_runs(self, statuses: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        def select(conn: sqlite3.Connection):
+            if statuses is None:
+                return conn.execute("SELECT run_id, meeting_id, status FROM runs").fetchall()
+            placeholders = ", ".join("?" for _ in statuses)
+            return conn.execute(
+                f"SELECT run_id, meeting_id, status FROM runs WHERE status IN ({placeholders})", list(statuses)
+            ).fetchall()
+
+        return [
+            {"run_id": run_id, "meeting_id": meeting_id, "status": status}
+            for run_id, meeting_id, status in await self._run(select)
+        ]
+
+    async def run_for_meeting(self, meeting_id: str) -> Optional[str]:
+        def select(conn: sqlite3.Connection):
+            # rowid растет с каждым новым run и не меняется при смене статуса
+            return conn.execute(
+                "SELECT run_id FROM runs WHERE meeting_id = ? ORDER BY rowid DESC LIMIT 1", (meeting_id,)
+            ).fetchone()
+
+        row = await self._run(select)
+        return row[0] if row else None
+
+    async def load_speaking_order(self, meeting_id: str) -> Optional[Tuple[SpeakingOrder, int]]:
+        def select(conn: sqlite3.Connection):
+            return conn.execute(
+                "SELECT data, version FROM speaking_orders WHERE meeting_id = ?", (meeting_id,)
+            ).fetchone()
+
+        row = await self._run(select)
+        return (SpeakingOrder.model_validate_json(row[0]), row[1]) if row else None
+
+    async def save_speaking_order(self, order: SpeakingOrder, expected_version: int) -> bool:
+        data = order.model_dump_json()
+
+        def compare_and_set(conn: sqlite3.Connection) -> bool:
+            if expected_version == 0:
+                cursor = conn.execute(
+                    "INSERT INTO speaking_orders (meeting_id, version, data) VALUES (?, 1, ?) "
+                    "ON CONFLICT (meeting_id) DO NOTHING",
+                    (order.meeting_id, data)
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE speaking_orders SET version = version + 1, data = ? WHERE meeting_id = ? AND version = ?",
+                    (data, order.meeting_id, expected_version)
+                )
+            return cursor.rowcount == 1
+
+        return await self._run(compare_and_set)
+
+    async def claim_run(self, run_id: str, owner: str, ttl: float) -> bool:
+        def claim(conn: sqlite3.Connection) -> bool:
+            now = time.time()
+            cursor = conn.execute(
+                "INSERT INTO run_leases (run_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (run_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE run_leases.owner = excluded.owner OR run_leases.expires_at <= ?",
+                (run_id, owner, now + ttl, now)
+            )
+            return cursor.rowcount == 1
+
+        return await self._run(claim)
+
+    async def release_run(self, run_id: str, owner: str):
+        await self._run(lambda conn: conn.execute(
+            "DELETE FROM run_leases WHERE run_id = ? AND owner = ?", (run_id, owner)
+        ))
+
+
+def _event_row(event: RunEvent) -> tuple:
+    return (
+        event.run_id, event.seq, event.type.value, event.ts.isoformat(),
+        json.dumps(event.model_dump(mode="json")["data"], ensure_ascii=False)
+    )
+
+
+def _insert_events(conn: sqlite3.Connection, rows: List[tuple]):
+    try:
+        conn.executemany("INSERT INTO run_events (run_id, seq, type, ts, data) VALUES (?, ?, ?, ?, ?)", rows)
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"Событие уже есть в журнале: {e}") from e
+
+
+def _upsert_run(conn: sqlite3.Connection, run_id: str, meeting_id: str, status: str):
+    conn.execute(
+        "INSERT INTO runs (run_id, meeting_id, status) VALUES (?, ?, ?) "
+        "ON CONFLICT (run_id) DO UPDATE SET status = excluded.status",
+        (run_id, meeting_id, status)
+    )
+
+
+def _upsert_snapshot(conn: sqlite3.Connection, row: tuple):
+    conn.execute(
+        "INSERT INTO run_snapshots (run_id, last_seq, state) VALUES (?, ?, ?) "
+        "ON CONFLICT (run_id) DO UPDATE SET last_seq = excluded.last_seq, state = excluded.state",
+        row
+    )
+
+
+# Дозапись событий с проверкой seq и запись run - атомарно на сервере.
+# MULTI/EXEC не откатывает очередь при ошибке XADD: статус и снимок проигравшей
+# гонки (два воркера забирают run на паузе) перетерли бы состояние победителя.
+# Скрипт трогает только ключи из KEYS, оба в слоте run (hash tag {run_id}).
+# KEYS[1] - stream событий, KEYS[2] - hash run.
+# ARGV[1] - seq первого события (пусто - без событий), ARGV[2] - события (JSON: [[id, type, ts, data]]),
+# ARGV[3], ARGV[4] - meeting_id и статус (пусто - без смены статуса),
+# ARGV[5], ARGV[6] - снимок и его seq (пусто - без снимка).
+_APPEND_SCRIPT = """
+if ARGV[1] ~= '' then
+    local top = redis.call('XREVRANGE', KEYS[1], '+', '-', 'COUNT', 1)
+    if #top > 0 and tonumber(string.match(top[1][1], '^(%d+)')) >= tonumber(ARGV[1]) then
+        return redis.error_reply('SEQ_CONFLICT ' .. top[1][1])
+    end
+end
+for _, event in ipairs(cjson.decode(ARGV[2])) do
+    redis.call('XADD', KEYS[1], event[1], 'type', event[2], 'ts', event[3], 'data', event[4])
+end
+if ARGV[4] ~= '' then
+    redis.call('HSET', KEYS[2], 'meeting_id', ARGV[3], 'status', ARGV[4])
+end
+if ARGV[5] ~= '' then
+    redis.call('HSET', KEYS[2], 'snapshot', ARGV[5], 'snapshot_seq', ARGV[6])
+end
+return 1
+"""
+
+
+# Продление аренды run только ее владельцем (взять свободную - SET NX PX)
+_RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisRunStateStore(RunStateStore):
+    """
+    Общее хранилище для всех реплик API на Redis.
+
+    Ключи ({run_id} в фигурных скобках - hash tag: ключи run в одном слоте кластера):
+      xio:run:{run_id}:events            - stream событий, ID записи = "{seq}-0"
+      xio:run:{run_id}                   - hash: meeting_id, status, snapshot, snapshot_seq
+      xio:run:{run_id}:owner             - аренда run: владелец, истекает через RUN_LEASE_TTL
+      xio:runs:{status}                  - set run с данным статусом
+      xio:meeting:{meeting_id}:run       - последний run встречи
+      xio:meeting:{meeting_id}:speaking  - hash: data, version (очередь выступлений)
+
+    События, статус и снимок run уходят одним Lua-скриптом: он проверяет seq
+    по последней записи stream и только тогда пишет hash run (без частичных
+    записей при конфликте). Индексы по статусу и встрече лежат в других
+    слотах и обновляются следом, после успешного скрипта; источник правды
+    о статусе - hash run. Очередь выступлений меняется через WATCH
+    (оптимистичная блокировка).
+    """
+
+    name = "redis"
+
+    def __init__(self, url: Optional[str] = None, client: Any = None, prefix: str = "xio"):
+        self.url = url
+        self.prefix = prefix
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            if aioredis is None:
+                raise RuntimeError("Для RUN_STATE_BACKEND=redis нужен пакет redis")
+            self._client = aioredis.from_url(self.url, decode_responses=True)
+        return self._client
+
+    def _run_key(self, run_id: str) -> str:
+        return f"{self.prefix}:run:{{{run_id}}}"
+
+    def _events_key(self, run_id: str) -> str:
+        return f"{self.prefix}:run:{{{run_id}}}:events"
+
+    def _owner_key(self, run_id: str) -> str:
+        return f"{self.prefix}:run:{{{run_id}}}:owner"
+
+    def _status_key(self, status: str) -> str:
+        return f"{self.prefix}:runs:{status}"
+
+    def _meeting_run_key(self, meeting_id: str) -> str:
+        return f"{self.prefix}:meeting:{meeting_id}:run"
+
+    def _speaking_key(self, meeting_id: str) -> str:
+        return f"{self.prefix}:meeting:{meeting_id}:speaking"
+
+    async def write(self,
+                    events: List[RunEvent],
+                    index: Optional[Tuple[str, str]] = None,
+                    snapshot: Optional[RunState] = None):
+        run_id = _write_run_id(events, snapshot)
+        if run_id is None:
+            return
+        meeting_id, status = index or ("", "")
+        try:
+            await self.client.eval(
+                _APPEND_SCRIPT, 2, self._events_key(run_id), self._run_key(run_id),
+                events[0].seq if events else "",
+                json.dumps([
+                    [f"{event.seq}-0", event.type.value, event.ts.isoformat(),
+                     json.dumps(event.model_dump(mode="json")["data"], ensure_ascii=False)]
+                    for event in events
+                ], ensure_ascii=False),
+                meeting_id, status,
+                snapshot.model_dump_json() if snapshot is not None else "",
+                snapshot.last_seq if snapshot is not None else 0
+            )
+        except ResponseError as e:
+            # seq не больше последнего в stream: событие с таким seq уже записано
+            raise ValueError(f"Событие уже есть в журнале: {e}") from e
+        if index is not None:
+            await self._update_index(run_id, meeting_id, status)
+
+    async def _update_index(self, run_id: str, meeting_id: str, status: str):
+        """Индексы по статусу и встрече (ключи в разных слотах, без транзакции)"""
+        async with self.client.pipeline(transaction=False) as pipe:
+            for other in RunStatus:
+                if other.value != status:
+                    pipe.srem(self._status_key(other.value), run_id)
+            pipe.sadd(self._status_key(status), run_id)
+            if status == RunStatus.RUNNING.value:
+                pipe.set(self._meeting_run_key(meeting_id), run_id)
+            await pipe.execute()
+
+    async def append(self, events: List[RunEvent]):
+        await self.write(events)
+
+    async def read_events(self, run_id: str, after_seq: int = 0) -> List[RunEvent]:
+        entries = await self.client.xrange(self._events_key(run_id), min=f"{after_seq + 1}-0", max="+")
+        return [
+            RunEvent(
+                run_id=run_id,
+                seq=int(entry_id.split("-")[0]),
+                type=fields["type"],
+                ts=datetime.fromisoformat(fields["ts"]),
+                data=json.loads(fields["data"])
+            )
+            for entry_id, fields in entries
+        ]
+
+    async def save_snapshot(self, state: RunState):
+        await self.write([], snapshot=state)
+
+    async def load_snapshot(self, run_id: str) -> Optional[RunState]:
+        raw = await self.client.hget(self._run_key(run_id), "snapshot")
+        return RunState.model_validate_json(raw) if raw else None
+
+    async def index_run(self, run_id: str, meeting_id: str, status: str):
+        await self.client.hset(self._run_key(run_id), mapping={"meeting_id": meeting_id, "status": status})
+        await self._update_index(run_id, meeting_id, status)
+
+    async def list_runs(self, statuses: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        statuses = statuses or [status.value for status in RunStatus]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for status in statuses:
+                pipe.smembers(self._status_key(status))
+            members = await pipe.execute()
+        run_ids = sorted(set().union(*members))
+        if not run_ids:
+            return []
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            for run_id in run_ids:
+                pipe.hmget(self._run_key(run_id), ["meeting_id", "status"])
+            rows = await pipe.execute()
+        # Set может отставать от hash run (сбой между скриптом и индексом): статус берется из hash
+        return [
+            {"run_id": run_id, "meeting_id": meeting_id, "status": status}
+            for run_id, (meeting_id, status) in zip(run_ids, rows)
+            if status in statuses
+        ]
+
+    async def run_for_meeting(self, meeting_id: str) -> Optional[str]:
+        return await self.client.get(self._meeting_run_key(meeting_id))
+
+    async def load_speaking_order(self, meeting_id: str) -> Optional[Tuple[SpeakingOrder, int]]:
+        stored = await self.client.hgetall(self._speaking_key(meeting_id))
+        if not stored:
+            return None
+        return SpeakingOrder.model_validate_json(stored["data"]), int(stored["version"])
+
+    async def save_speaking_order(self, order: SpeakingOrder, expected_version: int) -> bool:
+        key = self._speaking_key(order.meeting_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                version = int(await pipe.hget(key, "version") or 0)
+                if version != expected_version:
+                    return False
+                pipe.multi()
+                pipe.hset(key, mapping={"data": order.model_dump_json(), "version": version + 1})
+                await pipe.execute()
+                return True
+            except WatchError:
+                # Ключ изменила другая реплика между WATCH и EXEC
+                return False
+
+    async def claim_run(self, run_id: str, owner: str, ttl: float) -> bool:
+        key, ttl_ms = self._owner_key(run_id), max(int(ttl * 1000), 1)
+        if await self.client.set(key, owner, nx=True, px=ttl_ms):
+            return True
+        return bool(await self.client.eval(_RENEW_LEASE_SCRIPT, 1, key, owner, ttl_ms))
+
+    async def release_run(self, run_id: str, owner: str):
+        await self.client.eval(_RELEASE_LEASE_SCRIPT, 1, self._owner_key(run_id), owner)
+
+    async def ping(self) -> Dict[str, Any]:
+        await self.client.ping()
+        return {"backend": self.name}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+def create_run_state_store() -> RunStateStore:
+    """Хранилище по настройке RUN_STATE_BACKEND"""
+    settings = get_settings()
+    if settings.RUN_STATE_BACKEND == "memory":
+        return MemoryRunStateStore()
+    if settings.RUN_STATE_BACKEND == "sqlite":
+        return SQLiteRunStateStore(settings.RUN_STATE_PATH)
+    if settings.RUN_STATE_BACKEND == "redis":
+        return RedisRunStateStore(settings.RUN_STATE_REDIS_URL or settings.REDIS_URL)
+    raise ValueError(f"Неизвестный RUN_STATE_BACKEND: {settings.RUN_STATE_BACKEND}")
@@ -0,0 +1,372 @@
+"""
+Полнотекстовый индекс сообщений: токенизация ru/en, стемминг и BM25
+"""
+
+import asyncio
+import heapq
+import math
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config.settings import get_settings
+
+try:
+    import snowballstemmer
+except ImportError:  # pragma: no cover - используется встроенный стеммер
+    snowballstemmer = None
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_CYRILLIC_RE = re.compile(r"[а-я]")
+
+STOPWORDS = frozenset({
+    "и", "в", "во", "на", "не", "с", "со", "по", "к", "ко", "о", "об", "от", "из", "за", "для",
+    "что", "это", "как", "а", "но", "или", "то", "же", "бы", "ли", "у", "до",
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "is", "are", "be", "with", "at", "by", "it",
+})
+
+# Окончания в порядке убывания длины; стем не короче MIN_STEM символов
+_RU_SUFFIXES = tuple(sorted({
+    "иями", "ями", "ами", "ией", "иях", "иям", "ием", "остью", "ость", "ости",
+    "ением", "ение", "ения", "ению", "ении", "анием", "ание", "ания", "анию", "ании",
+    "ать", "ять", "ить", "еть", "уть", "ешь", "ишь", "ете", "ите", "ает", "яет", "ует",
+    "ют", "ут", "ат", "ят", "ала", "ила", "ыла", "ало", "ило", "али", "или",
+    "ого", "его", "ому", "ему", "ыми", "ими", "ая", "яя", "ое", "ее", "ые", "ие",
+    "ый", "ий", "ой", "ей", "ом", "ем", "ах", "ях", "ам", "ям", "ов", "ев", "ию",
+    "ья", "ье", "ью", "а", "я", "о", "е", "и", "ы", "у", "ю", "ь", "й",
+}, key=len, reverse=True))
+_EN_SUFFIXES = ("ations", "ation", "ingly", "ings", "ing", "ness", "ments", "ment", "edly", "ed", "ly", "es", "s")
+MIN_STEM = 3
+
+
+def _stem_ru(word: str) -> str:
+    if len(word) > MIN_STEM + 2 and word.endswith(("ся", "сь")):
+        word = word[:-2]
+    for suffix in _RU_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def _stem_en(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    for suffix in _EN_SUFFIXES:
+        if suffix == "s" and word.endswith("ss"):
+            continue
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[:-len(suffix)]
+            break
+    if word.endswith("e") and len(word) > MIN_STEM + 1:
+        word = word[:-1]
+    return word
+
+
+class Stemmer:
+    """Snowball, если установлен, иначе облегченный суффиксный стеммер"""
+
+    def __init__(self):
+        self._ru = snowballstemmer.stemmer("russian") if snowballstemmer else None
+        self._en = snowballstemmer.stemmer("english") if snowballstemmer else None
+        self._cache: Dict[str, str] = {}
+
+    def stem(self, word: str) -> str:
+        stem = self._cache.get(word)
+        if stem is None:
+            if _CYRILLIC_RE.search(word):
+                stem = self._ru.stemWord(word) if self._ru else _stem_ru(word)
+            elif word.isdigit():
+                stem = word
+            else:
+                stem = self._en.stemWord(word) if self._en else _stem_en(word)
+            if len(self._cache) < 200_000:
+                self._cache[word] = stem
+        return stem
+
+
+_stemmer = Stemmer()
+
+
+def analyze(text: str) -> List[str]:
+    """Текст -> список стемов (без стоп-слов)"""
+    return [
+        _stemmer.stem(token)
+        for token in _TOKEN_RE.findall(text.lower().replace("ё", "е"))
+        if token not in STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+
+@dataclass
+class SearchDocument:
+    """Сообщение в полнотекстовом индексе"""
+    id: str
+    text: str
+    meeting_id: str
+    agent_id: str
+    role: str
+    type: str
+    ts: float
+
+
+@dataclass
+class SearchFilter:
+    meeting_id: Optional[str] = None
+    agent_id: Optional[str] = None
+    role: Optional[str] = None
+    type: Optional[str] = None
+    ts_from: Optional[float] = None
+    ts_to: Optional[float] = None
+
+    def matches(self, document: SearchDocument) -> bool:
+        return (
+            (self.meeting_id is None or document.meeting_id == self.meeting_id)
+            and (self.agent_id is None or document.agent_id == self.agent_id)
+            and (self.role is None or document.role == self.role)
+            and (self.type is None or document.type == self.type)
+            and (self.ts_from is None or document.ts >= self.ts_from)
+            and (self.ts_to is None or document.ts <= self.ts_to)
+        )
+
+
+class TextSearchIndex(ABC):
+    """Инвертированный индекс с ранжированием BM25"""
+
+    name: str = "index"
+
+    @abstractmethod
+    async def add(self, documents: List[SearchDocument]):
+        """Добавить или заменить документы (по id)"""
+
+    @abstractmethod
+    async def search(self,
+                     query: str,
+                     where: Optional[SearchFilter] = None,
+                     limit: int = 20,
+                     offset: int = 0) -> Tuple[int, List[Tuple[str, float]]]:
+        """(число совпадений, [(id, score)]) по убыванию релевантности"""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Число документов"""
+
+    async def ping(self) -> Dict[str, Any]:
+        """Дешевая проверка доступности индекса (без обхода документов)"""
+        return {"backend": self.name}
+
+    async def close(self):
+        pass
+
+
+class InvertedIndex(TextSearchIndex):
+    """In-process инвертированный индекс: term -> {номер документа: tf}"""
+
+    name = "memory"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._documents: List[Optional[SearchDocument]] = []
+        self._terms: List[Tuple[str, ...]] = []
+        self._lengths: List[int] = []
+        self._positions: Dict[str, int] = {}
+        self._total_length = 0
+        self._live = 0
+
+    def _remove(self, position: int):
+        for term in self._terms[position]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(position, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths[position]
+        self._documents[position] = None
+        self._terms[position] = ()
+        self._lengths[position] = 0
+        self._live -= 1
+
+    async def add(self, documents: List[SearchDocument]):
+        for document in documents:
+            previous = self._positions.get(document.id)
+            if previous is not None:
+                self._remove(previous)
+
+            tokens = analyze(document.text)
+            frequencies: Dict[str, int] = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+
+            position = len(self._documents)
+            self._positions[document.id] = position
+            self._documents.append(document)
+            self._terms.append(tuple(frequencies))
+            self._lengths.append(len(tokens))
+            self._total_length += len(tokens)
+            self._live += 1
+            for term, tf in frequencies.items():
+                self._postings.setdefault(term, {})[position] = tf
+
+    async def search(self,
+                     query: str,
+                     where: Optional[SearchFilter] = None,
+                     limit: int = 20,
+                     offset: int = 0) -> Tuple[int, List[Tuple[str, float]]]:
+        terms = set(analyze(query))
+        if not terms or not self._live:
+            return 0, []
+
+        average = self._total_length / self._live or 1.0
+        scores: Dict[int, float] = {}
+        # Редкие термы первыми: у них самые короткие списки
+        for term in sorted(terms, key=lambda t: len(self._postings.get(t, ()))):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (self._live - df + 0.5) / (df + 0.5))
+            for position, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[position] / average)
+                scores[position] = scores.get(position, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if where is not None:
+            scores = {
+                position: score for position, score in scores.items()
+                if where.matches(self._documents[position])
+            }
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: item[1])[offset:]
+        return len(scores), [(self._documents[position].id, score) for position, score in top]
+
+    async def count(self) -> int:
+        return self._live
+
+
+_FTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_docs (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    meeting_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    type TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_search_docs_meeting ON search_docs (meeting_id, ts);
+CREATE INDEX IF NOT EXISTS idx_search_docs_ts ON search_docs (ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5 (body, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+
+class SQLiteFTSIndex(TextSearchIndex):
+    """
+    Персистентный индекс на SQLite FTS5.
+
+    В FTS кладутся уже стеммированные токены, поэтому анализ текста
+    одинаков с in-process индексом; ранжирование - встроенный bm25().
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def open(self):
+        if self._conn is not None:
+            return
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_FTS_SCHEMA)
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        await self.open()
+        async with self._lock:
+            return await asyncio.to_thread(self._transaction, fn)
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._conn:
+            return fn(self._conn)
+
+    async def add(self, documents: List[SearchDocument]):
+        rows = [(document, " ".join(analyze(document.text))) for document in documents]
+
+        def upsert(conn: sqlite3.Connection):
+            for document, body in rows:
+                existing = conn.execute("SELECT rowid FROM search_docs WHERE id = ?", (document.id,)).fetchone()
+                if existing is not None:
+                    conn.execute("DELETE FROM search_fts WHERE rowid = ?", (existing[0],))
+                    conn.execute("DELETE FROM search_docs WHERE rowid = ?", (existing[0],))
+                cursor = conn.execute(
+                    "INSERT INTO search_docs (id, meeting_id, agent_id, role, type, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                    (document.id, document.meeting_id, document.agent_id, document.role, document.type, document.ts)
+                )
+                conn.execute("INSERT INTO search_fts (rowid, body) VALUES (?, ?)", (cursor.lastrowid, body))
+
+        await self._run(upsert)
+
+    async def search(self,
+                     query: str,
+                     where: Optional[SearchFilter] = None,
+                     limit: int = 20,
+                     offset: int = 0) -> Tuple[int, List[Tuple[str, float]]]:
+        terms = sorted(set(analyze(query)))
+        if not terms:
+            return 0, []
+
+        clauses = ["search_fts MATCH ?"]
+        params: List[Any] = [" OR ".join(f'"{term}"' for term in terms)]
+        if where is not None:
+            for column in ("meeting_id", "agent_id", "role", "type"):
+                value = getattr(where, column)
+                if value is not None:
+                    clauses.append(f"d.{column} = ?")
+                    params.append(value)
+            if where.ts_from is not None:
+                clauses.append("d.ts >= ?")
+                params.append(where.ts_from)
+            if where.ts_to is not None:
+                clauses.append("d.ts <= ?")
+                params.append(where.ts_to)
+        condition = " AND ".join(clauses)
+        base = f"FROM search_fts JOIN search_docs d ON d.rowid = search_fts.rowid WHERE {condition}"
+
+        def select(conn: sqlite3.Connection) -> Tuple[int, List[Tuple[str, float]]]:
+            total = conn.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT d.id, bm25(search_fts) AS rank {base} ORDER BY rank LIMIT ? OFFSET ?",
+                [*params, limit, offset]
+            ).fetchall()
+            # bm25() в SQLite отрицательный: меньше - релевантнее
+            return total, [(row[0], -row[1]) for row in rows]
+
+        return await self._run(select)
+
+    async def count(self) -> int:
+        return await self._run(lambda conn: conn.execute("SELECT COUNT(*) FROM search_docs").fetchone()[0])
+
+    async def ping(self) -> Dict[str, Any]:
+        await self._run(lambda conn: conn.execute("SELECT 1").fetchone())
+        return {"backend": self.name}
+
+
+def create_text_search_index() -> TextSearchIndex:
+    """Индекс по настройке SEARCH_BACKEND"""
+    settings = get_settings()
+    if settings.SEARCH_BACKEND == "memory":
+        return InvertedIndex()
+    if settings.SEARCH_BACKEND == "sqlite":
+        return SQLiteFTSIndex(settings.SEARCH_INDEX_PATH)
+    raise ValueError(f"Неизвестный SEARCH_BACKEND: {settings.SEARCH_BACKEND}")
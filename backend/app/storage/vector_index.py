@@ -0,0 +1,225 @@
+"""
+Векторный индекс: интерфейс, фильтры по метаданным и in-process реализация
+"""
+
+import heapq
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.config.settings import get_settings
+from app.llm.embeddings import cosine
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy опционален
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VectorRecord:
+    """Запись индекса"""
+    id: str
+    vector: List[float]
+    document: str
+    metadata: Dict[str, Any]
+
+
+@dataclass
+class VectorHit:
+    id: str
+    score: float
+    document: str
+    metadata: Dict[str, Any]
+
+
+@dataclass
+class MetadataFilter:
+    """
+    Фильтр по метаданным: равенство, вхождение в список и диапазон ts
+    (время создания источника в секундах epoch).
+    """
+    equals: Dict[str, Any] = field(default_factory=dict)
+    one_of: Dict[str, List[Any]] = field(default_factory=dict)
+    ts_from: Optional[float] = None
+    ts_to: Optional[float] = None
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        for key, value in self.equals.items():
+            if metadata.get(key) != value:
+                return False
+        for key, values in self.one_of.items():
+            if metadata.get(key) not in values:
+                return False
+        ts = metadata.get("ts")
+        if self.ts_from is not None and (ts is None or ts < self.ts_from):
+            return False
+        if self.ts_to is not None and (ts is None or ts > self.ts_to):
+            return False
+        return True
+
+    def to_chroma(self) -> Optional[Dict[str, Any]]:
+        """Условие where в синтаксисе Chroma"""
+        clauses: List[Dict[str, Any]] = [{key: value} for key, value in self.equals.items()]
+        clauses.extend({key: {"$in": list(values)}} for key, values in self.one_of.items())
+        if self.ts_from is not None:
+            clauses.append({"ts": {"$gte": self.ts_from}})
+        if self.ts_to is not None:
+            clauses.append({"ts": {"$lte": self.ts_to}})
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+    @property
+    def empty(self) -> bool:
+        return not self.equals and not self.one_of and self.ts_from is None and self.ts_to is None
+
+
+class VectorIndex(ABC):
+    """Хранилище нормированных векторов с поиском top-k"""
+
+    name: str = "index"
+
+    @abstractmethod
+    async def upsert(self, records: List[VectorRecord]):
+        """Добавить или заменить записи (по id)"""
+
+    @abstractmethod
+    async def delete(self, ids: List[str]):
+        """Удалить записи"""
+
+    @abstractmethod
+    async def query(self,
+                    vector: List[float],
+                    k: int,
+                    where: Optional[MetadataFilter] = None) -> List[VectorHit]:
+        """k ближайших записей, удовлетворяющих фильтру"""
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Число записей"""
+
+    async def close(self):
+        pass
+
+
+class BruteForceIndex(VectorIndex):
+    """
+    In-process индекс с полным перебором.
+
+    С NumPy скоринг идет одним матричным умножением по кешированной матрице,
+    без NumPy - построчно. Матрица строится при первом запросе и дальше
+    обновляется на месте: upsert пишет строку (с запасом емкости),
+    delete переносит последнюю строку на место удаленной. Для тестов
+    и небольших инсталляций.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._vectors: List[List[float]] = []
+        self._documents: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix = None
+
+    async def upsert(self, records: List[VectorRecord]):
+        for record in records:
+            position = self._positions.get(record.id)
+            if position is None:
+                self._positions[record.id] = len(self._ids)
+                self._ids.append(record.id)
+                self._vectors.append(record.vector)
+                self._documents.append(record.document)
+                self._metadata.append(record.metadata)
+            else:
+                self._vectors[position] = record.vector
+                self._documents[position] = record.document
+                self._metadata[position] = record.metadata
+            self._set_row(self._positions[record.id], record.vector)
+
+    async def delete(self, ids: List[str]):
+        for record_id in ids:
+            position = self._positions.pop(record_id, None)
+            if position is None:
+                continue
+            # Удаление перестановкой последней записи на место удаленной
+            last = len(self._ids) - 1
+            if position != last:
+                for column in (self._ids, self._vectors, self._documents, self._metadata):
+                    column[position] = column[last]
+                self._positions[self._ids[position]] = position
+                if self._matrix is not None:
+                    self._matrix[position] = self._matrix[last]
+            for column in (self._ids, self._vectors, self._documents, self._metadata):
+                column.pop()
+
+    def _set_row(self, position: int, vector: List[float]):
+        """Записать строку построенной матрицы (строки за len(_ids) - свободная емкость)"""
+        if self._matrix is None:
+            return
+        rows, dim = self._matrix.shape
+        if len(vector) != dim:
+            # Другая размерность: матрица перестроится при следующем запросе
+            self._matrix = None
+            return
+        if position >= rows:
+            grown = np.empty((max(position + 1, rows * 2), dim), dtype=np.float32)
+            grown[:rows] = self._matrix
+            self._matrix = grown
+        self._matrix[position] = vector
+
+    async def query(self,
+                    vector: List[float],
+                    k: int,
+                    where: Optional[MetadataFilter] = None) -> List[VectorHit]:
+        if not self._ids or k <= 0:
+            return []
+
+        if where is None or where.empty:
+            candidates = range(len(self._ids))
+        else:
+            candidates = [i for i, metadata in enumerate(self._metadata) if where.matches(metadata)]
+
+        if np is not None:
+            if self._matrix is None:
+                self._matrix = np.asarray(self._vectors, dtype=np.float32)
+            positions = np.asarray(list(candidates), dtype=np.int64)
+            if positions.size == 0:
+                return []
+            scores = self._matrix[positions] @ np.asarray(vector, dtype=np.float32)
+            top = min(k, positions.size)
+            best = np.argpartition(-scores, top - 1)[:top]
+            ranked = sorted(((float(scores[i]), int(positions[i])) for i in best), reverse=True)
+        else:
+            ranked = heapq.nlargest(k, ((cosine(vector, self._vectors[i]), i) for i in candidates))
+
+        return [
+            VectorHit(
+                id=self._ids[position],
+                score=score,
+                document=self._documents[position],
+                metadata=self._metadata[position]
+            )
+            for score, position in ranked
+        ]
+
+    async def count(self) -> int:
+        return len(self._ids)
+
+
+def create_vector_index() -> VectorIndex:
+    """Индекс по настройке VECTOR_BACKEND"""
+    settings = get_settings()
+    if settings.VECTOR_BACKEND == "memory":
+        return BruteForceIndex()
+    if settings.VECTOR_BACKEND == "chroma":
+        from app.storage.chroma.index import ChromaIndex
+        return ChromaIndex(settings.CHROMA_HOST, settings.CHROMA_PORT, settings.CHROMA_COLLECTION)
+    raise ValueError(f"Неизвестный VECTOR_BACKEND: {settings.VECTOR_BACKEND}")
@@ -0,0 +1,318 @@
+"""
+Диспетчер вызовов инструментов: параллельное исполнение, лимиты и bulkhead-изоляция
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.models.tools import (
+    ToolCallRequest,
+    ToolCallResult,
+    ToolCallStatus,
+    ToolInstance
+)
+from app.observability.metrics import metrics_registry
+from app.observability.tracing import get_tracer
+from app.tools.limits import Bulkhead, BulkheadFullError, TokenBucket, integration_rate_limits
+from app.tools.registry_service import RegistrySnapshot, tool_registry
+from app.tools.result_cache import make_cache_key, tool_result_cache
+from app.tools.sandbox.pool import sandbox_executor
+from app.ws.broker import event_broker
+
+logger = logging.getLogger(__name__)
+
+# Обработчик инструмента: (запрос, экземпляр) -> результат
+ToolHandler = Callable[[ToolCallRequest, ToolInstance], Awaitable[Any]]
+
+# Ключи аргументов, значения которых маскируются в событиях
+SECRET_MARKERS = ("token", "secret", "password", "api_key", "apikey", "authorization")
+
+
+def mask_args(args: Dict[str, Any]) -> Dict[str, Any]:
+    """Замаскировать секретные значения аргументов"""
+    masked = {}
+    for key, value in args.items():
+        if any(marker in key.lower() for marker in SECRET_MARKERS):
+            masked[key] = "***"
+        elif isinstance(value, dict):
+            masked[key] = mask_args(value)
+        else:
+            masked[key] = value
+    return masked
+
+
+def integration_of(definition_id: str) -> str:
+    """Внешняя интеграция инструмента: notion.task -> notion"""
+    return definition_id.split(".", 1)[0]
+
+
+class ToolDispatcher:
+    """
+    Исполняет вызовы инструментов одного хода агента параллельно.
+
+    Каждая интеграция изолирована в собственном bulkhead, поэтому медленный
+    Notion не занимает слоты Slack. Частота вызовов ограничивается token bucket
+    на уровне ToolInstance и на уровне интеграции. Результаты берутся из кеша
+    только у инструментов, помеченных runtime_constraints.cacheable: читающих
+    и идемпотентных. У вторых runtime_constraints.idempotency_key задает
+    аргументы ключа (с meeting_id), и повтор или перезапуск создания страницы
+    возвращает уже созданную.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._instances: Dict[str, ToolInstance] = {}
+        self._handlers: Dict[str, ToolHandler] = {}
+        self._instance_buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._bulkheads: Dict[str, Bulkhead] = {}
+
+    def register_instance(self, instance: ToolInstance):
+        """Зарегистрировать экземпляр инструмента"""
+        self._instances[instance.instance_id] = instance
+        # Лимиты могли измениться
+        self._instance_buckets.pop(instance.instance_id, None)
+
+    def get_instance(self, instance_id: str) -> Optional[ToolInstance]:
+        return self._instances.get(instance_id)
+
+    def list_instances(self) -> List[ToolInstance]:
+        return list(self._instances.values())
+
+    def register_handler(self, definition_id: str, handler: ToolHandler):
+        """Зарегистрировать обработчик, исполняемый в процессе (вместо песочницы)"""
+        self._handlers[definition_id] = handler
+
+    async def dispatch_many(self, calls: List[ToolCallRequest]) -> List[ToolCallResult]:
+        """Выполнить независимые вызовы одного хода агента параллельно"""
+        if not calls:
+            return []
+
+        # Общий счетчик прогресса хода агента
+        batch = {"batch_total": len(calls), "batch_completed": 0}
+        return list(await asyncio.gather(*(
+            self.dispatch(call, batch=batch, batch_index=index)
+            for index, call in enumerate(calls)
+        )))
+
+    async def dispatch(self,
+                       call: ToolCallRequest,
+                       batch: Optional[Dict[str, int]] = None,
+                       batch_index: Optional[int] = None) -> ToolCallResult:
+        """Выполнить один вызов с учетом лимитов и bulkhead"""
+        with get_tracer().start_as_current_span("tool.call", attributes={
+            "xio.tool": call.definition_id,
+            "xio.call_id": call.call_id
+        }) as span:
+            result = await self._dispatch(call, batch, batch_index)
+            span.set_attribute("xio.status", result.status.value)
+            if result.cache:
+                span.set_attribute("xio.cache", result.cache)
+            return result
+
+    async def _dispatch(self,
+                        call: ToolCallRequest,
+                        batch: Optional[Dict[str, int]],
+                        batch_index: Optional[int]) -> ToolCallResult:
+        queued_at = time.perf_counter()
+        integration = integration_of(call.definition_id)
+        progress: Dict[str, Any] = {}
+        if batch is not None:
+            progress = {"batch_index": batch_index, "batch_total": batch["batch_total"]}
+
+        instance = self._instances.get(call.instance_id)
+        if instance is None or instance.definition_id != call.definition_id:
+            return await self._finish(call, ToolCallStatus.REJECTED, queued_at, queued_at,
+                                      error=f"Экземпляр {call.instance_id} не найден для {call.definition_id}",
+                                      progress=progress, batch=batch)
+
+        # Снимок реестра фиксируется на весь вызов
+        try:
+            with get_tracer().start_as_current_span("tool.validate"):
+                snapshot = tool_registry.validate(call.definition_id, call.args)
+        except (KeyError, ValueError) as e:
+            return await self._finish(call, ToolCallStatus.REJECTED, queued_at, queued_at,
+                                      error=str(e), progress=progress, batch=batch)
+
+        await self._emit(call, ToolCallStatus.QUEUED.value, {"stage": "queued", **progress})
+
+        constraints = snapshot.definitions[call.definition_id].runtime_constraints
+        # Инструменты с побочными эффектами без ключа идемпотентности (отправка сообщений) не кешируются
+        if not constraints.get("cacheable", False):
+            status, result, error, started_at = await self._run_limited(
+                call, instance, snapshot, integration, queued_at, progress
+            )
+            return await self._finish(call, status, queued_at, started_at, result=result,
+                                      error=error, progress=progress, batch=batch)
+
+        # Читающие и идемпотентные вызовы обслуживаются из кеша
+        cache_key = make_cache_key(
+            call.definition_id, call.instance_id, call.args, constraints.get("idempotency_key")
+        )
+        found, cached = await tool_result_cache.get(cache_key)
+        if found:
+            tool_result_cache.record(call.definition_id, "hit")
+            return await self._finish(call, ToolCallStatus.COMPLETED, queued_at, queued_at,
+                                      result=cached, progress=progress, batch=batch, cache="hit")
+
+        outcome, shared = await tool_result_cache.single_flight(
+            cache_key,
+            lambda: self._run_limited(call, instance, snapshot, integration, queued_at, progress)
+        )
+        status, result, error, started_at = outcome
+        cache_state = "coalesced" if shared else "miss"
+        tool_result_cache.record(call.definition_id, cache_state)
+
+        if not shared and status == ToolCallStatus.COMPLETED:
+            await tool_result_cache.set(cache_key, result, ttl=constraints.get("cache_ttl"))
+
+        return await self._finish(call, status, queued_at, started_at, result=result, error=error,
+                                  progress=progress, batch=batch, cache=cache_state)
+
+    async def _run_limited(self,
+                           call: ToolCallRequest,
+                           instance: ToolInstance,
+                           snapshot: RegistrySnapshot,
+                           integration: str,
+                           queued_at: float,
+                           progress: Dict[str, Any]) -> Tuple[ToolCallStatus, Any, Optional[str], float]:
+        """Исполнить вызов внутри bulkhead и лимитов: (статус, результат, ошибка, started_at)"""
+        try:
+            async with self._bulkhead(integration):
+                rate_wait = 0.0
+                instance_bucket = self._instance_bucket(instance)
+                if instance_bucket:
+                    rate_wait += await instance_bucket.acquire()
+                integration_bucket = self._integration_bucket(integration)
+                if integration_bucket:
+                    rate_wait += await integration_bucket.acquire()
+
+                started_at = time.perf_counter()
+                await self._emit(call, ToolCallStatus.RUNNING.value, {
+                    "stage": "running",
+                    "wait_ms": round((started_at - queued_at) * 1000, 2),
+                    "rate_limited_ms": round(rate_wait * 1000, 2),
+                    **progress
+                })
+
+                try:
+                    with get_tracer().start_as_current_span("tool.execute", attributes={"xio.tool": call.definition_id}):
+                        result = await self._execute(call, instance, snapshot)
+                except Exception as e:
+                    logger.error(f"Ошибка инструмента {call.definition_id} ({call.call_id}): {e}")
+                    return ToolCallStatus.FAILED, None, str(e), started_at
+
+                return ToolCallStatus.COMPLETED, result, None, started_at
+        except BulkheadFullError as e:
+            return ToolCallStatus.REJECTED, None, str(e), queued_at
+
+    async def _execute(self,
+                       call: ToolCallRequest,
+                       instance: ToolInstance,
+                       snapshot: RegistrySnapshot) -> Any:
+        handler = self._handlers.get(call.definition_id)
+        if handler is not None:
+            return await handler(call, instance)
+
+        definition = snapshot.definitions[call.definition_id]
+        constraints = definition.runtime_constraints
+        entrypoint = constraints.get("entrypoint")
+        if not entrypoint:
+            raise RuntimeError(f"Для {call.definition_id} не задан обработчик или entrypoint")
+
+        return await sandbox_executor.execute(
+            entrypoint,
+            {"args": call.args, "parameters": instance.parameters},
+            image_class=constraints.get("image_class", "default"),
+            timeout=constraints.get("timeout")
+        )
+
+    async def _finish(self,
+                      call: ToolCallRequest,
+                      status: ToolCallStatus,
+                      queued_at: float,
+                      started_at: float,
+                      result: Any = None,
+                      error: Optional[str] = None,
+                      progress: Optional[Dict[str, Any]] = None,
+                      batch: Optional[Dict[str, int]] = None,
+                      cache: Optional[str] = None) -> ToolCallResult:
+        finished_at = time.perf_counter()
+        tool_result = ToolCallResult(
+            call_id=call.call_id,
+            definition_id=call.definition_id,
+            status=status,
+            result=result,
+            error=error,
+            duration_ms=round((finished_at - started_at) * 1000, 2),
+            wait_ms=round((started_at - queued_at) * 1000, 2),
+            cache=cache
+        )
+
+        metrics_registry.histogram(
+            "tool_call_duration_seconds",
+            definition_id=call.definition_id,
+            status=status.value
+        ).observe(finished_at - started_at)
+
+        final_progress = {"stage": status.value, "duration_ms": tool_result.duration_ms, **(progress or {})}
+        if batch is not None:
+            batch["batch_completed"] += 1
+            final_progress["batch_completed"] = batch["batch_completed"]
+        if error:
+            final_progress["error"] = error
+        await self._emit(call, status.value, final_progress, cache=cache)
+        return tool_result
+
+    async def _emit(self,
+                    call: ToolCallRequest,
+                    status: str,
+                    progress: Dict[str, Any],
+                    cache: Optional[str] = None):
+        await event_broker.emit_event({
+            "type": "tool_execution",
+            "meeting_id": call.meeting_id,
+            "run_id": call.run_id,
+            "thread_id": call.thread_id or call.call_id,
+            "tool_id": call.definition_id,
+            "agent_id": call.agent_id,
+            "status": status,
+            "args_masked": mask_args(call.args),
+            "progress": progress,
+            "cache": cache
+        })
+
+    def _bulkhead(self, integration: str) -> Bulkhead:
+        bulkhead = self._bulkheads.get(integration)
+        if bulkhead is None:
+            bulkhead = Bulkhead(
+                integration,
+                max_concurrent=self.settings.TOOL_BULKHEAD_CONCURRENCY,
+                max_queue=self.settings.TOOL_BULKHEAD_QUEUE
+            )
+            self._bulkheads[integration] = bulkhead
+        return bulkhead
+
+    def _instance_bucket(self, instance: ToolInstance) -> Optional[TokenBucket]:
+        if instance.instance_id not in self._instance_buckets:
+            self._instance_buckets[instance.instance_id] = TokenBucket.from_limits(instance.rate_limits)
+        return self._instance_buckets[instance.instance_id]
+
+    def _integration_bucket(self, integration: str) -> Optional[TokenBucket]:
+        # Bucket общий с другими клиентами интеграции (например, экспортом в Notion)
+        return integration_rate_limits.bucket(
+            integration, self.settings.TOOL_INTEGRATION_RATE_LIMITS.get(integration, {})
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Состояние bulkhead-пулов по интеграциям"""
+        return {
+            "instances": len(self._instances),
+            "bulkheads": [bulkhead.get_stats() for bulkhead in self._bulkheads.values()]
+        }
+
+
+# Глобальный экземпляр диспетчера
+tool_dispatcher = ToolDispatcher()
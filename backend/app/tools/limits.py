@@ -0,0 +1,130 @@
+"""
+Примитивы ограничения нагрузки: token bucket и bulkhead
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from app.config.settings import get_settings
+
+
+class BulkheadFullError(RuntimeError):
+    """Очередь изолированного пула переполнена"""
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket.
+
+    rate - пополнение в токенах в секунду, capacity - максимальный всплеск.
+    Ожидающие обслуживаются по очереди, без гонок за пополнение.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate должен быть положительным")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Взять токены без ожидания"""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Дождаться токенов; возвращает время ожидания в секундах"""
+        started_at = time.monotonic()
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+        return time.monotonic() - started_at
+
+    @classmethod
+    def from_limits(cls, limits: Dict[str, Any]) -> Optional["TokenBucket"]:
+        """Создать bucket из rate_limits ToolInstance ({"requests_per_second", "requests_per_minute", "burst"})"""
+        rate = limits.get("requests_per_second")
+        if rate is None and limits.get("requests_per_minute"):
+            rate = limits["requests_per_minute"] / 60.0
+        if not rate:
+            return None
+        return cls(rate=rate, capacity=limits.get("burst"))
+
+
+class IntegrationRateLimits:
+    """
+    Общие token bucket интеграций на процесс.
+
+    Диспетчер инструментов и пакетный экспорт берут один и тот же bucket,
+    поэтому суммарная частота запросов к интеграции не превышает ее лимит.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+
+    def bucket(self, integration: str, limits: Optional[Dict[str, Any]] = None) -> Optional[TokenBucket]:
+        """Bucket интеграции (создается при первом обращении из TOOL_INTEGRATION_RATE_LIMITS)"""
+        if integration not in self._buckets:
+            if limits is None:
+                limits = get_settings().TOOL_INTEGRATION_RATE_LIMITS.get(integration, {})
+            self._buckets[integration] = TokenBucket.from_limits(limits)
+        return self._buckets[integration]
+
+    def reset(self):
+        """Сбросить bucket (лимиты будут перечитаны)"""
+        self._buckets.clear()
+
+
+class Bulkhead:
+    """Изолированный пул с ограничением одновременных вызовов и длины очереди"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._active = 0
+        self._queued = 0
+
+    async def __aenter__(self) -> "Bulkhead":
+        if self._semaphore.locked() and self._queued >= self.max_queue:
+            raise BulkheadFullError(f"Пул {self.name} переполнен ({self._queued} в очереди)")
+
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+        self._active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._active -= 1
+        self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "active": self._active,
+            "queued": self._queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue
+        }
+
+
+# Глобальный экземпляр общих лимитов интеграций
+integration_rate_limits = IntegrationRateLimits()
@@ -0,0 +1,244 @@
+"""
+Реестр определений инструментов XIO с горячей перезагрузкой
+"""
+
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.models.tools import ToolDefinition
+from app.tools.schema_compiler import SchemaValidationError, Validator, compile_schema
+
+logger = logging.getLogger(__name__)
+
+# Встроенные определения инструментов
+DEFAULT_DEFINITIONS_DIR = Path(__file__).parent / "schemas"
+
+
+class DefinitionSource(ABC):
+    """Источник определений инструментов (каталог на диске, БД и т.д.)"""
+
+    @abstractmethod
+    async def scan(self) -> Dict[str, str]:
+        """Вернуть отпечатки всех определений: ключ источника -> fingerprint"""
+
+    @abstractmethod
+    async def load(self, key: str) -> Dict[str, Any]:
+        """Загрузить сырое определение по ключу источника"""
+
+
+class DirectoryDefinitionSource(DefinitionSource):
+    """Определения в виде *.json файлов в каталоге"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    async def scan(self) -> Dict[str, str]:
+        return await asyncio.to_thread(self._scan_sync)
+
+    def _scan_sync(self) -> Dict[str, str]:
+        fingerprints: Dict[str, str] = {}
+        if not self.path.is_dir():
+            logger.warning(f"Каталог определений инструментов не найден: {self.path}")
+            return fingerprints
+
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    fingerprints[entry.name] = f"{stat.st_mtime_ns}:{stat.st_size}"
+        return fingerprints
+
+    async def load(self, key: str) -> Dict[str, Any]:
+        text = await asyncio.to_thread((self.path / key).read_text, encoding="utf-8")
+        return json.loads(text)
+
+
+class RegistrySnapshot:
+    """
+    Неизменяемый снимок реестра.
+
+    Вызов инструмента берет снимок один раз и работает с ним до конца,
+    поэтому перезагрузка не меняет определения посреди вызова.
+    """
+
+    __slots__ = ("generation", "definitions", "validators", "definition_generations", "sources")
+
+    def __init__(self,
+                 generation: int,
+                 definitions: Dict[str, ToolDefinition],
+                 validators: Dict[str, Validator],
+                 definition_generations: Dict[str, int],
+                 sources: Dict[str, Tuple[str, str]]):
+        self.generation = generation
+        self.definitions: Mapping[str, ToolDefinition] = MappingProxyType(definitions)
+        self.validators: Mapping[str, Validator] = MappingProxyType(validators)
+        self.definition_generations: Mapping[str, int] = MappingProxyType(definition_generations)
+        # ключ источника -> (fingerprint, definition_id)
+        self.sources: Mapping[str, Tuple[str, str]] = MappingProxyType(sources)
+
+    def validate(self, definition_id: str, args: Dict[str, Any]) -> None:
+        """Проверить аргументы по скомпилированной схеме"""
+        validator = self.validators.get(definition_id)
+        if validator is None:
+            raise KeyError(f"Инструмент {definition_id} не найден в реестре")
+
+        errors = validator(args, "$")
+        if errors:
+            raise SchemaValidationError(definition_id, errors)
+
+
+class ToolRegistryService:
+    """Реестр ToolDefinition с инкрементальной перекомпиляцией и copy-on-write снимками"""
+
+    def __init__(self, source: Optional[DefinitionSource] = None):
+        self.settings = get_settings()
+        if source is None:
+            path = self.settings.TOOL_DEFINITIONS_DIR or DEFAULT_DEFINITIONS_DIR
+            source = DirectoryDefinitionSource(Path(path))
+        self.source = source
+        self._snapshot = RegistrySnapshot(0, {}, {}, {}, {})
+        self._reload_lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> RegistrySnapshot:
+        """Текущий снимок реестра"""
+        return self._snapshot
+
+    @property
+    def generation(self) -> int:
+        return self._snapshot.generation
+
+    async def load_definitions(self) -> RegistrySnapshot:
+        """Первичная загрузка определений"""
+        await self.reload()
+        logger.info(
+            f"Загружено {len(self._snapshot.definitions)} определений инструментов "
+            f"(generation={self._snapshot.generation})"
+        )
+        return self._snapshot
+
+    async def reload(self) -> bool:
+        """
+        Перечитать источник и перекомпилировать только изменившиеся определения.
+
+        Возвращает True, если опубликован новый снимок.
+        """
+        async with self._reload_lock:
+            current = self._snapshot
+            fingerprints = await self.source.scan()
+
+            changed = [
+                key for key, fingerprint in fingerprints.items()
+                if current.sources.get(key, (None,))[0] != fingerprint
+            ]
+            removed = [key for key in current.sources if key not in fingerprints]
+
+            if not changed and not removed:
+                return False
+
+            generation = current.generation + 1
+            definitions = dict(current.definitions)
+            validators = dict(current.validators)
+            definition_generations = dict(current.definition_generations)
+            sources = dict(current.sources)
+            updated = bool(removed)
+
+            for key in removed:
+                _, definition_id = sources.pop(key)
+                definitions.pop(definition_id, None)
+                validators.pop(definition_id, None)
+                definition_generations.pop(definition_id, None)
+                logger.info(f"Определение инструмента удалено: {definition_id}")
+
+            for key in changed:
+                try:
+                    raw = await self.source.load(key)
+                    definition = ToolDefinition(**raw)
+                    validator = compile_schema(definition.json_schema)
+                except Exception as e:
+                    # Оставляем предыдущую версию определения, если она была, и запоминаем
+                    # отпечаток файла: пока он не изменится, повторять загрузку незачем
+                    logger.error(f"Не удалось загрузить определение {key}: {e}")
+                    sources[key] = (fingerprints[key], sources.get(key, (None, None))[1])
+                    continue
+
+                previous = sources.get(key)
+                if previous and previous[1] != definition.definition_id:
+                    definitions.pop(previous[1], None)
+                    validators.pop(previous[1], None)
+                    definition_generations.pop(previous[1], None)
+
+                definitions[definition.definition_id] = definition
+                validators[definition.definition_id] = validator
+                definition_generations[definition.definition_id] = generation
+                sources[key] = (fingerprints[key], definition.definition_id)
+                updated = True
+                logger.info(f"Определение инструмента обновлено: {definition.definition_id}")
+
+            if not updated:
+                # Набор инструментов прежний (изменились только битые файлы): поколение не растет
+                self._snapshot = RegistrySnapshot(
+                    current.generation, current.definitions, current.validators,
+                    current.definition_generations, sources
+                )
+                return False
+
+            # Атомарная публикация нового снимка
+            self._snapshot = RegistrySnapshot(
+                generation, definitions, validators, definition_generations, sources
+            )
+            return True
+
+    def get_definition(self, definition_id: str) -> Optional[ToolDefinition]:
+        """Получить определение инструмента из текущего снимка"""
+        return self._snapshot.definitions.get(definition_id)
+
+    def list_definitions(self) -> List[ToolDefinition]:
+        """Список определений текущего снимка"""
+        return list(self._snapshot.definitions.values())
+
+    def validate(self, definition_id: str, args: Dict[str, Any]) -> RegistrySnapshot:
+        """Проверить аргументы и вернуть снимок, по которому выполнялась проверка"""
+        snapshot = self._snapshot
+        snapshot.validate(definition_id, args)
+        return snapshot
+
+    async def start_watching(self, interval: Optional[float] = None):
+        """Запустить фоновое отслеживание источника определений"""
+        if self._watch_task and not self._watch_task.done():
+            return
+
+        interval = interval or self.settings.TOOL_REGISTRY_WATCH_INTERVAL
+        self._watch_task = asyncio.create_task(self._watch(interval))
+        logger.info(f"Отслеживание определений инструментов запущено (interval={interval}s)")
+
+    async def _watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.reload():
+                    logger.info(f"Реестр инструментов перезагружен: generation={self.generation}")
+            except Exception as e:
+                logger.error(f"Ошибка перезагрузки реестра инструментов: {e}")
+
+    async def stop_watching(self):
+        """Остановить отслеживание источника"""
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+
+# Глобальный экземпляр реестра
+tool_registry = ToolRegistryService()
@@ -0,0 +1,172 @@
+"""
+Кеш результатов читающих вызовов инструментов
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.observability.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+def make_cache_key(definition_id: str,
+                   instance_id: str,
+                   args: Dict[str, Any],
+                   key_fields: Optional[List[str]] = None) -> str:
+    """
+    Ключ кеша: (definition_id, instance_id, хеш аргументов).
+
+    Аргументы берутся как переданы: пробелы в строках и явные None могут
+    быть значимы для инструмента, поэтому нормализуется только порядок ключей.
+    key_fields (ключ идемпотентности инструмента) ограничивает хеш этими
+    аргументами: повтор создания с тем же ключом получает прежний результат.
+    """
+    if key_fields:
+        args = {field: args.get(field) for field in key_fields}
+    canonical = json.dumps(
+        args,
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str
+    )
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return f"{definition_id}:{instance_id}:{digest}"
+
+
+class ToolResultCache:
+    """
+    Двухуровневый кеш результатов: локальный LRU с TTL и опциональный Redis.
+
+    Одновременные одинаковые вызовы схлопываются (single-flight): исполняется
+    только первый, остальные получают его результат.
+    """
+
+    def __init__(self,
+                 max_entries: Optional[int] = None,
+                 ttl: Optional[float] = None,
+                 redis_url: Optional[str] = None):
+        self.settings = get_settings()
+        self.max_entries = max_entries or self.settings.TOOL_CACHE_MAX_ENTRIES
+        self.ttl = ttl or self.settings.TOOL_CACHE_TTL
+        self.redis_url = redis_url if redis_url is not None else self.settings.TOOL_CACHE_REDIS_URL
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._redis = None
+
+    def _get_redis(self):
+        if not self.redis_url:
+            return None
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(self.redis_url)
+        return self._redis
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        """Найти результат: (найден, значение)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return True, value
+            del self._entries[key]
+
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                raw = await redis_client.get(f"xio:tool_cache:{key}")
+            except Exception as e:
+                logger.warning(f"Redis-кеш инструментов недоступен: {e}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._store_local(key, value, self.ttl)
+                return True, value
+
+        return False, None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Сохранить результат в оба уровня"""
+        ttl = ttl or self.ttl
+        self._store_local(key, value, ttl)
+
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                await redis_client.set(
+                    f"xio:tool_cache:{key}",
+                    json.dumps(value, ensure_ascii=False, default=str),
+                    ex=max(int(ttl), 1)
+                )
+            except Exception as e:
+                logger.warning(f"Не удалось записать результат в Redis-кеш: {e}")
+
+    def _store_local(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def single_flight(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Выполнить factory один раз на ключ среди одновременных вызовов.
+
+        Возвращает (значение, True если значение получено от чужого вызова).
+        factory исполняется отдельной задачей: отмена первого вызывающего
+        не отменяет ее, и остальные ожидающие получают результат.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight), True
+
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._flight_done(key, done))
+        return await asyncio.shield(task), False
+
+    def _flight_done(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Исключение уже передано ожидающим (если они были); не даем asyncio ругаться на него
+            task.exception()
+
+    async def ping(self) -> Dict[str, Any]:
+        """Проверка Redis-уровня кеша (локальный уровень всегда доступен)"""
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            await redis_client.ping()
+        return {"redis": redis_client is not None, "entries": len(self._entries)}
+
+    def record(self, definition_id: str, outcome: str):
+        """Учесть попадание/промах в метриках"""
+        metrics_registry.counter(
+            "tool_cache_requests_total",
+            definition_id=definition_id,
+            result=outcome
+        ).inc()
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "redis": bool(self.redis_url)
+        }
+
+
+# Глобальный экземпляр кеша
+tool_result_cache = ToolResultCache()
@@ -0,0 +1,179 @@
+"""
+Бэкенды песочницы: локальный процесс и Docker
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Корень backend (для импорта app.* в локальном воркере)
+BACKEND_ROOT = Path(__file__).resolve().parents[3]
+
+RUNNER_MODULE = "app.tools.sandbox.runner"
+
+# Максимальный размер строки ответа воркера
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+# Переменные окружения API, которые видит локальный воркер: секреты
+# (ключи моделей, токены интеграций) коду инструментов не передаются
+WORKER_ENV_ALLOWLIST = ("PATH", "LANG", "LC_ALL", "LC_CTYPE", "TZ", "TMPDIR")
+
+
+class SandboxError(RuntimeError):
+    """Ошибка исполнения в песочнице"""
+
+
+class SandboxTimeoutError(SandboxError):
+    """Превышен таймаут исполнения в песочнице"""
+
+
+class SandboxWorker:
+    """Прогретый воркер: долгоживущий процесс с JSON-lines протоколом"""
+
+    def __init__(self, image_class: str, process: asyncio.subprocess.Process):
+        self.image_class = image_class
+        self.process = process
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.calls = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def request(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Отправить запрос воркеру и дождаться ответа"""
+        if not self.alive:
+            raise SandboxError(f"Воркер {self.image_class} завершился")
+
+        line = json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+        try:
+            self.process.stdin.write(line.encode("utf-8"))
+            await self.process.stdin.drain()
+            raw = await asyncio.wait_for(self.process.stdout.readline(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise SandboxTimeoutError(f"Таймаут {timeout}s в песочнице {self.image_class}")
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise SandboxError(f"Воркер {self.image_class} недоступен: {e}")
+
+        if not raw:
+            raise SandboxError(f"Воркер {self.image_class} закрыл stdout")
+
+        self.last_used = time.monotonic()
+        return json.loads(raw)
+
+    async def kill(self):
+        """Завершить процесс воркера"""
+        if self.alive:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning(f"Воркер {self.image_class} не завершился за 5s")
+
+
+class SandboxBackend(ABC):
+    """Бэкенд, запускающий процессы-воркеры песочницы"""
+
+    name: str = "abstract"
+
+    @abstractmethod
+    def worker_command(self, image_class: str) -> List[str]:
+        """Команда запуска воркера для класса образа"""
+
+    def worker_env(self) -> Optional[Dict[str, str]]:
+        return None
+
+    def worker_cwd(self) -> Optional[str]:
+        return None
+
+    async def spawn(self, image_class: str) -> SandboxWorker:
+        """Запустить новый воркер"""
+        process = await asyncio.create_subprocess_exec(
+            *self.worker_command(image_class),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=self.worker_env(),
+            cwd=self.worker_cwd(),
+            limit=_STREAM_LIMIT
+        )
+        return SandboxWorker(image_class, process)
+
+
+class LocalProcessBackend(SandboxBackend):
+    """
+    Локальные процессы-воркеры (для тестов и разработки).
+
+    Воркер получает только WORKER_ENV_ALLOWLIST из окружения API. При
+    use_namespaces=True он запускается через unshare в отдельных
+    user/network namespace (без доступа к сети), если unshare доступен.
+    Файловая система не изолируется: в production - DockerBackend.
+    """
+
+    name = "local"
+
+    def __init__(self, use_namespaces: bool = False):
+        self.use_namespaces = use_namespaces and shutil.which("unshare") is not None
+
+    def worker_command(self, image_class: str) -> List[str]:
+        command = [sys.executable, "-u", "-m", RUNNER_MODULE]
+        if self.use_namespaces:
+            command = ["unshare", "--user", "--map-root-user", "--net", *command]
+        return command
+
+    def worker_env(self) -> Optional[Dict[str, str]]:
+        env = {name: os.environ[name] for name in WORKER_ENV_ALLOWLIST if name in os.environ}
+        env["PYTHONPATH"] = str(BACKEND_ROOT)
+        return env
+
+    def worker_cwd(self) -> Optional[str]:
+        return str(BACKEND_ROOT)
+
+
+class DockerBackend(SandboxBackend):
+    """Воркеры в Docker-контейнерах с лимитами CPU/RAM/NET"""
+
+    name = "docker"
+
+    def __init__(self, images: Optional[Dict[str, str]] = None):
+        self.settings = get_settings()
+        self.images = images or {"default": self.settings.SANDBOX_IMAGE}
+
+    def worker_command(self, image_class: str) -> List[str]:
+        image = self.images.get(image_class, self.images["default"])
+        return [
+            "docker", "--host", self.settings.DOCKER_HOST,
+            "run", "-i", "--rm",
+            "--cpus", self.settings.SANDBOX_CPU_LIMIT,
+            "--memory", self.settings.SANDBOX_MEMORY_LIMIT,
+            "--network", self.settings.SANDBOX_NETWORK,
+            "--read-only", "--tmpfs", "/tmp",
+            "--label", f"xio.sandbox.class={image_class}",
+            image,
+            "python", "-u", "-m", RUNNER_MODULE
+        ]
+
+
+def create_backend(name: Optional[str] = None) -> SandboxBackend:
+    """Создать бэкенд песочницы по имени из настроек"""
+    name = name or get_settings().SANDBOX_BACKEND
+    if name == "docker":
+        return DockerBackend()
+    if name == "local":
+        return LocalProcessBackend(use_namespaces=True)
+    raise ValueError(f"Неизвестный бэкенд песочницы: {name}")
@@ -0,0 +1,317 @@
+"""
+Пул прогретых воркеров песочницы и исполнитель вызовов инструментов
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from app.config.settings import get_settings
+from app.observability.metrics import metrics_registry
+from app.observability.tracing import inject_context, record_span
+from app.tools.sandbox.backends import (
+    SandboxBackend,
+    SandboxError,
+    SandboxTimeoutError,
+    SandboxWorker,
+    create_backend
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WarmWorkerPool:
+    """Пул прогретых воркеров одного класса образа"""
+
+    def __init__(self,
+                 image_class: str,
+                 backend: SandboxBackend,
+                 min_idle: int,
+                 max_size: int,
+                 idle_ttl: float,
+                 max_calls_per_worker: int):
+        self.image_class = image_class
+        self.backend = backend
+        self.min_idle = min_idle
+        self.max_size = max(max_size, 1)
+        self.idle_ttl = idle_ttl
+        self.max_calls_per_worker = max_calls_per_worker
+        self._idle: Deque[SandboxWorker] = deque()
+        self._size = 0
+        self._waiters = 0
+        self._available = asyncio.Condition()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    async def ensure_warm(self):
+        """Догреть пул до min_idle воркеров"""
+        while len(self._idle) < self.min_idle and self._size < self.max_size:
+            self._size += 1
+            try:
+                worker = await self.backend.spawn(self.image_class)
+            except Exception:
+                self._size -= 1
+                raise
+            async with self._available:
+                self._idle.append(worker)
+                self._available.notify()
+
+    async def acquire(self) -> SandboxWorker:
+        """Взять воркер из пула (или запустить новый в пределах max_size)"""
+        async with self._available:
+            while True:
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.alive:
+                        return worker
+                    self._size -= 1
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                self._waiters += 1
+                try:
+                    await self._available.wait()
+                finally:
+                    self._waiters -= 1
+
+        # Холодный старт вне блокировки
+        try:
+            return await self.backend.spawn(self.image_class)
+        except Exception:
+            await self._discard_slot()
+            raise
+
+    async def release(self, worker: SandboxWorker, reusable: bool):
+        """Вернуть воркер в пул после сброса состояния"""
+        if reusable and worker.calls < self.max_calls_per_worker:
+            try:
+                response = await worker.request({"op": "reset"}, timeout=5)
+                reusable = bool(response.get("ok"))
+            except SandboxError:
+                reusable = False
+        else:
+            reusable = False
+
+        if not reusable:
+            await worker.kill()
+            await self._discard_slot()
+            return
+
+        async with self._available:
+            self._idle.append(worker)
+            self._available.notify()
+
+    async def reap_idle(self) -> int:
+        """Остановить воркеры, простаивающие дольше idle_ttl (сверх min_idle)"""
+        now = time.monotonic()
+        expired = []
+
+        async with self._available:
+            # Самые старые по использованию - в начале очереди
+            while len(self._idle) > self.min_idle and now - self._idle[0].last_used > self.idle_ttl:
+                expired.append(self._idle.popleft())
+            self._size -= len(expired)
+
+        for worker in expired:
+            await worker.kill()
+        return len(expired)
+
+    async def close(self):
+        """Остановить все простаивающие воркеры"""
+        async with self._available:
+            workers = list(self._idle)
+            self._idle.clear()
+            self._size -= len(workers)
+
+        for worker in workers:
+            await worker.kill()
+
+    async def ping(self, timeout: float) -> Dict[str, Any]:
+        """
+        Проверить пул, не занимая мощность вызовов.
+
+        Пингуется только простаивающий воркер; если все заняты,
+        пул считается живым без дополнительного запроса.
+        """
+        async with self._available:
+            worker = self._idle.pop() if self._idle else None
+
+        if worker is None:
+            if self._size == 0 and self.min_idle > 0:
+                raise SandboxError(f"В пуле {self.image_class} нет воркеров")
+            return {**self.get_stats(), "pinged": False}
+
+        ok = False
+        try:
+            response = await worker.request({"op": "ping"}, timeout=timeout)
+            ok = bool(response.get("ok"))
+        finally:
+            if ok:
+                async with self._available:
+                    self._idle.append(worker)
+                    self._available.notify()
+            else:
+                await worker.kill()
+                await self._discard_slot()
+
+        if not ok:
+            raise SandboxError(f"Воркер {self.image_class} не ответил на ping")
+        return {**self.get_stats(), "pinged": True}
+
+    async def _discard_slot(self):
+        async with self._available:
+            self._size -= 1
+            self._available.notify()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "image_class": self.image_class,
+            "size": self._size,
+            "idle": len(self._idle),
+            "waiters": self._waiters,
+            "max_size": self.max_size
+        }
+
+
+class SandboxExecutor:
+    """Исполнитель вызовов инструментов в пулах прогретых воркеров"""
+
+    def __init__(self, backend: Optional[SandboxBackend] = None):
+        self.settings = get_settings()
+        self._backend = backend
+        self._pools: Dict[str, WarmWorkerPool] = {}
+        self._reaper_task: Optional[asyncio.Task] = None
+
+    @property
+    def backend(self) -> SandboxBackend:
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    def get_pool(self, image_class: str = "default") -> WarmWorkerPool:
+        """Пул для класса образа (создается лениво)"""
+        pool = self._pools.get(image_class)
+        if pool is None:
+            pool = WarmWorkerPool(
+                image_class=image_class,
+                backend=self.backend,
+                min_idle=self.settings.SANDBOX_POOL_MIN_IDLE,
+                max_size=self.settings.SANDBOX_POOL_MAX_SIZE,
+                idle_ttl=self.settings.SANDBOX_IDLE_TTL,
+                max_calls_per_worker=self.settings.SANDBOX_MAX_CALLS_PER_WORKER
+            )
+            self._pools[image_class] = pool
+        return pool
+
+    async def start(self, image_classes=("default",)):
+        """Прогреть пулы и запустить фоновую очистку простаивающих воркеров"""
+        if not self._reaper_task or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+        for image_class in image_classes:
+            await self.get_pool(image_class).ensure_warm()
+
+        logger.info(f"Песочница запущена: backend={self.backend.name}, pools={list(self._pools)}")
+
+    async def execute(self,
+                      entrypoint: str,
+                      args: Dict[str, Any],
+                      image_class: str = "default",
+                      timeout: Optional[float] = None) -> Any:
+        """Выполнить entrypoint ("module:function") в прогретом воркере"""
+        pool = self.get_pool(image_class)
+        timeout = timeout or self.settings.SANDBOX_TIMEOUT
+
+        queued_at = time.perf_counter()
+        worker = await pool.acquire()
+        started_at = time.perf_counter()
+        metrics_registry.histogram("sandbox_queue_wait_seconds", image_class=image_class).observe(
+            started_at - queued_at
+        )
+
+        reusable = False
+        try:
+            response = await worker.request(
+                {"op": "call", "entrypoint": entrypoint, "args": args, "trace": inject_context()},
+                timeout=timeout
+            )
+            worker.calls += 1
+            # Ошибка в коде инструмента не ломает сам воркер
+            reusable = True
+        except SandboxTimeoutError:
+            metrics_registry.counter("sandbox_timeouts_total", image_class=image_class).inc()
+            raise
+        finally:
+            metrics_registry.histogram("sandbox_exec_seconds", image_class=image_class).observe(
+                time.perf_counter() - started_at
+            )
+            await pool.release(worker, reusable=reusable)
+            # Восполняем пул после выбывания воркера
+            if not reusable:
+                asyncio.create_task(self._replenish(pool))
+
+        # Интервал исполнения внутри воркера (часы хоста общие и для Docker)
+        if response.get("started_ns") and response.get("finished_ns"):
+            record_span("sandbox.worker", response["started_ns"], response["finished_ns"], attributes={
+                "xio.entrypoint": entrypoint,
+                "xio.image_class": image_class
+            })
+
+        if not response.get("ok"):
+            metrics_registry.counter("sandbox_errors_total", image_class=image_class).inc()
+            raise SandboxError(response.get("error", "Неизвестная ошибка песочницы"))
+
+        metrics_registry.counter("sandbox_calls_total", image_class=image_class).inc()
+        return response.get("result")
+
+    async def _replenish(self, pool: WarmWorkerPool):
+        try:
+            await pool.ensure_warm()
+        except Exception as e:
+            logger.error(f"Не удалось восполнить пул песочницы {pool.image_class}: {e}")
+
+    async def _reap_loop(self):
+        interval = max(self.settings.SANDBOX_IDLE_TTL / 2, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            for pool in list(self._pools.values()):
+                try:
+                    reaped = await pool.reap_idle()
+                    if reaped:
+                        logger.info(f"Остановлено {reaped} простаивающих воркеров {pool.image_class}")
+                except Exception as e:
+                    logger.error(f"Ошибка очистки пула {pool.image_class}: {e}")
+
+    async def stop(self):
+        """Остановить очистку и все воркеры"""
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+
+        for pool in self._pools.values():
+            await pool.close()
+
+    async def ping(self, image_class: str = "default", timeout: float = 5.0) -> Dict[str, Any]:
+        """Проверка готовности песочницы (для /ready)"""
+        return await self.get_pool(image_class).ping(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика пулов песочницы"""
+        return {
+            "backend": self.backend.name,
+            "pools": [pool.get_stats() for pool in self._pools.values()]
+        }
+
+
+# Глобальный экземпляр исполнителя
+sandbox_executor = SandboxExecutor()
@@ -0,0 +1,110 @@
+"""
+Процесс-воркер песочницы XIO
+
+Читает JSON-запросы построчно из stdin и пишет ответы построчно в stdout.
+Один и тот же протокол используется локальным бэкендом и контейнером Docker.
+
+Операции:
+- {"op": "call", "entrypoint": "module:function", "args": {...}, "trace": {"traceparent": ...}}
+- {"op": "reset"} - очистка состояния между вызовами
+- {"op": "ping"}
+"""
+
+import asyncio
+import contextlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from typing import Any, Dict
+
+
+class SandboxRunner:
+    """Исполнитель вызовов внутри прогретого воркера"""
+
+    def __init__(self):
+        self._baseline_modules = set(sys.modules)
+        self._baseline_env = dict(os.environ)
+        self._baseline_cwd = os.getcwd()
+        self._workdir = tempfile.mkdtemp(prefix="xio_sandbox_")
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "call":
+            return self._call(request)
+        if op == "reset":
+            self._reset()
+            return {"ok": True}
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        return {"ok": False, "error": f"Неизвестная операция: {op}"}
+
+    def _call(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        module_name, _, func_name = request["entrypoint"].partition(":")
+        os.chdir(self._workdir)
+        # Контекст трассировки родителя доступен коду инструмента как TRACEPARENT
+        traceparent = (request.get("trace") or {}).get("traceparent")
+        if traceparent:
+            os.environ["TRACEPARENT"] = traceparent
+        started_ns = time.time_ns()
+        try:
+            # stdout зарезервирован под протокол
+            with contextlib.redirect_stdout(sys.stderr):
+                func = getattr(importlib.import_module(module_name), func_name)
+                result = func(**request.get("args", {}))
+                if inspect.isawaitable(result):
+                    result = asyncio.run(_await(result))
+            response = {"ok": True, "result": result}
+        except Exception as e:
+            response = {
+                "ok": False,
+                "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc(limit=5)
+            }
+        finally:
+            os.environ.pop("TRACEPARENT", None)
+        response["started_ns"] = started_ns
+        response["finished_ns"] = time.time_ns()
+        return response
+
+    def _reset(self):
+        """Вернуть воркер в исходное состояние"""
+        for name in set(sys.modules) - self._baseline_modules:
+            sys.modules.pop(name, None)
+
+        os.environ.clear()
+        os.environ.update(self._baseline_env)
+        os.chdir(self._baseline_cwd)
+
+        shutil.rmtree(self._workdir, ignore_errors=True)
+        self._workdir = tempfile.mkdtemp(prefix="xio_sandbox_")
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+def main():
+    runner = SandboxRunner()
+    out = sys.stdout
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            response = runner.handle(json.loads(line))
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        out.write(json.dumps(response, ensure_ascii=False, default=str) + "\n")
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
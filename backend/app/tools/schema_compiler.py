@@ -0,0 +1,184 @@
+"""
+Компиляция JSON Schema инструментов в функции-валидаторы
+"""
+
+import re
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List
+
+# Валидатор принимает значение и путь, возвращает список ошибок
+Validator = Callable[[Any, str], List[str]]
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "null": lambda v: v is None,
+}
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_URI_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://\S+$")
+
+
+def _check_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _check_datetime(value: str) -> bool:
+    try:
+        datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return True
+    except ValueError:
+        return False
+
+
+_FORMAT_CHECKS: Dict[str, Callable[[str], bool]] = {
+    "date": _check_date,
+    "date-time": _check_datetime,
+    "email": lambda v: bool(_EMAIL_RE.match(v)),
+    "uri": lambda v: bool(_URI_RE.match(v)),
+}
+
+
+class SchemaValidationError(ValueError):
+    """Аргументы инструмента не соответствуют JSON Schema"""
+
+    def __init__(self, definition_id: str, errors: List[str]):
+        self.definition_id = definition_id
+        self.errors = errors
+        super().__init__(f"Аргументы {definition_id} не прошли валидацию: {'; '.join(errors)}")
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """
+    Компилирует JSON Schema в дерево замыканий.
+
+    Схема разбирается один раз; при валидации не выполняется разбор ключей схемы.
+    Поддерживается подмножество, используемое в определениях инструментов:
+    type, properties, required, additionalProperties, items, enum,
+    minItems/maxItems, minLength/maxLength, minimum/maximum, format.
+    """
+    checks: List[Validator] = []
+
+    schema_type = schema.get("type")
+    if schema_type is not None:
+        types = schema_type if isinstance(schema_type, list) else [schema_type]
+        type_checks = [_TYPE_CHECKS[t] for t in types if t in _TYPE_CHECKS]
+
+        def check_type(value: Any, path: str) -> List[str]:
+            if any(check(value) for check in type_checks):
+                return []
+            return [f"{path}: ожидался тип {'|'.join(types)}"]
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value: Any, path: str) -> List[str]:
+            return [] if value in allowed else [f"{path}: значение не из {allowed}"]
+
+        checks.append(check_enum)
+
+    if "minLength" in schema or "maxLength" in schema:
+        min_len = schema.get("minLength", 0)
+        max_len = schema.get("maxLength")
+
+        def check_length(value: Any, path: str) -> List[str]:
+            if not isinstance(value, str):
+                return []
+            if len(value) < min_len:
+                return [f"{path}: длина меньше {min_len}"]
+            if max_len is not None and len(value) > max_len:
+                return [f"{path}: длина больше {max_len}"]
+            return []
+
+        checks.append(check_length)
+
+    if "format" in schema and schema["format"] in _FORMAT_CHECKS:
+        fmt = schema["format"]
+        format_check = _FORMAT_CHECKS[fmt]
+
+        def check_format(value: Any, path: str) -> List[str]:
+            if isinstance(value, str) and not format_check(value):
+                return [f"{path}: неверный формат {fmt}"]
+            return []
+
+        checks.append(check_format)
+
+    if "minimum" in schema or "maximum" in schema:
+        minimum = schema.get("minimum")
+        maximum = schema.get("maximum")
+
+        def check_range(value: Any, path: str) -> List[str]:
+            if not _TYPE_CHECKS["number"](value):
+                return []
+            if minimum is not None and value < minimum:
+                return [f"{path}: меньше {minimum}"]
+            if maximum is not None and value > maximum:
+                return [f"{path}: больше {maximum}"]
+            return []
+
+        checks.append(check_range)
+
+    if "properties" in schema or "required" in schema or "additionalProperties" in schema:
+        properties = {
+            name: compile_schema(sub_schema)
+            for name, sub_schema in schema.get("properties", {}).items()
+        }
+        required = list(schema.get("required", []))
+        allow_additional = schema.get("additionalProperties", True) is not False
+
+        def check_object(value: Any, path: str) -> List[str]:
+            if not isinstance(value, dict):
+                return []
+            errors = [f"{path}.{name}: обязательное поле" for name in required if name not in value]
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is not None:
+                    errors.extend(validator(item, f"{path}.{name}"))
+                elif not allow_additional:
+                    errors.append(f"{path}.{name}: лишнее поле")
+            return errors
+
+        checks.append(check_object)
+
+    if "items" in schema or "minItems" in schema or "maxItems" in schema:
+        items_validator = compile_schema(schema["items"]) if "items" in schema else None
+        min_items = schema.get("minItems", 0)
+        max_items = schema.get("maxItems")
+
+        def check_array(value: Any, path: str) -> List[str]:
+            if not isinstance(value, list):
+                return []
+            errors = []
+            if len(value) < min_items:
+                errors.append(f"{path}: элементов меньше {min_items}")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: элементов больше {max_items}")
+            if items_validator is not None:
+                for idx, item in enumerate(value):
+                    errors.extend(items_validator(item, f"{path}[{idx}]"))
+            return errors
+
+        checks.append(check_array)
+
+    def validate(value: Any, path: str = "$") -> List[str]:
+        errors: List[str] = []
+        for check in checks:
+            found = check(value, path)
+            if found:
+                errors.extend(found)
+                # После ошибки типа остальные проверки бессмысленны
+                if check is checks[0] and schema_type is not None:
+                    break
+        return errors
+
+    return validate
@@ -5,12 +5,67 @@ WebSocket брокер для XIO событий
 import asyncio
 import json
 import logging
-from typing import Dict, Set, Any, Optional
+import time
+from typing import Awaitable, Callable, Dict, List, Set, Any, Optional
 from datetime import datetime
 from fastapi import WebSocket
+from opentelemetry.trace import SpanKind
+
+from app.config.settings import get_settings
+from app.observability.metrics import metrics_registry
+from app.observability.tracing import extract_context, get_tracer, inject_context, perf_to_ns, record_span
 
 logger = logging.getLogger(__name__)
 
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+FANOUT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+# Целевая задержка доставки события в сокет - 250 мс
+DELIVERY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+TRANSFORM_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01)
+# Сколько ждать подписчиков при остановке брокера, секунд
+SUBSCRIBER_DRAIN_TIMEOUT = 5.0
+
+
+class LatencyStats:
+    """
+    Текущая латентность доставки для комнаты или подключения.
+
+    Экспоненциальное среднее отражает состояние "прямо сейчас",
+    max - худший случай с момента подключения.
+    """
+
+    __slots__ = ("sends", "send_ewma", "delivery_ewma", "delivery_max", "updated_at")
+
+    ALPHA = 0.2
+
+    def __init__(self):
+        self.sends = 0
+        self.send_ewma = 0.0
+        self.delivery_ewma = 0.0
+        self.delivery_max = 0.0
+        self.updated_at = 0.0
+
+    def observe(self, send_time: float, delivery: float):
+        if self.sends:
+            self.send_ewma += self.ALPHA * (send_time - self.send_ewma)
+            self.delivery_ewma += self.ALPHA * (delivery - self.delivery_ewma)
+        else:
+            self.send_ewma = send_time
+            self.delivery_ewma = delivery
+        self.delivery_max = max(self.delivery_max, delivery)
+        self.sends += 1
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sends": self.sends,
+            "send_ms": round(self.send_ewma * 1000, 3),
+            "delivery_ms": round(self.delivery_ewma * 1000, 3),
+            "delivery_max_ms": round(self.delivery_max * 1000, 3),
+            "updated_at": datetime.fromtimestamp(self.updated_at).isoformat() if self.updated_at else None
+        }
+
 
 class WSConnectionManager:
     """Менеджер WebSocket подключений для meeting rooms"""
@@ -20,6 +75,9 @@ class WSConnectionManager:
         self._rooms: Dict[str, Set[WebSocket]] = {}
         # websocket -> meeting_id mapping для быстрого поиска
         self._connections: Dict[WebSocket, str] = {}
+        # Текущая латентность доставки по комнатам и подключениям
+        self._room_latency: Dict[str, LatencyStats] = {}
+        self._connection_latency: Dict[WebSocket, LatencyStats] = {}
     
     async def connect(self, websocket: WebSocket, meeting_id: str):
         """Подключить WebSocket к комнате встречи"""
@@ -53,28 +111,71 @@ class WSConnectionManager:
             # Удаляем пустые комнаты
             if not self._rooms[meeting_id]:
                 del self._rooms[meeting_id]
+                self._room_latency.pop(meeting_id, None)
             
             logger.info(f"WebSocket отключен от meeting {meeting_id}")
         
         if websocket in self._connections:
             del self._connections[websocket]
+        self._connection_latency.pop(websocket, None)
     
-    async def broadcast_to_meeting(self, meeting_id: str, message: Dict[str, Any]):
-        """Отправить сообщение всем подключенным к встрече"""
+    async def broadcast_to_meeting(self,
+                                   meeting_id: str,
+                                   message: Dict[str, Any],
+                                   emitted_at: Optional[float] = None):
+        """
+        Отправить сообщение всем подключенным к встрече.
+        
+        emitted_at - отметка perf_counter() при emit_event: задержка доставки
+        считается от нее до записи в каждый сокет.
+        """
         if meeting_id not in self._rooms:
             logger.warning(f"Нет активных подключений для meeting {meeting_id}")
             return
         
         # Копируем set чтобы избежать изменения во время итерации
         connections = self._rooms[meeting_id].copy()
+        started = time.perf_counter()
+        
+        event_type = message.get("type")
+        send_histogram = metrics_registry.histogram("ws_send_seconds", event_type=event_type)
+        delivery_histogram = metrics_registry.histogram(
+            "event_delivery_seconds", buckets=DELIVERY_BUCKETS, event_type=event_type
+        )
+        room_latency = self._room_latency.get(meeting_id)
+        if room_latency is None:
+            room_latency = self._room_latency[meeting_id] = LatencyStats()
         
+        tracer = get_tracer()
         failed_connections = []
-        for websocket in connections:
-            try:
-                await self._send_to_websocket(websocket, message)
-            except Exception as e:
-                logger.error(f"Ошибка отправки в WebSocket: {e}")
-                failed_connections.append(websocket)
+        with tracer.start_as_current_span("ws.broadcast", attributes={
+            "xio.meeting_id": meeting_id,
+            "xio.event_type": event_type,
+            "xio.fanout": len(connections)
+        }):
+            for websocket in connections:
+                send_started = time.perf_counter()
+                try:
+                    with tracer.start_as_current_span("ws.send"):
+                        await self._send_to_websocket(websocket, message)
+                except Exception as e:
+                    logger.error(f"Ошибка отправки в WebSocket: {e}")
+                    failed_connections.append(websocket)
+                    continue
+                
+                sent_at = time.perf_counter()
+                send_time = sent_at - send_started
+                delivery = sent_at - (emitted_at if emitted_at is not None else send_started)
+                send_histogram.observe(send_time)
+                delivery_histogram.observe(delivery)
+                room_latency.observe(send_time, delivery)
+                connection_latency = self._connection_latency.get(websocket)
+                if connection_latency is None:
+                    connection_latency = self._connection_latency[websocket] = LatencyStats()
+                connection_latency.observe(send_time, delivery)
+        
+        metrics_registry.histogram("ws_broadcast_seconds").observe(time.perf_counter() - started)
+        metrics_registry.histogram("ws_broadcast_fanout", buckets=FANOUT_BUCKETS).observe(len(connections))
         
         # Удаляем сломанные подключения
         for websocket in failed_connections:
@@ -88,6 +189,25 @@ class WSConnectionManager:
             logger.error(f"Не удалось отправить сообщение в WebSocket: {e}")
             raise
     
+    def get_latency_report(self, limit: int = 10) -> Dict[str, Any]:
+        """Самые медленные комнаты и подключения по текущей задержке доставки"""
+        rooms = sorted(self._room_latency.items(), key=lambda item: item[1].delivery_ewma, reverse=True)
+        connections = sorted(self._connection_latency.items(), key=lambda item: item[1].delivery_ewma, reverse=True)
+        return {
+            "rooms": [
+                {"meeting_id": meeting_id, "connections": len(self._rooms.get(meeting_id, ())), **stats.to_dict()}
+                for meeting_id, stats in rooms[:limit]
+            ],
+            "connections": [
+                {
+                    "meeting_id": self._connections.get(websocket),
+                    "client": _client_address(websocket),
+                    **stats.to_dict()
+                }
+                for websocket, stats in connections[:limit]
+            ]
+        }
+    
     def get_room_info(self, meeting_id: str) -> Dict[str, Any]:
         """Получить информацию о комнате"""
         return {
@@ -97,6 +217,67 @@ class WSConnectionManager:
         }
 
 
+def _client_address(websocket: WebSocket) -> str:
+    client = getattr(websocket, "client", None)
+    if client:
+        return f"{client.host}:{client.port}"
+    return f"ws-{id(websocket):x}"
+
+
+class _Subscription:
+    """
+    Подписчик брокера со своей ограниченной очередью и задачей-обработчиком.
+
+    Медленный подписчик не задерживает остальных. Переполненная очередь
+    надежного подписчика (журнал run, уведомления) притормаживает рассылку,
+    а lossy-подписчик (best effort) теряет события.
+    """
+
+    def __init__(self, handler: EventHandler, lossy: bool, maxsize: int):
+        self.handler = handler
+        self.lossy = lossy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def name(self) -> str:
+        return getattr(self.handler, "__qualname__", repr(self.handler))
+
+    async def put(self, event: Dict[str, Any]):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        try:
+            self.queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            if self.lossy:
+                metrics_registry.counter("broker_subscriber_dropped_total", event_type=event.get("type")).inc()
+                logger.warning(f"Очередь подписчика {self.name} переполнена, событие {event.get('type')} пропущено")
+                return
+        metrics_registry.counter("broker_subscriber_backpressure_total", event_type=event.get("type")).inc()
+        await self.queue.put(event)
+
+    async def _run(self):
+        """Передавать события подписчику по порядку; ошибка подписчика не останавливает очередь"""
+        while True:
+            event = await self.queue.get()
+            try:
+                await self.handler(event)
+            except Exception as e:
+                logger.error(f"Ошибка подписчика события {event.get('type')}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
 class XIOEventBroker:
     """Брокер событий для координации между оркестратором и WebSocket"""
     
@@ -104,6 +285,38 @@ class XIOEventBroker:
         self.connection_manager = connection_manager
         self._event_queue: asyncio.Queue = asyncio.Queue()
         self._is_processing = False
+        self._processing_task: Optional[asyncio.Task] = None
+        # тип внутреннего события -> подписчики (уведомления, журнал run и т.д.);
+        # у каждого подписчика своя очередь, чтобы он не задерживал рассылку в сокеты
+        self._subscribers: Dict[str, List[_Subscription]] = {}
+        self._subscriptions: Dict[EventHandler, _Subscription] = {}
+        # message_id -> накопленные части потокового ответа до следующего кадра
+        self._delta_buffers: Dict[str, Dict[str, Any]] = {}
+        self.delta_flush_interval = get_settings().STREAM_DELTA_FLUSH_MS / 1000.0
+    
+    def subscribe(self, event_type: str, handler: EventHandler, lossy: bool = False):
+        """
+        Подписаться на внутренние события заданного типа.
+
+        lossy=True - подписчик best effort: при переполнении его очереди
+        события теряются, а не притормаживают рассылку.
+        """
+        subscription = self._subscriptions.get(handler)
+        if subscription is None:
+            subscription = _Subscription(handler, lossy, get_settings().BROKER_SUBSCRIBER_QUEUE)
+            self._subscriptions[handler] = subscription
+        self._subscribers.setdefault(event_type, []).append(subscription)
+    
+    def unsubscribe(self, event_type: str, handler: EventHandler):
+        """Отписаться от событий"""
+        subscription = self._subscriptions.get(handler)
+        subscriptions = self._subscribers.get(event_type, [])
+        if subscription in subscriptions:
+            subscriptions.remove(subscription)
+        if subscription is not None and not any(subscription in subs for subs in self._subscribers.values()):
+            del self._subscriptions[handler]
+            if subscription.task is not None:
+                subscription.task.cancel()
     
     async def start_processing(self):
         """Запустить обработку событий"""
@@ -111,7 +324,7 @@ class XIOEventBroker:
             return
         
         self._is_processing = True
-        asyncio.create_task(self._process_events())
+        self._processing_task = asyncio.create_task(self._process_events())
         logger.info("Запущена обработка XIO событий")
     
     async def _process_events(self):
@@ -119,28 +332,143 @@ class XIOEventBroker:
         while self._is_processing:
             try:
                 # Ждем события из очереди
-                event = await asyncio.wait_for(self._event_queue.get(), timeout=1.0)
-                await self._handle_event(event)
+                enqueued_at, event, carrier = await asyncio.wait_for(self._event_queue.get(), timeout=1.0)
+                metrics_registry.gauge("broker_queue_depth").set(self._event_queue.qsize())
+                metrics_registry.histogram(
+                    "broker_queue_wait_seconds", event_type=event.get("type")
+                ).observe(time.perf_counter() - enqueued_at)
+                if carrier:
+                    await self._handle_traced(event, enqueued_at, carrier)
+                else:
+                    await self._handle_event(event, enqueued_at)
             except asyncio.TimeoutError:
                 # Нормальный timeout для проверки флага
                 continue
             except Exception as e:
                 logger.error(f"Ошибка обработки события: {e}")
     
-    async def _handle_event(self, event: Dict[str, Any]):
+    async def _handle_traced(self, event: Dict[str, Any], enqueued_at: float, carrier: Dict[str, str]):
+        """Обработка события в контексте трассировки, пришедшем через очередь"""
+        parent = extract_context(carrier)
+        attributes = {"xio.event_type": event.get("type"), "xio.meeting_id": event.get("meeting_id") or ""}
+        record_span("broker.queue_wait", perf_to_ns(enqueued_at), time.time_ns(), parent, attributes)
+        with get_tracer().start_as_current_span(
+            "broker.handle_event", context=parent, kind=SpanKind.CONSUMER, attributes=attributes
+        ):
+            await self._handle_event(event, enqueued_at)
+    
+    async def _handle_event(self, event: Dict[str, Any], enqueued_at: Optional[float] = None):
         """Обработать событие и отправить в WebSocket"""
+        await self._dispatch_to_subscribers(event)
+        
         meeting_id = event.get("meeting_id")
         if not meeting_id:
             logger.warning("Событие без meeting_id, пропускаем")
             return
         
+        event_type = event.get("type")
+        if event_type == "chat_message_delta":
+            await self._buffer_delta(event, enqueued_at)
+            return
+        if event_type == "_flush_delta":
+            await self._flush_delta(event["message_id"])
+            return
+        if event_type == "agent_message" and event.get("message_id"):
+            # Финальное сообщение несет весь текст - недоотправленные части не нужны
+            self._discard_delta(event["message_id"])
+        if event_type == "chat_message_aborted":
+            self._discard_delta(event["message_id"])
+        
         # Преобразуем в формат StreamEvent
+        transform_started = time.perf_counter()
         stream_event = self._to_stream_event(event)
+        metrics_registry.histogram(
+            "broker_transform_seconds", buckets=TRANSFORM_BUCKETS, event_type=stream_event["type"]
+        ).observe(time.perf_counter() - transform_started)
         
         # Отправляем в комнату встречи
-        await self.connection_manager.broadcast_to_meeting(meeting_id, stream_event)
+        await self.connection_manager.broadcast_to_meeting(meeting_id, stream_event, emitted_at=enqueued_at)
         logger.debug(f"Событие отправлено в meeting {meeting_id}: {stream_event['type']}")
     
+    async def _buffer_delta(self, event: Dict[str, Any], enqueued_at: Optional[float] = None):
+        """
+        Накопить часть потокового ответа.
+
+        Части одного сообщения склеиваются в кадр раз в delta_flush_interval;
+        сброс кадра проходит через ту же очередь, поэтому кадры не обгоняют
+        финальный chat_message.
+        """
+        message_id = event["message_id"]
+        buffer = self._delta_buffers.get(message_id)
+        if buffer is None:
+            buffer = {
+                "meeting_id": event["meeting_id"],
+                "run_id": event.get("run_id"),
+                "agent_id": event.get("agent_id"),
+                "parts": [],
+                "offset": 0,
+                "seq": 0,
+                "timer": None,
+                "emitted_at": None
+            }
+            self._delta_buffers[message_id] = buffer
+        
+        if not buffer["parts"]:
+            # Задержка кадра считается от самой старой части в нем
+            buffer["emitted_at"] = enqueued_at
+        buffer["parts"].append(event.get("delta", ""))
+        
+        if self.delta_flush_interval <= 0:
+            await self._flush_delta(message_id)
+        elif buffer["timer"] is None:
+            buffer["timer"] = asyncio.get_running_loop().call_later(
+                self.delta_flush_interval,
+                self._enqueue,
+                {"type": "_flush_delta", "meeting_id": event["meeting_id"], "message_id": message_id}
+            )
+    
+    async def _flush_delta(self, message_id: str):
+        """Отправить накопленные части одним кадром chat_message_delta"""
+        buffer = self._delta_buffers.get(message_id)
+        if buffer is None or not buffer["parts"]:
+            return
+        
+        delta = "".join(buffer["parts"])
+        frame = {
+            "type": "chat_message_delta",
+            "payload": {
+                "id": message_id,
+                "run_id": buffer["run_id"],
+                "agent_id": buffer["agent_id"],
+                "delta": delta,
+                "offset": buffer["offset"],
+                "seq": buffer["seq"]
+            }
+        }
+        buffer["parts"] = []
+        buffer["offset"] += len(delta)
+        buffer["seq"] += 1
+        buffer["timer"] = None
+        
+        await self.connection_manager.broadcast_to_meeting(
+            buffer["meeting_id"], frame, emitted_at=buffer["emitted_at"]
+        )
+    
+    def _discard_delta(self, message_id: str):
+        buffer = self._delta_buffers.pop(message_id, None)
+        if buffer and buffer["timer"] is not None:
+            buffer["timer"].cancel()
+    
+    async def _dispatch_to_subscribers(self, event: Dict[str, Any]):
+        """Поставить событие в очереди подписчиков (ждет только переполненную очередь надежного подписчика)"""
+        for subscription in list(self._subscribers.get(event.get("type"), [])):
+            await subscription.put(event)
+    
+    async def drain_subscribers(self):
+        """Дождаться, пока подписчики обработают уже поставленные события"""
+        for subscription in list(self._subscriptions.values()):
+            await subscription.queue.join()
+    
     def _to_stream_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
         """Преобразовать внутреннее событие в StreamEvent"""
         event_type = event.get("type", "unknown")
@@ -155,7 +483,19 @@ class XIOEventBroker:
                     "role": event.get("role", "assistant"),
                     "content": event.get("content"),
                     "created_at": event.get("timestamp", datetime.now().isoformat()),
-                    "reply_to": event.get("reply_to")
+                    "reply_to": event.get("reply_to"),
+                    "ttft_ms": event.get("ttft_ms")
+                }
+            }
+        
+        elif event_type == "chat_message_aborted":
+            return {
+                "type": "chat_message_aborted",
+                "payload": {
+                    "id": event.get("message_id"),
+                    "run_id": event.get("run_id"),
+                    "agent_id": event.get("agent_id"),
+                    "reason": event.get("reason")
                 }
             }
         
@@ -178,7 +518,8 @@ class XIOEventBroker:
                     "tool_id": event.get("tool_id"),
                     "agent_id": event.get("agent_id"),
                     "args_masked": event.get("args_masked", {}),
-                    "progress": event.get("progress", {})
+                    "progress": event.get("progress", {}),
+                    "cache": event.get("cache")
                 }
             }
         
@@ -201,7 +542,9 @@ class XIOEventBroker:
                 "payload": {
                     "run_id": event.get("run_id"),
                     "status": event.get("status"),
-                    "meeting_id": event.get("meeting_id")
+                    "meeting_id": event.get("meeting_id"),
+                    "reason": event.get("reason"),
+                    "budget": event.get("budget")
                 }
             }
         
@@ -214,11 +557,48 @@ class XIOEventBroker:
     
     async def emit_event(self, event: Dict[str, Any]):
         """Добавить событие в очередь для обработки"""
-        await self._event_queue.put(event)
+        with get_tracer().start_as_current_span(
+            "broker.emit",
+            kind=SpanKind.PRODUCER,
+            attributes={"xio.event_type": event.get("type"), "xio.meeting_id": event.get("meeting_id") or ""}
+        ):
+            # Контекст едет вместе с событием и восстанавливается в обработчике
+            self._enqueue(event, inject_context())
+    
+    def _enqueue(self, event: Dict[str, Any], carrier: Optional[Dict[str, str]] = None):
+        # Очередь неограничена: put_nowait не блокирует
+        self._event_queue.put_nowait((time.perf_counter(), event, carrier))
+        metrics_registry.gauge("broker_queue_depth").set(self._event_queue.qsize())
+    
+    def get_health(self) -> Dict[str, Any]:
+        """Состояние цикла обработки событий (для /ready)"""
+        task = self._processing_task
+        running = self._is_processing and task is not None and not task.done()
+        return {
+            "running": running,
+            "queue_depth": self._event_queue.qsize(),
+            "rooms": len(self.connection_manager._rooms)
+        }
     
     async def stop_processing(self):
         """Остановить обработку событий"""
         self._is_processing = False
+        if self._processing_task is not None:
+            self._processing_task.cancel()
+            try:
+                await self._processing_task
+            except asyncio.CancelledError:
+                pass
+            self._processing_task = None
+        try:
+            await asyncio.wait_for(self.drain_subscribers(), timeout=SUBSCRIBER_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            pending = sum(subscription.queue.qsize() for subscription in self._subscriptions.values())
+            logger.warning(f"Подписчики не успели обработать {pending} событий")
+        for subscription in list(self._subscriptions.values()):
+            await subscription.stop()
+        for message_id in list(self._delta_buffers):
+            self._discard_delta(message_id)
         logger.info("Остановлена обработка XIO событий")
 
 
@@ -0,0 +1,110 @@
+"""
+Бенчмарк полнотекстового поиска по сообщениям
+
+Запуск (10 млн сообщений, SQLite FTS5):
+    python benchmark_search.py --messages 10000000 --backend sqlite --path /tmp/search_bench.sqlite3
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+from app.storage.text_search import InvertedIndex, SearchDocument, SearchFilter, SQLiteFTSIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VOCABULARY = (
+    "архитектура микросервисы монолит кеширование база данных репликация шардирование очередь "
+    "сообщений деплой kubernetes мониторинг алерты трассировка бюджет срок риск задача решение "
+    "миграция postgres redis latency throughput api gateway авторизация тестирование релиз "
+    "rollback инцидент метрики логирование нагрузка масштабирование контейнер ci cd pipeline"
+).split()
+AGENTS = ("moderator", "architect", "devops", "security", "scribe", "product")
+QUERIES = (
+    "репликация postgres", "kubernetes деплой", "риск миграции", "кеширование redis latency",
+    "решение архитектура", "rollback релиза", "мониторинг алерты", "бюджет сроки",
+)
+
+
+def generate(count: int, meetings: int, seed: int = 42):
+    rng = random.Random(seed)
+    start = time.time() - 365 * 86400
+    for i in range(count):
+        words = rng.choices(VOCABULARY, k=rng.randint(8, 40))
+        yield SearchDocument(
+            id=f"msg_{i}",
+            text=" ".join(words),
+            meeting_id=f"meet_{i % meetings}",
+            agent_id=rng.choice(AGENTS),
+            role="assistant",
+            type="chat",
+            ts=start + i * (365 * 86400 / count)
+        )
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args):
+    if args.backend == "sqlite":
+        if os.path.exists(args.path):
+            os.remove(args.path)
+        index = SQLiteFTSIndex(args.path)
+    else:
+        index = InvertedIndex()
+
+    logger.info(f"Индексация {args.messages} сообщений ({args.backend})...")
+    started = time.perf_counter()
+    batch = []
+    for document in generate(args.messages, args.meetings):
+        batch.append(document)
+        if len(batch) >= args.batch:
+            await index.add(batch)
+            batch = []
+    if batch:
+        await index.add(batch)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Индексация: {elapsed:.1f} с, {args.messages / elapsed:.0f} сообщений/с")
+
+    rng = random.Random(7)
+    scenarios = {
+        "без фильтров": lambda: None,
+        "встреча": lambda: SearchFilter(meeting_id=f"meet_{rng.randrange(args.meetings)}"),
+        "агент + месяц": lambda: SearchFilter(
+            agent_id=rng.choice(AGENTS), ts_from=time.time() - 60 * 86400, ts_to=time.time() - 30 * 86400
+        ),
+    }
+    for name, make_filter in scenarios.items():
+        latencies = []
+        for _ in range(args.queries):
+            query = rng.choice(QUERIES)
+            t0 = time.perf_counter()
+            await index.search(query, make_filter(), limit=20)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        logger.info(
+            f"Запросы [{name}]: p50={percentile(latencies, 0.5):.1f} мс, "
+            f"p99={percentile(latencies, 0.99):.1f} мс"
+        )
+
+    await index.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска по сообщениям")
+    parser.add_argument("--messages", type=int, default=10_000_000)
+    parser.add_argument("--meetings", type=int, default=50_000)
+    parser.add_argument("--backend", choices=("sqlite", "memory"), default="sqlite")
+    parser.add_argument("--path", default="/tmp/search_bench.sqlite3")
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Микробенчмарки горячих путей сервисов XIO
+
+Каждый сценарий измеряется на нескольких масштабах данных (1k ... 1M).
+Время - медиана по повторам в пересчете на один вызов.
+
+Запуск и сохранение базовой линии:
+    python benchmark_services.py --save benchmark_services_baseline.json
+
+Проверка против базовой линии (код выхода 1 при замедлении сверх порога):
+    python benchmark_services.py --check benchmark_services_baseline.json --threshold 0.25
+
+Полный прогон до 1M (долго, несколько ГБ памяти):
+    python benchmark_services.py --sizes 1000,10000,100000,1000000
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.models.artifacts import Alternative, Risk
+from app.models.messages import MessageRole
+from app.models.participants import ParticipantRole
+from app.models.runs import RunEventType
+from app.models.validators import ValidatedDecisionLog
+from app.observability.metrics import metrics_registry
+from app.services.messages import MessageService
+from app.services.normalizer import ActionItemNormalizer
+from app.services.participants import ParticipantService
+from app.services.run_log import RunLog
+from app.storage.run_state import MemoryRunStateStore
+from app.ws.broker import WSConnectionManager, XIOEventBroker
+
+logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+# Фразы протокола консилиума: часть содержит формулировки задач и сроков
+TRANSCRIPT_SENTENCES = (
+    "Предлагаю обсудить архитектуру платежного сервиса",
+    "Необходимо настроить репликацию PostgreSQL до конца недели",
+    "Считаю, что монолит на текущем этапе проще сопровождать",
+    "Нужно срочно исследовать причины роста латентности API",
+    "Задача: подготовить план миграции на Kubernetes",
+    "Риски по срокам пока оцениваю как умеренные",
+    "Следует внедрить трассировку запросов в течение 2 недель",
+    "Согласен с коллегой, кеширование даст основной выигрыш",
+    "Желательно разработать нагрузочный тест для очереди сообщений",
+    "По бюджету вопросов нет, команда укладывается",
+    "TODO: описать процедуру отката релиза",
+    "Давайте зафиксируем решение и перейдем к следующему вопросу",
+)
+
+
+@dataclass
+class Case:
+    """
+    Сценарий: setup(size) готовит данные и возвращает измеряемую функцию.
+
+    Если у функции есть close(), она вызывается после замера.
+    """
+    name: str
+    description: str
+    setup: Callable[[int], Callable[[], Any]]
+
+
+def _message_store(size: int) -> MessageService:
+    service = MessageService()
+    meetings = max(1, size // 1000)
+    for i in range(size):
+        service.create_message(
+            meeting_id=f"meet_{i % meetings}",
+            run_id="run_bench",
+            agent_id=f"expert_{i % 5}",
+            role=MessageRole.ASSISTANT,
+            content=TRANSCRIPT_SENTENCES[i % len(TRANSCRIPT_SENTENCES)]
+        )
+    return service
+
+
+def setup_create_message(size: int):
+    service = _message_store(size)
+    counter = iter(range(sys.maxsize))
+
+    def run():
+        service.create_message(
+            meeting_id=f"meet_{next(counter) % max(1, size // 1000)}",
+            run_id="run_bench",
+            agent_id="expert_1",
+            role=MessageRole.ASSISTANT,
+            content=TRANSCRIPT_SENTENCES[0]
+        )
+    return run
+
+
+def setup_get_messages(size: int):
+    service = _message_store(size)
+    return lambda: service.get_messages("meet_0", limit=50)
+
+
+def setup_next_speaker(size: int):
+    service = ParticipantService()
+    roles = (ParticipantRole.MODERATOR, ParticipantRole.EXPERT, ParticipantRole.EXPERT, ParticipantRole.SCRIBE)
+    participants = [
+        service.create_participant(f"agent_{i}", "meet_bench", roles[i % len(roles)], f"Агент {i}")
+        for i in range(size)
+    ]
+    service.create_speaking_order("meet_bench", participants)
+    return lambda: service.next_speaker("meet_bench")
+
+
+def russian_transcript(chars: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    parts, length = [], 0
+    while length < chars:
+        sentence = rng.choice(TRANSCRIPT_SENTENCES) + ". "
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)[:chars]
+
+
+def setup_extract_candidates(size: int):
+    normalizer = ActionItemNormalizer()
+    text = russian_transcript(size)
+    return lambda: normalizer.extract_candidates(text)
+
+
+def setup_decision_log(size: int):
+    alternatives = [
+        Alternative(option=f"Вариант {i}", pros=["быстрее"], cons=["дороже"]).model_dump()
+        for i in range(max(2, size // 2))
+    ]
+    risks = [
+        Risk(risk=f"Риск {i}", impact="high", probability="low", mitigation="мониторинг").model_dump()
+        for i in range(size // 2)
+    ]
+    payload = {
+        "meeting_id": "meet_bench",
+        "title": "Выбор архитектуры",
+        "alternatives": alternatives,
+        "rationale": "Минимальный риск при текущей нагрузке",
+        "decision": f"Вариант {len(alternatives) - 1}",
+        "risks": risks
+    }
+    return lambda: ValidatedDecisionLog.model_validate(payload)
+
+
+def _agent_events(count: int) -> List[Dict[str, Any]]:
+    kinds = (
+        {"type": "agent_message", "message_id": "msg_1", "agent_id": "expert_1", "content": TRANSCRIPT_SENTENCES[1]},
+        {"type": "tool_execution", "tool_id": "jira", "status": "running", "args_masked": {"project": "XIO"}},
+        {"type": "participant_status", "agent_id": "expert_2", "status": "speaking", "role": "expert"},
+        {"type": "run_status", "run_id": "run_bench", "status": "running"},
+    )
+    return [{**kinds[i % len(kinds)], "meeting_id": "meet_bench"} for i in range(count)]
+
+
+def setup_to_stream_event(size: int):
+    broker = XIOEventBroker(WSConnectionManager())
+    events = _agent_events(size)
+
+    def run():
+        for event in events:
+            broker._to_stream_event(event)
+    return run
+
+
+class _AsyncCall:
+    """Измеряемый вызов корутины на собственном event loop (loop живет до close())"""
+
+    def __init__(self, factory: Callable[[], Awaitable[Any]]):
+        self.factory = factory
+        self.loop = asyncio.new_event_loop()
+
+    def __call__(self):
+        return self.loop.run_until_complete(self.factory())
+
+    def close(self):
+        self.loop.close()
+
+
+class _NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        pass
+
+
+def setup_broadcast(size: int):
+    manager = WSConnectionManager()
+    for _ in range(size):
+        socket = _NullWebSocket()
+        manager._rooms.setdefault("meet_bench", set()).add(socket)
+        manager._connections[socket] = "meet_bench"
+    frame = XIOEventBroker(manager)._to_stream_event(_agent_events(1)[0])
+    return _AsyncCall(lambda: manager.broadcast_to_meeting("meet_bench", frame))
+
+
+def _run_log_store(size: int, snapshot_interval: int) -> MemoryRunStateStore:
+    store = MemoryRunStateStore()
+    log = RunLog(store)
+    log.settings = log.settings.model_copy(update={"RUN_SNAPSHOT_INTERVAL": snapshot_interval})
+
+    async def fill():
+        await log.start_run("run_bench", "meet_bench", "Архитектура")
+        for i in range(size):
+            await log.record("run_bench", RunEventType.MESSAGE, {"message_id": f"msg_{i}", "agent_id": f"expert_{i % 5}"})
+
+    asyncio.run(fill())
+    return store
+
+
+def setup_recover(size: int):
+    log = RunLog(_run_log_store(size, snapshot_interval=100))
+    return _AsyncCall(lambda: log.recover("run_bench"))
+
+
+def setup_replay_full(size: int):
+    # Без снимков: восстановление повторяет весь журнал
+    log = RunLog(_run_log_store(size, snapshot_interval=sys.maxsize))
+    return _AsyncCall(lambda: log.recover("run_bench"))
+
+
+CASES = (
+    Case("messages.create_message", "создание сообщения в хранилище из size сообщений", setup_create_message),
+    Case("messages.get_messages", "страница из 50 сообщений встречи в хранилище из size сообщений", setup_get_messages),
+    Case("participants.next_speaker", "смена спикера в очереди из size участников", setup_next_speaker),
+    Case("normalizer.extract_candidates", "извлечение задач из протокола длиной size символов", setup_extract_candidates),
+    Case("validators.decision_log", "валидация решения с size альтернативами и рисками", setup_decision_log),
+    Case("broker.to_stream_event", "преобразование size событий в StreamEvent", setup_to_stream_event),
+    Case("broker.broadcast", "рассылка кадра в комнату из size подключений", setup_broadcast),
+    Case("run_state.recover", "восстановление run из снимка и хвоста журнала из size событий", setup_recover),
+    Case("run_state.replay_full", "восстановление run повтором всего журнала из size событий", setup_replay_full),
+)
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    """Медиана и минимум времени одного вызова; число вызовов в замере подбирается под min_time"""
+    fn()
+    number = 1
+    while True:
+        elapsed = _timed(fn, number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+
+    samples = sorted(_timed(fn, number) / number for _ in range(repeat))
+    return {"median": samples[len(samples) // 2], "min": samples[0], "number": number}
+
+
+def _timed(fn: Callable[[], Any], number: int) -> float:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def run(sizes: List[int], cases: Optional[List[str]] = None, repeat: int = 5, min_time: float = 0.05) -> Dict:
+    """Прогнать сценарии на всех масштабах; ключ результата - "сценарий[size]" """
+    # Метрики горячих путей не должны влиять на замер
+    metrics_registry.enabled = False
+    logging.getLogger("app").setLevel(logging.WARNING)
+    results = {}
+    try:
+        for case in CASES:
+            if cases and case.name not in cases:
+                continue
+            for size in sizes:
+                fn = case.setup(size)
+                try:
+                    stats = measure(fn, repeat, min_time)
+                finally:
+                    close = getattr(fn, "close", None)
+                    if close is not None:
+                        close()
+                key = f"{case.name}[{size}]"
+                results[key] = stats
+                logger.info(f"{key}: {_format_seconds(stats['median'])} (x{stats['number']})")
+                del fn
+                gc.collect()
+    finally:
+        metrics_registry.enabled = True
+
+    return {
+        "benchmark": "services",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": results
+    }
+
+
+def check(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Сценарии, замедлившиеся относительно базовой линии больше чем на threshold (доля)"""
+    regressions = []
+    for key, stats in current["results"].items():
+        reference = baseline.get("results", {}).get(key)
+        if not reference:
+            continue
+        change = stats["median"] / reference["median"] - 1
+        if change > threshold:
+            regressions.append(
+                f"{key}: {_format_seconds(reference['median'])} -> {_format_seconds(stats['median'])} ({change:+.0%})"
+            )
+    return regressions
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.2f} мкс"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} мс"
+    return f"{seconds:.2f} с"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарки сервисов XIO")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument("--cases", help="имена сценариев через запятую (по умолчанию все)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="минимальная длительность одного замера, с")
+    parser.add_argument("--save", help="сохранить результат как базовую линию")
+    parser.add_argument("--check", help="сравнить с базовой линией")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое замедление (доля)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    cases = args.cases.split(",") if args.cases else None
+    report = run(sizes, cases, repeat=args.repeat, min_time=args.min_time)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"Базовая линия сохранена в {args.save}")
+
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            regressions = check(report, json.load(f), args.threshold)
+        if regressions:
+            logger.error("Замедления сверх порога:\n" + "\n".join(regressions))
+            sys.exit(1)
+        logger.info("Замедлений сверх порога нет")
+
+
+if __name__ == "__main__":
+    main()
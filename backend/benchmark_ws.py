@@ -0,0 +1,319 @@
+"""
+Нагрузочный бенчмарк WebSocket-комнат встреч
+
+Приложение поднимается в процессе, клиенты подключаются к
+/api/v1/meetings/{meeting_id}/stream напрямую через ASGI (без сети),
+события идут через event_broker. Результат - JSON для сравнения между коммитами.
+
+Запуск (5000 клиентов в 500 встречах, 2000 событий/с в течение 10 с):
+    python benchmark_ws.py --clients 5000 --meetings 500 --rate 2000 --duration 10 --output ws_load.json
+
+Сравнение с сохраненным результатом (код выхода 1 при регрессии):
+    python benchmark_ws.py --compare ws_load.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from app.main import create_app
+from app.observability.metrics import metrics_registry
+from app.ws.broker import event_broker
+
+logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+_EVENT_ID_RE = re.compile(r'"id":"bench_(\d+)"')
+
+# Метрики, по которым результаты сравниваются между коммитами: путь -> больше значит хуже
+COMPARED_METRICS = {
+    ("latency_ms", "all", "p50"): True,
+    ("latency_ms", "all", "p99"): True,
+    ("latency_ms", "clean_rooms", "p99"): True,
+    ("throughput", "deliveries_per_s"): False,
+    ("memory", "bytes_per_connection"): True,
+}
+
+
+class SimulatedClient:
+    """WebSocket-клиент встречи поверх ASGI-интерфейса приложения"""
+
+    def __init__(self, app, meeting_id: str, number: int, send_delay: float = 0.0):
+        self.app = app
+        self.meeting_id = meeting_id
+        self.number = number
+        # Медленный потребитель: запись в сокет занимает send_delay
+        self.send_delay = send_delay
+        self.received: List[tuple] = []
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._accepted = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        path = f"/api/v1/meetings/{self.meeting_id}/stream"
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 10000 + self.number),
+            "server": ("bench", 80),
+            "subprotocols": []
+        }
+        self._incoming.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(scope, self._receive, self._send))
+        await self._accepted.wait()
+
+    async def close(self):
+        self._incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        if self._task is not None:
+            await self._task
+
+    async def _receive(self):
+        return await self._incoming.get()
+
+    async def _send(self, message):
+        if message["type"] == "websocket.accept":
+            self._accepted.set()
+            return
+        if message["type"] != "websocket.send":
+            return
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        # Разбор текста откладывается до отчета, чтобы не нагружать цикл брокера
+        self.received.append((time.perf_counter(), message.get("text") or ""))
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {"count": len(ordered), "p50": at(0.5), "p90": at(0.9), "p99": at(0.99), "max": round(ordered[-1], 3)}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+async def open_clients(app, args, rng: random.Random) -> List[SimulatedClient]:
+    """Распределить клиентов по встречам; в доле встреч один клиент медленный"""
+    slow_meetings = set(rng.sample(range(args.meetings), int(args.meetings * args.slow_fraction)))
+    clients = []
+    for number in range(args.clients):
+        meeting = number % args.meetings
+        slow = meeting in slow_meetings and number < args.meetings
+        clients.append(SimulatedClient(
+            app,
+            f"meet_{meeting}",
+            number,
+            send_delay=args.slow_delay_ms / 1000.0 if slow else 0.0
+        ))
+
+    # Подключаемся пачками, чтобы не держать тысячи незавершенных рукопожатий
+    for start in range(0, len(clients), 500):
+        await asyncio.gather(*(client.connect() for client in clients[start:start + 500]))
+    return clients
+
+
+async def drive_events(args, rng: random.Random, emitted: Dict[int, float]) -> float:
+    """Равномерный поток agent_message по случайным встречам с темпом rate событий/с"""
+    content = "слово " * (args.payload_bytes // 12)
+    total = int(args.rate * args.duration)
+    tick = 0.01
+    per_tick = max(1, int(args.rate * tick))
+    started = time.perf_counter()
+    seq = 0
+
+    while seq < total:
+        for _ in range(min(per_tick, total - seq)):
+            meeting = rng.randrange(args.meetings)
+            emitted[seq] = time.perf_counter()
+            await event_broker.emit_event({
+                "type": "agent_message",
+                "meeting_id": f"meet_{meeting}",
+                "run_id": "run_bench",
+                "agent_id": "expert_1",
+                "message_id": f"bench_{seq}",
+                "content": content
+            })
+            seq += 1
+        # Держим темп по настенным часам, а не по числу тиков
+        lag = started + seq / args.rate - time.perf_counter()
+        await asyncio.sleep(max(lag, 0))
+
+    return time.perf_counter() - started
+
+
+async def run(args) -> Dict:
+    logging.getLogger("app").setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+    app = create_app()
+    metrics_registry.reset()
+    await event_broker.start_processing()
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    connect_started = time.perf_counter()
+    clients = await open_clients(app, args, rng)
+    connect_elapsed = time.perf_counter() - connect_started
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logger.info(f"Подключено {len(clients)} клиентов к {args.meetings} встречам за {connect_elapsed:.2f} с")
+
+    room_sizes: Dict[str, int] = {}
+    for client in clients:
+        room_sizes[client.meeting_id] = room_sizes.get(client.meeting_id, 0) + 1
+    slow_rooms = {client.meeting_id for client in clients if client.send_delay}
+    for client in clients:
+        client.received.clear()
+
+    emitted: Dict[int, float] = {}
+    meetings_of: Dict[int, str] = {}
+    max_queue = 0
+
+    async def sample_queue():
+        nonlocal max_queue
+        while True:
+            max_queue = max(max_queue, event_broker.get_health()["queue_depth"])
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample_queue())
+    emit_elapsed = await drive_events(args, rng, emitted)
+
+    # Ждем, пока очередь брокера опустеет
+    deadline = time.perf_counter() + args.drain_timeout
+    while time.perf_counter() < deadline and event_broker.get_health()["queue_depth"]:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    total_elapsed = time.perf_counter() - min(emitted.values())
+    sampler.cancel()
+
+    groups: Dict[str, List[float]] = {"all": [], "clean_rooms": [], "shared_rooms": [], "slow_clients": []}
+    deliveries = 0
+    for client in clients:
+        if client.send_delay:
+            group = "slow_clients"
+        elif client.meeting_id in slow_rooms:
+            group = "shared_rooms"
+        else:
+            group = "clean_rooms"
+        for received_at, text in client.received:
+            match = _EVENT_ID_RE.search(text)
+            if match is None:
+                continue
+            seq = int(match.group(1))
+            latency = (received_at - emitted[seq]) * 1000
+            groups["all"].append(latency)
+            groups[group].append(latency)
+            meetings_of[seq] = client.meeting_id
+            deliveries += 1
+
+    # Ожидаемое число доставок: событие уходит всем клиентам своей встречи
+    expected = sum(room_sizes[meeting_id] for meeting_id in meetings_of.values())
+    undelivered_events = len(emitted) - len(meetings_of)
+
+    for client in clients:
+        await client.close()
+    await event_broker.stop_processing()
+
+    report = {
+        "benchmark": "ws_load",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": vars(args),
+        "connections": len(clients),
+        "meetings": args.meetings,
+        "events": len(emitted),
+        "deliveries": deliveries,
+        "lost": {"events": undelivered_events, "deliveries": expected - deliveries},
+        "throughput": {
+            "events_per_s": round(len(emitted) / total_elapsed, 1),
+            "deliveries_per_s": round(deliveries / total_elapsed, 1),
+            "emit_seconds": round(emit_elapsed, 3),
+            "total_seconds": round(total_elapsed, 3)
+        },
+        "latency_ms": {name: percentiles(values) for name, values in groups.items()},
+        "memory": {
+            "bytes_per_connection": round((after - before) / max(len(clients), 1)),
+            "connect_seconds": round(connect_elapsed, 3)
+        },
+        "broker": {"max_queue_depth": max_queue}
+    }
+    return report
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Регрессии current относительно baseline сверх threshold (доля)"""
+    regressions = []
+    for path, higher_is_worse in COMPARED_METRICS.items():
+        old, new = baseline, current
+        for key in path:
+            old, new = old.get(key, {}), new.get(key, {})
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+            continue
+        change = (new - old) / old
+        worse = change > threshold if higher_is_worse else change < -threshold
+        line = f"{'.'.join(path)}: {old} -> {new} ({change:+.1%})"
+        logger.info(line)
+        if worse:
+            regressions.append(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк WebSocket-комнат")
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--meetings", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=2000, help="событий в секунду")
+    parser.add_argument("--duration", type=float, default=10.0, help="секунд генерации событий")
+    parser.add_argument("--payload-bytes", type=int, default=600)
+    parser.add_argument("--slow-fraction", type=float, default=0.05, help="доля встреч с медленным клиентом")
+    parser.add_argument("--slow-delay-ms", type=float, default=20.0)
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="файл для JSON-результата (по умолчанию stdout)")
+    parser.add_argument("--compare", help="JSON-результат предыдущего прогона")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение (доля)")
+    args = parser.parse_args()
+
+    baseline_path, threshold, output = args.compare, args.threshold, args.output
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), threshold)
+        if regressions:
+            logger.error("Регрессии:\n" + "\n".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Тесты для микробенчмарков сервисов (малые масштабы)
+"""
+
+import asyncio
+
+import benchmark_services
+from benchmark_services import CASES, check, run, russian_transcript
+from app.services.normalizer import ActionItemNormalizer
+
+def test_all_cases_run_on_small_sizes():
+    report = run([50], repeat=1, min_time=0.001)
+
+    assert set(report["results"]) == {f"{case.name}[50]" for case in CASES}
+    assert all(stats["median"] > 0 for stats in report["results"].values())
+
+def test_async_cases_close_their_event_loops(monkeypatch):
+    loops = []
+    new_event_loop = asyncio.new_event_loop
+
+    def tracked():
+        loop = new_event_loop()
+        loops.append(loop)
+        return loop
+
+    monkeypatch.setattr(benchmark_services.asyncio, "new_event_loop", tracked)
+    run([10], cases=["broker.broadcast", "run_state.recover", "run_state.replay_full"], repeat=1, min_time=0.001)
+
+    assert len(loops) >= 3
+    assert all(loop.is_closed() for loop in loops)
+
+def test_transcript_contains_tasks():
+    text = russian_transcript(2000)
+
+    assert len(text) == 2000
+    assert ActionItemNormalizer().extract_candidates(text)
+
+def test_check_reports_only_regressions_over_threshold():
+    baseline = {"results": {"a[1000]": {"median": 1e-3}, "b[1000]": {"median": 1e-3}}}
+    current = {"results": {
+        "a[1000]": {"median": 1.2e-3},
+        "b[1000]": {"median": 2e-3},
+        "c[1000]": {"median": 5e-3}
+    }}
+
+    regressions = check(current, baseline, threshold=0.25)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("b[1000]")
@@ -0,0 +1,201 @@
+"""
+Тесты бюджетов токенов и стоимости run и команды
+"""
+
+import asyncio
+
+import pytest
+from app.llm.client import ModelClient
+from app.llm.providers import MockModelProvider
+from app.models.llm import BudgetLevel, ModelRequest, ModelUsage
+from app.models.runs import RunStatus
+from app.orchestrator.admission import RunAdmission
+from app.orchestrator.budget import BudgetTracker
+from app.orchestrator.manager import BudgetExceededError, XIOOrchestrator
+from app.services.messages import MessageService
+from app.services.run_log import RunLog
+from app.storage.run_state import MemoryRunStateStore
+from app.ws.broker import WSConnectionManager, XIOEventBroker
+
+class RecordingBroker:
+    def __init__(self):
+        self.events = []
+
+    async def emit_event(self, event):
+        self.events.append(event)
+
+class RecordingContext:
+    def __init__(self):
+        self.scheduled = []
+        self.forgotten = []
+
+    def schedule_summarization(self, meeting_id, agent_id=None):
+        self.scheduled.append((meeting_id, agent_id))
+
+    def forget(self, meeting_id):
+        self.forgotten.append(meeting_id)
+
+def _tracker(**limits):
+    tracker = BudgetTracker()
+    tracker.settings = tracker.settings.model_copy(update=limits)
+    return tracker
+
+def _usage(run_id, prompt_tokens, completion_tokens, cost_usd=0.0):
+    return ModelUsage(
+        run_id=run_id, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cost_usd=cost_usd
+    )
+
+def _request(run_id, content):
+    return ModelRequest(
+        model="gpt-4",
+        messages=[{"role": "user", "content": content}],
+        run_id=run_id,
+        agent_id="expert_1",
+        cacheable=False
+    )
+
+@pytest.fixture
+def harness(monkeypatch):
+    tracker = _tracker()
+    log = RunLog(MemoryRunStateStore())
+    client = ModelClient(MockModelProvider())
+    admission = RunAdmission(max_runs=1)
+    broker = RecordingBroker()
+    context = RecordingContext()
+    for name, value in [("budget_tracker", tracker), ("run_log", log), ("model_client", client),
+                        ("run_admission", admission), ("event_broker", broker),
+                        ("message_service", MessageService()), ("context_window", context)]:
+        monkeypatch.setattr(f"app.orchestrator.manager.{name}", value)
+
+    orchestrator = XIOOrchestrator()
+
+    async def no_flow(meeting_id, topic):
+        # Run остается активным, пока его не остановят
+        await asyncio.Event().wait()
+
+    orchestrator._simulate_basic_flow = no_flow
+    return orchestrator, tracker, log, client, admission, broker, context
+
+def test_run_and_team_levels():
+    tracker = _tracker(RUN_TOKEN_BUDGET=100, TEAM_TOKEN_BUDGET=150, BUDGET_SOFT_RATIO=0.8)
+    tracker.start("run_1", "team_1")
+    budget = tracker.update("run_1", _usage("run_1", 50, 35))
+    assert budget.run.level == BudgetLevel.SOFT and budget.team.level == BudgetLevel.OK
+    assert budget.level == BudgetLevel.SOFT
+
+    # Расход завершенного run остается в итоге команды
+    tracker.finish("run_1")
+    tracker.start("run_2", "team_1")
+    budget = tracker.update("run_2", _usage("run_2", 30, 10))
+    assert budget.run.level == BudgetLevel.OK
+    assert budget.team.tokens == 125 and budget.team.level == BudgetLevel.SOFT
+
+    budget = tracker.update("run_2", _usage("run_2", 50, 20))
+    assert budget.run.level == BudgetLevel.OK
+    assert budget.team.level == BudgetLevel.EXCEEDED and budget.level == BudgetLevel.EXCEEDED
+
+def test_cost_budget_and_unlimited_defaults():
+    tracker = _tracker(RUN_COST_BUDGET_USD=0.5)
+    tracker.start("run_1")
+    budget = tracker.update("run_1", _usage("run_1", 10_000, 10_000, cost_usd=0.6))
+    assert budget.run.token_limit is None
+    assert budget.run.ratio == pytest.approx(1.2)
+    assert budget.level == BudgetLevel.EXCEEDED and budget.team is None
+
+    # run вне учета не ограничивается
+    assert tracker.update("run_x", _usage("run_x", 10_000, 10_000, cost_usd=5.0)).level == BudgetLevel.OK
+
+@pytest.mark.asyncio
+async def test_soft_threshold_switches_to_cheaper_model(harness):
+    orchestrator, tracker, _, client, _, _, context = harness
+    run_id = await orchestrator.start_run("meet_1", "Архитектура", team_id="team_1")
+    await orchestrator.stream_agent_turn("meet_1", _request(run_id, "Монолит или микросервисы?"))
+    spent = client.get_run_usage(run_id)
+    tracker.settings = tracker.settings.model_copy(update={
+        "RUN_TOKEN_BUDGET": int((spent.prompt_tokens + spent.completion_tokens) / 0.85)
+    })
+
+    message = await orchestrator.stream_agent_turn("meet_1", _request(run_id, "А что с безопасностью?"))
+
+    assert message.metadata["model"] == "gpt-4o-mini"
+    assert context.scheduled == [("meet_1", "expert_1")]
+
+@pytest.mark.asyncio
+async def test_hard_threshold_stops_run_cleanly(harness):
+    orchestrator, tracker, log, _, admission, broker, context = harness
+    tracker.settings = tracker.settings.model_copy(update={"RUN_TOKEN_BUDGET": 10})
+    run_id = await orchestrator.start_run("meet_1", "Архитектура")
+
+    await orchestrator.stream_agent_turn("meet_1", _request(run_id, "Монолит или микросервисы?"))
+
+    assert orchestrator.get_status()["is_running"] is False
+    assert admission.get_stats()["active"] == 0
+    assert context.forgotten == ["meet_1"]
+    state = await log.load_for_meeting("meet_1")
+    assert state.status == RunStatus.STOPPED
+    event = broker.events[-1]
+    assert event["type"] == "run_status" and event["status"] == "stopped"
+    assert event["reason"] == "budget_exceeded"
+    assert event["budget"]["level"] == "exceeded"
+
+@pytest.mark.asyncio
+async def test_exhausted_team_budget_blocks_next_run(harness):
+    orchestrator, tracker, _, client, _, broker, _ = harness
+    tracker.settings = tracker.settings.model_copy(update={"TEAM_TOKEN_BUDGET": 10})
+    first = await orchestrator.start_run("meet_1", "Архитектура", team_id="team_1")
+    await orchestrator.stream_agent_turn("meet_1", _request(first, "Монолит или микросервисы?"))
+    assert orchestrator.get_status()["is_running"] is False
+
+    second = await orchestrator.start_run("meet_2", "Безопасность", team_id="team_1")
+    calls = client.provider.calls
+    with pytest.raises(BudgetExceededError):
+        await orchestrator.stream_agent_turn("meet_2", _request(second, "Как защитить API?"))
+
+    assert client.provider.calls == calls
+    assert orchestrator.get_status()["is_running"] is False
+    assert broker.events[-1]["run_id"] == second and broker.events[-1]["reason"] == "budget_exceeded"
+
+def test_snapshot_does_not_record_spend():
+    tracker = _tracker(RUN_TOKEN_BUDGET=100)
+    tracker.start("run_1", "team_1")
+
+    budget = tracker.snapshot("run_1", _usage("run_1", 60, 30))
+
+    assert budget.run.tokens == 90 and budget.team.tokens == 90
+    assert budget.level == BudgetLevel.SOFT
+    assert tracker.get("run_1").run.tokens == 0
+
+def test_run_status_stream_event_carries_budget():
+    budget = {"run": {"scope": "run", "key": "run_1", "tokens": 120}, "team": None}
+    event = XIOEventBroker(WSConnectionManager())._to_stream_event({
+        "type": "run_status", "run_id": "run_1", "status": "stopped",
+        "reason": "budget_exceeded", "budget": budget
+    })
+
+    assert event["payload"]["budget"] == budget
+    assert event["payload"]["reason"] == "budget_exceeded"
+
+@pytest.mark.asyncio
+async def test_status_exposes_live_spend(harness):
+    orchestrator, tracker, _, client, _, _, _ = harness
+    tracker.settings = tracker.settings.model_copy(update={"RUN_COST_BUDGET_USD": 100.0})
+    run_id = await orchestrator.start_run("meet_1", "Архитектура", team_id="team_1")
+    await orchestrator.stream_agent_turn("meet_1", _request(run_id, "Монолит или микросервисы?"))
+
+    budget = orchestrator.get_status()["budget"]
+    usage = client.get_run_usage(run_id)
+    assert budget["run"]["tokens"] == usage.prompt_tokens + usage.completion_tokens
+    assert budget["run"]["cost_usd"] == pytest.approx(usage.cost_usd) and usage.cost_usd > 0
+    assert budget["team"]["key"] == "team_1"
+    assert budget["level"] == "ok"
+
+@pytest.mark.asyncio
+async def test_stop_releases_run_usage(harness):
+    orchestrator, _, _, client, _, _, _ = harness
+    run_id = await orchestrator.start_run("meet_1", "Архитектура")
+    await orchestrator.stream_agent_turn("meet_1", _request(run_id, "Монолит или микросервисы?"))
+    assert client.get_stats()["runs"] == 1
+
+    await orchestrator.stop_run()
+
+    assert client.get_stats()["runs"] == 0
@@ -0,0 +1,122 @@
+"""
+Тесты для менеджера контекстного окна агентов
+"""
+
+import pytest
+from app.models.messages import MessageRole
+from app.services.context import ContextWindowManager
+from app.services.messages import MessageService
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, run_id, lines):
+        self.calls.append(lines)
+        return f"резюме {len(self.calls)}: {len(lines)} реплик"
+
+def _manager(messages, summarizer, **overrides):
+    manager = ContextWindowManager(messages, summarizer)
+    manager.settings = manager.settings.model_copy(update={
+        "CONTEXT_DEFAULT_BUDGET": 400,
+        "CONTEXT_RECENT_SHARE": 0.5,
+        "CONTEXT_KEEP_RECENT": 3,
+        "CONTEXT_SUMMARY_CHUNK": 5,
+        "CONTEXT_MAX_SUMMARY_BLOCKS": 2,
+        **overrides
+    })
+    return manager
+
+def _chat(messages, count, start=0):
+    for i in range(start, start + count):
+        messages.create_message(
+            meeting_id="meet_1",
+            run_id="run_1",
+            agent_id=f"expert_{i % 3}",
+            role=MessageRole.ASSISTANT,
+            content=f"Реплика {i}: " + "аргумент " * 10
+        )
+
+@pytest.mark.asyncio
+async def test_short_history_fits_without_summarization():
+    messages, summarizer = MessageService(), RecordingSummarizer()
+    manager = _manager(messages, summarizer)
+    _chat(messages, 3)
+
+    prompt, stats = manager.build_prompt("meet_1", "moderator", "Вы модератор")
+
+    assert [m["role"] for m in prompt] == ["system", "assistant", "assistant", "assistant"]
+    assert stats.recent_messages == 3 and stats.pending_messages == 0
+    assert stats.prompt_tokens <= stats.budget
+    await manager.wait_idle("meet_1")
+    assert summarizer.calls == []
+
+@pytest.mark.asyncio
+async def test_long_history_is_summarized_in_background_within_budget():
+    messages, summarizer = MessageService(), RecordingSummarizer()
+    manager = _manager(messages, summarizer)
+    _chat(messages, 30)
+
+    _, first = manager.build_prompt("meet_1", "moderator", "Вы модератор")
+    assert first.prompt_tokens <= first.budget
+    assert first.pending_messages > 0
+
+    await manager.wait_idle("meet_1")
+    prompt, second = manager.build_prompt("meet_1", "moderator", "Вы модератор")
+
+    assert summarizer.calls
+    assert all(len(lines) <= 5 for lines in summarizer.calls)
+    assert second.summary_blocks <= 2
+    assert any(m["content"].startswith("Краткое содержание") for m in prompt)
+    # Последние реплики идут дословно
+    assert prompt[-1]["content"].startswith("Реплика 29")
+    assert second.prompt_tokens <= second.budget
+
+@pytest.mark.asyncio
+async def test_decisions_and_tasks_are_pinned():
+    messages, summarizer = MessageService(), RecordingSummarizer()
+    manager = _manager(messages, summarizer)
+
+    messages.create_decision_message(
+        meeting_id="meet_1", run_id="run_1", agent_id="moderator",
+        content="Решение: модульный монолит", decision_id="dec_1",
+        alternatives_count=3, selected_option="Модульный монолит", confidence=0.8
+    )
+    messages.create_task_message(
+        meeting_id="meet_1", run_id="run_1", agent_id="scribe",
+        content="Задача: настроить CI", task_id="task_1", priority="high", assignee="devops@company.com"
+    )
+    _chat(messages, 30)
+    manager.build_prompt("meet_1", "expert_1", "Вы эксперт")
+    await manager.wait_idle("meet_1")
+
+    prompt, _ = manager.build_prompt("meet_1", "expert_1", "Вы эксперт")
+    pinned = prompt[1]["content"]
+
+    assert "Решение: модульный монолит" in pinned
+    assert "Задача: настроить CI" in pinned
+    assert all("модульный монолит" not in line for lines in summarizer.calls for line in lines)
+
+@pytest.mark.asyncio
+async def test_per_agent_budget():
+    messages, summarizer = MessageService(), RecordingSummarizer()
+    manager = _manager(messages, summarizer, CONTEXT_AGENT_BUDGETS={"scribe": 120})
+    _chat(messages, 10)
+
+    _, moderator = manager.build_prompt("meet_1", "moderator", "Вы модератор")
+    _, scribe = manager.build_prompt("meet_1", "scribe", "Вы секретарь")
+
+    assert scribe.budget == 120
+    assert scribe.prompt_tokens <= 120 < moderator.prompt_tokens
+    await manager.wait_idle("meet_1")
+
+@pytest.mark.asyncio
+async def test_forget_drops_token_estimates_of_meeting():
+    messages, summarizer = MessageService(), RecordingSummarizer()
+    manager = _manager(messages, summarizer)
+    _chat(messages, 3)
+    manager.build_prompt("meet_1", "moderator", "Вы модератор")
+    assert len(manager._contexts["meet_1"].tokens) == 3
+
+    manager.forget("meet_1")
+    assert manager._contexts == {}
@@ -0,0 +1,169 @@
+"""
+Тесты для замера задержки событий от emit до записи в сокет
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1 import debug
+from app.observability.metrics import metrics_registry
+from app.ws import broker as broker_module
+from app.ws.broker import WSConnectionManager, XIOEventBroker
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+@pytest_asyncio.fixture
+async def broker():
+    metrics_registry.reset()
+    broker = XIOEventBroker(WSConnectionManager())
+    broker.delta_flush_interval = 0
+    await broker.start_processing()
+    yield broker
+    await broker.stop_processing()
+    metrics_registry.reset()
+
+async def _drain(broker):
+    for _ in range(100):
+        if broker._event_queue.empty():
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+
+async def _wait_for(predicate, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Условие не выполнено за отведенное время")
+
+def _histogram(name, **labels):
+    for series in metrics_registry.snapshot()["histograms"].get(name, []):
+        if series["labels"] == labels:
+            return series
+    return None
+
+@pytest.mark.asyncio
+async def test_stages_are_recorded_by_event_type(broker):
+    await broker.connection_manager.connect(FakeWebSocket(), "meet_1")
+    await broker.emit_event({"type": "run_status", "meeting_id": "meet_1", "run_id": "run_1", "status": "running"})
+    await broker.emit_event({
+        "type": "chat_message_delta", "meeting_id": "meet_1", "message_id": "msg_1", "delta": "Привет"
+    })
+    await _drain(broker)
+
+    assert _histogram("broker_queue_wait_seconds", event_type="run_status")["count"] == 1
+    assert _histogram("broker_transform_seconds", event_type="run_status")["count"] == 1
+    # connection_established при подключении отправляется мимо брокера
+    assert _histogram("ws_send_seconds", event_type="run_status")["count"] == 1
+    assert _histogram("event_delivery_seconds", event_type="run_status")["count"] == 1
+    assert _histogram("event_delivery_seconds", event_type="chat_message_delta")["count"] == 1
+
+@pytest.mark.asyncio
+async def test_delivery_includes_queue_wait(broker):
+    await broker.connection_manager.connect(FakeWebSocket(), "meet_1")
+    await broker.connection_manager.connect(FakeWebSocket(delay=0.1), "meet_slow")
+
+    # Медленный сокет другой встречи задерживает обработку следующего события в очереди
+    await broker.emit_event({"type": "participant_status", "meeting_id": "meet_slow", "agent_id": "cto", "status": "idle"})
+    await broker.emit_event({"type": "run_status", "meeting_id": "meet_1", "run_id": "run_1", "status": "running"})
+    await _drain(broker)
+    await _wait_for(lambda: _histogram("event_delivery_seconds", event_type="run_status")["count"] == 1)
+
+    delivery = _histogram("event_delivery_seconds", event_type="run_status")
+    send = _histogram("ws_send_seconds", event_type="run_status")
+    assert delivery["max"] >= 0.1
+    assert send["max"] < delivery["max"]
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_does_not_delay_delivery(broker):
+    socket = FakeWebSocket()
+    await broker.connection_manager.connect(socket, "meet_1")
+    handled = []
+
+    async def slow_subscriber(event):
+        await asyncio.sleep(0.2)
+        handled.append(event["agent_id"])
+
+    broker.subscribe("participant_status", slow_subscriber)
+    await broker.emit_event({"type": "participant_status", "meeting_id": "meet_1", "agent_id": "cto", "status": "idle"})
+    await broker.emit_event({"type": "run_status", "meeting_id": "meet_1", "run_id": "run_1", "status": "running"})
+    await _wait_for(lambda: any(message["type"] == "run_status" for message in socket.sent))
+
+    assert handled == []
+    assert _histogram("event_delivery_seconds", event_type="run_status")["max"] < 0.2
+
+    await broker.drain_subscribers()
+    assert handled == ["cto"]
+
+@pytest.mark.asyncio
+async def test_durable_subscriber_gets_every_event_of_a_burst(broker, monkeypatch):
+    """Переполненная очередь журнала run притормаживает рассылку, а не теряет события"""
+    monkeypatch.setattr(broker_module.get_settings(), "BROKER_SUBSCRIBER_QUEUE", 2)
+    durable, best_effort = [], []
+
+    async def record(event):
+        await asyncio.sleep(0.01)
+        durable.append(event["call_id"])
+
+    async def preview(event):
+        await asyncio.sleep(0.1)
+        best_effort.append(event["call_id"])
+
+    broker.subscribe("tool_execution", record)
+    broker.subscribe("tool_execution", preview, lossy=True)
+    for i in range(10):
+        await broker.emit_event({"type": "tool_execution", "meeting_id": "meet_1", "call_id": i, "status": "completed"})
+    await _drain(broker)
+    await broker.drain_subscribers()
+
+    assert durable == list(range(10))
+    assert len(best_effort) < 10
+    assert metrics_registry.counter("broker_subscriber_backpressure_total", event_type="tool_execution").value > 0
+    assert metrics_registry.counter("broker_subscriber_dropped_total", event_type="tool_execution").value > 0
+
+@pytest.mark.asyncio
+async def test_latency_report_ranks_slowest_rooms_and_connections(broker):
+    manager = broker.connection_manager
+    slow = FakeWebSocket(delay=0.05)
+    await manager.connect(FakeWebSocket(), "meet_fast")
+    await manager.connect(slow, "meet_slow")
+    await manager.connect(FakeWebSocket(), "meet_slow")
+
+    for meeting_id in ("meet_fast", "meet_slow"):
+        await broker.emit_event({"type": "run_status", "meeting_id": meeting_id, "run_id": "run_1", "status": "running"})
+    await _wait_for(lambda: len(manager.get_latency_report()["connections"]) == 3)
+
+    report = manager.get_latency_report(limit=2)
+    assert [room["meeting_id"] for room in report["rooms"]] == ["meet_slow", "meet_fast"]
+    assert report["rooms"][0]["connections"] == 2
+    # Соседи медленного сокета по комнате тоже получают событие позже
+    assert [conn["meeting_id"] for conn in report["connections"]] == ["meet_slow", "meet_slow"]
+    assert max(conn["send_ms"] for conn in report["connections"]) >= 50
+
+    await manager.disconnect(slow)
+    assert all(conn["send_ms"] < 50 for conn in manager.get_latency_report()["connections"])
+
+def test_debug_latency_endpoint(monkeypatch):
+    broker = XIOEventBroker(WSConnectionManager())
+    monkeypatch.setattr(debug, "event_broker", broker)
+    app = FastAPI()
+    app.include_router(debug.router, prefix="/api/v1")
+
+    response = TestClient(app).get("/api/v1/debug/latency", params={"limit": 5})
+
+    assert response.status_code == 200
+    assert response.json() == {"queue_depth": 0, "rooms": [], "connections": []}
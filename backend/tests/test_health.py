@@ -0,0 +1,162 @@
+"""
+Тесты для фоновых проверок зависимостей и /ready
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1 import health
+from app.integrations.notifications import NotificationStore
+from app.lifecycle import LifecycleManager
+from app.observability.health import HealthMonitor
+from app.observability.metrics import metrics_registry
+from app.storage.text_search import SQLiteFTSIndex
+
+class FakeDependency:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.delay = 0.0
+
+    async def probe(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("connection refused")
+        return {"calls": self.calls}
+
+@pytest.mark.asyncio
+async def test_probe_results_are_cached():
+    monitor = HealthMonitor(interval=60, timeout=1, stale_after=60)
+    dependency = FakeDependency()
+    monitor.register("storage", dependency.probe)
+
+    await monitor.probe_all()
+    for _ in range(100):
+        readiness = monitor.readiness()
+
+    # Опрос /ready не вызывает проверку повторно
+    assert dependency.calls == 1
+    assert readiness["status"] == "ready"
+    assert readiness["checks"]["storage"]["status"] == "healthy"
+    assert readiness["checks"]["storage"]["details"] == {"calls": 1}
+    assert readiness["checks"]["storage"]["latency_ms"] >= 0
+
+@pytest.mark.asyncio
+async def test_failed_and_slow_probes_are_unhealthy():
+    monitor = HealthMonitor(interval=60, timeout=0.05, stale_after=60)
+    broken, slow = FakeDependency(), FakeDependency()
+    broken.fail = True
+    slow.delay = 1.0
+    monitor.register("broker", broken.probe)
+    monitor.register("storage", slow.probe)
+
+    started = asyncio.get_running_loop().time()
+    await monitor.probe_all()
+
+    assert asyncio.get_running_loop().time() - started < 0.5
+    readiness = monitor.readiness()
+    assert readiness["status"] == "not_ready"
+    assert "connection refused" in readiness["checks"]["broker"]["error"]
+    assert "Таймаут" in readiness["checks"]["storage"]["error"]
+
+@pytest.mark.asyncio
+async def test_non_critical_failure_only_degrades():
+    monitor = HealthMonitor(interval=60, timeout=1, stale_after=60)
+    broker, sandbox = FakeDependency(), FakeDependency()
+    sandbox.fail = True
+    monitor.register("broker", broker.probe)
+    monitor.register("sandbox", sandbox.probe, critical=False)
+
+    await monitor.probe_all()
+    readiness = monitor.readiness()
+
+    assert readiness["status"] == "ready"
+    assert readiness["degraded"] == ["sandbox"]
+
+@pytest.mark.asyncio
+async def test_stale_results_are_not_ready():
+    monitor = HealthMonitor(interval=60, timeout=1, stale_after=0.01)
+    monitor.register("storage", FakeDependency().probe)
+
+    assert monitor.readiness()["checks"]["storage"]["status"] == "unknown"
+    await monitor.probe_all()
+    await asyncio.sleep(0.02)
+
+    readiness = monitor.readiness()
+    assert readiness["status"] == "not_ready"
+    assert readiness["checks"]["storage"]["status"] == "stale"
+
+@pytest.mark.asyncio
+async def test_background_loop_refreshes_results():
+    monitor = HealthMonitor(interval=0.01, timeout=1, stale_after=60)
+    dependency = FakeDependency()
+    monitor.register("storage", dependency.probe)
+
+    await monitor.start()
+    dependency.fail = True
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert dependency.calls > 1
+    assert monitor.readiness()["status"] == "not_ready"
+
+    snapshot = metrics_registry.snapshot()
+    assert "health_probe_seconds" in snapshot["histograms"]
+
+def test_ready_endpoint_answers_from_cache(monkeypatch):
+    monitor = HealthMonitor(interval=60, timeout=1, stale_after=60)
+    dependency = FakeDependency()
+    monitor.register("broker", dependency.probe)
+    monkeypatch.setattr(health, "health_monitor", monitor)
+
+    app = FastAPI()
+    app.include_router(health.router, prefix="/api/v1")
+    client = TestClient(app)
+
+    # До первой проверки зависимость неизвестна - трафик не принимаем
+    response = client.get("/api/v1/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["broker"]["status"] == "unknown"
+
+    asyncio.run(monitor.probe_all())
+    response = client.get("/api/v1/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert dependency.calls == 1
+
+@pytest.mark.asyncio
+async def test_storage_probe_pings_configured_stores(monkeypatch):
+    store = NotificationStore(":memory:")
+    monkeypatch.setattr("app.lifecycle.notification_queue.store", store)
+    lifecycle = LifecycleManager()
+
+    details = await lifecycle._probe_storage()
+    assert details["notifications"] == {"backend": "sqlite"}
+    assert "backend" in details["search"]
+    # Проба не считает документы индекса
+    assert "documents" not in details["search"]
+
+    class BrokenStore:
+        async def ping(self):
+            raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr("app.lifecycle.notification_queue.store", BrokenStore())
+    with pytest.raises(sqlite3.OperationalError):
+        await lifecycle._probe_storage()
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_sqlite_search_ping_does_not_scan_documents():
+    index = SQLiteFTSIndex(":memory:")
+    statements = []
+    await index.open()
+    index._conn.set_trace_callback(statements.append)
+
+    assert await index.ping() == {"backend": "sqlite"}
+    assert not any("search_docs" in sql for sql in statements)
+    await index.close()
@@ -0,0 +1,115 @@
+"""
+Тесты для фоновой индексации сообщений
+"""
+
+import pytest
+import pytest_asyncio
+from app.llm.embeddings import CachedEmbedder, HashingEmbedder
+from app.models.messages import MessageRole, MessageType
+from app.services.indexing import IndexingPipeline
+from app.services.messages import MessageService
+from app.services.rag_service import RetrievalService, chunk_text
+from app.storage.vector_index import BruteForceIndex
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=128)
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        return await super().embed(texts)
+
+def _configure(pipeline, **overrides):
+    pipeline.settings = pipeline.settings.model_copy(update={
+        "INDEXING_DEBOUNCE_MS": 20,
+        "INDEXING_MAX_DELAY_MS": 200,
+        "INDEXING_BATCH_SIZE": 16,
+        "INDEXING_MAX_PENDING": 100,
+        **overrides
+    })
+
+@pytest_asyncio.fixture
+async def env():
+    inner = CountingEmbedder()
+    retrieval = RetrievalService(index=BruteForceIndex(), embedder=CachedEmbedder(inner))
+    messages = MessageService()
+    pipeline = IndexingPipeline(retrieval, messages)
+    _configure(pipeline)
+    await pipeline.start()
+    yield pipeline, messages, retrieval, inner
+    await pipeline.stop()
+
+def _say(messages, text, meeting_id="meet_1", message_type=MessageType.CHAT):
+    return messages.create_message(
+        meeting_id=meeting_id, run_id="run_1", agent_id="expert",
+        role=MessageRole.ASSISTANT, content=text, message_type=message_type
+    )
+
+@pytest.mark.asyncio
+async def test_burst_is_debounced_into_one_batch(env):
+    pipeline, messages, retrieval, inner = env
+
+    for i in range(10):
+        _say(messages, f"аргумент номер {i} про кеширование")
+    # create_message не ждет индексации
+    assert pipeline.get_stats()["pending"] == 10
+
+    await pipeline.wait_idle()
+
+    assert await retrieval.index.count() == 10
+    assert pipeline.get_stats()["batches"] == 1
+    assert sum(len(call) for call in inner.calls) == 10
+    hits = await retrieval.search("кеширование", meeting_id="meet_1", k=3)
+    assert len(hits) == 3 and hits[0].metadata["message_id"].startswith("msg_")
+
+@pytest.mark.asyncio
+async def test_decisions_and_tasks_indexed_tool_calls_skipped(env):
+    pipeline, messages, retrieval, _ = env
+
+    messages.create_decision_message(
+        meeting_id="meet_1", run_id="run_1", agent_id="moderator",
+        content="Решение: выбрать PostgreSQL", decision_id="dec_1",
+        alternatives_count=2, selected_option="PostgreSQL", confidence=0.9
+    )
+    messages.create_task_message(
+        meeting_id="meet_1", run_id="run_1", agent_id="scribe",
+        content="Задача: развернуть реплику", task_id="task_1", priority="high", assignee="dba"
+    )
+    messages.create_tool_call_message(
+        meeting_id="meet_1", run_id="run_1", agent_id="expert",
+        content="вызов jira", tool_id="jira", status="ok", args_masked={}
+    )
+    await pipeline.wait_idle()
+
+    kinds = {hit.kind for hit in await retrieval.search("PostgreSQL реплика", k=10)}
+    assert kinds == {"decision", "task"}
+
+@pytest.mark.asyncio
+async def test_overflow_falls_back_to_meeting_backfill(env):
+    pipeline, messages, retrieval, _ = env
+    _configure(pipeline, INDEXING_MAX_PENDING=3)
+
+    for i in range(8):
+        _say(messages, f"реплика {i}")
+    assert pipeline.get_stats()["pending"] == 3
+    assert pipeline.get_stats()["overflows"] == 5
+
+    await pipeline.wait_idle()
+
+    # Ничего не потеряно и без дублей
+    assert await retrieval.index.count() == 8
+
+@pytest.mark.asyncio
+async def test_long_message_is_chunked_with_stable_ids(env):
+    pipeline, messages, retrieval, _ = env
+    retrieval.settings = retrieval.settings.model_copy(update={
+        "RETRIEVAL_CHUNK_WORDS": 10, "RETRIEVAL_CHUNK_OVERLAP": 2
+    })
+
+    message = _say(messages, " ".join(f"слово{i}" for i in range(25)))
+    await pipeline.wait_idle()
+    await retrieval.index_message(message)
+
+    assert await retrieval.index.count() == 3
+    assert len(chunk_text("a b c", 10)) == 1
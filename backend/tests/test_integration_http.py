@@ -0,0 +1,138 @@
+"""
+Тесты для HTTP-слоя интеграций на локальном stub-сервере
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.integrations.http import CircuitBreaker, CircuitOpenError, IntegrationError, IntegrationHTTPClient
+from app.integrations.notion.client import NotionClient
+
+@pytest_asyncio.fixture
+async def stub_server():
+    state = {"flaky_calls": 0, "down_calls": 0, "peers": set(), "pages": []}
+
+    async def flaky(request):
+        state["flaky_calls"] += 1
+        if state["flaky_calls"] < 3:
+            return web.json_response({"error": "busy"}, status=503)
+        return web.json_response({"ok": True})
+
+    async def down(request):
+        state["down_calls"] += 1
+        return web.json_response({"error": "down"}, status=500)
+
+    async def bad_request(request):
+        return web.json_response({"message": "validation"}, status=400)
+
+    async def create_page(request):
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        state["pages"].append(body)
+        page_id = f"page_{len(state['pages'])}"
+        return web.json_response({"id": page_id, "url": f"https://notion.so/{page_id}"})
+
+    app = web.Application()
+    app.router.add_get("/flaky", flaky)
+    app.router.add_get("/down", down)
+    app.router.add_get("/bad", bad_request)
+    async def post_down(request):
+        state["down_calls"] += 1
+        return web.json_response({"error": "down"}, status=502)
+
+    app.router.add_post("/v1/pages", create_page)
+    app.router.add_post("/bot123456:SECRET/sendMessage", post_down)
+
+    server = TestServer(app)
+    await server.start_server()
+    server.state = state
+    yield server
+    await server.close()
+
+@pytest_asyncio.fixture
+async def http(stub_server):
+    client = IntegrationHTTPClient("stub", str(stub_server.make_url("")))
+    client.settings = client.settings.model_copy(update={
+        "INTEGRATION_HTTP_RETRIES": 3,
+        "INTEGRATION_HTTP_BACKOFF_BASE": 0.01,
+        "CIRCUIT_BREAKER_FAILURES": 3,
+        "CIRCUIT_BREAKER_RESET_SECONDS": 60
+    })
+    yield client
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_retries_with_backoff_until_success(http, stub_server):
+    response = await http.request("GET", "/flaky")
+
+    assert response.json() == {"ok": True}
+    assert stub_server.state["flaky_calls"] == 3
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(http):
+    with pytest.raises(IntegrationError) as error:
+        await http.request("GET", "/bad")
+
+    assert error.value.status_code == 400
+    assert error.value.payload == {"message": "validation"}
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens_per_host(http, stub_server):
+    with pytest.raises(IntegrationError):
+        await http.request("GET", "/down")
+    assert stub_server.state["down_calls"] == 3
+
+    # Хост разомкнут: запрос даже не отправляется
+    with pytest.raises(CircuitOpenError):
+        await http.request("GET", "/flaky")
+    assert stub_server.state["flaky_calls"] == 0
+
+@pytest.mark.asyncio
+async def test_notion_client_reuses_keepalive_connection(http, stub_server):
+    notion = NotionClient(http)
+
+    first = await notion.create_page("db_1", {"Name": {"title": []}})
+    second = await notion.create_page("db_1", {"Name": {"title": []}})
+
+    assert (first.page_id, first.status) == ("page_1", "created")
+    assert second.url == "https://notion.so/page_2"
+    assert stub_server.state["pages"][0]["parent"] == {"database_id": "db_1"}
+    assert len(stub_server.state["peers"]) == 1
+
+@pytest.mark.asyncio
+async def test_non_idempotent_post_is_not_retried_and_url_is_redacted(http, stub_server, caplog):
+    with pytest.raises(IntegrationError) as error:
+        await http.request("POST", "/bot123456:SECRET/sendMessage", json={"text": "Итоги"})
+
+    assert stub_server.state["down_calls"] == 1
+    assert error.value.status_code == 502
+    assert "SECRET" not in str(error.value)
+    assert "POST 127.0.0.1" in str(error.value)
+
+    with pytest.raises(IntegrationError):
+        await http.request("POST", "/bot123456:SECRET/sendMessage", idempotent=True, json={"text": "Итоги"})
+    assert stub_server.state["down_calls"] > 1
+    assert "SECRET" not in caplog.text
+
+@pytest.mark.asyncio
+async def test_half_open_probe_is_released_on_cancellation():
+    breaker = CircuitBreaker("api.telegram.org", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    client = IntegrationHTTPClient("stub", "https://api.telegram.org", breakers={"api.telegram.org": breaker})
+
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    client.client.request = hang
+    probe = asyncio.create_task(client.request("GET", "/getMe"))
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    await client.close()
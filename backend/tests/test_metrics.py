@@ -0,0 +1,100 @@
+"""
+Тесты для экспорта метрик в формате Prometheus
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1 import health
+from app.observability.metrics import NULL_METRIC, MetricsRegistry, metrics_registry
+from app.observability.prometheus import HTTPMetricsMiddleware, RegistryCollector, render_metrics
+from app.orchestrator.admission import AdmissionTimeoutError, RunAdmission
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics_registry.reset()
+    yield
+    metrics_registry.enabled = True
+    metrics_registry.reset()
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(HTTPMetricsMiddleware)
+    app.include_router(health.router, prefix="/api/v1")
+    return app
+
+def test_registry_is_exported_in_exposition_format():
+    metrics_registry.counter("tool_calls_total", tool="jira").inc(3)
+    metrics_registry.gauge("broker_queue_depth").set(7)
+    histogram = metrics_registry.histogram("ws_broadcast_seconds", buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.5):
+        histogram.observe(value)
+
+    body, content_type = render_metrics()
+    text = body.decode()
+
+    assert content_type.startswith("text/plain")
+    assert 'xio_tool_calls_total{tool="jira"} 3.0' in text
+    assert "xio_broker_queue_depth 7.0" in text
+    assert 'xio_ws_broadcast_seconds_bucket{le="0.01"} 1.0' in text
+    assert 'xio_ws_broadcast_seconds_bucket{le="0.1"} 2.0' in text
+    assert 'xio_ws_broadcast_seconds_bucket{le="+Inf"} 3.0' in text
+    assert "xio_ws_broadcast_seconds_count 3.0" in text
+
+def test_mixed_label_sets_are_padded():
+    registry = MetricsRegistry()
+    registry.counter("events_total").inc()
+    registry.counter("events_total", type="chat").inc(2)
+
+    [family] = list(RegistryCollector(registry).collect())
+
+    assert sorted(tuple(sample.labels.items()) for sample in family.samples) == [
+        (("type", ""),), (("type", "chat"),)
+    ]
+
+def test_metrics_endpoint_and_http_route_latency():
+    client = TestClient(_app())
+
+    client.get("/api/v1/health")
+    response = client.get("/api/v1/metrics")
+
+    assert response.status_code == 200
+    assert 'xio_http_requests_total{method="GET",route="/api/v1/health",status="200"} 1.0' in response.text
+    assert 'xio_http_request_duration_seconds_count{method="GET",route="/api/v1/health"} 1.0' in response.text
+
+def test_disabled_metrics_are_noop():
+    metrics_registry.enabled = False
+
+    assert metrics_registry.counter("anything_total") is NULL_METRIC
+    metrics_registry.histogram("anything_seconds").observe(1.0)
+    assert metrics_registry.snapshot()["histograms"] == {}
+
+@pytest.mark.asyncio
+async def test_run_admission_waits_for_free_slot():
+    admission = RunAdmission(max_runs=1)
+    await admission.acquire("run_1")
+
+    waiter = asyncio.create_task(admission.acquire("run_2"))
+    await asyncio.sleep(0.02)
+    assert not waiter.done() and admission.get_stats()["waiting"] == 1
+
+    assert admission.release("run_1")
+    waited = await waiter
+
+    assert waited >= 0.02
+    assert admission.get_stats() == {"max_runs": 1, "active": 1, "waiting": 0}
+    assert metrics_registry.histogram("run_admission_wait_seconds").count == 2
+
+@pytest.mark.asyncio
+async def test_run_admission_times_out_with_clear_error():
+    admission = RunAdmission(max_runs=1, timeout=0.05)
+    await admission.acquire("run_1")
+
+    with pytest.raises(AdmissionTimeoutError, match="run_2"):
+        await admission.acquire("run_2")
+
+    assert admission.get_stats() == {"max_runs": 1, "active": 1, "waiting": 0}
+    assert admission.release("run_1")
+    assert await admission.acquire("run_2") < 0.05
@@ -0,0 +1,165 @@
+"""
+Тесты для общего клиента моделей
+"""
+
+import asyncio
+
+import pytest
+from app.llm.client import ModelClient, PriorityLimiter
+from app.llm.providers import MockModelProvider
+from app.models.llm import ModelPriority, ModelRequest
+
+def _request(content, **kwargs):
+    return ModelRequest(model=kwargs.pop("model", "gpt-4"), messages=[{"role": "user", "content": content}], **kwargs)
+
+def _client(provider, **overrides):
+    client = ModelClient(provider)
+    client.settings = client.settings.model_copy(update=overrides)
+    client._global = PriorityLimiter("global", client.settings.LLM_MAX_CONCURRENCY)
+    return client
+
+@pytest.mark.asyncio
+async def test_mock_model_is_deterministic():
+    provider = MockModelProvider()
+
+    first = await provider.complete(_request("Монолит или микросервисы?", agent_id="expert_1"))
+    second = await provider.complete(_request("Монолит или микросервисы?", agent_id="expert_1"))
+
+    assert first.content == second.content
+    assert first.content.startswith("expert_1:")
+    assert first.prompt_tokens > 0 and first.completion_tokens > 0
+
+@pytest.mark.asyncio
+async def test_identical_requests_in_flight_are_coalesced():
+    provider = MockModelProvider(latency=0.05)
+    client = _client(provider)
+
+    responses = await asyncio.gather(*(
+        client.complete(_request("Итоги встречи", run_id="run_1")) for _ in range(5)
+    ))
+
+    assert provider.calls == 1
+    assert sum(response.coalesced for response in responses) == 4
+    assert len({response.content for response in responses}) == 1
+
+    usage = client.get_run_usage("run_1")
+    assert (usage.requests, usage.coalesced) == (5, 4)
+    assert usage.prompt_tokens == responses[0].prompt_tokens
+
+@pytest.mark.asyncio
+async def test_global_and_per_model_concurrency_limits():
+    class CountingProvider(MockModelProvider):
+        def __init__(self):
+            super().__init__(latency=0.02)
+            self.active = {}
+            self.peak = {}
+
+        async def complete(self, request):
+            self.active[request.model] = self.active.get(request.model, 0) + 1
+            self.peak[request.model] = max(self.peak.get(request.model, 0), self.active[request.model])
+            self.peak["total"] = max(self.peak.get("total", 0), sum(self.active.values()))
+            try:
+                return await super().complete(request)
+            finally:
+                self.active[request.model] -= 1
+
+    provider = CountingProvider()
+    client = _client(
+        provider,
+        LLM_MAX_CONCURRENCY=3,
+        LLM_DEFAULT_MODEL_CONCURRENCY=2,
+        LLM_MODEL_CONCURRENCY={"gpt-4o-mini": 1}
+    )
+
+    await asyncio.gather(
+        *(client.complete(_request(f"q{i}", model="gpt-4")) for i in range(6)),
+        *(client.complete(_request(f"q{i}", model="gpt-4o-mini")) for i in range(4))
+    )
+
+    assert provider.peak["gpt-4"] == 2
+    assert provider.peak["gpt-4o-mini"] == 1
+    assert provider.peak["total"] <= 3
+
+@pytest.mark.asyncio
+async def test_moderator_lane_overtakes_background_summaries():
+    order = []
+
+    class RecordingProvider(MockModelProvider):
+        async def complete(self, request):
+            order.append(request.agent_id)
+            await asyncio.sleep(0.01)
+            return await super().complete(request)
+
+    client = _client(RecordingProvider(), LLM_MAX_CONCURRENCY=1)
+
+    background = [
+        asyncio.create_task(client.complete(_request(f"summary {i}", agent_id="summarizer", priority=ModelPriority.BACKGROUND)))
+        for i in range(3)
+    ]
+    await asyncio.sleep(0)
+    moderator = asyncio.create_task(client.complete(_request("next", agent_id="moderator", priority=ModelPriority.MODERATOR)))
+
+    await asyncio.gather(*background, moderator)
+
+    # Первый фоновый запрос уже выполнялся, модератор идет сразу за ним
+    assert order[:2] == ["summarizer", "moderator"]
+
+@pytest.mark.asyncio
+async def test_cost_accounting_per_run():
+    client = _client(MockModelProvider(), LLM_MODEL_PRICING={"gpt-4": {"prompt": 0.03, "completion": 0.06}})
+
+    response = await client.complete(_request("Оценка рисков", run_id="run_1"))
+    await client.complete(_request("Другой run", run_id="run_2"))
+
+    usage = client.get_run_usage("run_1")
+    expected = (response.prompt_tokens * 0.03 + response.completion_tokens * 0.06) / 1000
+    assert usage.cost_usd == pytest.approx(expected)
+    assert usage.by_model == {"gpt-4": response.total_tokens}
+    assert client.pop_run_usage("run_1").requests == 1
+    assert client.get_run_usage("run_1").requests == 0
+
+@pytest.mark.asyncio
+async def test_failed_leader_propagates_to_coalesced_waiters():
+    class FailingProvider(MockModelProvider):
+        async def complete(self, request):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("модель недоступна")
+
+    client = _client(FailingProvider())
+    results = await asyncio.gather(*(client.complete(_request("x")) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert client.get_stats()["in_flight"] == 0
+    assert client.get_stats()["global"]["in_use"] == 0
+
+@pytest.mark.asyncio
+async def test_coalesced_waiters_survive_leader_cancellation():
+    provider = MockModelProvider(latency=0.05)
+    client = _client(provider)
+
+    leader = asyncio.create_task(client.complete(_request("Итоги встречи", run_id="run_1")))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(client.complete(_request("Итоги встречи", run_id="run_2")))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    response = await follower
+    assert leader.cancelled()
+    assert provider.calls == 1
+    # Токены вызова, брошенного инициатором, учитывает дождавшийся
+    assert not response.coalesced
+    assert client.get_run_usage("run_2").prompt_tokens == response.prompt_tokens
+    assert client.get_stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_cancelling_last_waiter_cancels_the_call():
+    client = _client(MockModelProvider(latency=1.0))
+
+    leader = asyncio.create_task(client.complete(_request("Итоги встречи")))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    await asyncio.gather(leader, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert client.get_stats()["in_flight"] == 0
+    assert client.get_stats()["global"]["in_use"] == 0
@@ -0,0 +1,130 @@
+"""
+Тесты для очереди исходящих уведомлений
+"""
+
+import time
+
+import pytest
+import pytest_asyncio
+from app.integrations.notifications import NotificationQueue, NotificationStore
+from app.ws.broker import XIOEventBroker, WSConnectionManager
+
+class FakeSender:
+    def __init__(self, failures=0):
+        self.sent = []
+        self.failures = failures
+
+    async def __call__(self, target, text):
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("webhook недоступен")
+        self.sent.append((target, text))
+
+@pytest_asyncio.fixture
+async def queue(tmp_path):
+    slack = FakeSender()
+    queue = NotificationQueue(
+        NotificationStore(str(tmp_path / "notifications.sqlite3")),
+        senders={"slack": slack, "telegram": FakeSender()}
+    )
+    queue.settings = queue.settings.model_copy(update={
+        "NOTIFICATION_CHANNELS": ["slack:#xio"],
+        "NOTIFICATION_DIGEST_WINDOW": 10.0,
+        "NOTIFICATION_MAX_ATTEMPTS": 3,
+        "NOTIFICATION_RETRY_BASE": 5.0,
+        "NOTIFICATION_RATE_LIMITS": {"slack": 1e6}
+    })
+    queue.slack = slack
+    yield queue
+    await queue.store.close()
+
+@pytest.mark.asyncio
+async def test_notifications_within_window_are_digested(queue):
+    for i in range(5):
+        await queue.enqueue("slack:#xio", f"Встреча {i} завершена")
+
+    # Окно еще не истекло - ничего не отправляется
+    assert await queue.flush_due() == 0
+
+    assert await queue.flush_due(now=time.time() + 11) == 1
+    target, text = queue.slack.sent[0]
+    assert target == "#xio"
+    assert text.startswith("Сводка XIO: 5 уведомлений")
+    assert (await queue.store.counts()) == {"sent": 5}
+
+@pytest.mark.asyncio
+async def test_queue_survives_restart(queue, tmp_path):
+    await queue.enqueue("slack:#xio", "Встреча завершена")
+    await queue.store.close()
+
+    restarted = NotificationQueue(
+        NotificationStore(str(tmp_path / "notifications.sqlite3")),
+        senders={"slack": queue.slack}
+    )
+    restarted.settings = queue.settings
+
+    assert await restarted.flush_due(now=time.time() + 11) == 1
+    assert queue.slack.sent == [("#xio", "Встреча завершена")]
+    await restarted.store.close()
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried_then_dead_lettered(queue):
+    queue.senders["slack"] = queue.slack = FakeSender(failures=3)
+    await queue.enqueue("slack:#xio", "Итог встречи")
+    now = time.time() + 11
+
+    assert await queue.flush_due(now=now) == 0
+    # Повтор отложен на NOTIFICATION_RETRY_BASE
+    assert await queue.flush_due(now=now + 1) == 0
+    assert await queue.flush_due(now=now + 6) == 0
+    assert await queue.flush_due(now=now + 60) == 0
+
+    dead = await queue.store.dead_letters()
+    assert [(item["channel"], item["attempts"]) for item in dead] == [("slack:#xio", 3)]
+
+    assert await queue.store.requeue_dead() == 1
+    assert await queue.flush_due(now=time.time() + 11) == 1
+
+@pytest.mark.asyncio
+async def test_retries_are_counted_per_notification(queue):
+    """Старое уведомление уходит в dead-letter, свежее из того же дайджеста - на первый повтор"""
+    queue.senders["slack"] = queue.slack = FakeSender(failures=3)
+    await queue.enqueue("slack:#xio", "Старое")
+    now = time.time() + 11
+    assert await queue.flush_due(now=now) == 0
+    assert await queue.flush_due(now=now + 6) == 0
+
+    await queue.enqueue("slack:#xio", "Свежее")
+    assert await queue.flush_due(now=now + 30) == 0
+
+    assert [item["text"] for item in await queue.store.dead_letters()] == ["Старое"]
+    # Задержка свежего - NOTIFICATION_RETRY_BASE, а не по попыткам старого
+    assert await queue.store.pending("slack:#xio", now + 34, 10) == []
+    [fresh] = await queue.store.pending("slack:#xio", now + 35, 10)
+    assert fresh["text"] == "Свежее" and fresh["attempts"] == 1
+
+@pytest.mark.asyncio
+async def test_channel_rate_limit_defers_to_next_digest(queue):
+    queue.settings = queue.settings.model_copy(update={"NOTIFICATION_RATE_LIMITS": {"slack": 0.01}})
+    now = time.time() + 11
+
+    await queue.enqueue("slack:#xio", "Первая встреча")
+    assert await queue.flush_due(now=now) == 1
+
+    await queue.enqueue("slack:#xio", "Вторая встреча")
+    await queue.enqueue("slack:#xio", "Третья встреча")
+    assert await queue.flush_due(now=now + 11) == 0
+    assert (await queue.store.counts())["pending"] == 2
+
+@pytest.mark.asyncio
+async def test_run_status_completion_feeds_queue(queue):
+    broker = XIOEventBroker(WSConnectionManager())
+    broker.subscribe("run_status", queue.handle_run_status)
+
+    await broker._handle_event({"type": "run_status", "meeting_id": "meet_1", "run_id": "run_1", "status": "started"})
+    await broker._handle_event({"type": "run_status", "meeting_id": "meet_1", "run_id": "run_1", "status": "completed"})
+    # Повторное событие не дублирует уведомление
+    await broker._handle_event({"type": "run_status", "meeting_id": "meet_1", "run_id": "run_1", "status": "completed"})
+    await broker.stop_processing()
+
+    assert (await queue.store.counts()) == {"pending": 1}
@@ -0,0 +1,202 @@
+"""
+Тесты для пакетного экспорта в Notion на локальном fake-сервере
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.integrations.http import IntegrationHTTPClient
+from app.integrations.notion.client import NotionClient
+from app.integrations.notion.exporter import ExportLedger, NotionExportPipeline
+from app.models import Alternative, TaskPriority, ValidatedActionItem, ValidatedDecisionLog
+from app.tools.limits import TokenBucket, integration_rate_limits
+
+@pytest_asyncio.fixture
+async def fake_notion():
+    state = {"pages": {}, "blocks": {}, "creates": 0, "updates": 0, "fail_titles": set(), "in_flight": 0, "max_in_flight": 0,
+             "appended": 0, "fail_deletes": 0}
+
+    async def create_page(request):
+        body = await request.json()
+        title = body["properties"]["Name"]["title"][0]["text"]["content"]
+        if title in state["fail_titles"]:
+            state["fail_titles"].discard(title)
+            return web.json_response({"message": "conflict"}, status=409)
+
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+
+        state["creates"] += 1
+        page_id = f"page_{state['creates']}"
+        state["pages"][page_id] = body
+        state["blocks"][page_id] = [
+            {"id": f"{page_id}_block_{i}", **block} for i, block in enumerate(body.get("children", []))
+        ]
+        return web.json_response({"id": page_id, "url": f"https://notion.so/{page_id}"})
+
+    async def update_page(request):
+        state["updates"] += 1
+        page_id = request.match_info["page_id"]
+        state["pages"][page_id]["properties"].update((await request.json())["properties"])
+        return web.json_response({"id": page_id, "url": f"https://notion.so/{page_id}"})
+
+    async def list_children(request):
+        blocks = state["blocks"].get(request.match_info["page_id"], [])
+        return web.json_response({"results": blocks, "has_more": False, "next_cursor": None})
+
+    async def delete_block(request):
+        block_id = request.match_info["block_id"]
+        if state["fail_deletes"]:
+            state["fail_deletes"] -= 1
+            return web.json_response({"message": "internal error"}, status=500)
+        for page_id, blocks in state["blocks"].items():
+            state["blocks"][page_id] = [block for block in blocks if block["id"] != block_id]
+        return web.json_response({"id": block_id, "archived": True})
+
+    async def append_children(request):
+        page_id = request.match_info["page_id"]
+        blocks = state["blocks"].setdefault(page_id, [])
+        for block in (await request.json())["children"]:
+            state["appended"] += 1
+            blocks.append({"id": f"{page_id}_block_new_{state['appended']}", **block})
+        return web.json_response({"results": blocks})
+
+    app = web.Application()
+    app.router.add_post("/v1/pages", create_page)
+    app.router.add_patch("/v1/pages/{page_id}", update_page)
+    app.router.add_get("/v1/blocks/{page_id}/children", list_children)
+    app.router.add_patch("/v1/blocks/{page_id}/children", append_children)
+    app.router.add_delete("/v1/blocks/{block_id}", delete_block)
+
+    server = TestServer(app)
+    await server.start_server()
+    server.state = state
+    yield server
+    await server.close()
+
+@pytest_asyncio.fixture
+async def pipeline(fake_notion, tmp_path, monkeypatch):
+    events = []
+
+    async def capture(event):
+        events.append(event)
+
+    monkeypatch.setattr("app.integrations.notion.exporter.event_broker.emit_event", capture)
+
+    http = IntegrationHTTPClient("notion", str(fake_notion.make_url("")))
+    http.settings = http.settings.model_copy(update={"INTEGRATION_HTTP_RETRIES": 0})
+    client = NotionClient(http, rate_limit=TokenBucket(1000))
+    pipeline = NotionExportPipeline(client, ExportLedger(str(tmp_path)), database_id="db_1")
+    pipeline.events = events
+    yield pipeline
+    await http.close()
+
+def _decision():
+    return ValidatedDecisionLog(
+        meeting_id="meet_1",
+        title="Выбор архитектуры",
+        alternatives=[Alternative(option="Монолит"), Alternative(option="Микросервисы")],
+        rationale="Масштабируемость",
+        decision="Микросервисы"
+    )
+
+def _tasks(count):
+    return [
+        ValidatedActionItem(
+            meeting_id="meet_1",
+            title=f"Задача {i}",
+            description="Описание задачи",
+            assignee="team@company.com",
+            priority=TaskPriority.MEDIUM
+        )
+        for i in range(count)
+    ]
+
+@pytest.mark.asyncio
+async def test_export_creates_pages_with_bounded_concurrency(pipeline, fake_notion):
+    report = await pipeline.export_meeting("meet_1", [_decision()], _tasks(10))
+
+    assert len(report.created) == 11
+    assert report.complete
+    assert fake_notion.state["max_in_flight"] <= pipeline.settings.NOTION_EXPORT_CONCURRENCY
+    assert len([e for e in pipeline.events if e["type"] == "artifact_created"]) == 11
+    assert all(e["external_ref"].startswith("notion:page_") for e in pipeline.events)
+
+@pytest.mark.asyncio
+async def test_reexport_sends_only_diffs(pipeline, fake_notion):
+    tasks = _tasks(3)
+    await pipeline.export_meeting("meet_1", [], tasks)
+
+    tasks[1].assignee = "devops@company.com"
+    report = await pipeline.export_meeting("meet_1", [], tasks)
+
+    assert report.skipped == ["action_item:meet_1:Задача 0", "action_item:meet_1:Задача 2"]
+    assert report.updated == ["action_item:meet_1:Задача 1"]
+    assert (fake_notion.state["creates"], fake_notion.state["updates"]) == (3, 1)
+
+@pytest.mark.asyncio
+async def test_reexport_replaces_page_body(pipeline, fake_notion):
+    decision = _decision()
+    await pipeline.export_meeting("meet_1", [decision], [])
+
+    decision.rationale = "Независимые релизы команд"
+    report = await pipeline.export_meeting("meet_1", [decision], [])
+
+    assert report.updated == ["decision_log:meet_1:Выбор архитектуры"]
+    texts = [
+        block["paragraph"]["rich_text"][0]["text"]["content"]
+        for block in fake_notion.state["blocks"]["page_1"]
+    ]
+    assert "Обоснование: Независимые релизы команд" in texts
+    assert "Обоснование: Масштабируемость" not in texts
+    assert len(texts) == 4
+
+@pytest.mark.asyncio
+async def test_failed_body_replace_keeps_page_content_and_is_retried(pipeline, fake_notion):
+    decision = _decision()
+    await pipeline.export_meeting("meet_1", [decision], [])
+
+    decision.rationale = "Независимые релизы команд"
+    fake_notion.state["fail_deletes"] = 1
+    report = await pipeline.export_meeting("meet_1", [decision], [])
+
+    key = "decision_log:meet_1:Выбор архитектуры"
+    assert list(report.failed) == [key]
+    # Новые блоки уже добавлены, старые не удалены: страница не пустая
+    assert len(fake_notion.state["blocks"]["page_1"]) == 8
+
+    # Журнал не отметил обновление - повтор дочищает старое содержимое
+    retried = await pipeline.export_meeting("meet_1", [decision], [])
+    assert retried.updated == [key]
+    texts = [
+        block["paragraph"]["rich_text"][0]["text"]["content"]
+        for block in fake_notion.state["blocks"]["page_1"]
+    ]
+    assert "Обоснование: Независимые релизы команд" in texts
+    assert "Обоснование: Масштабируемость" not in texts
+    assert len(texts) == 4
+
+def test_client_shares_integration_rate_limit():
+    client = NotionClient(IntegrationHTTPClient("notion", "http://notion.invalid"))
+
+    assert client.rate_limit is integration_rate_limits.bucket("notion")
+
+@pytest.mark.asyncio
+async def test_export_resumes_after_partial_failure(pipeline, fake_notion, tmp_path):
+    fake_notion.state["fail_titles"] = {"Задача 2"}
+    first = await pipeline.export_meeting("meet_1", [], _tasks(4))
+
+    assert list(first.failed) == ["action_item:meet_1:Задача 2"]
+
+    # Новый экземпляр читает журнал с диска, как после рестарта
+    resumed = NotionExportPipeline(pipeline.client, ExportLedger(str(tmp_path)), database_id="db_1")
+    second = await resumed.export_meeting("meet_1", [], _tasks(4))
+
+    assert second.created == ["action_item:meet_1:Задача 2"]
+    assert len(second.skipped) == 3
+    assert fake_notion.state["creates"] == 4
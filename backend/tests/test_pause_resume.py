@@ -0,0 +1,243 @@
+"""
+Тесты паузы и возобновления run с контрольной точкой
+"""
+
+import asyncio
+
+import pytest
+from app.llm.client import ModelClient
+from app.llm.providers import MockModelProvider
+from app.models.llm import ModelRequest
+from app.models.runs import RunStatus
+from app.orchestrator.admission import RunAdmission
+from app.orchestrator.manager import RunPausedError, XIOOrchestrator
+from app.services.context import ContextWindowManager
+from app.services.messages import MessageService
+from app.services.run_log import RunLog
+from app.storage.run_state import MemoryRunStateStore
+
+class RecordingBroker:
+    def __init__(self):
+        self.events = []
+
+    async def emit_event(self, event):
+        self.events.append(event)
+
+class Worker:
+    """Отдельный воркер: свой журнал, клиент модели и слоты допуска поверх общего хранилища"""
+
+    def __init__(self, monkeypatch, store, token_delay=0.0):
+        self.log = RunLog(store)
+        self.client = ModelClient(MockModelProvider(token_delay=token_delay))
+        self.admission = RunAdmission(max_runs=1)
+        self.broker = RecordingBroker()
+        self.messages = MessageService()
+        self.context = ContextWindowManager(self.messages)
+        self.monkeypatch = monkeypatch
+        self.orchestrator = XIOOrchestrator()
+
+        async def no_flow(meeting_id, topic):
+            # Run остается активным, пока его не остановят
+            await asyncio.Event().wait()
+
+        self.orchestrator._simulate_basic_flow = no_flow
+        self.activate()
+
+    def activate(self):
+        for name, value in [("run_log", self.log), ("model_client", self.client),
+                            ("run_admission", self.admission), ("event_broker", self.broker),
+                            ("message_service", self.messages), ("context_window", self.context)]:
+            self.monkeypatch.setattr(f"app.orchestrator.manager.{name}", value)
+
+def _request(run_id):
+    return ModelRequest(
+        model="gpt-4",
+        messages=[{"role": "user", "content": "Монолит или микросервисы?"}],
+        run_id=run_id,
+        agent_id="expert_1"
+    )
+
+@pytest.mark.asyncio
+async def test_pause_checkpoints_run_and_releases_resources(monkeypatch):
+    store = MemoryRunStateStore()
+    worker = Worker(monkeypatch, store)
+    run_id = await worker.orchestrator.start_run("meet_1", "Архитектура")
+    message = await worker.orchestrator.stream_agent_turn("meet_1", _request(run_id))
+    spent = worker.client.get_run_usage(run_id).completion_tokens
+
+    assert await worker.orchestrator.pause_run()
+
+    assert worker.admission.get_stats()["active"] == 0
+    assert worker.client.get_run_usage(run_id).completion_tokens == 0
+    assert worker.log.get_state(run_id) is None
+    assert worker.orchestrator.get_status()["is_running"] is False
+
+    state = await RunLog(store).load_for_meeting("meet_1")
+    assert state.status == RunStatus.PAUSED
+    assert state.checkpoint.conversation_cursor == message.id
+    assert state.checkpoint.usage.completion_tokens == spent > 0
+
+@pytest.mark.asyncio
+async def test_paused_run_is_resumed_on_another_worker(monkeypatch):
+    store = MemoryRunStateStore()
+    first = Worker(monkeypatch, store)
+    run_id = await first.orchestrator.start_run("meet_1", "Архитектура")
+    message = await first.orchestrator.stream_agent_turn("meet_1", _request(run_id))
+    spent = first.client.get_run_usage(run_id).completion_tokens
+    await first.orchestrator.pause_run()
+
+    second = Worker(monkeypatch, store)
+    assert await second.orchestrator.resume_run("meet_1")
+
+    status = second.orchestrator.get_status()
+    assert status["current_run_id"] == run_id
+    assert status["run_state"]["status"] == "running"
+    assert status["run_state"]["last_message_id"] == message.id
+    assert status["usage"]["completion_tokens"] == spent
+    assert second.admission.get_stats()["active"] == 1
+
+    # Run уже ведет второй воркер
+    third = Worker(monkeypatch, store)
+    assert not await third.orchestrator.resume_run("meet_1")
+    assert third.admission.get_stats()["active"] == 0
+
+@pytest.mark.asyncio
+async def test_pause_interrupts_turn_in_flight(monkeypatch):
+    worker = Worker(monkeypatch, MemoryRunStateStore(), token_delay=0.02)
+    run_id = await worker.orchestrator.start_run("meet_1", "Архитектура")
+    turn = asyncio.create_task(worker.orchestrator.stream_agent_turn("meet_1", _request(run_id)))
+    await asyncio.sleep(0.05)
+
+    assert await worker.orchestrator.pause_run()
+    with pytest.raises(RunPausedError):
+        await turn
+
+    types = [event["type"] for event in worker.broker.events]
+    assert "chat_message_delta" in types
+    assert types[-1] == "chat_message_aborted"
+    assert worker.messages.get_messages("meet_1") == []
+
+@pytest.mark.asyncio
+async def test_paused_run_can_be_stopped_by_any_worker(monkeypatch):
+    store = MemoryRunStateStore()
+    first = Worker(monkeypatch, store)
+    await first.orchestrator.start_run("meet_1", "Архитектура")
+    await first.orchestrator.pause_run()
+
+    second = Worker(monkeypatch, store)
+    assert await second.orchestrator.stop_run("meet_1")
+    assert (await RunLog(store).load_for_meeting("meet_1")).status == RunStatus.STOPPED
+    assert not await second.orchestrator.resume_run("meet_1")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("crash, status", [(False, RunStatus.COMPLETED), (True, RunStatus.STOPPED)])
+async def test_finished_or_crashed_run_frees_its_slot(monkeypatch, crash, status):
+    store = MemoryRunStateStore()
+    worker = Worker(monkeypatch, store)
+    finish = asyncio.Event()
+
+    async def flow(meeting_id, topic):
+        await finish.wait()
+        if crash:
+            raise RuntimeError("агент упал")
+
+    worker.orchestrator._simulate_basic_flow = flow
+    run_id = await worker.orchestrator.start_run("meet_1", "Архитектура")
+    assert worker.admission.get_stats()["active"] == 1
+
+    finish.set()
+    for _ in range(100):
+        if worker.admission.get_stats()["active"] == 0:
+            break
+        await asyncio.sleep(0.01)
+
+    assert worker.admission.get_stats()["active"] == 0
+    assert worker.orchestrator.get_status()["is_running"] is False
+    assert (await RunLog(store).load_for_meeting("meet_1")).status == status
+    assert worker.broker.events[-1]["run_id"] == run_id
+    assert worker.broker.events[-1]["status"] == ("stopped" if crash else "completed")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("paused", [False, True])
+async def test_stopped_run_forgets_meeting_context(monkeypatch, paused):
+    worker = Worker(monkeypatch, MemoryRunStateStore())
+    await worker.orchestrator.start_run("meet_1", "Архитектура")
+    worker.context.build_prompt("meet_1", "moderator", "Вы модератор")
+    assert "meet_1" in worker.context._contexts
+
+    if paused:
+        await worker.orchestrator.pause_run()
+    assert await worker.orchestrator.stop_run("meet_1")
+    assert "meet_1" not in worker.context._contexts
+
+@pytest.mark.asyncio
+async def test_concurrent_starts_admit_only_one_run(monkeypatch):
+    worker = Worker(monkeypatch, MemoryRunStateStore())
+
+    results = await asyncio.gather(
+        worker.orchestrator.start_run("meet_1", "Архитектура"),
+        worker.orchestrator.start_run("meet_2", "Архитектура"),
+        return_exceptions=True
+    )
+
+    run_ids = [result for result in results if isinstance(result, str)]
+    assert len(run_ids) == 1
+    assert isinstance(next(result for result in results if not isinstance(result, str)), ValueError)
+    assert worker.admission.get_stats()["active"] == 1
+    assert worker.orchestrator.get_status()["current_run_id"] == run_ids[0]
+    assert await worker.orchestrator.stop_run()
+    assert worker.admission.get_stats()["active"] == 0
+
+async def _wait_for_free_slot(admission):
+    for _ in range(100):
+        if admission.get_stats()["active"] == 0:
+            return
+        await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_resumed_run_frees_its_slot_when_flow_ends(monkeypatch):
+    store = MemoryRunStateStore()
+    first = Worker(monkeypatch, store)
+    run_id = await first.orchestrator.start_run("meet_1", "Архитектура")
+    await first.orchestrator.pause_run()
+
+    second = Worker(monkeypatch, store)
+    finish = asyncio.Event()
+
+    async def flow(meeting_id, topic):
+        assert (meeting_id, topic) == ("meet_1", "Архитектура")
+        await finish.wait()
+
+    second.orchestrator._simulate_basic_flow = flow
+    assert await second.orchestrator.resume_run("meet_1")
+    assert second.admission.get_stats()["active"] == 1
+
+    finish.set()
+    await _wait_for_free_slot(second.admission)
+
+    assert second.admission.get_stats()["active"] == 0
+    assert (await RunLog(store).load_for_meeting("meet_1")).status == RunStatus.COMPLETED
+    assert second.broker.events[-1]["run_id"] == run_id
+
+@pytest.mark.asyncio
+async def test_recovery_continues_flow_and_survives_admission_timeout(monkeypatch):
+    store = MemoryRunStateStore()
+    crashed = Worker(monkeypatch, store)
+    run_id = await crashed.orchestrator.start_run("meet_1", "Архитектура")
+
+    # Слоты заняты: восстановление не срывает старт приложения
+    busy = Worker(monkeypatch, store)
+    busy.admission = RunAdmission(max_runs=1, timeout=0.01)
+    await busy.admission.acquire("run_other")
+    busy.activate()
+    await busy.orchestrator.initialize()
+    assert busy.orchestrator.get_status()["is_running"] is False
+    assert busy.log.get_state(run_id) is None
+
+    restarted = Worker(monkeypatch, store)
+    await restarted.orchestrator.initialize()
+    assert restarted.orchestrator.get_status()["current_run_id"] == run_id
+    assert restarted.admission.get_stats()["active"] == 1
+    assert restarted.orchestrator._run_task is not None and not restarted.orchestrator._run_task.done()
+    assert await restarted.orchestrator.stop_run()
+    assert restarted.admission.get_stats()["active"] == 0
@@ -0,0 +1,140 @@
+"""
+Тесты для кеша промптов в клиенте моделей
+"""
+
+import asyncio
+
+import pytest
+from app.llm.client import ModelClient
+from app.llm.embeddings import HashingEmbedder, cosine
+from app.llm.prompt_cache import PromptCache
+from app.llm.providers import MockModelProvider
+from app.models.llm import ModelRequest
+
+class SemanticEmbedder(HashingEmbedder):
+    """hashing-векторы, выданные за семантические: для проверки semantic-уровня"""
+    semantic = True
+
+def _request(content, history=None, **kwargs):
+    kwargs.setdefault("run_id", "run_1")
+    kwargs.setdefault("agent_id", "moderator")
+    kwargs.setdefault("agent_role", "moderator")
+    kwargs.setdefault("team_version", "team_1@1.0")
+    messages = (history or []) + [{"role": "user", "content": content}]
+    return ModelRequest(model="gpt-4", messages=messages, **kwargs)
+
+def _client(embedder=None, **overrides):
+    cache = PromptCache(embedder or SemanticEmbedder())
+    cache.settings = cache.settings.model_copy(update=overrides)
+    provider = MockModelProvider()
+    return ModelClient(provider, cache=cache), provider
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dim=64)
+
+    first = embedder.embed_one("Оценка рисков решения")
+    second = embedder.embed_one("Оценка рисков решения")
+
+    assert first == second
+    assert cosine(first, first) == pytest.approx(1.0)
+    assert cosine(first, embedder.embed_one("Совсем другая тема встречи")) < 0.5
+
+@pytest.mark.asyncio
+async def test_exact_hit_skips_model_and_saves_tokens():
+    client, provider = _client()
+
+    first = await client.complete(_request("Откройте встречу по теме архитектуры"))
+    second = await client.complete(_request("Откройте встречу по теме архитектуры"))
+
+    assert provider.calls == 1
+    assert (first.cache, second.cache) == (None, "exact")
+    assert second.content == first.content
+
+    usage = client.get_run_usage("run_1")
+    assert usage.cache_hits == {"exact": 1}
+    assert usage.cache_misses == 1
+    assert usage.tokens_saved == first.total_tokens
+    assert usage.cache_hit_ratio == 0.5
+    assert usage.model_dump()["cache_hit_ratio"] == 0.5
+
+@pytest.mark.asyncio
+async def test_semantic_hit_within_partition_only():
+    client, provider = _client(LLM_PROMPT_CACHE_SIMILARITY=0.95)
+
+    await client.complete(_request("Оцените риски выбранного решения."))
+    similar = await client.complete(_request("оцените риски выбранного решения"))
+    other_team = await client.complete(_request("оцените риски выбранного решения", team_version="team_1@2.0"))
+
+    assert similar.cache == "semantic"
+    assert other_team.cache is None
+    assert provider.calls == 2
+
+@pytest.mark.asyncio
+async def test_semantic_tier_is_exact_only_by_default():
+    client, provider = _client()
+    assert client.cache.settings.LLM_PROMPT_CACHE_SIMILARITY == 1.0
+
+    await client.complete(_request("Оцените риски выбранного решения."))
+    similar = await client.complete(_request("оцените риски выбранного решения"))
+
+    assert similar.cache is None and provider.calls == 2
+
+@pytest.mark.asyncio
+async def test_semantic_tier_skips_multi_turn_prompts_and_hashing_embedder():
+    history = [
+        {"role": "system", "content": "Вы - модератор консилиума"},
+        *[{"role": "assistant", "content": f"Реплика {i} о выборе архитектуры и рисках"} for i in range(12)]
+    ]
+    client, provider = _client(LLM_PROMPT_CACHE_SIMILARITY=0.9)
+    await client.complete(_request("Какие риски у микросервисов?", history))
+    other = await client.complete(_request("Какие сроки у микросервисов?", history))
+    assert other.cache is None
+
+    lexical, lexical_provider = _client(HashingEmbedder(), LLM_PROMPT_CACHE_SIMILARITY=0.95)
+    await lexical.complete(_request("Оцените риски выбранного решения."))
+    similar = await lexical.complete(_request("оцените риски выбранного решения"))
+    assert similar.cache is None and lexical_provider.calls == 2
+
+@pytest.mark.asyncio
+async def test_agent_opt_out_and_request_opt_out():
+    client, provider = _client(LLM_PROMPT_CACHE_DISABLED_AGENTS=["expert_security"])
+
+    for _ in range(2):
+        await client.complete(_request("Проверьте безопасность", agent_id="expert_security"))
+    for _ in range(2):
+        await client.complete(_request("Свежая идея", cacheable=False))
+
+    assert provider.calls == 4
+    assert client.get_run_usage("run_1").cache_misses == 0
+
+@pytest.mark.asyncio
+async def test_lru_and_ttl_eviction():
+    client, provider = _client(LLM_PROMPT_CACHE_MAX_ENTRIES=2, LLM_PROMPT_CACHE_SIMILARITY=1.0)
+
+    for prompt in ["первый", "второй", "третий"]:
+        await client.complete(_request(prompt))
+    assert client.cache.get_stats()["entries"] == 2
+
+    assert (await client.complete(_request("третий"))).cache == "exact"
+    assert (await client.complete(_request("первый"))).cache is None
+
+    client.cache.settings = client.cache.settings.model_copy(update={"LLM_PROMPT_CACHE_TTL": 0.01})
+    await client.complete(_request("короткоживущий"))
+    await asyncio.sleep(0.02)
+    assert (await client.complete(_request("короткоживущий"))).cache is None
+
+@pytest.mark.asyncio
+async def test_stream_served_from_cache_as_single_delta():
+    client, provider = _client()
+    await client.complete(_request("Запросите альтернативы"))
+
+    deltas = []
+
+    async def on_delta(delta):
+        deltas.append(delta)
+
+    response = await client.stream(_request("Запросите альтернативы"), on_delta)
+
+    assert response.cache == "exact"
+    assert deltas == [response.content]
+    assert provider.calls == 1
@@ -0,0 +1,157 @@
+"""
+Тесты для поиска по истории встреч
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from app.llm.embeddings import CachedEmbedder, HashingEmbedder
+from app.models.artifacts import ActionItem, Alternative, DecisionLog
+from app.models.retrieval import RetrievalDocument
+from app.services.rag_service import RetrievalService
+from app.storage.vector_index import BruteForceIndex, MetadataFilter
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=128)
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        return await super().embed(texts)
+
+def _service():
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner, cache_size=100)
+    embedder.settings = embedder.settings.model_copy(update={
+        "EMBEDDING_BATCH_SIZE": 4,
+        "EMBEDDING_BATCH_WINDOW_MS": 5
+    })
+    return RetrievalService(index=BruteForceIndex(), embedder=embedder), inner
+
+def _doc(doc_id, text, meeting_id="meet_1", team_id="team_a", day=1, kind="message"):
+    return RetrievalDocument(
+        id=doc_id, text=text, kind=kind, meeting_id=meeting_id,
+        team_id=team_id, created_at=datetime(2024, 1, day, 12, 0)
+    )
+
+@pytest.mark.asyncio
+async def test_top_k_returns_most_similar_first():
+    service, _ = _service()
+    await service.index_documents([
+        _doc("d1", "переход на kubernetes для оркестрации контейнеров"),
+        _doc("d2", "бюджет маркетинга на следующий квартал"),
+        _doc("d3", "миграция сервисов в kubernetes кластер"),
+    ])
+
+    hits = await service.search("kubernetes кластер", k=2)
+
+    assert [hit.id for hit in hits] == ["d3", "d1"]
+    assert hits[0].score >= hits[1].score
+    assert hits[0].meeting_id == "meet_1" and hits[0].team_id == "team_a"
+
+@pytest.mark.asyncio
+async def test_filters_by_meeting_team_date_and_kind():
+    service, _ = _service()
+    await service.index_documents([
+        _doc("d1", "выбор базы данных postgres", meeting_id="meet_1", team_id="team_a", day=1),
+        _doc("d2", "выбор базы данных postgres", meeting_id="meet_2", team_id="team_a", day=10),
+        _doc("d3", "выбор базы данных postgres", meeting_id="meet_3", team_id="team_b", day=20, kind="decision"),
+    ])
+
+    by_meeting = await service.search("база данных", meeting_id="meet_2")
+    by_team = await service.search("база данных", team_id="team_b")
+    by_date = await service.search("база данных", date_from=datetime(2024, 1, 5), date_to=datetime(2024, 1, 15))
+    by_kind = await service.search("база данных", kinds=["decision"])
+
+    assert [hit.id for hit in by_meeting] == ["d2"]
+    assert [hit.id for hit in by_team] == ["d3"]
+    assert [hit.id for hit in by_date] == ["d2"]
+    assert [hit.id for hit in by_kind] == ["d3"]
+
+@pytest.mark.asyncio
+async def test_reindexing_is_idempotent():
+    service, _ = _service()
+    decision = DecisionLog(
+        meeting_id="meet_1",
+        title="Архитектура",
+        alternatives=[Alternative(option="Монолит"), Alternative(option="Микросервисы")],
+        rationale="Проще сопровождать",
+        decision="Модульный монолит"
+    )
+    item = ActionItem(meeting_id="meet_1", title="Настроить CI", description="GitHub Actions", assignee="devops")
+
+    await service.index_decision(decision, team_id="team_a")
+    await service.index_decision(decision, team_id="team_a")
+    await service.index_action_item(item)
+    await service.index_action_item(item)
+
+    assert await service.index.count() == 2
+    hits = await service.search("модульный монолит", kinds=["decision"])
+    assert hits[0].kind == "decision" and hits[0].metadata["title"] == "Архитектура"
+
+@pytest.mark.asyncio
+async def test_embeddings_are_cached_and_batched():
+    service, inner = _service()
+    texts = [f"реплика номер {i}" for i in range(6)]
+
+    # Конкурентные вызовы сливаются в пачки не больше EMBEDDING_BATCH_SIZE
+    await asyncio.gather(*(service.embedder.embed([text]) for text in texts))
+    assert sum(len(batch) for batch in inner.calls) == 6
+    assert all(len(batch) <= 4 for batch in inner.calls)
+    assert len(inner.calls) == 2
+
+    # Повторные тексты берутся из кеша
+    calls = len(inner.calls)
+    await service.embedder.embed(texts[:3])
+    assert len(inner.calls) == calls
+    assert service.embedder.get_stats()["hits"] == 3
+
+def test_metadata_filter_chroma_where():
+    where = MetadataFilter(equals={"meeting_id": "meet_1"}, one_of={"kind": ["decision", "task"]}, ts_from=10.0)
+
+    assert where.to_chroma() == {"$and": [
+        {"meeting_id": "meet_1"},
+        {"kind": {"$in": ["decision", "task"]}},
+        {"ts": {"$gte": 10.0}},
+    ]}
+    assert MetadataFilter().to_chroma() is None
+    assert where.matches({"meeting_id": "meet_1", "kind": "task", "ts": 11.0})
+    assert not where.matches({"meeting_id": "meet_1", "kind": "message", "ts": 11.0})
+
+@pytest.mark.asyncio
+async def test_brute_force_delete_keeps_positions_consistent():
+    index = BruteForceIndex()
+    service = RetrievalService(index=index, embedder=HashingEmbedder(64))
+    await service.index_documents([_doc(f"d{i}", f"текст {i}") for i in range(4)])
+
+    await index.delete(["d0", "missing"])
+
+    assert await index.count() == 3
+    hits = await service.search("текст 3", k=1)
+    assert hits[0].id == "d3"
+
+@pytest.mark.asyncio
+async def test_brute_force_matrix_is_updated_in_place():
+    pytest.importorskip("numpy")
+    index = BruteForceIndex()
+    embedder = HashingEmbedder(64)
+    service = RetrievalService(index=index, embedder=embedder)
+    await service.index_documents([_doc(f"d{i}", f"текст {i}") for i in range(4)])
+    await service.search("текст 1", k=1)
+    matrix = index._matrix
+
+    # Замена, удаление и добавление не сбрасывают матрицу
+    await service.index_documents([_doc("d1", "совсем другой текст")])
+    await index.delete(["d0"])
+    await service.index_documents([_doc("d4", "текст 4")])
+
+    assert index._matrix is matrix
+    assert (await service.search("совсем другой текст", k=1))[0].id == "d1"
+    assert (await service.search("текст 3", k=1))[0].id == "d3"
+
+    # Рост за пределы емкости сохраняет строки
+    await service.index_documents([_doc(f"n{i}", f"новый {i}") for i in range(10)])
+    assert (await service.search("новый 7", k=1))[0].id == "n7"
+    assert (await service.search("текст 4", k=1))[0].id == "d4"
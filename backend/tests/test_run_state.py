@@ -0,0 +1,369 @@
+"""
+Тесты журнала событий run и восстановления из снимков
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1 import meetings, participants
+from app.models.participants import ParticipantRole
+from app.models.runs import RunEvent, RunEventType, RunState, RunStatus
+from app.observability.metrics import metrics_registry
+from app.services.participants import ParticipantService
+from app.services.run_log import RunLog, SpeakingOrderConflict
+from app.storage.run_state import (
+    MemoryRunStateStore,
+    RedisRunStateStore,
+    SQLiteRunStateStore
+)
+from redis.crc import key_slot
+
+try:
+    import fakeredis
+    import fakeredis.aioredis
+except ImportError:  # pragma: no cover - тесты Redis-бэкенда пропускаются
+    fakeredis = None
+
+def _fake_redis(server=None):
+    """Redis в памяти с настоящим исполнением Lua (fakeredis[lua])"""
+    if fakeredis is None:
+        pytest.skip("fakeredis не установлен")
+    return fakeredis.aioredis.FakeRedis(server=server or fakeredis.FakeServer(), decode_responses=True)
+
+@pytest_asyncio.fixture(params=["memory", "sqlite", "redis"])
+async def store(request, tmp_path):
+    if request.param == "memory":
+        store = MemoryRunStateStore()
+    elif request.param == "sqlite":
+        store = SQLiteRunStateStore(str(tmp_path / "run_state.sqlite3"))
+    else:
+        store = RedisRunStateStore(client=_fake_redis())
+    yield store
+    await store.close()
+
+def _log(store, snapshot_interval=100):
+    log = RunLog(store)
+    log.settings = log.settings.model_copy(update={"RUN_SNAPSHOT_INTERVAL": snapshot_interval})
+    return log
+
+def _order():
+    service = ParticipantService()
+    participants = [
+        service.create_participant("moderator", "meet_1", ParticipantRole.MODERATOR, "Модератор"),
+        service.create_participant("expert_1", "meet_1", ParticipantRole.EXPERT, "Эксперт 1"),
+        service.create_participant("expert_2", "meet_1", ParticipantRole.EXPERT, "Эксперт 2"),
+    ]
+    return service, service.create_speaking_order("meet_1", participants)
+
+@pytest.mark.asyncio
+async def test_state_is_rebuilt_from_log(store):
+    """Новый процесс восстанавливает очередь, статусы и курсор переписки"""
+    log = _log(store)
+    await log.start_run("run_1", "meet_1", "Архитектура")
+    service, order = _order()
+    await log.record_for_meeting("meet_1", RunEventType.SPEAKER_CHANGED, order.model_dump(exclude={"meeting_id"}))
+    await log.record("run_1", RunEventType.MESSAGE, {"message_id": "msg_1", "agent_id": "moderator"})
+    order = service.next_speaker("meet_1")
+    await log.record(
+        "run_1", RunEventType.SPEAKER_CHANGED, order.model_dump(include={"current_speaker", "next_speaker", "round"})
+    )
+    await log.record("run_1", RunEventType.MESSAGE, {"message_id": "msg_2", "agent_id": "expert_1"})
+    live = log.get_state("run_1")
+    await log.record("run_1", RunEventType.RUN_PAUSED)
+
+    restored = await _log(store).recover("run_1")
+
+    assert restored.model_dump() == live.model_dump()
+    assert restored.status == RunStatus.PAUSED
+    assert restored.speaking_order.current_speaker == "expert_1"
+    assert restored.participant_statuses == {"moderator": "waiting", "expert_1": "speaking", "expert_2": "next"}
+    assert restored.last_message_id == "msg_2"
+    assert restored.message_count == 2
+
+@pytest.mark.asyncio
+async def test_recovery_replays_only_tail_after_snapshot(store):
+    log = _log(store, snapshot_interval=10)
+    await log.start_run("run_1", "meet_1")
+    for i in range(24):
+        await log.record("run_1", RunEventType.MESSAGE, {"message_id": f"msg_{i}"})
+
+    recovering = _log(store)
+    state = await recovering.recover("run_1")
+
+    assert state.message_count == 24
+    assert state.last_seq == 25
+    assert recovering.get_stats()["last_recovery"]["snapshot_seq"] == 20
+    assert recovering.get_stats()["last_recovery"]["replayed_events"] == 5
+
+@pytest.mark.asyncio
+async def test_finished_run_is_snapshotted_and_not_recovered_as_active(store):
+    log = _log(store)
+    await log.start_run("run_done", "meet_1")
+    await log.record("run_done", RunEventType.RUN_STOPPED)
+    await log.start_run("run_live", "meet_2")
+    await log.record("run_live", RunEventType.MESSAGE, {"message_id": "msg_1"})
+
+    assert log.get_state("run_done") is None
+    assert (await store.load_snapshot("run_done")).status == RunStatus.STOPPED
+
+    recovering = _log(store)
+    active = await recovering.recover_active()
+    assert [state.run_id for state in active] == ["run_live"]
+    assert recovering.active_run("meet_2").message_count == 1
+
+@pytest.mark.asyncio
+async def test_events_are_idempotent_by_seq(store):
+    log = _log(store)
+    await log.start_run("run_1", "meet_1")
+    event = await log.record("run_1", RunEventType.MESSAGE, {"message_id": "msg_1"})
+
+    state = await _log(store).recover("run_1")
+    state.apply(event)
+    assert state.message_count == 1
+
+    with pytest.raises(ValueError):
+        await store.append([event])
+
+@pytest.mark.asyncio
+async def test_broker_events_are_recorded():
+    """Вызовы инструментов и решения приходят в журнал из брокера"""
+    log = _log(MemoryRunStateStore())
+    await log.start_run("run_1", "meet_1")
+    await log._on_tool_execution({"type": "tool_execution", "run_id": "run_1", "status": "running"})
+    await log._on_tool_execution({"type": "tool_execution", "run_id": "run_1", "status": "completed", "tool_id": "jira"})
+    await log._on_artifact_created({
+        "type": "artifact_created", "meeting_id": "meet_1", "artifact_type": "decision_log", "summary": "Модульный монолит"
+    })
+    await log._on_artifact_created({"type": "artifact_created", "meeting_id": "meet_2", "artifact_type": "decision_log"})
+
+    state = log.get_state("run_1")
+    assert state.tool_calls == 1
+    assert state.decisions == ["Модульный монолит"]
+
+@pytest.mark.asyncio
+async def test_recovery_time_is_measured(store):
+    metrics_registry.reset()
+    log = _log(store)
+    await log.start_run("run_1", "meet_1")
+    await log.record("run_1", RunEventType.MESSAGE, {"message_id": "msg_1"})
+
+    await _log(store).recover("run_1")
+
+    [series] = metrics_registry.snapshot()["histograms"]["run_recovery_seconds"]
+    assert series["labels"] == {"backend": store.name}
+    assert series["count"] == 1
+
+@pytest.mark.asyncio
+async def test_speaking_order_compare_and_set(store):
+    _, order = _order()
+    assert await store.save_speaking_order(order, expected_version=0)
+    assert not await store.save_speaking_order(order, expected_version=0)
+
+    stored, version = await store.load_speaking_order("meet_1")
+    assert (stored, version) == (order, 1)
+    moved = order.model_copy(update={"current_speaker": "expert_1"})
+    assert await store.save_speaking_order(moved, expected_version=1)
+    assert not await store.save_speaking_order(order, expected_version=1)
+    assert (await store.load_speaking_order("meet_1"))[0].current_speaker == "expert_1"
+
+@pytest.mark.asyncio
+async def test_concurrent_speaker_change_is_retried_on_fresh_order(monkeypatch):
+    """Запись другой реплики между WATCH и EXEC: шаг повторяется от ее очереди"""
+    server = fakeredis.FakeServer() if fakeredis is not None else None
+    redis_a, redis_b = _fake_redis(server), _fake_redis(server)
+    replica_a, replica_b = RunLog(RedisRunStateStore(client=redis_a)), RunLog(RedisRunStateStore(client=redis_b))
+    service, order = _order()
+    await replica_a.update_speaking_order("meet_1", lambda current: order)
+
+    pipeline = redis_a.pipeline
+    interfere = [True]
+
+    def pipeline_with_other_replica(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        watch = pipe.watch
+
+        async def watch_then_other_replica_moves(*keys):
+            await watch(*keys)
+            if interfere:
+                interfere.clear()
+                await replica_b.update_speaking_order("meet_1", service.advance_speaking_order)
+
+        pipe.watch = watch_then_other_replica_moves
+        return pipe
+
+    monkeypatch.setattr(redis_a, "pipeline", pipeline_with_other_replica)
+    metrics_registry.reset()
+    result = await replica_a.update_speaking_order("meet_1", service.advance_speaking_order)
+
+    # Оба шага применены: moderator -> expert_1 -> expert_2
+    assert result.current_speaker == "expert_2"
+    assert (await replica_b.get_speaking_order("meet_1")).current_speaker == "expert_2"
+    [conflicts] = metrics_registry.snapshot()["counters"]["speaking_order_conflicts_total"]
+    assert conflicts["value"] == 1
+
+@pytest.mark.asyncio
+async def test_speaking_order_conflict_is_raised_after_retries():
+    class BusyStore(MemoryRunStateStore):
+        async def save_speaking_order(self, order, expected_version):
+            return False
+
+    _, order = _order()
+    with pytest.raises(SpeakingOrderConflict):
+        await RunLog(BusyStore()).update_speaking_order("meet_1", lambda current: order)
+
+@pytest.mark.asyncio
+async def test_redis_run_keys_share_one_cluster_slot():
+    """Скрипт дозаписи трогает только ключи run из одного слота, индексы - следом"""
+    redis = _fake_redis()
+    log = _log(RedisRunStateStore(client=redis), snapshot_interval=1)
+    await log.start_run("run_1", "meet_1")
+
+    assert key_slot(b"xio:run:{run_1}") == key_slot(b"xio:run:{run_1}:events")
+    assert await redis.hget("xio:run:{run_1}", "status") == "running"
+    assert await redis.smembers("xio:runs:running") == {"run_1"}
+    assert await redis.get("xio:meeting:meet_1:run") == "run_1"
+
+    await log.record("run_1", RunEventType.RUN_PAUSED)
+    assert await redis.smembers("xio:runs:paused") == {"run_1"}
+    assert not await redis.smembers("xio:runs:running")
+    assert RunState.model_validate_json(await redis.hget("xio:run:{run_1}", "snapshot")).status == RunStatus.PAUSED
+
+@pytest.mark.asyncio
+async def test_redis_status_set_lagging_behind_run_hash_is_ignored():
+    """Сбой между скриптом и обновлением индекса: статус берется из hash run"""
+    redis = _fake_redis()
+    store = RedisRunStateStore(client=redis)
+    log = _log(store)
+    await log.start_run("run_1", "meet_1")
+    await redis.hset("xio:run:{run_1}", "status", "stopped")
+
+    assert await store.list_runs(["running"]) == []
+
+def test_meeting_status_is_served_by_any_replica(monkeypatch):
+    """Run ведет одна реплика, статус и очередь отдает другая"""
+
+    server = fakeredis.FakeServer() if fakeredis is not None else None
+    owner = RunLog(RedisRunStateStore(client=_fake_redis(server)))
+    service, order = _order()
+
+    async def run_on_owner():
+        await owner.start_run("run_1", "meet_1", "Архитектура")
+        await owner.update_speaking_order("meet_1", lambda current: order)
+        await owner.update_speaking_order("meet_1", service.advance_speaking_order)
+        await owner.record("run_1", RunEventType.MESSAGE, {"message_id": "msg_1"})
+
+    asyncio.run(run_on_owner())
+
+    replica = RunLog(RedisRunStateStore(client=_fake_redis(server)))
+    monkeypatch.setattr(meetings, "run_log", replica)
+    monkeypatch.setattr(participants, "run_log", replica)
+    app = FastAPI()
+    app.include_router(meetings.router, prefix="/api/v1")
+    app.include_router(participants.router, prefix="/api/v1")
+    # Один event loop на все запросы: клиент Redis реплики привязан к нему
+    with TestClient(app) as client:
+        body = client.get("/api/v1/meetings/meet_1/status").json()
+        assert body["run"]["run_id"] == "run_1"
+        assert body["run"]["status"] == "running"
+        assert body["run"]["last_message_id"] == "msg_1"
+        assert body["run"]["speaking_order"]["current_speaker"] == "expert_1"
+        assert body["speaking_order"]["current_speaker"] == "expert_1"
+        assert client.get("/api/v1/meetings/meet_1/speaking-order").json()["current_speaker"] == "expert_1"
+
+@pytest.mark.asyncio
+async def test_paused_run_is_resumed_by_one_worker_only(store):
+    log = _log(store)
+    await log.start_run("run_1", "meet_1")
+    await log.record("run_1", RunEventType.MESSAGE, {"message_id": "msg_1"})
+    await log.record("run_1", RunEventType.RUN_PAUSED, {"checkpoint": {"conversation_cursor": "msg_1"}})
+    assert log.get_state("run_1") is None
+
+    results = await asyncio.gather(_log(store).resume("run_1"), _log(store).resume("run_1"))
+
+    claimed = [result for result in results if result is not None]
+    assert len(claimed) == 1
+    state, checkpoint = claimed[0]
+    assert state.status == RunStatus.RUNNING and state.checkpoint is None
+    assert checkpoint.conversation_cursor == "msg_1"
+    assert (await _log(store).recover("run_1")).status == RunStatus.RUNNING
+
+@pytest.mark.asyncio
+async def test_losing_claim_leaves_no_partial_writes(store):
+    """Проигравший гонку stop не перетирает индекс и снимок продолженного run"""
+    log = _log(store)
+    await log.start_run("run_1", "meet_1")
+    await log.record("run_1", RunEventType.RUN_PAUSED)
+    paused = await store.load_snapshot("run_1")
+
+    await store.write([RunEvent(run_id="run_1", seq=3, type=RunEventType.RUN_RESUMED)], index=("meet_1", "running"))
+    stopped = paused.model_copy(deep=True).apply(RunEvent(run_id="run_1", seq=3, type=RunEventType.RUN_STOPPED))
+    with pytest.raises(ValueError):
+        await store.write(
+            [RunEvent(run_id="run_1", seq=3, type=RunEventType.RUN_STOPPED)],
+            index=("meet_1", "stopped"),
+            snapshot=stopped
+        )
+
+    assert (await store.load_snapshot("run_1")).status == RunStatus.PAUSED
+    assert [state.run_id for state in await _log(store).recover_active()] == ["run_1"]
+
+@pytest.mark.asyncio
+async def test_speaker_change_on_other_replica_is_logged(store):
+    """Смену очереди на реплике без run видят журнал, владелец run и восстановление"""
+    owner = _log(store)
+    await owner.start_run("run_1", "meet_1")
+    _, order = _order()
+    await _log(store).update_speaking_order("meet_1", lambda current: order)
+
+    await owner.record("run_1", RunEventType.MESSAGE, {"message_id": "msg_1"})
+
+    live = owner.get_state("run_1")
+    assert live.speaking_order.current_speaker == "moderator"
+    assert live.message_count == 1 and live.last_seq == 3
+    restored = await _log(store).recover("run_1")
+    assert restored.model_dump() == live.model_dump()
+
+def _replica(store, owner, lease_ttl=30.0):
+    log = RunLog(store, owner=owner)
+    log.settings = log.settings.model_copy(update={"RUN_LEASE_TTL": lease_ttl})
+    return log
+
+@pytest.mark.asyncio
+async def test_live_replica_runs_are_not_recovered_by_others(store):
+    """Масштабирование: новая реплика не забирает run живой реплики, только с истекшей арендой"""
+    live = _replica(store, "replica_a")
+    await live.start_run("run_live", "meet_1")
+    crashed = _replica(store, "replica_b", lease_ttl=0.05)
+    await crashed.start_run("run_orphan", "meet_2")
+    await asyncio.sleep(0.1)
+
+    scaled = _replica(store, "replica_c")
+    assert [state.run_id for state in await scaled.recover_active()] == ["run_orphan"]
+    assert scaled.get_state("run_live") is None
+
+    # Владелец после рестарта продолжает свой run сразу
+    assert [state.run_id for state in await _replica(store, "replica_a").recover_active()] == ["run_live"]
+
+@pytest.mark.asyncio
+async def test_finished_run_releases_its_lease(store):
+    log = _replica(store, "replica_a")
+    await log.start_run("run_1", "meet_1")
+    assert not await store.claim_run("run_1", "replica_b", 30.0)
+
+    await log.record("run_1", RunEventType.RUN_PAUSED)
+    assert await store.claim_run("run_1", "replica_b", 30.0)
+
+@pytest.mark.asyncio
+async def test_run_with_lost_lease_is_no_longer_led(store):
+    stalled = _replica(store, "replica_a", lease_ttl=0.05)
+    await stalled.start_run("run_1", "meet_1")
+    await asyncio.sleep(0.1)
+    assert [state.run_id for state in await _replica(store, "replica_b").recover_active()] == ["run_1"]
+
+    await stalled.renew_leases()
+
+    assert stalled.get_state("run_1") is None
+    assert not await store.claim_run("run_1", "replica_a", 30.0)
@@ -0,0 +1,136 @@
+"""
+Тесты для пула прогретых воркеров песочницы (локальный бэкенд)
+"""
+
+import asyncio
+import os
+import shutil
+import pytest
+import pytest_asyncio
+from app.observability.metrics import metrics_registry
+from app.tools.sandbox.backends import (
+    DockerBackend,
+    LocalProcessBackend,
+    SandboxError,
+    SandboxTimeoutError,
+    create_backend
+)
+from app.tools.sandbox.pool import SandboxExecutor
+
+# Инструменты, исполняемые внутри воркера
+
+def add_tool(a, b):
+    return {"sum": a + b, "pid": os.getpid()}
+
+def leak_env_tool():
+    previous = os.environ.get("XIO_SANDBOX_LEAK")
+    os.environ["XIO_SANDBOX_LEAK"] = "1"
+    return previous
+
+def read_env_tool(name):
+    return os.environ.get(name)
+
+def sleep_tool(seconds):
+    import time
+    time.sleep(seconds)
+
+def failing_tool():
+    raise RuntimeError("boom")
+
+@pytest_asyncio.fixture
+async def executor():
+    executor = SandboxExecutor(backend=LocalProcessBackend())
+    pool = executor.get_pool("default")
+    pool.min_idle = 1
+    pool.max_size = 2
+    yield executor
+    await executor.stop()
+
+@pytest.mark.asyncio
+async def test_warm_worker_is_reused(executor):
+    await executor.start()
+
+    first = await executor.execute("tests.test_sandbox:add_tool", {"a": 1, "b": 2})
+    second = await executor.execute("tests.test_sandbox:add_tool", {"a": 2, "b": 3})
+
+    assert first["sum"] == 3
+    assert second["sum"] == 5
+    assert first["pid"] == second["pid"]
+    assert executor.get_pool("default").size == 1
+
+@pytest.mark.asyncio
+async def test_state_is_reset_between_calls(executor):
+    assert await executor.execute("tests.test_sandbox:leak_env_tool", {}) is None
+    assert await executor.execute("tests.test_sandbox:leak_env_tool", {}) is None
+
+@pytest.mark.asyncio
+async def test_tool_error_keeps_worker(executor):
+    ok = await executor.execute("tests.test_sandbox:add_tool", {"a": 1, "b": 1})
+    with pytest.raises(SandboxError, match="boom"):
+        await executor.execute("tests.test_sandbox:failing_tool", {})
+    again = await executor.execute("tests.test_sandbox:add_tool", {"a": 1, "b": 1})
+
+    assert ok["pid"] == again["pid"]
+
+@pytest.mark.asyncio
+async def test_timeout_replaces_worker(executor):
+    with pytest.raises(SandboxTimeoutError):
+        await executor.execute("tests.test_sandbox:sleep_tool", {"seconds": 5}, timeout=0.5)
+
+    result = await executor.execute("tests.test_sandbox:add_tool", {"a": 1, "b": 1})
+    assert result["sum"] == 2
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_and_metrics_recorded(executor):
+    metrics_registry.reset()
+
+    await asyncio.gather(*[
+        executor.execute("tests.test_sandbox:sleep_tool", {"seconds": 0.2})
+        for _ in range(4)
+    ])
+
+    assert executor.get_pool("default").size <= 2
+    snapshot = metrics_registry.snapshot()["histograms"]
+    assert snapshot["sandbox_queue_wait_seconds"][0]["count"] == 4
+    assert snapshot["sandbox_exec_seconds"][0]["count"] == 4
+
+@pytest.mark.asyncio
+async def test_idle_workers_are_reaped(executor):
+    pool = executor.get_pool("default")
+    pool.min_idle = 0
+    pool.idle_ttl = 0
+
+    await executor.execute("tests.test_sandbox:add_tool", {"a": 1, "b": 1})
+    assert await pool.reap_idle() == 1
+    assert pool.size == 0
+
+@pytest.mark.asyncio
+async def test_ping_uses_idle_worker_without_taking_capacity(executor):
+    await executor.start()
+    pool = executor.get_pool("default")
+
+    state = await executor.ping(timeout=5)
+
+    assert state["pinged"] is True
+    assert pool.size == 1
+    assert pool.get_stats()["idle"] == 1
+
+def test_default_backend_is_docker():
+    assert isinstance(create_backend(), DockerBackend)
+
+def test_local_worker_gets_no_secrets(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-secret")
+    monkeypatch.setenv("NOTION_TOKEN", "secret_notion")
+    backend = create_backend("local")
+
+    env = backend.worker_env()
+
+    assert "OPENAI_API_KEY" not in env and "NOTION_TOKEN" not in env
+    assert env["PATH"] == os.environ["PATH"]
+    assert backend.use_namespaces == (shutil.which("unshare") is not None)
+
+@pytest.mark.asyncio
+async def test_tool_cannot_read_api_secrets(executor, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-secret")
+
+    assert await executor.execute("tests.test_sandbox:read_env_tool", {"name": "OPENAI_API_KEY"}) is None
@@ -0,0 +1,84 @@
+"""
+Тесты для полнотекстового поиска по сообщениям
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from app.models.messages import MessageRole, MessageType
+from app.services.messages import MessageService
+from app.services.search import MessageSearchService
+from app.storage.text_search import InvertedIndex, SQLiteFTSIndex, analyze
+
+@pytest_asyncio.fixture(params=["memory", "sqlite"])
+async def env(request, tmp_path):
+    if request.param == "memory":
+        index = InvertedIndex()
+    else:
+        index = SQLiteFTSIndex(str(tmp_path / "search.sqlite3"))
+    messages = MessageService()
+    service = MessageSearchService(index, messages)
+    await service.start()
+    yield service, messages
+    await service.stop()
+
+def _say(messages, text, meeting_id="meet_1", agent_id="architect", role=MessageRole.ASSISTANT):
+    return messages.create_message(
+        meeting_id=meeting_id, run_id="run_1", agent_id=agent_id, role=role, content=text
+    )
+
+def test_analyzer_stems_russian_and_english():
+    assert analyze("Кеширование и кешировать") == analyze("кеширования кешировать")
+    assert analyze("Caching caches") == ["cach", "cach"]
+    assert analyze("и в на the of") == []
+    assert analyze("Ёлка") == analyze("елки")
+
+@pytest.mark.asyncio
+async def test_bm25_ranks_more_relevant_message_first(env):
+    service, messages = env
+    _say(messages, "Предлагаю обсудить бюджет на квартал")
+    best = _say(messages, "Репликация PostgreSQL: настроим репликацию и проверим репликацию под нагрузкой")
+    _say(messages, "Репликация нужна и для Redis")
+
+    page = await service.search("репликация postgresql")
+
+    assert page.total == 2
+    assert page.hits[0].message.id == best.id
+    assert page.hits[0].score > page.hits[1].score
+
+@pytest.mark.asyncio
+async def test_filters_by_meeting_agent_role_type_and_date(env):
+    service, messages = env
+    _say(messages, "kubernetes деплой", meeting_id="meet_1", agent_id="devops")
+    other = _say(messages, "kubernetes деплой", meeting_id="meet_2", agent_id="architect")
+    user = _say(messages, "kubernetes вопрос", meeting_id="meet_2", agent_id="cto", role=MessageRole.USER)
+    decision = messages.create_decision_message(
+        meeting_id="meet_2", run_id="run_1", agent_id="moderator", content="Решение: kubernetes",
+        decision_id="dec_1", alternatives_count=2, selected_option="k8s", confidence=0.9
+    )
+
+    assert [h.message.id for h in (await service.search("kubernetes", meeting_id="meet_2", agent_id="architect")).hits] == [other.id]
+    assert [h.message.id for h in (await service.search("kubernetes", role=MessageRole.USER)).hits] == [user.id]
+    assert [h.message.id for h in (await service.search("kubernetes", message_type=MessageType.DECISION)).hits] == [decision.id]
+
+    future = datetime.now() + timedelta(days=1)
+    assert (await service.search("kubernetes", date_from=future)).total == 0
+    assert (await service.search("kubernetes", date_to=future)).total == 4
+
+@pytest.mark.asyncio
+async def test_index_is_incremental_and_paginated(env):
+    service, messages = env
+    for i in range(5):
+        _say(messages, f"метрики latency итерация {i}")
+
+    assert (await service.search("метрики")).total == 5
+    _say(messages, "метрики throughput")
+
+    first = await service.search("метрики", limit=2)
+    second = await service.search("метрики", limit=2, offset=2)
+
+    assert first.total == 6 and len(first.hits) == 2
+    assert second.total == 6 and len(second.hits) == 2
+    assert not {h.message.id for h in first.hits} & {h.message.id for h in second.hits}
+    assert (await service.get_stats())["documents"] == 6
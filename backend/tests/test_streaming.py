@@ -0,0 +1,96 @@
+"""
+Тесты для потоковых ответов агентов через брокер событий
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from app.llm.client import ModelClient
+from app.llm.providers import MockModelProvider
+from app.models.llm import ModelRequest
+from app.orchestrator.manager import XIOOrchestrator
+from app.services.messages import MessageService
+from app.ws.broker import WSConnectionManager, XIOEventBroker
+
+class RecordingConnections(WSConnectionManager):
+    def __init__(self):
+        super().__init__()
+        self.frames = []
+
+    async def broadcast_to_meeting(self, meeting_id, message, emitted_at=None):
+        self.frames.append(message)
+
+@pytest_asyncio.fixture
+async def broker():
+    broker = XIOEventBroker(RecordingConnections())
+    broker.delta_flush_interval = 0.03
+    await broker.start_processing()
+    yield broker
+    await broker.stop_processing()
+
+async def _drain(broker, timeout=0.2):
+    await asyncio.sleep(broker.delta_flush_interval)
+    for _ in range(int(timeout / 0.01)):
+        if broker._event_queue.empty():
+            break
+        await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_deltas_are_coalesced_into_frames(broker):
+    words = [f"слово{i} " for i in range(20)]
+    for word in words:
+        await broker.emit_event({
+            "type": "chat_message_delta", "meeting_id": "meet_1", "run_id": "run_1",
+            "agent_id": "expert_1", "message_id": "msg_1", "delta": word
+        })
+    await _drain(broker)
+
+    frames = broker.connection_manager.frames
+    assert 1 <= len(frames) < len(words)
+    assert "".join(frame["payload"]["delta"] for frame in frames) == "".join(words)
+    assert [frame["payload"]["seq"] for frame in frames] == list(range(len(frames)))
+    assert frames[-1]["payload"]["offset"] + len(frames[-1]["payload"]["delta"]) == len("".join(words))
+
+@pytest.mark.asyncio
+async def test_final_message_supersedes_pending_deltas(broker):
+    await broker.emit_event({
+        "type": "chat_message_delta", "meeting_id": "meet_1", "message_id": "msg_1", "delta": "Привет"
+    })
+    await broker.emit_event({
+        "type": "agent_message", "meeting_id": "meet_1", "message_id": "msg_1", "content": "Привет, мир"
+    })
+    await _drain(broker)
+
+    frames = broker.connection_manager.frames
+    assert [frame["type"] for frame in frames] == ["chat_message"]
+    assert frames[0]["payload"]["content"] == "Привет, мир"
+    assert broker._delta_buffers == {}
+
+@pytest.mark.asyncio
+async def test_orchestrator_streams_and_persists_only_final_message(broker, monkeypatch):
+    messages = MessageService()
+    monkeypatch.setattr("app.orchestrator.manager.event_broker", broker)
+    monkeypatch.setattr("app.orchestrator.manager.message_service", messages)
+    monkeypatch.setattr("app.orchestrator.manager.model_client", ModelClient(MockModelProvider(token_delay=0.005)))
+
+    orchestrator = XIOOrchestrator()
+    request = ModelRequest(
+        model="gpt-4",
+        messages=[{"role": "user", "content": "Монолит или микросервисы?"}],
+        run_id="run_1",
+        agent_id="expert_1"
+    )
+    message = await orchestrator.stream_agent_turn("meet_1", request)
+    await _drain(broker)
+
+    assert [m.id for m in messages.get_messages("meet_1")] == [message.id]
+    assert message.metadata["ttft_ms"] is not None
+    assert message.metadata["ttft_ms"] <= message.metadata["latency_ms"]
+
+    frames = broker.connection_manager.frames
+    deltas = [frame for frame in frames if frame["type"] == "chat_message_delta"]
+    assert deltas and all(frame["payload"]["id"] == message.id for frame in deltas)
+    assert frames[-1]["type"] == "chat_message"
+    assert frames[-1]["payload"]["content"] == message.content
+    assert message.content.startswith("".join(frame["payload"]["delta"] for frame in deltas))
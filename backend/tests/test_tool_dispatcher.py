@@ -0,0 +1,234 @@
+"""
+Тесты для диспетчера вызовов инструментов
+"""
+
+import asyncio
+import json
+import time
+import pytest
+import pytest_asyncio
+from app.models import ToolCallRequest, ToolCallStatus, ToolInstance
+from app.tools.executor import ToolDispatcher, mask_args
+from app.tools.limits import IntegrationRateLimits
+from app.tools.registry_service import DEFAULT_DEFINITIONS_DIR, DirectoryDefinitionSource, ToolRegistryService
+from app.tools.result_cache import ToolResultCache
+
+SCHEMA = {"type": "object", "properties": {"meeting_id": {"type": "string"}}, "required": ["meeting_id"]}
+
+@pytest_asyncio.fixture
+async def dispatcher(tmp_path, monkeypatch):
+    for definition_id, constraints in (
+        ("notion.task", {}),
+        ("notion.search", {"cacheable": True}),
+        ("slack.send_message", {})
+    ):
+        (tmp_path / f"{definition_id}.json").write_text(json.dumps({
+            "definition_id": definition_id,
+            "name": definition_id,
+            "json_schema": SCHEMA,
+            "runtime_constraints": constraints
+        }), encoding="utf-8")
+    registry = ToolRegistryService(source=DirectoryDefinitionSource(tmp_path))
+    await registry.load_definitions()
+    monkeypatch.setattr("app.tools.executor.tool_registry", registry)
+    monkeypatch.setattr("app.tools.executor.tool_result_cache", ToolResultCache(redis_url=""))
+
+    events = []
+
+    async def capture(event):
+        events.append(event)
+
+    monkeypatch.setattr("app.tools.executor.event_broker.emit_event", capture)
+
+    dispatcher = ToolDispatcher()
+    dispatcher.events = events
+    monkeypatch.setattr("app.tools.executor.integration_rate_limits", IntegrationRateLimits())
+    dispatcher.settings = dispatcher.settings.model_copy(update={"TOOL_INTEGRATION_RATE_LIMITS": {}})
+    dispatcher.register_instance(ToolInstance(
+        instance_id="notion_default", definition_id="notion.task", owner_id="user_1"
+    ))
+    dispatcher.register_instance(ToolInstance(
+        instance_id="slack_default", definition_id="slack.send_message", owner_id="user_1"
+    ))
+    dispatcher.register_instance(ToolInstance(
+        instance_id="notion_search", definition_id="notion.search", owner_id="user_1"
+    ))
+    return dispatcher
+
+def _call(call_id, definition_id, instance_id, **args):
+    return ToolCallRequest(
+        call_id=call_id,
+        definition_id=definition_id,
+        instance_id=instance_id,
+        meeting_id="meet_1",
+        agent_id="integrator",
+        args={"meeting_id": "meet_1", **args}
+    )
+
+@pytest.mark.asyncio
+async def test_calls_of_one_turn_run_concurrently(dispatcher):
+    async def slow(call, instance):
+        await asyncio.sleep(0.2)
+        return {"ok": call.call_id}
+
+    dispatcher.register_handler("notion.task", slow)
+    dispatcher.register_handler("slack.send_message", slow)
+
+    started = time.monotonic()
+    results = await dispatcher.dispatch_many([
+        _call("c1", "notion.task", "notion_default", title="a"),
+        _call("c2", "slack.send_message", "slack_default", title="b"),
+        _call("c3", "notion.task", "notion_default", title="c")
+    ])
+
+    assert time.monotonic() - started < 0.35
+    assert [r.result["ok"] for r in results] == ["c1", "c2", "c3"]
+    finals = [e for e in dispatcher.events if e["status"] == "completed"]
+    assert sorted(e["progress"]["batch_completed"] for e in finals) == [1, 2, 3]
+    assert all(e["progress"]["batch_total"] == 3 for e in finals)
+
+@pytest.mark.asyncio
+async def test_slow_integration_does_not_starve_others(dispatcher):
+    dispatcher.settings = dispatcher.settings.model_copy(update={"TOOL_BULKHEAD_CONCURRENCY": 1})
+    release = asyncio.Event()
+
+    async def stuck(call, instance):
+        await release.wait()
+
+    async def fast(call, instance):
+        return "sent"
+
+    dispatcher.register_handler("notion.task", stuck)
+    dispatcher.register_handler("slack.send_message", fast)
+
+    notion = asyncio.create_task(dispatcher.dispatch(_call("n1", "notion.task", "notion_default")))
+    await asyncio.sleep(0.05)
+    slack = await asyncio.wait_for(
+        dispatcher.dispatch(_call("s1", "slack.send_message", "slack_default")), timeout=1
+    )
+
+    assert slack.status == ToolCallStatus.COMPLETED
+    assert not notion.done()
+    release.set()
+    assert (await notion).status == ToolCallStatus.COMPLETED
+
+@pytest.mark.asyncio
+async def test_instance_rate_limit_is_enforced(dispatcher):
+    dispatcher.register_instance(ToolInstance(
+        instance_id="notion_default",
+        definition_id="notion.task",
+        owner_id="user_1",
+        rate_limits={"requests_per_second": 10, "burst": 1}
+    ))
+
+    async def handler(call, instance):
+        return None
+
+    dispatcher.register_handler("notion.task", handler)
+
+    started = time.monotonic()
+    await dispatcher.dispatch_many([
+        _call(f"c{i}", "notion.task", "notion_default", title=str(i)) for i in range(3)
+    ])
+
+    assert time.monotonic() - started >= 0.18
+
+@pytest.mark.asyncio
+async def test_invalid_args_and_unknown_instance_are_rejected(dispatcher):
+    invalid = _call("c1", "notion.task", "notion_default")
+    invalid.args = {}
+    results = await dispatcher.dispatch_many([
+        invalid,
+        _call("c2", "notion.task", "missing_instance")
+    ])
+
+    assert [r.status for r in results] == [ToolCallStatus.REJECTED, ToolCallStatus.REJECTED]
+    assert dispatcher.events[-1]["progress"]["error"]
+
+@pytest.mark.asyncio
+async def test_identical_calls_are_served_from_cache(dispatcher):
+    executed = []
+
+    async def handler(call, instance):
+        executed.append(call.call_id)
+        await asyncio.sleep(0.05)
+        return {"page_id": "page_1"}
+
+    dispatcher.register_handler("notion.search", handler)
+
+    concurrent = await dispatcher.dispatch_many([
+        _call("c1", "notion.search", "notion_search", title="Задача"),
+        _call("c2", "notion.search", "notion_search", title="Задача")
+    ])
+    repeated = await dispatcher.dispatch(_call("c3", "notion.search", "notion_search", title="Задача"))
+
+    assert executed == ["c1"]
+    assert sorted(r.cache for r in concurrent) == ["coalesced", "miss"]
+    assert repeated.cache == "hit"
+    assert repeated.result == {"page_id": "page_1"}
+    assert dispatcher.events[-1]["cache"] == "hit"
+
+@pytest.mark.asyncio
+async def test_side_effect_tools_are_not_cached(dispatcher):
+    sent = []
+
+    async def handler(call, instance):
+        sent.append(call.call_id)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    dispatcher.register_handler("slack.send_message", handler)
+
+    results = await dispatcher.dispatch_many([
+        _call("s1", "slack.send_message", "slack_default", text="Привет"),
+        _call("s2", "slack.send_message", "slack_default", text="Привет")
+    ])
+    await dispatcher.dispatch(_call("s3", "slack.send_message", "slack_default", text="Привет"))
+
+    assert sorted(sent) == ["s1", "s2", "s3"]
+    assert all(r.cache is None for r in results)
+
+@pytest.mark.asyncio
+async def test_shipped_notion_tools_are_idempotent_per_meeting(dispatcher, monkeypatch):
+    """Повтор и перезапуск создания decision log возвращают уже созданную страницу"""
+    registry = ToolRegistryService(source=DirectoryDefinitionSource(DEFAULT_DEFINITIONS_DIR))
+    await registry.load_definitions()
+    monkeypatch.setattr("app.tools.executor.tool_registry", registry)
+    dispatcher.register_instance(ToolInstance(
+        instance_id="notion_decisions", definition_id="notion.decision_log", owner_id="user_1"
+    ))
+    created = []
+
+    async def create_page(call, instance):
+        created.append(call.call_id)
+        return {"page_id": f"page_{call.args['meeting_id']}", "status": "created"}
+
+    dispatcher.register_handler("notion.decision_log", create_page)
+
+    def decision(call_id, meeting_id, rationale):
+        return ToolCallRequest(
+            call_id=call_id,
+            definition_id="notion.decision_log",
+            instance_id="notion_decisions",
+            meeting_id=meeting_id,
+            args={
+                "meeting_id": meeting_id,
+                "title": "Архитектура",
+                "alternatives": [{"option": "Монолит"}, {"option": "Микросервисы"}],
+                "rationale": rationale,
+                "decision": "Модульный монолит"
+            }
+        )
+
+    first = await dispatcher.dispatch(decision("d1", "meet_1", "Проще сопровождать"))
+    retried = await dispatcher.dispatch(decision("d2", "meet_1", "Проще сопровождать и развивать"))
+    other_meeting = await dispatcher.dispatch(decision("d3", "meet_2", "Проще сопровождать"))
+
+    assert created == ["d1", "d3"]
+    assert (first.cache, retried.cache, other_meeting.cache) == ("miss", "hit", "miss")
+    assert retried.result == {"page_id": "page_meet_1", "status": "created"}
+
+def test_mask_args():
+    assert mask_args({"api_key": "x", "nested": {"token": "y"}, "title": "t"}) == {
+        "api_key": "***", "nested": {"token": "***"}, "title": "t"
+    }
@@ -0,0 +1,105 @@
+"""
+Тесты для реестра инструментов с горячей перезагрузкой
+"""
+
+import json
+import os
+import pytest
+from app.tools.registry_service import ToolRegistryService, DirectoryDefinitionSource
+from app.tools.schema_compiler import SchemaValidationError, compile_schema
+
+def _write_definition(path, definition_id, required, mtime=None):
+    file_path = path / f"{definition_id}.json"
+    file_path.write_text(json.dumps({
+        "definition_id": definition_id,
+        "name": definition_id,
+        "json_schema": {
+            "type": "object",
+            "properties": {
+                "meeting_id": {"type": "string"},
+                "title": {"type": "string", "minLength": 3}
+            },
+            "required": required
+        }
+    }), encoding="utf-8")
+    if mtime is not None:
+        os.utime(file_path, (mtime, mtime))
+
+@pytest.fixture
+def registry(tmp_path):
+    _write_definition(tmp_path, "notion.task", ["meeting_id"], mtime=1000)
+    _write_definition(tmp_path, "slack.send_message", ["meeting_id"], mtime=1000)
+    return ToolRegistryService(source=DirectoryDefinitionSource(tmp_path))
+
+@pytest.mark.asyncio
+async def test_initial_load(registry):
+    snapshot = await registry.load_definitions()
+
+    assert snapshot.generation == 1
+    assert set(snapshot.definitions) == {"notion.task", "slack.send_message"}
+    snapshot.validate("notion.task", {"meeting_id": "m1", "title": "abc"})
+
+@pytest.mark.asyncio
+async def test_reload_without_changes_keeps_snapshot(registry):
+    await registry.load_definitions()
+    snapshot = registry.snapshot
+
+    assert await registry.reload() is False
+    assert registry.snapshot is snapshot
+
+@pytest.mark.asyncio
+async def test_incremental_reload_touches_only_changed(registry, tmp_path):
+    await registry.load_definitions()
+    old_snapshot = registry.snapshot
+    untouched_validator = old_snapshot.validators["slack.send_message"]
+
+    _write_definition(tmp_path, "notion.task", ["meeting_id", "title"], mtime=2000)
+    assert await registry.reload() is True
+
+    snapshot = registry.snapshot
+    assert snapshot.generation == 2
+    assert snapshot.definition_generations["notion.task"] == 2
+    assert snapshot.definition_generations["slack.send_message"] == 1
+    assert snapshot.validators["slack.send_message"] is untouched_validator
+
+    # Старый снимок, взятый вызовом до перезагрузки, остается согласованным
+    old_snapshot.validate("notion.task", {"meeting_id": "m1"})
+    with pytest.raises(SchemaValidationError):
+        snapshot.validate("notion.task", {"meeting_id": "m1"})
+
+@pytest.mark.asyncio
+async def test_removed_and_broken_definitions(registry, tmp_path):
+    await registry.load_definitions()
+
+    (tmp_path / "slack.send_message.json").unlink()
+    (tmp_path / "notion.task.json").write_text("{broken", encoding="utf-8")
+    await registry.reload()
+
+    assert registry.get_definition("slack.send_message") is None
+    # Сломанный файл не удаляет рабочую версию определения
+    assert registry.get_definition("notion.task") is not None
+
+    # Неизменный битый файл не публикует новые поколения на каждом тике
+    generation = registry.generation
+    assert await registry.reload() is False
+    assert registry.generation == generation
+
+    (tmp_path / "notion.task.json").write_text("{still broken", encoding="utf-8")
+    os.utime(tmp_path / "notion.task.json", (3000, 3000))
+    assert await registry.reload() is False
+    assert registry.generation == generation
+
+def test_compiled_validator_errors():
+    validate = compile_schema({
+        "type": "object",
+        "properties": {
+            "priority": {"type": "string", "enum": ["low", "high"]},
+            "due_date": {"type": "string", "format": "date"},
+            "alternatives": {"type": "array", "items": {"type": "string"}, "minItems": 2}
+        },
+        "required": ["priority"]
+    })
+
+    assert validate({"priority": "low", "due_date": "2024-02-01", "alternatives": ["a", "b"]}) == []
+    errors = validate({"due_date": "завтра", "alternatives": ["a", 1]})
+    assert len(errors) == 3
@@ -0,0 +1,84 @@
+"""
+Тесты для кеша результатов инструментов
+"""
+
+import asyncio
+import pytest
+from app.tools.result_cache import ToolResultCache, make_cache_key
+
+def test_cache_key_ignores_key_order_only():
+    first = make_cache_key("notion.search", "notion_default", {"title": "Задача", "hours": 2})
+    second = make_cache_key("notion.search", "notion_default", {"hours": 2, "title": "Задача"})
+
+    assert first == second
+    assert first != make_cache_key("notion.search", "other_instance", {"hours": 2, "title": "Задача"})
+    assert first != make_cache_key("notion.search", "notion_default", {"hours": 2, "title": "Задача "})
+    assert first != make_cache_key("notion.search", "notion_default", {"hours": 2, "title": "Задача", "tags": None})
+
+def test_idempotency_key_limits_hashed_args():
+    fields = ["meeting_id", "title"]
+    key = make_cache_key("notion.task", "notion_default", {"meeting_id": "m1", "title": "Задача", "hours": 2}, fields)
+
+    assert key == make_cache_key("notion.task", "notion_default", {"title": "Задача", "meeting_id": "m1"}, fields)
+    assert key != make_cache_key("notion.task", "notion_default", {"meeting_id": "m2", "title": "Задача"}, fields)
+
+@pytest.mark.asyncio
+async def test_ttl_and_lru_eviction():
+    cache = ToolResultCache(max_entries=2, ttl=60, redis_url="")
+
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    await cache.get("a")
+    await cache.set("c", 3)
+
+    assert await cache.get("a") == (True, 1)
+    assert await cache.get("b") == (False, None)
+
+    await cache.set("d", 4, ttl=0.01)
+    await asyncio.sleep(0.02)
+    assert await cache.get("d") == (False, None)
+
+@pytest.mark.asyncio
+async def test_single_flight_collapses_and_propagates_errors():
+    cache = ToolResultCache(redis_url="")
+    calls = 0
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "value"
+
+    results = await asyncio.gather(*(cache.single_flight("key", factory) for _ in range(5)))
+
+    assert calls == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("notion down")
+
+    outcomes = await asyncio.gather(
+        cache.single_flight("err", failing),
+        cache.single_flight("err", failing),
+        return_exceptions=True
+    )
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_leader_cancellation():
+    cache = ToolResultCache(redis_url="")
+
+    async def factory():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    leader = asyncio.create_task(cache.single_flight("key", factory))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(cache.single_flight("key", factory))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == ("value", True)
+    assert leader.cancelled()
+    assert cache.get_stats()["inflight"] == 0
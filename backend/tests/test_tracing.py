@@ -0,0 +1,122 @@
+"""
+Тесты для сквозной трассировки OpenTelemetry
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from app.llm.client import ModelClient
+from app.llm.providers import MockModelProvider
+from app.models.llm import ModelRequest
+from app.observability.tracing import configure_tracing, get_tracer, shutdown_tracing
+from app.orchestrator.manager import XIOOrchestrator
+from app.services.messages import MessageService
+from app.ws.broker import WSConnectionManager, XIOEventBroker
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    configure_tracing(exporter, sample_ratio=1.0)
+    yield exporter
+    shutdown_tracing()
+
+@pytest_asyncio.fixture
+async def broker():
+    connections = WSConnectionManager()
+    broker = XIOEventBroker(connections)
+    broker.delta_flush_interval = 0
+    for _ in range(2):
+        await connections.connect(FakeWebSocket(), "meet_1")
+    await broker.start_processing()
+    yield broker
+    await broker.stop_processing()
+
+async def _drain(broker):
+    for _ in range(50):
+        if broker._event_queue.empty():
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+
+def _by_name(exporter):
+    spans = {}
+    for span in exporter.get_finished_spans():
+        spans.setdefault(span.name, []).append(span)
+    return spans
+
+@pytest.mark.asyncio
+async def test_context_propagates_through_event_queue(exporter, broker):
+    with get_tracer().start_as_current_span("test.request") as root:
+        await broker.emit_event({"type": "run_status", "meeting_id": "meet_1", "run_id": "run_1", "status": "running"})
+    await _drain(broker)
+
+    spans = _by_name(exporter)
+    trace_id = root.get_span_context().trace_id
+    emit = spans["broker.emit"][0]
+    handle = spans["broker.handle_event"][0]
+    wait = spans["broker.queue_wait"][0]
+
+    assert all(
+        span.context.trace_id == trace_id
+        for name in ("broker.emit", "broker.queue_wait", "broker.handle_event", "ws.send")
+        for span in spans[name]
+    )
+    assert emit.parent.span_id == root.get_span_context().span_id
+    assert handle.parent.span_id == emit.context.span_id
+    assert wait.parent.span_id == emit.context.span_id
+    [broadcast] = spans["ws.broadcast"]
+    assert broadcast.parent.span_id == handle.context.span_id
+    assert broadcast.attributes["xio.fanout"] == 2
+    # По спану на каждый сокет комнаты
+    assert len(spans["ws.send"]) == 2
+    assert all(span.parent.span_id == broadcast.context.span_id for span in spans["ws.send"])
+
+@pytest.mark.asyncio
+async def test_agent_turn_is_parent_of_its_events(exporter, broker, monkeypatch):
+    monkeypatch.setattr("app.orchestrator.manager.event_broker", broker)
+    monkeypatch.setattr("app.orchestrator.manager.message_service", MessageService())
+    monkeypatch.setattr("app.orchestrator.manager.model_client", ModelClient(MockModelProvider()))
+
+    request = ModelRequest(
+        model="gpt-4",
+        messages=[{"role": "user", "content": "Монолит или микросервисы?"}],
+        run_id="run_1",
+        agent_id="expert_1"
+    )
+    await XIOOrchestrator().stream_agent_turn("meet_1", request)
+    await _drain(broker)
+
+    spans = _by_name(exporter)
+    [turn] = spans["agent.turn"]
+    assert turn.attributes["xio.agent_id"] == "expert_1"
+    assert turn.attributes["xio.tokens"] > 0
+    assert spans["broker.emit"]
+    assert all(span.parent.span_id == turn.context.span_id for span in spans["broker.emit"])
+
+@pytest.mark.asyncio
+async def test_unsampled_traces_are_not_exported(broker):
+    exporter = InMemorySpanExporter()
+    configure_tracing(exporter, sample_ratio=0.0)
+    try:
+        with get_tracer().start_as_current_span("test.request"):
+            await broker.emit_event({"type": "run_status", "meeting_id": "meet_1", "status": "running"})
+        await _drain(broker)
+    finally:
+        shutdown_tracing()
+
+    assert exporter.get_finished_spans() == ()
+    # Доставка не зависит от семплирования
+    sockets = broker.connection_manager._rooms["meet_1"]
+    assert all(any(m["type"] == "run_status" for m in ws.sent) for ws in sockets)
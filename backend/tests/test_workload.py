@@ -0,0 +1,66 @@
+"""
+Тесты для генератора синтетической нагрузки и воспроизведения журналов
+"""
+
+import pytest
+from workload import WorkloadGenerator, WorkloadProfile, read_log, replay_in_process, write_log
+from app.services.messages import message_service
+from app.services.normalizer import ActionItemNormalizer
+
+def _profile(**overrides):
+    params = dict(meetings=3, agents=4, duration=60, turns_per_minute=30, start_spread=5, seed=7)
+    params.update(overrides)
+    return WorkloadProfile(**params)
+
+def test_generation_is_reproducible(tmp_path):
+    first = WorkloadGenerator(_profile()).generate()
+    second = WorkloadGenerator(_profile()).generate()
+
+    assert first == second
+    assert [record["t"] for record in first] == sorted(record["t"] for record in first)
+
+    path = tmp_path / "workload.jsonl"
+    assert write_log(str(path), _profile(), first) == len(first)
+    assert read_log(str(path)) == first
+
+def test_stream_deltas_precede_final_message():
+    records = WorkloadGenerator(_profile(meetings=1)).generate()
+    events = [record["event"] for record in records if record["op"] == "event"]
+
+    finals = {}
+    for position, event in enumerate(events):
+        if event["type"] == "agent_message":
+            finals[event["message_id"]] = position
+    assert finals
+    for position, event in enumerate(events):
+        if event["type"] == "chat_message_delta":
+            assert position < finals[event["message_id"]]
+
+def test_profile_controls_tool_and_task_density():
+    quiet = WorkloadGenerator(_profile(tool_call_ratio=0.0, task_ratio=0.0, decision_ratio=0.0)).generate()
+    busy = WorkloadGenerator(_profile(tool_call_ratio=1.0, task_ratio=1.0, decision_ratio=1.0)).generate()
+
+    def count(records, event_type):
+        return sum(1 for r in records if r["op"] == "event" and r["event"]["type"] == event_type)
+
+    assert count(quiet, "tool_execution") == 0
+    assert count(quiet, "artifact_created") == 0
+    assert count(busy, "tool_execution") == 2 * count(busy, "agent_message")
+    assert count(busy, "artifact_created") == count(busy, "agent_message")
+
+    normalizer = ActionItemNormalizer()
+    message = next(r["event"]["content"] for r in busy if r["op"] == "event" and r["event"]["type"] == "agent_message")
+    assert normalizer.extract_candidates(message)
+
+@pytest.mark.asyncio
+async def test_replay_through_rest_and_broker():
+    records = WorkloadGenerator(_profile(meetings=2, duration=20)).generate()
+    finals = sum(1 for r in records if r["op"] == "event" and r["event"]["type"] == "agent_message")
+
+    report = await replay_in_process(records, speed=0)
+
+    assert report["errors"] == 0
+    assert report["records"] == len(records)
+    assert all(code.startswith("2") for code in report["http_statuses"])
+    assert len(message_service.get_messages("meet_w0", limit=None)) + \
+        len(message_service.get_messages("meet_w1", limit=None)) >= finals
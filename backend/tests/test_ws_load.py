@@ -0,0 +1,40 @@
+"""
+Тесты для нагрузочного бенчмарка WebSocket-комнат (уменьшенный прогон)
+"""
+
+import argparse
+
+import pytest
+from benchmark_ws import compare, run
+
+def _args(**overrides):
+    params = dict(
+        clients=40, meetings=8, rate=200, duration=0.2, payload_bytes=120,
+        slow_fraction=0.25, slow_delay_ms=1.0, drain_timeout=5.0, seed=1,
+        output=None, compare=None, threshold=0.2
+    )
+    params.update(overrides)
+    return argparse.Namespace(**params)
+
+@pytest.mark.asyncio
+async def test_small_run_delivers_every_event():
+    report = await run(_args())
+
+    assert report["connections"] == 40
+    assert report["events"] == 40
+    assert report["lost"] == {"events": 0, "deliveries": 0}
+    # Каждое событие уходит всем 5 клиентам своей встречи
+    assert report["deliveries"] == 200
+    assert report["latency_ms"]["all"]["count"] == 200
+    assert report["latency_ms"]["slow_clients"]["count"] > 0
+    assert report["memory"]["bytes_per_connection"] > 0
+
+def test_compare_flags_regressions():
+    baseline = {"latency_ms": {"all": {"p50": 10.0, "p99": 50.0}}, "throughput": {"deliveries_per_s": 1000.0}}
+    current = {"latency_ms": {"all": {"p50": 10.5, "p99": 80.0}}, "throughput": {"deliveries_per_s": 700.0}}
+
+    regressions = compare(current, baseline, threshold=0.2)
+
+    assert len(regressions) == 2
+    assert any(line.startswith("latency_ms.all.p99") for line in regressions)
+    assert any(line.startswith("throughput.deliveries_per_s") for line in regressions)
@@ -0,0 +1,371 @@
+"""
+Генератор синтетической нагрузки консилиумов и воспроизведение записанных журналов
+
+Генератор строит журнал событий (JSONL) для набора встреч: участники,
+очередь выступлений, потоковые ответы агентов, вызовы инструментов,
+решения и задачи в русскоязычном тексте. Журнал воспроизводится
+через REST API и event_broker с заданным ускорением времени.
+
+Генерация:
+    python workload.py generate --meetings 100 --agents 5 --duration 600 --output workload.jsonl
+
+Воспроизведение в процессе (REST через ASGI, события в event_broker), в 10 раз быстрее реального времени:
+    python workload.py replay workload.jsonl --speed 10 --report replay.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/v1"
+
+TOPICS = (
+    "Выбор архитектуры платежного сервиса",
+    "Миграция хранилища на PostgreSQL",
+    "Переход на Kubernetes",
+    "Снижение латентности API",
+    "План релиза мобильного приложения",
+    "Стратегия кеширования каталога",
+)
+
+DISCUSSION_SENTENCES = (
+    "Предлагаю сначала зафиксировать требования к нагрузке",
+    "Считаю, что монолит на текущем этапе проще сопровождать",
+    "Микросервисы дадут независимые релизы, но усложнят мониторинг",
+    "Риски по срокам пока оцениваю как умеренные",
+    "Согласен с коллегой, кеширование даст основной выигрыш",
+    "По бюджету вопросов нет, команда укладывается",
+    "Стоит учесть опыт прошлого инцидента с очередью сообщений",
+    "С точки зрения безопасности нужна аутентификация между сервисами",
+    "Текущая схема репликации выдержит рост в два раза",
+    "Давайте оценим стоимость поддержки каждого варианта",
+)
+
+TASK_SENTENCES = (
+    "Необходимо настроить репликацию PostgreSQL до конца недели",
+    "Нужно срочно исследовать причины роста латентности API",
+    "Задача: подготовить план миграции на Kubernetes",
+    "Следует внедрить трассировку запросов в течение 2 недель",
+    "Желательно разработать нагрузочный тест для очереди сообщений",
+    "TODO: описать процедуру отката релиза",
+)
+
+DECISION_PREFIX = "Фиксирую решение:"
+
+DECISION_SENTENCES = (
+    f"{DECISION_PREFIX} принят модульный монолит с выделением платежного сервиса",
+    f"{DECISION_PREFIX} миграцию проводим поэтапно с двойной записью",
+    f"{DECISION_PREFIX} кеширование каталога в Redis с TTL 5 минут",
+)
+
+
+@dataclass
+class WorkloadProfile:
+    """Параметры синтетической нагрузки"""
+    meetings: int = 10
+    agents: int = 5
+    # Длительность каждой встречи и темп реплик агентов
+    duration: float = 300.0
+    turns_per_minute: float = 6.0
+    # Размер реплики в словах и разбиение на части потокового ответа
+    words_per_turn: int = 80
+    words_per_delta: int = 4
+    delta_interval_ms: float = 40.0
+    # Доли реплик с вызовом инструмента, решением, задачей и реплик пользователя
+    tool_call_ratio: float = 0.2
+    tool_mix: Dict[str, float] = field(default_factory=lambda: {
+        "notion.task": 0.5, "notion.decision_log": 0.3, "jira.search": 0.2
+    })
+    tool_latency_ms: float = 800.0
+    decision_ratio: float = 0.05
+    task_ratio: float = 0.15
+    user_message_ratio: float = 0.1
+    # Разнос стартов встреч
+    start_spread: float = 30.0
+    seed: int = 42
+
+
+class WorkloadGenerator:
+    """Генератор журнала событий по профилю нагрузки"""
+
+    def __init__(self, profile: WorkloadProfile):
+        self.profile = profile
+        self.rng = random.Random(profile.seed)
+
+    def generate(self) -> List[Dict[str, Any]]:
+        """Записи всех встреч, упорядоченные по времени t (секунды от начала)"""
+        records: List[Dict[str, Any]] = []
+        for index in range(self.profile.meetings):
+            records.extend(self._meeting(index))
+        records.sort(key=lambda record: (record["t"], record["seq"]))
+        return records
+
+    def _meeting(self, index: int) -> Iterator[Dict[str, Any]]:
+        profile, rng = self.profile, self.rng
+        meeting_id = f"meet_w{index}"
+        run_id = f"run_w{index}"
+        t = rng.uniform(0, profile.start_spread)
+        seq = iter(range(sys.maxsize))
+
+        def record(op: str, at: float, **payload) -> Dict[str, Any]:
+            return {"t": round(at, 4), "seq": next(seq), "meeting_id": meeting_id, "op": op, **payload}
+
+        def event(at: float, **payload) -> Dict[str, Any]:
+            return record("event", at, event={"meeting_id": meeting_id, "run_id": run_id, **payload})
+
+        def http(at: float, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                 body: Any = None) -> Dict[str, Any]:
+            return record("http", at, method=method, path=f"{API_PREFIX}{path}", params=params or {}, body=body)
+
+        agents = [(f"moderator_w{index}", "moderator")]
+        agents += [(f"expert_{n}_w{index}", "expert") for n in range(max(profile.agents - 2, 1))]
+        agents.append((f"scribe_w{index}", "scribe"))
+
+        yield http(t, "POST", "/meetings", body={"meeting_id": meeting_id, "topic": rng.choice(TOPICS)})
+        for agent_id, role in agents:
+            yield http(t, "POST", f"/meetings/{meeting_id}/participants",
+                       params={"agent_id": agent_id, "role": role, "name": agent_id})
+        yield http(t, "POST", f"/meetings/{meeting_id}/speaking-order")
+        yield event(t, type="run_status", status="running")
+
+        end = t + profile.duration
+        turn = 0
+        while True:
+            # Интервалы между репликами - экспоненциальные (пуассоновский поток)
+            t += rng.expovariate(profile.turns_per_minute / 60.0)
+            if t >= end:
+                break
+
+            if rng.random() < profile.user_message_ratio:
+                yield http(t, "POST", f"/meetings/{meeting_id}/messages", params={
+                    "content": rng.choice(DISCUSSION_SENTENCES) + "?",
+                    "run_id": run_id,
+                    "agent_id": "user",
+                    "role": "user"
+                })
+
+            agent_id, role = agents[turn % len(agents)]
+            turn += 1
+            yield event(t, type="participant_status", agent_id=agent_id, status="speaking", role=role)
+
+            if rng.random() < profile.tool_call_ratio:
+                tool_id = rng.choices(list(profile.tool_mix), weights=list(profile.tool_mix.values()))[0]
+                yield event(t, type="tool_execution", agent_id=agent_id, tool_id=tool_id, status="running",
+                            args_masked={"query": "***"})
+                t += rng.expovariate(1000.0 / profile.tool_latency_ms)
+                yield event(t, type="tool_execution", agent_id=agent_id, tool_id=tool_id, status="completed")
+
+            # Потоковый ответ: части каждые delta_interval_ms, затем финальное сообщение
+            text = self._turn_text(role)
+            # Части и финальное сообщение связаны одним message_id, как в оркестраторе
+            message_id = f"msg_w{index}_{turn}"
+            words = text.split()
+            for start in range(0, len(words), profile.words_per_delta):
+                t += profile.delta_interval_ms / 1000.0
+                delta = " ".join(words[start:start + profile.words_per_delta]) + " "
+                yield event(t, type="chat_message_delta", agent_id=agent_id, message_id=message_id, delta=delta)
+
+            yield http(t, "POST", f"/meetings/{meeting_id}/messages", params={
+                "content": text, "run_id": run_id, "agent_id": agent_id, "role": "assistant"
+            })
+            yield event(t, type="agent_message", agent_id=agent_id, message_id=message_id,
+                        role="assistant", content=text)
+
+            if DECISION_PREFIX in text:
+                yield event(t, type="artifact_created", artifact_type="decision_log",
+                            summary=text, url=None, external_ref=None)
+
+            yield http(t, "POST", f"/meetings/{meeting_id}/next-speaker")
+
+        yield event(t, type="run_status", status="completed")
+
+    def _turn_text(self, role: str) -> str:
+        """Русский текст реплики с заданной плотностью решений и задач"""
+        profile, rng = self.profile, self.rng
+        sentences = []
+        if role == "scribe" and rng.random() < profile.decision_ratio * 5:
+            sentences.append(rng.choice(DECISION_SENTENCES))
+        elif rng.random() < profile.decision_ratio:
+            sentences.append(rng.choice(DECISION_SENTENCES))
+        if rng.random() < profile.task_ratio:
+            sentences.append(rng.choice(TASK_SENTENCES))
+
+        words = sum(len(sentence.split()) for sentence in sentences)
+        while words < profile.words_per_turn:
+            sentence = rng.choice(DISCUSSION_SENTENCES)
+            sentences.insert(rng.randrange(len(sentences) + 1), sentence)
+            words += len(sentence.split())
+        return ". ".join(sentences) + "."
+
+
+def write_log(path: str, profile: WorkloadProfile, records: Iterable[Dict[str, Any]]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "header", "profile": asdict(profile)}, ensure_ascii=False) + "\n")
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def read_log(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [record for record in records if record["op"] != "header"]
+
+
+class WorkloadReplayer:
+    """
+    Воспроизведение журнала с ускорением speed (0 - без пауз).
+
+    Записи одной встречи идут строго по порядку, встречи - параллельно.
+    Отставание от расписания показывает, где система перестает успевать.
+    """
+
+    def __init__(self, client, broker, speed: float = 1.0):
+        self.client = client
+        self.broker = broker
+        self.speed = speed
+        self.lags: List[float] = []
+        self.http_latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.events = 0
+        self.errors = 0
+
+    async def replay(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        by_meeting: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_meeting.setdefault(record["meeting_id"], []).append(record)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(self._replay_meeting(items, started) for items in by_meeting.values()))
+        elapsed = time.perf_counter() - started
+
+        span = max((record["t"] for record in records), default=0.0)
+        return {
+            "records": len(records),
+            "meetings": len(by_meeting),
+            "events": self.events,
+            "http_requests": len(self.http_latencies),
+            "http_statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "workload_seconds": round(span, 3),
+            "effective_speed": round(span / elapsed, 2) if elapsed else None,
+            "schedule_lag_ms": _percentiles(self.lags),
+            "http_latency_ms": _percentiles(self.http_latencies)
+        }
+
+    async def _replay_meeting(self, records: List[Dict[str, Any]], started: float):
+        for record in records:
+            if self.speed > 0:
+                due = started + record["t"] / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.lags.append(max(-delay, 0.0) * 1000)
+            try:
+                if record["op"] == "http":
+                    await self._http(record)
+                elif record["op"] == "event":
+                    await self._event(record["event"])
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Ошибка воспроизведения {record['op']} в {record['meeting_id']}: {e}")
+
+    async def _http(self, record: Dict[str, Any]):
+        request_started = time.perf_counter()
+        response = await self.client.request(
+            record["method"], record["path"], params=record.get("params") or None, json=record.get("body")
+        )
+        self.http_latencies.append((time.perf_counter() - request_started) * 1000)
+        self.statuses[response.status_code] = self.statuses.get(response.status_code, 0) + 1
+
+    async def _event(self, event: Dict[str, Any]):
+        await self.broker.emit_event(event)
+        self.events += 1
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {"p50": at(0.5), "p99": at(0.99), "max": round(ordered[-1], 3)}
+
+
+async def replay_in_process(records: List[Dict[str, Any]], speed: float) -> Dict[str, Any]:
+    """Воспроизвести журнал на приложении в том же процессе"""
+    import httpx
+    from app.main import create_app
+    from app.ws.broker import event_broker
+
+    # Встречи воспроизводятся без WebSocket-клиентов: предупреждения брокера о пустых комнатах не нужны
+    logging.getLogger("app").setLevel(logging.ERROR)
+    app = create_app()
+    await event_broker.start_processing()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://workload") as client:
+            report = await WorkloadReplayer(client, event_broker, speed).replay(records)
+        # Дожидаемся разбора очереди брокера
+        while event_broker.get_health()["queue_depth"]:
+            await asyncio.sleep(0.01)
+    finally:
+        await event_broker.stop_processing()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетическая нагрузка консилиумов")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="сгенерировать журнал событий")
+    defaults = WorkloadProfile()
+    for name, value in asdict(defaults).items():
+        if isinstance(value, dict):
+            generate.add_argument(f"--{name.replace('_', '-')}", type=json.loads, default=value,
+                                  help="JSON-объект")
+        else:
+            generate.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    generate.add_argument("--output", required=True)
+
+    replay = commands.add_parser("replay", help="воспроизвести журнал через REST API и event_broker")
+    replay.add_argument("log")
+    replay.add_argument("--speed", type=float, default=1.0, help="ускорение времени (0 - без пауз)")
+    replay.add_argument("--report", help="файл для JSON-отчета (по умолчанию stdout)")
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        params = {name: getattr(args, name) for name in asdict(defaults)}
+        profile = WorkloadProfile(**params)
+        count = write_log(args.output, profile, WorkloadGenerator(profile).generate())
+        logger.info(f"Записано {count} записей в {args.output}")
+        return
+
+    records = read_log(args.log)
+    logger.info(f"Воспроизведение {len(records)} записей, ускорение x{args.speed}")
+    report = asyncio.run(replay_in_process(records, args.speed))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()